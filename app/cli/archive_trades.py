@@ -0,0 +1,64 @@
+"""
+Move the trades older than TRADE_ARCHIVE_AFTER_DAYS from the trades
+collection to the archive.
+
+Usage:
+    python -m app.cli.archive_trades [--older-than-days N] [--user USER_ID]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+import time
+
+from app.config import get_app_settings
+from app.db import mongo
+from app.services.trade_archive import create_trade_archive
+
+
+async def __archive(older_than_days: int, user_id: str | None):
+    """
+    Archive the old trades of one user or of all users, and print the summary.
+    Args:
+        older_than_days (int): The age in days after which trades are archived.
+        user_id (str | None): Only archive this user's trades, or None for all users.
+    """
+
+    archive = create_trade_archive(get_app_settings().trade_archive_url)
+    if not archive:
+        raise SystemExit("TRADE_ARCHIVE_URL is not set")
+
+    cutoff = datetime.now(tz=timezone.utc) - timedelta(days=older_than_days)
+    await mongo.connect()
+    started_at = time.perf_counter()
+    try:
+        summary = await archive.archive(
+            mongo.get_trade_collection(), cutoff.timestamp(), user_id
+        )
+    finally:
+        mongo.close()
+    print(
+        f"Archived {summary['trades']} trades before {cutoff:%Y-%m-%d} "
+        f"of {summary['users']} users into {summary['files']} files "
+        f"in {time.perf_counter() - started_at:.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--older-than-days",
+        type=int,
+        help="Archive the trades older than this, TRADE_ARCHIVE_AFTER_DAYS by default",
+    )
+    parser.add_argument("--user", help="Only archive the trades of this user")
+    args = parser.parse_args()
+
+    older_than_days = args.older_than_days
+    if older_than_days is None:
+        older_than_days = get_app_settings().trade_archive_after_days
+    asyncio.run(__archive(older_than_days, args.user))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Backtest a strategy over the price history of a symbol, sweeping a parameter grid.
+
+Usage:
+    python -m app.cli.backtest SYMBOL [--strategy NAME] [--param NAME=V1,V2,...]...
+        [--source candles|trades|replay] [--interval 1m] [--replay-file PATH]
+        [--since TS] [--until TS] [--fee-rate RATE] [--workers N] [--top N]
+
+Example:
+    python -m app.cli.backtest BTC --strategy sma_crossover --param
+        fast=5,10,20 --param slow=50,100,200
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from app.config import get_app_settings
+from app.core.backtesting import STRATEGIES
+from app.core.parameter_sweep import run_sweep
+from app.db import mongo
+from app.schemas.candle_schema import CandleInterval
+from app.services.backtest_service import BacktestService
+from app.services.candle_service import CandleService
+from app.services.trade_archive import create_trade_archive
+
+
+def __parse_param(value: str) -> tuple[str, list]:
+    """
+    Parse a `NAME=V1,V2,...` parameter option into its candidate values.
+    Integers are kept as integers so they can be used as periods.
+    Args:
+        value (str): The option value.
+    Returns:
+        tuple[str, list]: The parameter name and its candidate values.
+    Raises:
+        argparse.ArgumentTypeError: If the option is malformed.
+    """
+
+    name, separator, candidates = value.partition("=")
+    if not separator or not name or not candidates:
+        raise argparse.ArgumentTypeError(f"Expected NAME=V1,V2,... but got '{value}'")
+
+    values = []
+    for candidate in candidates.split(","):
+        try:
+            values.append(int(candidate))
+        except ValueError:
+            try:
+                values.append(float(candidate))
+            except ValueError as e:
+                raise argparse.ArgumentTypeError(
+                    f"Invalid value '{candidate}' for parameter '{name}'"
+                ) from e
+    return name, values
+
+
+async def __load_prices(args: argparse.Namespace) -> np.ndarray:
+    """
+    Load the price history selected by the command line options.
+    Args:
+        args (argparse.Namespace): The parsed options.
+    Returns:
+        np.ndarray: The prices, oldest first.
+    """
+
+    if args.source == "replay":
+        _, prices = await BacktestService.load_replay_prices(
+            args.replay_file, args.symbol
+        )
+        return prices
+
+    await mongo.connect()
+    try:
+        app_settings = get_app_settings()
+        backtest_service = BacktestService(
+            mongo.get_trade_collection(),
+            CandleService(
+                mongo.get_candle_collection(), app_settings.candle_memory_size
+            ),
+            create_trade_archive(app_settings.trade_archive_url),
+        )
+        if args.source == "trades":
+            _, prices = await backtest_service.load_trade_prices(
+                args.symbol, args.since, args.until
+            )
+        else:
+            _, prices = await backtest_service.load_candle_prices(
+                args.symbol, args.interval, args.since or 0.0, args.until
+            )
+    finally:
+        mongo.close()
+    return prices
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("symbol")
+    parser.add_argument(
+        "--strategy", choices=sorted(STRATEGIES), default="sma_crossover"
+    )
+    parser.add_argument(
+        "--param",
+        type=__parse_param,
+        action="append",
+        default=[],
+        help="Candidate values of a strategy parameter, as NAME=V1,V2,...",
+    )
+    parser.add_argument(
+        "--source", choices=["candles", "trades", "replay"], default="candles"
+    )
+    parser.add_argument(
+        "--interval", type=CandleInterval, default=CandleInterval.ONE_MINUTE
+    )
+    parser.add_argument("--replay-file", help="The CSV file of the replay source")
+    parser.add_argument("--since", type=float)
+    parser.add_argument("--until", type=float)
+    parser.add_argument("--fee-rate", type=float, default=0.001)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--top", type=int, default=10, help="The number of results to print"
+    )
+    args = parser.parse_args()
+    if args.source == "replay" and not args.replay_file:
+        parser.error("--replay-file is required for the replay source")
+
+    prices = asyncio.run(__load_prices(args))
+    if len(prices) < 2:
+        parser.exit(1, f"Not enough {args.source} prices for {args.symbol}\n")
+
+    grid = dict(args.param)
+    started_at = time.perf_counter()
+    try:
+        results = run_sweep(prices, args.strategy, grid, args.fee_rate, args.workers)
+    except TypeError as e:
+        # The strategy function rejected a parameter name
+        parser.error(str(e))
+    elapsed = time.perf_counter() - started_at
+
+    print(
+        f"Backtested {len(results)} parameter sets over {len(prices):,} prices "
+        f"in {elapsed:.2f}s with {args.workers} workers"
+    )
+    results.sort(key=lambda result: result["total_return"], reverse=True)
+    for result in results[: args.top]:
+        print(
+            f"{result['params']}: return {result['total_return']:+.2%}, "
+            f"sharpe {result['sharpe_ratio']:.4f}, "
+            f"max drawdown {result['max_drawdown']:.2%}, "
+            f"{result['trade_count']} trades, exposure {result['exposure']:.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
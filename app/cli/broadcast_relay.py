@@ -0,0 +1,29 @@
+"""
+Run the broadcast relay sharing the trade stream between the
+worker processes of a machine.
+Point every worker at it with BROADCAST_TRANSPORT_URL=unix://PATH.
+
+Usage:
+    python -m app.cli.broadcast_relay PATH
+"""
+
+import argparse
+import asyncio
+
+from app.core.broadcast_transport import BroadcastRelay
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="The path of the Unix socket to listen on")
+    args = parser.parse_args()
+
+    print(f"Relaying broadcasts on {args.path}")
+    try:
+        asyncio.run(BroadcastRelay().serve(args.path))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
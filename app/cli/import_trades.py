@@ -0,0 +1,96 @@
+"""
+Import a trade history file for a user.
+
+Usage:
+    python -m app.cli.import_trades USER_ID FILE [--format csv|parquet] [--chunk-size N]
+"""
+
+import argparse
+import asyncio
+from collections.abc import AsyncIterator
+
+from app.db import mongo
+from app.schemas.trade_schema import TradeImportFormat
+from app.services.position_service import PositionService
+from app.services.trade_files import iter_csv_rows, iter_parquet_rows
+from app.services.trade_service import IMPORT_CHUNK_SIZE, TradeService
+
+READ_SIZE = 1 << 16
+
+
+async def __read_chunks(path: str) -> AsyncIterator[bytes]:
+    """
+    Read a file in fixed-size chunks.
+    Args:
+        path (str): The path of the file.
+    Yields:
+        bytes: The chunks of the file.
+    """
+
+    with open(path, "rb") as file:
+        while chunk := file.read(READ_SIZE):
+            yield chunk
+
+
+async def __import(
+    user_id: str, path: str, file_format: TradeImportFormat, chunk_size: int
+):
+    """
+    Import a trade history file and print the summary.
+    Args:
+        user_id (str): The ID of the user owning the trades.
+        path (str): The path of the file.
+        file_format (TradeImportFormat): The format of the file.
+        chunk_size (int): The number of rows validated and written at a time.
+    """
+
+    await mongo.connect()
+    try:
+        trade_service = TradeService(
+            mongo.get_trade_collection(),
+            position_service=PositionService(mongo.get_position_collection()),
+        )
+        batches = (
+            iter_csv_rows(__read_chunks(path))
+            if file_format == TradeImportFormat.CSV
+            else iter_parquet_rows(path)
+        )
+        summary = await trade_service.import_trades(user_id, batches, chunk_size)
+    finally:
+        mongo.close()
+
+    for error in summary["errors"]:
+        print(f"row {error['row']}: {error['message']}")
+    print(
+        f"Imported {summary['accepted']} trades, rejected {summary['rejected']} rows "
+        f"in {summary['elapsed_seconds']:.2f}s "
+        f"({summary['rows_per_second']:,.0f} rows/s)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("user_id", help="The user owning the imported trades")
+    parser.add_argument("file", help="The CSV or Parquet trade history file")
+    parser.add_argument(
+        "--format",
+        choices=[file_format.value for file_format in TradeImportFormat],
+        help="The format of the file, guessed from its extension by default",
+    )
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    file_format = (
+        TradeImportFormat(args.format)
+        if args.format
+        else (
+            TradeImportFormat.PARQUET
+            if args.file.lower().endswith(".parquet")
+            else TradeImportFormat.CSV
+        )
+    )
+    asyncio.run(__import(args.user_id, args.file, file_format, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Rebuild the materialized positions from the trades collection and the trade archive.
+
+Usage:
+    python -m app.cli.rebuild_positions [--user USER_ID]
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.config import get_app_settings
+from app.db import mongo
+from app.services.position_service import PositionService
+from app.services.trade_archive import create_trade_archive
+
+
+async def __rebuild(user_id: str | None):
+    """
+    Rebuild the positions of one user or of all users.
+    Args:
+        user_id (str | None): The user to rebuild, or None for all users.
+    """
+
+    await mongo.connect()
+    started_at = time.perf_counter()
+    try:
+        position_service = PositionService(mongo.get_position_collection())
+        count = await position_service.rebuild(
+            mongo.get_trade_collection(),
+            user_id,
+            create_trade_archive(get_app_settings().trade_archive_url),
+        )
+    finally:
+        mongo.close()
+    print(f"Rebuilt {count} positions in {time.perf_counter() - started_at:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--user", help="Only rebuild the positions of this user")
+    args = parser.parse_args()
+
+    asyncio.run(__rebuild(args.user))
+
+
+if __name__ == "__main__":
+    main()
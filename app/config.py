@@ -1,7 +1,14 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings
 
+# The keys of READ_PROFILES and WRITE_PROFILES in app.db.mongo, or the client defaults
+ReadProfile = Literal[
+    "default", "primary", "primary_preferred", "secondary_preferred", "nearest"
+]
+WriteProfile = Literal["default", "majority", "journaled", "acknowledged"]
+
 
 class AppSettings(BaseSettings):
     """
@@ -14,11 +21,55 @@ class AppSettings(BaseSettings):
     access_token_secret: str
     access_token_algorithm: str
     access_token_expires_in_minutes: int
+    access_token_cache_size: int = 10000
 
     mongodb_uri: str
     mongodb_db: str
     mongodb_trades_collection: str
     mongodb_users_collection: str
+    mongodb_candles_collection: str = "candles"
+    mongodb_positions_collection: str = "positions"
+    mongodb_alerts_collection: str = "alerts"
+    mongodb_max_pool_size: int = 100
+    mongodb_min_pool_size: int = 10
+    mongodb_max_idle_time_ms: int = 300000
+    mongodb_server_selection_timeout_ms: int = 5000
+    mongodb_connect_timeout_ms: int = 5000
+    mongodb_listing_read_profile: ReadProfile = "default"
+    mongodb_max_staleness_seconds: int = 90
+    mongodb_trade_write_profile: WriteProfile = "default"
+    mongodb_user_write_profile: WriteProfile = "default"
+    mongodb_derived_write_profile: WriteProfile = "default"
+    mongodb_write_timeout_ms: int = 5000
+
+    password_hash_workers: int = 4
+    password_hash_queue_size: int = 64
+
+    websocket_max_lag_seconds: float = 5.0
+    websocket_batch_window_ms: float = 10.0
+    broadcast_transport_url: str | None = None
+
+    market_data_source: str = "none"
+    market_data_symbols: str = "BTC,ETH,SOL"
+    market_data_replay_file: str | None = None
+    market_data_buffer_size: int = 65536
+
+    candle_memory_size: int = 1440
+    candle_flush_interval_seconds: float = 5.0
+
+    indicator_stream_interval: str = "1m"
+
+    trade_write_coalescing: bool = False
+    trade_write_window_ms: float = 2.0
+    trade_write_max_batch_size: int = 500
+    trade_fast_responses: bool = True
+
+    cache_local_size: int = 10000
+    cache_ttl_seconds: float = 2.0
+    cache_redis_url: str | None = None
+
+    trade_archive_url: str | None = None
+    trade_archive_after_days: int = 365
 
 
 @lru_cache
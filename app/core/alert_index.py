@@ -0,0 +1,136 @@
+import bisect
+from collections.abc import Iterable, Sequence
+
+
+class ThresholdIndex:
+    """
+    ThresholdIndex keeps alert rule IDs sorted by threshold in parallel lists,
+    so the rules whose thresholds fall within a price range are found with two
+    bisections and removed with one slice deletion.
+    """
+
+    def __init__(self):
+        self.thresholds: list[float] = []
+        self.rule_ids: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.thresholds)
+
+    def extend(self, rules: Iterable[tuple[float, str]]):
+        """
+        Add many rules at once, sorting once instead of inserting one by one.
+        Args:
+            rules (Iterable[tuple[float, str]]): The thresholds and IDs of the rules.
+        """
+
+        merged = sorted([*zip(self.thresholds, self.rule_ids), *rules])
+        self.thresholds = [threshold for threshold, _ in merged]
+        self.rule_ids = [rule_id for _, rule_id in merged]
+
+    def add(self, threshold: float, rule_id: str):
+        """
+        Add a rule.
+        Args:
+            threshold (float): The threshold of the rule.
+            rule_id (str): The ID of the rule.
+        """
+
+        index = bisect.bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(index, threshold)
+        self.rule_ids.insert(index, rule_id)
+
+    def remove(self, threshold: float, rule_id: str) -> bool:
+        """
+        Remove a rule.
+        Args:
+            threshold (float): The threshold of the rule.
+            rule_id (str): The ID of the rule.
+        Returns:
+            bool: True if the rule was indexed.
+        """
+
+        index = bisect.bisect_left(self.thresholds, threshold)
+        while index < len(self.thresholds) and self.thresholds[index] == threshold:
+            if self.rule_ids[index] == rule_id:
+                del self.thresholds[index]
+                del self.rule_ids[index]
+                return True
+            index += 1
+        return False
+
+    def pop_range(self, low: float, high: float, include_low: bool) -> list[str]:
+        """
+        Remove and return the rules with a threshold between two prices.
+        Args:
+            low (float): The lower bound of the range.
+            high (float): The upper bound of the range.
+            include_low (bool): Whether the range includes `low` (and excludes `high`),
+                or includes `high` (and excludes `low`).
+        Returns:
+            list[str]: The IDs of the removed rules, by ascending threshold.
+        """
+
+        if include_low:
+            start = bisect.bisect_left(self.thresholds, low)
+            end = bisect.bisect_left(self.thresholds, high, start)
+        else:
+            start = bisect.bisect_right(self.thresholds, low)
+            end = bisect.bisect_right(self.thresholds, high, start)
+        if start == end:
+            return []
+
+        rule_ids = self.rule_ids[start:end]
+        del self.thresholds[start:end]
+        del self.rule_ids[start:end]
+        return rule_ids
+
+
+class SymbolAlertIndex:
+    """
+    SymbolAlertIndex holds the alert rules of one symbol: rules firing when the price
+    crosses above their threshold, and rules firing when it crosses below.
+    A price move only touches the rules whose thresholds lie between the
+    previous and the new price.
+    Rules are one-shot and leave the index when they fire.
+    """
+
+    def __init__(self):
+        self.above = ThresholdIndex()
+        self.below = ThresholdIndex()
+        self.last_price: float | None = None
+
+    def __len__(self) -> int:
+        return len(self.above) + len(self.below)
+
+    def check(self, prices: Sequence[float]) -> list[tuple[str, float]]:
+        """
+        Fire the rules crossed by a sequence of prices.
+        A rule crossing above X fires on a move from below X to X or higher;
+        a rule crossing below X fires on a move from above X to X or lower.
+        Args:
+            prices (Sequence[float]): The new prices, in time order.
+        Returns:
+            list[tuple[str, float]]: The fired rule IDs and their crossing prices.
+        """
+
+        fired = []
+        previous = self.last_price
+        for price in prices:
+            if previous is not None:
+                if price > previous and self.above:
+                    fired.extend(
+                        (rule_id, price)
+                        for rule_id in self.above.pop_range(
+                            previous, price, include_low=False
+                        )
+                    )
+                elif price < previous and self.below:
+                    fired.extend(
+                        (rule_id, price)
+                        for rule_id in self.below.pop_range(
+                            price, previous, include_low=True
+                        )
+                    )
+            previous = price
+        self.last_price = previous
+        return fired
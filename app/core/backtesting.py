@@ -0,0 +1,175 @@
+from collections.abc import Callable
+import itertools
+from typing import NamedTuple
+
+import numpy as np
+
+from app.core.indicators import bollinger_bands, rsi, sma
+
+
+class BacktestResult(NamedTuple):
+    """
+    The performance of a strategy over a price series.
+    """
+
+    total_return: float
+    sharpe_ratio: float
+    max_drawdown: float
+    trade_count: int
+    exposure: float
+
+
+def __hold_between(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """
+    Turn entry and exit events into a long/flat position series without a Python loop:
+    the position after each bar is set by the most recent event, entries winning ties.
+    Args:
+        entries (np.ndarray): Boolean mask of the bars where a long position is entered.
+        exits (np.ndarray): Boolean mask of the bars where the position is closed.
+    Returns:
+        np.ndarray: The position after each bar, 1 when long and 0 when flat.
+    """
+
+    events = np.full(len(entries), np.nan)
+    events[exits] = 0.0
+    events[entries] = 1.0
+    # Forward-fill the events with the index of the latest bar that had one
+    latest = np.maximum.accumulate(
+        np.where(np.isnan(events), 0, np.arange(len(events)))
+    )
+    positions = events[latest]
+    return np.nan_to_num(positions, nan=0.0)
+
+
+def sma_crossover(prices: np.ndarray, fast: int, slow: int) -> np.ndarray:
+    """
+    Go long while the fast simple moving average is above the slow one.
+    Args:
+        prices (np.ndarray): The price series.
+        fast (int): The period of the fast average.
+        slow (int): The period of the slow average.
+    Returns:
+        np.ndarray: The position after each bar, 1 when long and 0 when flat.
+    """
+
+    with np.errstate(invalid="ignore"):
+        return (sma(prices, fast) > sma(prices, slow)).astype(np.float64)
+
+
+def rsi_reversion(
+    prices: np.ndarray, period: int = 14, lower: float = 30.0, upper: float = 70.0
+) -> np.ndarray:
+    """
+    Go long when the RSI falls below `lower`, and close when it rises above `upper`.
+    Args:
+        prices (np.ndarray): The price series.
+        period (int): The RSI period.
+        lower (float): The oversold level that triggers an entry.
+        upper (float): The overbought level that triggers an exit.
+    Returns:
+        np.ndarray: The position after each bar, 1 when long and 0 when flat.
+    """
+
+    strength = rsi(prices, period)
+    with np.errstate(invalid="ignore"):
+        return __hold_between(strength < lower, strength > upper)
+
+
+def bollinger_reversion(
+    prices: np.ndarray, period: int = 20, width: float = 2.0
+) -> np.ndarray:
+    """
+    Go long when the price closes below the lower Bollinger Band, and
+    close at the middle band.
+    Args:
+        prices (np.ndarray): The price series.
+        period (int): The band period.
+        width (float): The band width in standard deviations.
+    Returns:
+        np.ndarray: The position after each bar, 1 when long and 0 when flat.
+    """
+
+    middle, _, lower = bollinger_bands(prices, period, width)
+    with np.errstate(invalid="ignore"):
+        return __hold_between(prices < lower, prices > middle)
+
+
+STRATEGIES: dict[str, Callable[..., np.ndarray]] = {
+    "sma_crossover": sma_crossover,
+    "rsi_reversion": rsi_reversion,
+    "bollinger_reversion": bollinger_reversion,
+}
+
+
+def run_backtest(
+    prices: np.ndarray, positions: np.ndarray, fee_rate: float = 0.001
+) -> BacktestResult:
+    """
+    Simulate holding a position series over a price series.
+    The position decided at the close of a bar is filled at that close and earns the
+    return of the next bar, so signals never see the price they trade on. Every change
+    of position pays `fee_rate` on the traded fraction of equity.
+    Args:
+        prices (np.ndarray): The price series.
+        positions (np.ndarray): The position after each bar, as a fraction of equity.
+        fee_rate (float): The fee paid per unit of traded equity.
+    Returns:
+        BacktestResult: The performance of the position series.
+    """
+
+    if len(prices) < 2:
+        return BacktestResult(0.0, 0.0, 0.0, 0, 0.0)
+
+    price_returns = prices[1:] / prices[:-1] - 1.0
+    held = positions[:-1]
+    trades = np.abs(np.diff(held, prepend=0.0))
+    strategy_returns = held * price_returns - fee_rate * trades
+
+    equity = np.cumprod(1.0 + strategy_returns)
+    peaks = np.maximum.accumulate(np.maximum(equity, 1.0))
+    deviation = strategy_returns.std()
+
+    return BacktestResult(
+        total_return=float(equity[-1] - 1.0),
+        sharpe_ratio=(
+            float(strategy_returns.mean() / deviation) if deviation > 0 else 0.0
+        ),
+        max_drawdown=float((1.0 - equity / peaks).max()),
+        trade_count=int(np.count_nonzero(trades)),
+        exposure=float(np.count_nonzero(held) / len(held)),
+    )
+
+
+def run_strategy(
+    prices: np.ndarray, strategy: str, params: dict, fee_rate: float = 0.001
+) -> BacktestResult:
+    """
+    Backtest a registered strategy with a set of parameters.
+    Args:
+        prices (np.ndarray): The price series.
+        strategy (str): The name of the strategy in `STRATEGIES`.
+        params (dict): The keyword arguments of the strategy.
+        fee_rate (float): The fee paid per unit of traded equity.
+    Returns:
+        BacktestResult: The performance of the strategy.
+    Raises:
+        ValueError: If the strategy is unknown.
+    """
+
+    signal = STRATEGIES.get(strategy)
+    if signal is None:
+        raise ValueError(f"Unknown strategy '{strategy}'")
+    return run_backtest(prices, signal(prices, **params), fee_rate)
+
+
+def expand_grid(grid: dict[str, list]) -> list[dict]:
+    """
+    Expand a parameter grid into every combination of its values.
+    Args:
+        grid (dict[str, list]): The candidate values of each parameter.
+    Returns:
+        list[dict]: The parameter sets.
+    """
+
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
@@ -0,0 +1,319 @@
+import asyncio
+from collections.abc import Hashable, Iterable, Sequence
+import logging
+import time
+from typing import Any
+
+from app.core.broadcast_transport import BroadcastTransport
+from app.core.conflating_queue import ConflatingQueue, PutResult
+from app.core.service_metrics import (
+    BROADCAST_MESSAGES_CONFLATED,
+    BROADCAST_MESSAGES_DELIVERED,
+    BROADCAST_MESSAGES_DROPPED,
+    BROADCAST_MESSAGES_PUBLISHED,
+    BROADCAST_SUBSCRIBERS,
+)
+
+
+class SlowConsumerError(Exception):
+    """Exception raised when a subscriber falls behind its lag threshold."""
+
+    def __init__(self, lag_seconds: float):
+        self.lag_seconds = lag_seconds
+
+    def __str__(self):
+        return f"Subscriber is {self.lag_seconds:.2f} seconds behind"
+
+
+def symbol_topic(symbol: str) -> str:
+    """
+    Get the topic name for messages about a symbol.
+    Args:
+        symbol (str): The trading symbol.
+    Returns:
+        str: The topic name.
+    """
+
+    return f"symbol:{symbol}"
+
+
+def user_topic(user_id: str) -> str:
+    """
+    Get the topic name for messages addressed to a user.
+    Args:
+        user_id (str): The ID of the user.
+    Returns:
+        str: The topic name.
+    """
+
+    return f"user:{user_id}"
+
+
+class Subscription:
+    """
+    Subscription is a single subscriber's view of the BroadcastHub.
+    Messages published to any of its topics are delivered to a bounded conflating queue,
+    which keeps only the newest pending message per key.
+    """
+
+    def __init__(
+        self,
+        topics: Iterable[str],
+        max_queue_size: int,
+        max_lag_seconds: float | None = None,
+    ):
+        self.topics = frozenset(topics)
+        self.queue = ConflatingQueue(max_queue_size)
+        self.max_lag_seconds = max_lag_seconds
+
+    @property
+    def conflated(self) -> int:
+        """
+        Get the number of messages replaced by a newer message with the same key.
+        Returns:
+            int: The number of conflated messages.
+        """
+
+        return self.queue.conflated
+
+    @property
+    def dropped(self) -> int:
+        """
+        Get the number of messages dropped because the queue was full.
+        Returns:
+            int: The number of dropped messages.
+        """
+
+        return self.queue.dropped
+
+    def deliver(self, message: Any, key: Hashable | None = None) -> PutResult:
+        """
+        Deliver a message to the subscriber without blocking.
+        Args:
+            message (Any): The message to deliver.
+            key (Hashable | None): The conflation key, or None to never conflate it.
+        Returns:
+            PutResult: The outcome of queueing the message.
+        """
+
+        return self.queue.put_nowait(message, key)
+
+    async def get(self) -> Any:
+        """
+        Wait for the next message.
+        Returns:
+            Any: The next message.
+        Raises:
+            SlowConsumerError: If the message waited longer than the lag threshold.
+        """
+
+        message, enqueued_at = await self.queue.get()
+        self.__check_lag(enqueued_at)
+        return message
+
+    async def get_batch(self, window_seconds: float) -> list[Any]:
+        """
+        Wait for the next message, then collect everything that
+        arrives within a time window.
+        Args:
+            window_seconds (float): How long to keep collecting after the first message.
+        Returns:
+            list[Any]: The collected messages, oldest first.
+        Raises:
+            SlowConsumerError: If a message waited longer than the lag threshold.
+        """
+
+        messages = [await self.get()]
+        if window_seconds > 0:
+            await asyncio.sleep(window_seconds)
+
+        for message, enqueued_at in self.queue.drain():
+            self.__check_lag(enqueued_at)
+            messages.append(message)
+        return messages
+
+    def __check_lag(self, enqueued_at: float):
+        """
+        Check that a message did not wait longer than the lag threshold.
+        Args:
+            enqueued_at (float): The monotonic time the message was enqueued at.
+        Raises:
+            SlowConsumerError: If the message waited longer than the lag threshold.
+        """
+
+        if self.max_lag_seconds is None:
+            return
+
+        lag_seconds = time.monotonic() - enqueued_at
+        if lag_seconds > self.max_lag_seconds:
+            raise SlowConsumerError(lag_seconds)
+
+
+class BroadcastHub:
+    """
+    BroadcastHub is a process-wide, in-memory publish/subscribe hub.
+    A producer publishes each message once, and the hub fans it out to the bounded
+    queue of every subscriber of the message's topics.
+    With a transport, published messages are fanned out to the subscribers of
+    every process sharing it, once they come back through the transport numbered
+    per topic (see `BroadcastTransport`); `run_transport` must then run for
+    messages to be delivered.
+    """
+
+    def __init__(self, transport: BroadcastTransport | None = None):
+        self.transport = transport
+        self.__subscribers: dict[str, set[Subscription]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.conflated = 0
+        self.dropped = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        """
+        Get the number of distinct active subscriptions.
+        Returns:
+            int: The number of active subscriptions.
+        """
+
+        return len(set().union(*self.__subscribers.values()))
+
+    def get_stats(self) -> dict:
+        """
+        Get the fan-out counters and the current depth of the subscriber queues.
+        Walks every subscription, so it is meant for periodic
+        reporting rather than hot paths.
+        Returns:
+            dict: The cumulative message counters, the number of subscriptions,
+            and the total and largest number of queued messages.
+        """
+
+        subscriptions = set().union(*self.__subscribers.values())
+        depths = [len(subscription.queue) for subscription in subscriptions]
+        return {
+            "published": self.published,
+            "delivered": self.delivered,
+            "conflated": self.conflated,
+            "dropped": self.dropped,
+            "subscribers": len(subscriptions),
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+        }
+
+    def subscribe(
+        self,
+        topics: Iterable[str],
+        max_queue_size: int,
+        max_lag_seconds: float | None = None,
+    ) -> Subscription:
+        """
+        Subscribe to a set of topics.
+        Args:
+            topics (Iterable[str]): The topics to subscribe to.
+            max_queue_size (int): The maximum number of undelivered messages to keep.
+            max_lag_seconds (float | None): How far behind the subscriber may fall
+            before reading from the subscription fails, or None for no limit.
+        Returns:
+            Subscription: The new subscription. Pass it to `unsubscribe` when done.
+        """
+
+        subscription = Subscription(topics, max_queue_size, max_lag_seconds)
+        for topic in subscription.topics:
+            self.__subscribers.setdefault(topic, set()).add(subscription)
+        BROADCAST_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """
+        Remove a subscription from all its topics.
+        Args:
+            subscription (Subscription): The subscription to remove.
+        """
+
+        subscribed = False
+        for topic in subscription.topics:
+            subscribers = self.__subscribers.get(topic)
+            if subscribers is None or subscription not in subscribers:
+                continue
+            subscribed = True
+            subscribers.remove(subscription)
+            if not subscribers:
+                del self.__subscribers[topic]
+        if subscribed:
+            BROADCAST_SUBSCRIBERS.dec()
+
+    def publish(
+        self,
+        message: Any,
+        *topics: str,
+        key: Hashable | None = None,
+        local: bool = False,
+    ) -> int:
+        """
+        Publish a message to one or more topics.
+        A subscriber of several of the topics receives the message only once.
+        Args:
+            message (Any): The message to publish. Must be a StreamMessage with a string
+            key, or no key, when it goes through the transport.
+            *topics (str): The topics to publish to.
+            key (Hashable | None): The conflation key, e.g. the symbol of a price
+            update. Slow subscribers only keep the newest pending message per key.
+            local (bool): Whether to only deliver the message to this process's
+            subscribers, for messages every process produces itself, such as heartbeats.
+        Returns:
+            int: The number of subscribers the message was delivered to,
+            or 0 if it was handed to the transport.
+        """
+
+        self.published += 1
+        BROADCAST_MESSAGES_PUBLISHED.inc()
+        if self.transport and not local:
+            self.transport.send(message, list(topics), key)
+            return 0
+        return self.__deliver(message, topics, key)
+
+    async def run_transport(self, logger: logging.Logger):
+        """
+        Deliver the messages received from the transport until the task is cancelled.
+        Args:
+            logger (logging.Logger): The logger instance.
+        """
+
+        await self.transport.run(self.__deliver, logger)
+
+    def __deliver(
+        self, message: Any, topics: Sequence[str], key: Hashable | None
+    ) -> int:
+        """
+        Deliver a message to the subscribers of its topics in this process.
+        Args:
+            message (Any): The message.
+            topics (Sequence[str]): The topics of the message.
+            key (Hashable | None): The conflation key.
+        Returns:
+            int: The number of subscribers the message was delivered to.
+        """
+
+        if len(topics) == 1:
+            subscribers = self.__subscribers.get(topics[0], ())
+        else:
+            subscribers = set().union(
+                *(self.__subscribers.get(topic, ()) for topic in topics)
+            )
+
+        conflated = dropped = 0
+        for subscription in subscribers:
+            result = subscription.deliver(message, key)
+            if result is PutResult.CONFLATED:
+                conflated += 1
+            elif result is PutResult.DROPPED:
+                dropped += 1
+        self.delivered += len(subscribers)
+        BROADCAST_MESSAGES_DELIVERED.inc(len(subscribers))
+        if conflated:
+            self.conflated += conflated
+            BROADCAST_MESSAGES_CONFLATED.inc(conflated)
+        if dropped:
+            self.dropped += dropped
+            BROADCAST_MESSAGES_DROPPED.inc(dropped)
+        return len(subscribers)
@@ -0,0 +1,483 @@
+from abc import ABC, abstractmethod
+import asyncio
+from collections.abc import AsyncIterator, Callable
+import logging
+import os
+import struct
+
+import orjson
+
+from app.core.service_metrics import (
+    BROADCAST_TRANSPORT_MESSAGES,
+    BROADCAST_TRANSPORT_PENDING_MESSAGES,
+    BROADCAST_TRANSPORT_RECONNECTS,
+)
+from app.core.stream_codec import StreamMessage
+
+MEMORY_TRANSPORT_URL = "memory://"
+# Local topic told every time the transport connects, as messages may have been missed
+CONNECTED_TOPIC = "broadcast:connected"
+UNIX_TRANSPORT_SCHEME = "unix://"
+BROADCAST_CHANNEL = "broadcast"
+SEQUENCE_KEY_PREFIX = "broadcast:seq:"
+MAX_PENDING_FRAMES = 10000
+MAX_WRITE_BATCH = 256
+RECONNECT_DELAY_SECONDS = 0.5
+# Relay connections buffering more than this are too slow to keep up and are closed
+MAX_RELAY_BUFFER_BYTES = 8 << 20
+FRAME_HEADER = struct.Struct("!I")
+
+# Increments the sequence of every topic and publishes the message prefixed with
+# them, atomically, so the sequence numbers follow the order in which
+# subscribers receive the messages
+PUBLISH_SCRIPT = """
+local sequences = {}
+for i, key in ipairs(KEYS) do
+    sequences[i] = redis.call('INCR', key)
+end
+redis.call('PUBLISH', ARGV[1], '[' .. table.concat(sequences, ',') .. ']\\n' .. ARGV[2])
+"""
+
+Deliver = Callable[[StreamMessage, list[str], str | None], object]
+
+
+class BroadcastTransport(ABC):
+    """
+    BroadcastTransport carries published stream messages between the processes
+    serving the stream, so a message published by one worker reaches the clients
+    connected to every worker.
+    Every message, including the worker's own, comes back through the transport numbered
+    with the next sequence number of each of its topics, assigned in a
+    single place for all workers.
+    Clients can then detect missed messages from gaps in the sequence of a topic.
+    Messages are sent in the background, in publish order; while the transport is
+    disconnected, they are queued up to a limit and then dropped. Each time the
+    transport connects, a message of type "connected" is delivered locally to
+    CONNECTED_TOPIC, so subscribers that cannot afford missed messages can resync.
+    Wire format: the sequence numbers, the topics and the key with the payload, as JSON
+    separated by newlines (the JSON encoding never contains a raw newline).
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_FRAMES):
+        self.__pending: asyncio.Queue[bytes] = asyncio.Queue(max_pending)
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    def send(self, message: StreamMessage, topics: list[str], key: str | None = None):
+        """
+        Queue a message for publishing, without blocking.
+        Args:
+            message (StreamMessage): The message to publish.
+            topics (list[str]): The topics to publish to.
+            key (str | None): The conflation key.
+        """
+
+        frame = orjson.dumps(topics) + b"\n" + orjson.dumps([key, message.payload])
+        try:
+            self.__pending.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            BROADCAST_TRANSPORT_MESSAGES.labels("dropped").inc()
+            return
+        BROADCAST_TRANSPORT_PENDING_MESSAGES.inc()
+
+    async def run(self, deliver: Deliver, logger: logging.Logger):
+        """
+        Publish the queued messages and deliver the received ones until the task is
+        cancelled, reconnecting whenever the connection is lost.
+        Args:
+            deliver (Deliver): Called with each message received, its topics and key.
+            logger (logging.Logger): The logger instance. A failure is logged once until
+            the transport connects again, rather than on every attempt.
+        """
+
+        failing = False
+        while True:
+            try:
+                await self.open()
+                deliver(StreamMessage({"type": "connected"}), [CONNECTED_TOPIC], None)
+                if failing:
+                    logger.info(
+                        "Broadcast transport %s reconnected", type(self).__name__
+                    )
+                    failing = False
+                await self.__run_connected(deliver)
+            except self.connection_errors as e:
+                if not failing:
+                    logger.error(
+                        "Broadcast transport %s disconnected, retrying every %.1fs: %s",
+                        type(self).__name__,
+                        RECONNECT_DELAY_SECONDS,
+                        str(e) or type(e).__name__,
+                    )
+                    failing = True
+                self.reconnects += 1
+                BROADCAST_TRANSPORT_RECONNECTS.inc()
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            finally:
+                await self.close()
+
+    def get_stats(self) -> dict:
+        """
+        Get the transport counters.
+        Returns:
+            dict: The cumulative numbers of messages sent, received and dropped, the
+            number of reconnections, and the number of messages waiting to be sent.
+        """
+
+        return {
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+            "pending": self.__pending.qsize(),
+        }
+
+    @property
+    def connection_errors(self) -> tuple[type[Exception], ...]:
+        """
+        Get the exceptions signalling a lost connection.
+        Returns:
+            tuple[type[Exception], ...]: The exception types.
+        """
+
+        return (OSError, EOFError)
+
+    @abstractmethod
+    async def open(self):
+        """
+        Connect to the transport.
+        """
+
+    @abstractmethod
+    async def close(self):
+        """
+        Disconnect from the transport. Must be safe to call when not connected.
+        """
+
+    @abstractmethod
+    async def write(self, frames: list[bytes]):
+        """
+        Publish messages, in order.
+        Args:
+            frames (list[bytes]): The topics and payload of each message.
+        """
+
+    @abstractmethod
+    def read(self) -> AsyncIterator[bytes]:
+        """
+        Receive messages, in the order they were numbered.
+        Yields:
+            bytes: The sequence numbers, topics and payload of each message.
+        """
+
+    async def __run_connected(self, deliver: Deliver):
+        """
+        Publish and receive messages until either direction stops.
+        Args:
+            deliver (Deliver): Called with each message received, its topics and key.
+        Raises:
+            EOFError: If the transport stopped delivering messages without an error.
+        """
+
+        tasks = [
+            asyncio.create_task(self.__write_pending()),
+            asyncio.create_task(self.__read(deliver)),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done:
+            task.result()
+        raise EOFError("The transport stopped delivering messages")
+
+    async def __write_pending(self):
+        """
+        Publish queued messages, in batches of whatever is queued when
+        the previous batch is done.
+        """
+
+        while True:
+            frames = [await self.__pending.get()]
+            while len(frames) < MAX_WRITE_BATCH and not self.__pending.empty():
+                frames.append(self.__pending.get_nowait())
+            BROADCAST_TRANSPORT_PENDING_MESSAGES.dec(len(frames))
+            await self.write(frames)
+            self.sent += len(frames)
+            BROADCAST_TRANSPORT_MESSAGES.labels("sent").inc(len(frames))
+
+    async def __read(self, deliver: Deliver):
+        """
+        Decode received messages, attach their sequence numbers and deliver them.
+        Args:
+            deliver (Deliver): Called with each message received, its topics and key.
+        """
+
+        async for data in self.read():
+            sequences, topics, rest = data.split(b"\n", 2)
+            topics = orjson.loads(topics)
+            key, payload = orjson.loads(rest)
+            payload["seq"] = dict(zip(topics, orjson.loads(sequences)))
+            self.received += 1
+            BROADCAST_TRANSPORT_MESSAGES.labels("received").inc()
+            deliver(StreamMessage(payload), topics, key)
+
+
+class MemoryBroadcastTransport(BroadcastTransport):
+    """
+    MemoryBroadcastTransport is an in-process loopback transport,
+    which only numbers messages.
+    Useful for a single worker, or for development, without a relay or a Redis server.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_FRAMES):
+        super().__init__(max_pending)
+        self.__sequences = TopicSequences()
+        self.__received: asyncio.Queue[bytes] = asyncio.Queue()
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def write(self, frames: list[bytes]):
+        for frame in frames:
+            self.__received.put_nowait(self.__sequences.number(frame))
+
+    async def read(self) -> AsyncIterator[bytes]:
+        while True:
+            yield await self.__received.get()
+
+
+class RelayBroadcastTransport(BroadcastTransport):
+    """
+    RelayBroadcastTransport connects to a BroadcastRelay over a Unix socket: a
+    local stand-in for Redis pub/sub for the workers of a single machine.
+    Frames are length-prefixed.
+    """
+
+    def __init__(self, path: str, max_pending: int = MAX_PENDING_FRAMES):
+        super().__init__(max_pending)
+        self.path = path
+        self.__reader: asyncio.StreamReader | None = None
+        self.__writer: asyncio.StreamWriter | None = None
+
+    async def open(self):
+        self.__reader, self.__writer = await asyncio.open_unix_connection(self.path)
+
+    async def close(self):
+        if self.__writer is not None:
+            self.__writer.close()
+            self.__reader = self.__writer = None
+
+    async def write(self, frames: list[bytes]):
+        self.__writer.write(
+            b"".join(FRAME_HEADER.pack(len(frame)) + frame for frame in frames)
+        )
+        await self.__writer.drain()
+
+    async def read(self) -> AsyncIterator[bytes]:
+        while True:
+            yield await read_frame(self.__reader)
+
+
+class RedisBroadcastTransport(BroadcastTransport):
+    """
+    RedisBroadcastTransport publishes messages to a Redis pub/sub channel.
+    Each message is numbered and published by a server-side script in a single round
+    trip, and queued messages are sent in pipelines.
+    """
+
+    def __init__(
+        self,
+        client,
+        channel: str = BROADCAST_CHANNEL,
+        max_pending: int = MAX_PENDING_FRAMES,
+    ):
+        super().__init__(max_pending)
+        self.client = client
+        self.channel = channel
+        self.__script = client.register_script(PUBLISH_SCRIPT)
+        self.__pubsub = None
+
+    @property
+    def connection_errors(self) -> tuple[type[Exception], ...]:
+        import redis.exceptions
+
+        return (
+            OSError,
+            EOFError,
+            redis.exceptions.ConnectionError,
+            redis.exceptions.TimeoutError,
+        )
+
+    async def open(self):
+        self.__pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self.__pubsub.subscribe(self.channel)
+
+    async def close(self):
+        if self.__pubsub is not None:
+            await self.__pubsub.aclose()
+            self.__pubsub = None
+
+    async def write(self, frames: list[bytes]):
+        async with self.client.pipeline(transaction=False) as pipeline:
+            for frame in frames:
+                topics = orjson.loads(frame.partition(b"\n")[0])
+                await self.__script(
+                    keys=[SEQUENCE_KEY_PREFIX + topic for topic in topics],
+                    args=[self.channel, frame],
+                    client=pipeline,
+                )
+            await pipeline.execute()
+
+    async def read(self) -> AsyncIterator[bytes]:
+        async for message in self.__pubsub.listen():
+            if message["type"] == "message":
+                yield message["data"]
+
+
+class TopicSequences:
+    """
+    TopicSequences numbers messages with the next sequence
+    number of each of their topics.
+    """
+
+    def __init__(self):
+        self.__sequences: dict[str, int] = {}
+
+    def number(self, frame: bytes) -> bytes:
+        """
+        Number a message.
+        Args:
+            frame (bytes): The topics and payload of the message.
+        Returns:
+            bytes: The message prefixed with the sequence number of each of its topics.
+        """
+
+        sequences = []
+        for topic in orjson.loads(frame.partition(b"\n")[0]):
+            sequence = self.__sequences[topic] = self.__sequences.get(topic, 0) + 1
+            sequences.append(sequence)
+        return orjson.dumps(sequences) + b"\n" + frame
+
+
+class BroadcastRelay:
+    """
+    BroadcastRelay forwards every message received from a connection to all connections,
+    including the sender, numbered in the order they are forwarded.
+    Connections that do not read fast enough are closed rather than buffered without
+    bound; their clients see the messages missed meanwhile as sequence gaps.
+    """
+
+    def __init__(self):
+        self.__sequences = TopicSequences()
+        self.__writers: set[asyncio.StreamWriter] = set()
+        self.relayed = 0
+        self.disconnected = 0
+
+    async def serve(self, path: str):
+        """
+        Listen on a Unix socket until the task is cancelled.
+        Args:
+            path (str): The path of the socket, replaced if it exists.
+        """
+
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.__handle, path)
+        async with server:
+            await server.serve_forever()
+
+    def get_stats(self) -> dict:
+        """
+        Get the relay counters.
+        Returns:
+            dict: The connections, messages relayed and slow connections closed.
+        """
+
+        return {
+            "connections": len(self.__writers),
+            "relayed": self.relayed,
+            "disconnected": self.disconnected,
+        }
+
+    async def __handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """
+        Relay the messages of a connection until it is closed.
+        Args:
+            reader (asyncio.StreamReader): The connection's reader.
+            writer (asyncio.StreamWriter): The connection's writer.
+        """
+
+        self.__writers.add(writer)
+        try:
+            while True:
+                frame = self.__sequences.number(await read_frame(reader))
+                data = FRAME_HEADER.pack(len(frame)) + frame
+                for subscriber in list(self.__writers):
+                    if (
+                        subscriber.transport.get_write_buffer_size()
+                        > MAX_RELAY_BUFFER_BYTES
+                    ):
+                        self.disconnected += 1
+                        self.__writers.discard(subscriber)
+                        subscriber.close()
+                        continue
+                    subscriber.write(data)
+                self.relayed += 1
+        except (OSError, EOFError):
+            pass
+        finally:
+            self.__writers.discard(writer)
+            writer.close()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    """
+    Read a length-prefixed frame.
+    Args:
+        reader (asyncio.StreamReader): The reader.
+    Returns:
+        bytes: The frame.
+    Raises:
+        IncompleteReadError: If the connection is closed.
+    """
+
+    (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    return await reader.readexactly(length)
+
+
+def create_broadcast_transport(url: str | None) -> BroadcastTransport | None:
+    """
+    Create the cross-process broadcast transport from its URL.
+    Args:
+        url (str | None): "unix:///path/to/relay.sock" for a BroadcastRelay, a Redis
+        URL, "memory://" for the in-process loopback, or None to skip numbering.
+    Returns:
+        BroadcastTransport | None: The transport, or None if disabled.
+    Raises:
+        ValueError: If the URL scheme is not supported.
+    """
+
+    if not url:
+        return None
+    if url == MEMORY_TRANSPORT_URL:
+        return MemoryBroadcastTransport()
+    if url.startswith(UNIX_TRANSPORT_SCHEME):
+        return RelayBroadcastTransport(url[len(UNIX_TRANSPORT_SCHEME) :])
+    if url.startswith(("redis://", "rediss://")):
+        # redis takes a while to import and is only needed when a Redis
+        # transport is configured
+        import redis.asyncio
+
+        return RedisBroadcastTransport(redis.asyncio.from_url(url))
+    raise ValueError(f"Unsupported broadcast transport URL: {url}")
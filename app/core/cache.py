@@ -0,0 +1,508 @@
+from abc import ABC, abstractmethod
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+import logging
+import sys
+import time
+from typing import Any
+import uuid
+
+import orjson
+
+from app.core.broadcast_hub import BroadcastHub
+from app.core.broadcast_transport import CONNECTED_TOPIC
+from app.core.service_metrics import CACHE_BACKEND_ERRORS, CACHE_LOOKUPS
+from app.core.stream_codec import StreamMessage
+
+MEMORY_CACHE_URL = "memory://"
+CACHE_INVALIDATION_TOPIC = "cache-invalidations"
+# Outlives any load, so a generation never expires and counts up to
+# the same value while a load of its namespace is in flight
+GENERATION_TTL_SECONDS = 86400
+
+# Sets an entry only if its namespace is still at the generation read before loading
+# the value, so a value loaded before an invalidation is never written back
+SET_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[2]) or '0') ~= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+
+class CacheBackend(ABC):
+    """
+    CacheBackend is the interface of the shared cache tier behind the ReadThroughCache.
+    Entries are grouped in namespaces that are dropped as a whole,
+    and values are opaque bytes.
+    Each namespace has a generation, bumped when it is dropped, and entries are only
+    set if their namespace is still at the generation read before loading them.
+    """
+
+    @abstractmethod
+    async def get(self, namespace: str, key: str) -> tuple[bytes | None, int]:
+        """
+        Get an entry and the generation of its namespace.
+        Args:
+            namespace (str): The namespace of the entry.
+            key (str): The key of the entry within its namespace.
+        Returns:
+            tuple[bytes | None, int]: The value, or None if the entry does not exist,
+            and the generation of the namespace.
+        """
+
+    @abstractmethod
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl_seconds: float,
+        generation: int,
+    ) -> bool:
+        """
+        Set an entry, keeping its namespace for at least `ttl_seconds`, unless
+        the namespace was dropped since `generation` was read.
+        Args:
+            namespace (str): The namespace of the entry.
+            key (str): The key of the entry within its namespace.
+            value (bytes): The value.
+            ttl_seconds (float): The time to live of the namespace.
+            generation (int): The generation of the namespace the value was loaded in.
+        Returns:
+            bool: Whether the entry was set.
+        """
+
+    @abstractmethod
+    async def delete(self, namespace: str):
+        """
+        Delete every entry of a namespace and bump its generation.
+        Args:
+            namespace (str): The namespace.
+        """
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    RedisCacheBackend stores each namespace as a Redis hash, so a namespace is
+    read and written one field at a time and dropped with a single DEL,
+    whatever the number of entries.
+    The generation of a namespace is a counter next to its hash, read in the same
+    round trip as entries and checked by a server-side script when setting them.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.__set_script = client.register_script(SET_SCRIPT)
+
+    async def get(self, namespace: str, key: str) -> tuple[bytes | None, int]:
+        async with self.client.pipeline(transaction=False) as pipeline:
+            pipeline.hget(namespace, key)
+            pipeline.get(self.__generation_key(namespace))
+            value, generation = await pipeline.execute()
+        return value, int(generation or 0)
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl_seconds: float,
+        generation: int,
+    ) -> bool:
+        return bool(
+            await self.__set_script(
+                keys=[namespace, self.__generation_key(namespace)],
+                args=[key, value, generation, max(int(ttl_seconds), 1)],
+            )
+        )
+
+    async def delete(self, namespace: str):
+        generation_key = self.__generation_key(namespace)
+        async with self.client.pipeline(transaction=True) as pipeline:
+            pipeline.incr(generation_key)
+            pipeline.expire(generation_key, GENERATION_TTL_SECONDS)
+            pipeline.delete(namespace)
+            await pipeline.execute()
+
+    @staticmethod
+    def __generation_key(namespace: str) -> str:
+        """
+        Get the key of the generation counter of a namespace.
+        Args:
+            namespace (str): The namespace.
+        Returns:
+            str: The key of the counter.
+        """
+
+        return f"{namespace}:generation"
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    MemoryCacheBackend is an in-process stand-in for the Redis tier, with the same
+    semantics: namespaces are hashes expiring as a whole. Useful for local development
+    and benchmarks without a Redis server; it is not shared between processes.
+    """
+
+    def __init__(self):
+        self.__namespaces: dict[str, tuple[float, dict[str, bytes]]] = {}
+        self.__generations: dict[str, int] = {}
+
+    async def get(self, namespace: str, key: str) -> tuple[bytes | None, int]:
+        entries = self.__get_entries(namespace)
+        return (
+            entries.get(key) if entries else None,
+            self.__generations.get(namespace, 0),
+        )
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl_seconds: float,
+        generation: int,
+    ) -> bool:
+        if self.__generations.get(namespace, 0) != generation:
+            return False
+        entries = self.__get_entries(namespace) or {}
+        entries[key] = value
+        self.__namespaces[namespace] = (time.monotonic() + ttl_seconds, entries)
+        return True
+
+    async def delete(self, namespace: str):
+        self.__generations[namespace] = self.__generations.get(namespace, 0) + 1
+        self.__namespaces.pop(namespace, None)
+
+    def __get_entries(self, namespace: str) -> dict[str, bytes] | None:
+        """
+        Get the entries of a namespace, dropping it if it has expired.
+        Args:
+            namespace (str): The namespace.
+        Returns:
+            dict[str, bytes] | None: The entries, or None if there is no such namespace.
+        """
+
+        expires_at, entries = self.__namespaces.get(namespace, (0.0, None))
+        if entries is not None and expires_at <= time.monotonic():
+            del self.__namespaces[namespace]
+            return None
+        return entries
+
+
+class ReadThroughCache:
+    """
+    ReadThroughCache serves values from an in-process LRU tier, then from an optional
+    shared backend tier, and only calls the loader on a miss in both.
+    Concurrent misses on the same key share a single load, so an expired hot key
+    does not send a stampede of identical queries to the database.
+    Entries are grouped in namespaces (e.g. one per user) that
+    writers invalidate as a whole.
+    Cached values are shared between callers and must not be modified. Values stored in
+    the backend tier must be JSON-serializable; tuples come back as lists.
+    With a hub that has a transport, invalidations are published to
+    CACHE_INVALIDATION_TOPIC and applied by `run_invalidations`, so every worker
+    process drops its local tier of the namespace. Until an invalidation reaches them,
+    other workers may serve their local copy, for at most `ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        local_size: int,
+        ttl_seconds: float,
+        backend: CacheBackend | None = None,
+        hub: BroadcastHub | None = None,
+    ):
+        self.local_size = local_size
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.hub = hub if hub and hub.transport else None
+        self.__local: OrderedDict[tuple[str, str], tuple[float, int, Any]] = (
+            OrderedDict()
+        )
+        # Bumped on invalidation, so local entries and loads from an
+        # older epoch are discarded
+        self.__epochs: dict[str, int] = {}
+        self.__loads: dict[tuple[str, str, int], asyncio.Task] = {}
+        # Tells this process's invalidations apart from the other workers'
+        self.__origin = uuid.uuid4().hex
+        # Unbounded, as a dropped invalidation would leave a stale local entry
+        self.__invalidations = (
+            self.hub.subscribe([CACHE_INVALIDATION_TOPIC, CONNECTED_TOPIC], sys.maxsize)
+            if self.hub
+            else None
+        )
+
+        self.local_hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.backend_errors = 0
+
+    async def get_or_load(
+        self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Get a value from the cache, loading it on a miss.
+        Args:
+            namespace (str): The namespace of the value.
+            key (str): The key of the value within its namespace.
+            loader (Callable[[], Awaitable[Any]]): Loads the value from its source.
+        Returns:
+            Any: The value.
+        """
+
+        entry_key = (namespace, key)
+        epoch = self.__epochs.get(namespace, 0)
+        entry = self.__local.get(entry_key)
+        if entry is not None:
+            expires_at, entry_epoch, value = entry
+            if entry_epoch == epoch and expires_at > time.monotonic():
+                self.__local.move_to_end(entry_key)
+                self.local_hits += 1
+                CACHE_LOOKUPS.labels("local_hits").inc()
+                return value
+            del self.__local[entry_key]
+
+        # Loads started before an invalidation are not joined, so callers
+        # always see their own writes
+        load_key = (namespace, key, epoch)
+        load = self.__loads.get(load_key)
+        if load is not None:
+            self.coalesced += 1
+            CACHE_LOOKUPS.labels("coalesced").inc()
+        else:
+            # The load runs in its own task, so a cancelled caller
+            # does not fail the others
+            load = self.__loads[load_key] = asyncio.create_task(
+                self.__load(namespace, key, loader, epoch)
+            )
+            load.add_done_callback(lambda _: self.__finish_load(load_key))
+        return await asyncio.shield(load)
+
+    async def invalidate(self, namespace: str):
+        """
+        Drop every value of a namespace from both tiers, and from the local
+        tier of the other workers sharing the hub.
+        Loads of the namespace already in flight still return their value to their
+        callers, but do not cache it.
+        Args:
+            namespace (str): The namespace.
+        """
+
+        self.__epochs[namespace] = self.__epochs.get(namespace, 0) + 1
+        if self.backend:
+            try:
+                await self.backend.delete(namespace)
+            except Exception:
+                self.backend_errors += 1
+                CACHE_BACKEND_ERRORS.inc()
+        if self.hub:
+            self.hub.publish(
+                StreamMessage(
+                    {
+                        "type": "cache_invalidation",
+                        "namespace": namespace,
+                        "origin": self.__origin,
+                    }
+                ),
+                CACHE_INVALIDATION_TOPIC,
+            )
+
+    async def run_invalidations(self, logger: logging.Logger):
+        """
+        Apply the invalidations published by the other workers until
+        the task is cancelled.
+        The whole local tier is dropped when the transport connects, as invalidations
+        published while it was disconnected are lost, when a sequence gap shows a lost
+        invalidation, and when another worker dropped invalidations it published while
+        disconnected.
+        Args:
+            logger (logging.Logger): The logger instance.
+        """
+
+        last_sequence = None
+        dropped = 0
+        while True:
+            message = await self.__invalidations.get()
+            if message.payload["type"] == "connected":
+                last_sequence = None
+                self.__clear_local()
+                if self.hub.transport.dropped > dropped:
+                    # Invalidations this worker published while disconnected were
+                    # dropped before being numbered, so the others cannot see a gap
+                    dropped = self.hub.transport.dropped
+                    self.hub.publish(
+                        StreamMessage({"type": "cache_clear"}), CACHE_INVALIDATION_TOPIC
+                    )
+                continue
+
+            if (
+                message.payload["type"] == "cache_invalidation"
+                and message.payload["origin"] != self.__origin
+            ):
+                namespace = message.payload["namespace"]
+                self.__epochs[namespace] = self.__epochs.get(namespace, 0) + 1
+            sequence = message.payload["seq"][CACHE_INVALIDATION_TOPIC]
+            if message.payload["type"] == "cache_clear" or (
+                last_sequence is not None and sequence != last_sequence + 1
+            ):
+                logger.warning("Cache invalidations were missed, clearing the cache")
+                self.__clear_local()
+            last_sequence = sequence
+
+    def get_stats(self) -> dict:
+        """
+        Get the hit and miss counters.
+        Returns:
+            dict: The cumulative counters, and the hit ratio: the share of lookups
+            served without calling a loader, including joins of another's load.
+        """
+
+        hits = self.local_hits + self.backend_hits + self.coalesced
+        lookups = hits + self.misses
+        return {
+            "entries": len(self.__local),
+            "local_hits": self.local_hits,
+            "backend_hits": self.backend_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "backend_errors": self.backend_errors,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+    def __clear_local(self):
+        """
+        Drop every value from the local tier, and keep the loads in
+        flight from caching theirs.
+        """
+
+        namespaces = {namespace for namespace, _ in self.__local}
+        namespaces.update(namespace for namespace, _, _ in self.__loads)
+        for namespace in namespaces:
+            self.__epochs[namespace] = self.__epochs.get(namespace, 0) + 1
+        self.__local.clear()
+
+    def __finish_load(self, load_key: tuple[str, str, int]):
+        """
+        Forget a finished load, marking its error as retrieved in case no
+        caller is left to see it.
+        Args:
+            load_key (tuple[str, str, int]): The namespace, key and epoch of the load.
+        """
+
+        load = self.__loads.pop(load_key)
+        if not load.cancelled():
+            load.exception()
+
+    async def __load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        epoch: int,
+    ) -> Any:
+        """
+        Get a value from the backend tier, or from the loader, and
+        cache it if still current.
+        Backend errors are counted and treated as misses, so the
+        cache degrades to the loader.
+        A value loaded while the namespace was invalidated, here or by another worker,
+        is cached in neither tier.
+        Args:
+            namespace (str): The namespace of the value.
+            key (str): The key of the value within its namespace.
+            loader (Callable[[], Awaitable[Any]]): Loads the value from its source.
+            epoch (int): The epoch of the namespace when the lookup started.
+        Returns:
+            Any: The value.
+        """
+
+        generation = None
+        if self.backend:
+            try:
+                cached, generation = await self.backend.get(namespace, key)
+            except Exception:
+                self.backend_errors += 1
+                CACHE_BACKEND_ERRORS.inc()
+                cached = None
+            if cached is not None:
+                # The backend expires namespaces as a whole, so
+                # entries carry their own expiry
+                expires_at, value = orjson.loads(cached)
+                if expires_at > time.time():
+                    self.backend_hits += 1
+                    CACHE_LOOKUPS.labels("backend_hits").inc()
+                    self.__store_local(namespace, key, value, epoch)
+                    return value
+
+        self.misses += 1
+
+        CACHE_LOOKUPS.labels("misses").inc()
+        value = await loader()
+        if self.__epochs.get(namespace, 0) != epoch:
+            return value
+
+        # Without a generation, whether the value is still current cannot be checked
+        if generation is not None:
+            try:
+                if not await self.backend.set(
+                    namespace,
+                    key,
+                    orjson.dumps([time.time() + self.ttl_seconds, value]),
+                    self.ttl_seconds,
+                    generation,
+                ):
+                    return value
+            except Exception:
+                self.backend_errors += 1
+                CACHE_BACKEND_ERRORS.inc()
+            if self.__epochs.get(namespace, 0) != epoch:
+                return value
+        self.__store_local(namespace, key, value, epoch)
+        return value
+
+    def __store_local(self, namespace: str, key: str, value: Any, epoch: int):
+        """
+        Store a value in the local tier, evicting the least
+        recently used entry when full.
+        Args:
+            namespace (str): The namespace of the value.
+            key (str): The key of the value within its namespace.
+            value (Any): The value.
+            epoch (int): The epoch of the namespace the value was loaded in.
+        """
+
+        if self.local_size <= 0:
+            return
+
+        entry_key = (namespace, key)
+        self.__local[entry_key] = (time.monotonic() + self.ttl_seconds, epoch, value)
+        self.__local.move_to_end(entry_key)
+        while len(self.__local) > self.local_size:
+            self.__local.popitem(last=False)
+
+
+def create_cache_backend(url: str | None) -> CacheBackend | None:
+    """
+    Create the shared cache tier from its URL.
+    Args:
+        url (str | None): A Redis URL, "memory://" for the in-process stand-in, or None
+        to disable the tier.
+    Returns:
+        CacheBackend | None: The cache backend, or None if disabled.
+    """
+
+    if not url:
+        return None
+    if url == MEMORY_CACHE_URL:
+        return MemoryCacheBackend()
+
+    # redis takes a while to import and is only needed when a Redis tier is configured
+    import redis.asyncio
+
+    return RedisCacheBackend(redis.asyncio.from_url(url))
@@ -0,0 +1,107 @@
+import asyncio
+from collections import OrderedDict
+from collections.abc import Hashable
+from enum import Enum
+import time
+from typing import Any
+
+
+class PutResult(str, Enum):
+    """
+    Enum for the outcome of putting a message into a ConflatingQueue.
+    """
+
+    QUEUED = "queued"
+    CONFLATED = "conflated"
+    DROPPED = "dropped"
+
+
+class ConflatingQueue:
+    """
+    ConflatingQueue is a bounded single-consumer queue that keeps only
+    the newest message per key.
+    A message whose key is already pending replaces the pending one in place, so
+    ordering across keys is preserved and a slow consumer always receives the
+    latest update for each key.
+    Messages without a key are never conflated. When the queue is full of distinct keys,
+    the oldest pending message is dropped.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.__entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self.__not_empty = asyncio.Event()
+        self.conflated = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def lag(self) -> float:
+        """
+        Get how long the oldest pending message has been waiting.
+        A conflated message keeps the enqueue time of the update it replaced,
+        so the lag reflects how far behind the consumer is, not how fresh the data is.
+        Returns:
+            float: The lag in seconds, or 0 if the queue is empty.
+        """
+
+        if not self.__entries:
+            return 0.0
+        _, enqueued_at = next(iter(self.__entries.values()))
+        return time.monotonic() - enqueued_at
+
+    def put_nowait(self, message: Any, key: Hashable | None = None) -> PutResult:
+        """
+        Put a message into the queue without blocking.
+        Args:
+            message (Any): The message to put.
+            key (Hashable | None): The conflation key, or None to never conflate it.
+        Returns:
+            PutResult: Whether the message was queued, replaced a pending message with
+            the same key, or forced the oldest pending message out.
+        """
+
+        if key is None:
+            key = object()
+        elif key in self.__entries:
+            _, enqueued_at = self.__entries[key]
+            self.__entries[key] = (message, enqueued_at)
+            self.conflated += 1
+            return PutResult.CONFLATED
+
+        result = PutResult.QUEUED
+        if len(self.__entries) >= self.maxsize:
+            self.__entries.popitem(last=False)
+            self.dropped += 1
+            result = PutResult.DROPPED
+
+        self.__entries[key] = (message, time.monotonic())
+        self.__not_empty.set()
+        return result
+
+    async def get(self) -> tuple[Any, float]:
+        """
+        Wait for and remove the oldest pending message.
+        Returns:
+            tuple[Any, float]: The message and the monotonic time it (or the update it
+            replaced) was enqueued at.
+        """
+
+        while not self.__entries:
+            self.__not_empty.clear()
+            await self.__not_empty.wait()
+
+        _, entry = self.__entries.popitem(last=False)
+        return entry
+
+    def drain(self) -> list[tuple[Any, float]]:
+        """
+        Remove all pending messages without waiting.
+        Returns:
+            list[tuple[Any, float]]: The pending messages and enqueue times.
+        """
+
+        entries = list(self.__entries.values())
+        self.__entries.clear()
+        return entries
@@ -1,13 +1,52 @@
+from functools import lru_cache
 import logging
 
+from passlib.context import CryptContext
+from prometheus_client import REGISTRY, CollectorRegistry
+from prometheus_client.multiprocess import MultiProcessCollector
+
 from app.config import get_app_settings
 from app.core.auth_service import AuthService
+from app.core.broadcast_hub import BroadcastHub
+from app.core.broadcast_transport import create_broadcast_transport
+from app.core.cache import ReadThroughCache, create_cache_backend
 from app.core.jwt_service import JwtService
+from app.core.metrics import (
+    ProcessLabelCollector,
+    ServiceMetricsCollector,
+    is_multiprocess,
+)
+from app.core.order_book import MatchingEngine
+from app.core.password_hasher import PasswordHasher
+from app.core.write_coalescer import WriteCoalescer
+from app.db.mongo import (
+    get_alert_collection,
+    get_candle_collection,
+    get_trade_collection,
+)
+from app.schemas.candle_schema import CandleInterval
+from app.services.alert_service import AlertService
+from app.services.candle_service import CandleService
+from app.services.indicator_service import IndicatorService
+from app.services.market_data_service import MarketDataService
+from app.services.trade_archive import create_trade_archive
+
+
+@lru_cache
+def get_alert_service():
+    """
+    Get the process-wide AlertService instance, which holds the armed alert indexes.
+    Returns:
+        AlertService: The AlertService instance.
+    """
 
+    return AlertService(get_alert_collection(), get_broadcast_hub())
 
+
+@lru_cache
 def get_auth_service():
     """
-    Get the AuthService instance.
+    Get the shared AuthService instance.
     Returns:
         AuthService: The AuthService instance.
     """
@@ -15,9 +54,75 @@ def get_auth_service():
     return AuthService(get_jwt_service())
 
 
+@lru_cache
+def get_broadcast_hub():
+    """
+    Get the process-wide BroadcastHub instance, shared with the other worker processes
+    through the transport of BROADCAST_TRANSPORT_URL when it is set.
+    Returns:
+        BroadcastHub: The BroadcastHub instance.
+    """
+
+    return BroadcastHub(
+        create_broadcast_transport(get_app_settings().broadcast_transport_url)
+    )
+
+
+@lru_cache
+def get_cache():
+    """
+    Get the process-wide ReadThroughCache instance, backed by Redis when CACHE_REDIS_URL
+    is set ("memory://" selects an in-process stand-in), and sharing its invalidations
+    with the other worker processes through the broadcast hub.
+    Returns:
+        ReadThroughCache: The ReadThroughCache instance.
+    """
+
+    app_settings = get_app_settings()
+    return ReadThroughCache(
+        app_settings.cache_local_size,
+        app_settings.cache_ttl_seconds,
+        create_cache_backend(app_settings.cache_redis_url),
+        get_broadcast_hub(),
+    )
+
+
+@lru_cache
+def get_candle_service():
+    """
+    Get the process-wide CandleService instance.
+    Returns:
+        CandleService: The CandleService instance.
+    """
+
+    return CandleService(
+        get_candle_collection(),
+        get_app_settings().candle_memory_size,
+        on_close=get_indicator_service().on_candle_closed,
+    )
+
+
+@lru_cache
+def get_indicator_service():
+    """
+    Get the process-wide IndicatorService instance.
+    Streaming indicators are disabled when INDICATOR_STREAM_INTERVAL is "none".
+    Returns:
+        IndicatorService: The IndicatorService instance.
+    """
+
+    stream_interval = get_app_settings().indicator_stream_interval
+    return IndicatorService(
+        get_broadcast_hub(),
+        None if stream_interval == "none" else CandleInterval(stream_interval),
+    )
+
+
+@lru_cache
 def get_jwt_service():
     """
-    Get the JWTService instance.
+    Get the shared JWTService instance.
+    The instance is reused across requests so its verified-token cache stays warm.
     Returns:
         JwtService: The JWTService instance.
     """
@@ -25,6 +130,33 @@ def get_jwt_service():
     return JwtService(get_app_settings())
 
 
+@lru_cache
+def get_market_data_service():
+    """
+    Get the process-wide MarketDataService instance.
+    Returns:
+        MarketDataService: The MarketDataService instance.
+    """
+
+    return MarketDataService(
+        get_app_settings().market_data_buffer_size,
+        get_candle_service(),
+        get_alert_service(),
+    )
+
+
+@lru_cache
+def get_matching_engine():
+    """
+    Get the process-wide MatchingEngine instance, which holds the
+    paper-trading order books.
+    Returns:
+        MatchingEngine: The MatchingEngine instance.
+    """
+
+    return MatchingEngine()
+
+
 def get_logger(name: str = "uvicorn.error"):
     """
     Get a logger instance.
@@ -37,3 +169,115 @@ def get_logger(name: str = "uvicorn.error"):
     """
 
     return logging.getLogger(name)
+
+
+@lru_cache
+def get_metrics_registry():
+    """
+    Get the Prometheus registry exposed on /metrics.
+    With PROMETHEUS_MULTIPROC_DIR set, it aggregates the metrics every worker process
+    writes to that directory, service metrics included; only the subscriber queue
+    depths come from the worker serving the scrape, labelled with its PID.
+    Returns:
+        CollectorRegistry: The registry.
+    """
+
+    if not is_multiprocess():
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    registry.register(ProcessLabelCollector(get_service_metrics_collector()))
+    return registry
+
+
+@lru_cache
+def get_password_hasher():
+    """
+    Get the shared PasswordHasher instance.
+    The CryptContext and the hashing pool are created once and reused by every request.
+    Returns:
+        PasswordHasher: The PasswordHasher instance.
+    """
+
+    app_settings = get_app_settings()
+    return PasswordHasher(
+        CryptContext(schemes=["bcrypt"], deprecated="auto"),
+        max_workers=app_settings.password_hash_workers,
+        max_queue_size=app_settings.password_hash_queue_size,
+    )
+
+
+@lru_cache
+def get_service_metrics_collector():
+    """
+    Get the process-wide ServiceMetricsCollector, registering it
+    with the Prometheus registry.
+    Returns:
+        ServiceMetricsCollector: The ServiceMetricsCollector instance.
+    """
+
+    collector = ServiceMetricsCollector(get_broadcast_hub())
+    REGISTRY.register(collector)
+    return collector
+
+
+@lru_cache
+def get_trade_archive():
+    """
+    Get the process-wide TradeArchive of TRADE_ARCHIVE_URL.
+    Returns:
+        TradeArchive | None: The TradeArchive instance, or None if disabled.
+    """
+
+    return create_trade_archive(get_app_settings().trade_archive_url)
+
+
+@lru_cache
+def get_trade_write_coalescer():
+    """
+    Get the process-wide WriteCoalescer of the trades collection.
+    Trade inserts are only coalesced when TRADE_WRITE_COALESCING is enabled.
+    Returns:
+        WriteCoalescer | None: The WriteCoalescer instance, or None if disabled.
+    """
+
+    app_settings = get_app_settings()
+    if not app_settings.trade_write_coalescing:
+        return None
+    return WriteCoalescer(
+        get_trade_collection(),
+        app_settings.trade_write_window_ms / 1000,
+        app_settings.trade_write_max_batch_size,
+    )
+
+
+# Process-wide services bound to the MongoDB client, its pools or the broadcast hub
+PROCESS_SERVICE_GETTERS = (
+    get_alert_service,
+    get_broadcast_hub,
+    get_cache,
+    get_candle_service,
+    get_indicator_service,
+    get_market_data_service,
+    get_matching_engine,
+    get_metrics_registry,
+    get_password_hasher,
+    get_service_metrics_collector,
+    get_trade_write_coalescer,
+)
+
+
+def reset_process_services():
+    """
+    Release the process-wide services created since the application started, so a later
+    lifespan builds them again on its own client's collections, not on closed ones.
+    The hashing pool is shut down and the service metrics collector unregistered.
+    """
+
+    if get_password_hasher.cache_info().currsize:
+        get_password_hasher().shutdown()
+    if get_service_metrics_collector.cache_info().currsize:
+        REGISTRY.unregister(get_service_metrics_collector())
+    for getter in PROCESS_SERVICE_GETTERS:
+        getter.cache_clear()
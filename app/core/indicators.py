@@ -0,0 +1,551 @@
+import math
+from typing import NamedTuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Bounds of the blockwise exponential smoothing: within a block the weights span at most
+# e^EWM_MAX_EXPONENT, which keeps them well inside the float64 range
+EWM_MAX_EXPONENT = 600.0
+EWM_MAX_BLOCK = 1024
+
+
+class MACD(NamedTuple):
+    """
+    The MACD line, its signal line and their difference.
+    """
+
+    macd: np.ndarray | float
+    signal: np.ndarray | float
+    histogram: np.ndarray | float
+
+
+class BollingerBands(NamedTuple):
+    """
+    The middle, upper and lower Bollinger Bands.
+    """
+
+    middle: np.ndarray | float
+    upper: np.ndarray | float
+    lower: np.ndarray | float
+
+
+def __ewm(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """
+    Apply the recursion y[t] = alpha * x[t] + (1 - alpha) * y[t - 1] to a series,
+    without a Python loop per value.
+    The series is processed in blocks; within a block the recursion is unrolled
+    into a cumulative sum of decay-weighted values, and the last output carries
+    over into the next block.
+    Args:
+        values (np.ndarray): The input series.
+        alpha (float): The smoothing factor, in (0, 1].
+        initial (float): The value of y[-1].
+    Returns:
+        np.ndarray: The smoothed series.
+    """
+
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        return values.astype(np.float64)
+
+    block = max(1, min(EWM_MAX_BLOCK, int(EWM_MAX_EXPONENT / -math.log(decay))))
+    powers = decay ** np.arange(block + 1, dtype=np.float64)
+    inverse_powers = 1.0 / powers[:block]
+
+    smoothed = np.empty(len(values), dtype=np.float64)
+    carry = initial
+    for start in range(0, len(values), block):
+        chunk = values[start : start + block]
+        count = len(chunk)
+        weighted_sums = np.cumsum(chunk * inverse_powers[:count])
+        smoothed[start : start + count] = (
+            powers[1 : count + 1] * carry + alpha * powers[:count] * weighted_sums
+        )
+        carry = smoothed[start + count - 1]
+    return smoothed
+
+
+def __wilder(values: np.ndarray, period: int, offset: int) -> np.ndarray:
+    """
+    Smooth a series with Wilder's moving average, seeded by the simple average of
+    its first `period` values.
+    Args:
+        values (np.ndarray): The input series.
+        period (int): The smoothing period.
+        offset (int): The index of the first value of the series to use.
+    Returns:
+        np.ndarray: The smoothed series, NaN until `offset + period - 1`.
+    """
+
+    smoothed = np.full(len(values), np.nan)
+    seed_end = offset + period
+    if len(values) < seed_end:
+        return smoothed
+
+    smoothed[seed_end - 1] = values[offset:seed_end].mean()
+    smoothed[seed_end:] = __ewm(values[seed_end:], 1.0 / period, smoothed[seed_end - 1])
+    return smoothed
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Compute the simple moving average of a series.
+    Args:
+        values (np.ndarray): The input series.
+        period (int): The number of values averaged.
+    Returns:
+        np.ndarray: The moving average, NaN for the first `period - 1` values.
+    """
+
+    averages = np.full(len(values), np.nan)
+    if len(values) < period:
+        return averages
+
+    # Offsetting by the first value keeps the running sums small, and with
+    # them the rounding error
+    sums = np.concatenate(([0.0], np.cumsum(values - values[0])))
+    averages[period - 1 :] = (sums[period:] - sums[:-period]) / period + values[0]
+    return averages
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Compute the exponential moving average of a series, with a smoothing factor
+    of 2 / (period + 1), seeded by the simple average of the first `period` values.
+    Args:
+        values (np.ndarray): The input series.
+        period (int): The averaging period.
+    Returns:
+        np.ndarray: The moving average, NaN for the first `period - 1` values.
+    """
+
+    averages = np.full(len(values), np.nan)
+    if len(values) < period:
+        return averages
+
+    averages[period - 1] = values[:period].mean()
+    averages[period:] = __ewm(values[period:], 2.0 / (period + 1), averages[period - 1])
+    return averages
+
+
+def rsi(values: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    Compute Wilder's relative strength index of a series.
+    Args:
+        values (np.ndarray): The input series.
+        period (int): The smoothing period of the average gains and losses.
+    Returns:
+        np.ndarray: The RSI between 0 and 100, NaN for the first `period` values.
+    """
+
+    changes = np.diff(values, prepend=values[:1])
+    average_gains = __wilder(np.maximum(changes, 0.0), period, 1)
+    average_losses = __wilder(np.maximum(-changes, 0.0), period, 1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        strength = 100.0 - 100.0 / (1.0 + average_gains / average_losses)
+    # A window without losses is fully overbought, and a flat one is neutral
+    strength[(average_losses == 0) & (average_gains > 0)] = 100.0
+    strength[(average_losses == 0) & (average_gains == 0)] = 50.0
+    return strength
+
+
+def macd(
+    values: np.ndarray,
+    fast_period: int = 12,
+    slow_period: int = 26,
+    signal_period: int = 9,
+) -> MACD:
+    """
+    Compute the moving average convergence/divergence of a series.
+    Args:
+        values (np.ndarray): The input series.
+        fast_period (int): The period of the fast EMA.
+        slow_period (int): The period of the slow EMA.
+        signal_period (int): The period of the EMA of the MACD line.
+    Returns:
+        MACD: The MACD, signal and histogram series, NaN until enough values exist.
+    """
+
+    line = ema(values, fast_period) - ema(values, slow_period)
+    signal = np.full(len(values), np.nan)
+    signal[slow_period - 1 :] = ema(line[slow_period - 1 :], signal_period)
+    return MACD(line, signal, line - signal)
+
+
+def bollinger_bands(
+    values: np.ndarray, period: int = 20, width: float = 2.0
+) -> BollingerBands:
+    """
+    Compute the Bollinger Bands of a series: its simple moving average
+    plus and minus a multiple of the population standard deviation over the same window.
+    Args:
+        values (np.ndarray): The input series.
+        period (int): The window length.
+        width (float): The standard deviations between the middle and outer bands.
+    Returns:
+        BollingerBands: The middle, upper and lower bands, NaN for `period - 1` values.
+    """
+
+    middle = sma(values, period)
+    deviations = np.full(len(values), np.nan)
+    if len(values) >= period:
+        deviations[period - 1 :] = sliding_window_view(values, period).std(axis=1)
+    return BollingerBands(
+        middle, middle + width * deviations, middle - width * deviations
+    )
+
+
+def atr(
+    highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 14
+) -> np.ndarray:
+    """
+    Compute Wilder's average true range.
+    Args:
+        highs (np.ndarray): The high prices.
+        lows (np.ndarray): The low prices.
+        closes (np.ndarray): The close prices.
+        period (int): The smoothing period.
+    Returns:
+        np.ndarray: The average true range, NaN for the first `period - 1` values.
+    """
+
+    previous_closes = np.concatenate((closes[:1], closes[:-1]))
+    true_ranges = np.maximum(
+        highs - lows,
+        np.maximum(np.abs(highs - previous_closes), np.abs(lows - previous_closes)),
+    )
+    true_ranges[:1] = highs[:1] - lows[:1]
+    return __wilder(true_ranges, period, 0)
+
+
+def compute_indicators(
+    highs: np.ndarray, lows: np.ndarray, closes: np.ndarray
+) -> dict[str, np.ndarray]:
+    """
+    Compute every indicator with its default parameters over a series of bars.
+    Args:
+        highs (np.ndarray): The high prices.
+        lows (np.ndarray): The low prices.
+        closes (np.ndarray): The close prices.
+    Returns:
+        dict[str, np.ndarray]: The indicator series, keyed like
+        `StreamingIndicators.update`.
+    """
+
+    line, signal, histogram = macd(closes)
+    middle, upper, lower = bollinger_bands(closes)
+    return {
+        "sma": sma(closes, 20),
+        "ema": ema(closes, 20),
+        "rsi": rsi(closes),
+        "macd": line,
+        "macd_signal": signal,
+        "macd_histogram": histogram,
+        "bollinger_middle": middle,
+        "bollinger_upper": upper,
+        "bollinger_lower": lower,
+        "atr": atr(highs, lows, closes),
+    }
+
+
+class RollingWindow:
+    """
+    RollingWindow tracks the mean and population variance of the last `period`
+    values in O(1) per update.
+    The running sums are taken around an offset close to the window mean, and
+    are recomputed from the window once per `period` updates, so rounding
+    errors do not accumulate.
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.__values = [0.0] * period
+        self.__count = 0
+        self.__offset = 0.0
+        self.__sum = 0.0
+        self.__squares = 0.0
+
+    @property
+    def ready(self) -> bool:
+        """
+        Check whether the window is full.
+        Returns:
+            bool: True once `period` values were added.
+        """
+
+        return self.__count >= self.period
+
+    @property
+    def mean(self) -> float:
+        """
+        Get the mean of the window.
+        Returns:
+            float: The mean, or NaN until the window is full.
+        """
+
+        if not self.ready:
+            return math.nan
+        return self.__offset + self.__sum / self.period
+
+    @property
+    def variance(self) -> float:
+        """
+        Get the population variance of the window.
+        Returns:
+            float: The variance, or NaN until the window is full.
+        """
+
+        if not self.ready:
+            return math.nan
+        shifted_mean = self.__sum / self.period
+        return max(self.__squares / self.period - shifted_mean * shifted_mean, 0.0)
+
+    def update(self, value: float):
+        """
+        Add a value, evicting the oldest one once the window is full.
+        Args:
+            value (float): The new value.
+        """
+
+        if self.__count == 0:
+            self.__offset = value
+
+        index = self.__count % self.period
+        if self.__count >= self.period:
+            evicted = self.__values[index] - self.__offset
+            self.__sum -= evicted
+            self.__squares -= evicted * evicted
+        self.__values[index] = value
+        self.__count += 1
+
+        if index == self.period - 1:
+            self.__offset = math.fsum(self.__values[: self.__count]) / min(
+                self.__count, self.period
+            )
+            self.__sum = math.fsum(
+                v - self.__offset for v in self.__values[: self.__count]
+            )
+            self.__squares = math.fsum(
+                (v - self.__offset) ** 2 for v in self.__values[: self.__count]
+            )
+        else:
+            shifted = value - self.__offset
+            self.__sum += shifted
+            self.__squares += shifted * shifted
+
+
+class StreamingSMA:
+    """
+    StreamingSMA updates a simple moving average in O(1) per value.
+    """
+
+    def __init__(self, period: int):
+        self.window = RollingWindow(period)
+
+    def update(self, value: float) -> float:
+        """
+        Add a value.
+        Args:
+            value (float): The new value.
+        Returns:
+            float: The moving average, or NaN until `period` values were added.
+        """
+
+        self.window.update(value)
+        return self.window.mean
+
+
+class StreamingEMA:
+    """
+    StreamingEMA updates an exponential moving average in O(1) per value,
+    seeded by the simple average of the first `period` values like `ema`.
+    """
+
+    def __init__(self, period: int, alpha: float | None = None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.value = math.nan
+        self.__count = 0
+        self.__seed_sum = 0.0
+
+    def update(self, value: float) -> float:
+        """
+        Add a value.
+        Args:
+            value (float): The new value.
+        Returns:
+            float: The moving average, or NaN until `period` values were added.
+        """
+
+        self.__count += 1
+        if self.__count < self.period:
+            self.__seed_sum += value
+        elif self.__count == self.period:
+            self.value = (self.__seed_sum + value) / self.period
+        else:
+            self.value = self.alpha * value + (1.0 - self.alpha) * self.value
+        return self.value
+
+
+class StreamingRSI:
+    """
+    StreamingRSI updates Wilder's relative strength index in O(1) per value.
+    """
+
+    def __init__(self, period: int = 14):
+        self.__previous = math.nan
+        self.__gains = StreamingEMA(period, alpha=1.0 / period)
+        self.__losses = StreamingEMA(period, alpha=1.0 / period)
+
+    def update(self, value: float) -> float:
+        """
+        Add a value.
+        Args:
+            value (float): The new value.
+        Returns:
+            float: The RSI between 0 and 100, NaN until `period + 1` values were added.
+        """
+
+        previous, self.__previous = self.__previous, value
+        if math.isnan(previous):
+            return math.nan
+
+        change = value - previous
+        average_gain = self.__gains.update(max(change, 0.0))
+        average_loss = self.__losses.update(max(-change, 0.0))
+        if math.isnan(average_gain):
+            return math.nan
+        if average_loss == 0:
+            return 100.0 if average_gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + average_gain / average_loss)
+
+
+class StreamingMACD:
+    """
+    StreamingMACD updates the moving average convergence/divergence in O(1) per value.
+    """
+
+    def __init__(
+        self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9
+    ):
+        self.__fast = StreamingEMA(fast_period)
+        self.__slow = StreamingEMA(slow_period)
+        self.__signal = StreamingEMA(signal_period)
+
+    def update(self, value: float) -> MACD:
+        """
+        Add a value.
+        Args:
+            value (float): The new value.
+        Returns:
+            MACD: The MACD, signal and histogram values, NaN until enough were added.
+        """
+
+        fast = self.__fast.update(value)
+        slow = self.__slow.update(value)
+        if math.isnan(slow):
+            return MACD(math.nan, math.nan, math.nan)
+
+        line = fast - slow
+        signal = self.__signal.update(line)
+        return MACD(line, signal, line - signal)
+
+
+class StreamingBollingerBands:
+    """
+    StreamingBollingerBands updates the Bollinger Bands in O(1) per value.
+    """
+
+    def __init__(self, period: int = 20, width: float = 2.0):
+        self.width = width
+        self.window = RollingWindow(period)
+
+    def update(self, value: float) -> BollingerBands:
+        """
+        Add a value.
+        Args:
+            value (float): The new value.
+        Returns:
+            BollingerBands: The bands, or NaN until `period` values were added.
+        """
+
+        self.window.update(value)
+        middle = self.window.mean
+        band = self.width * math.sqrt(self.window.variance)
+        return BollingerBands(middle, middle + band, middle - band)
+
+
+class StreamingATR:
+    """
+    StreamingATR updates Wilder's average true range in O(1) per bar.
+    """
+
+    def __init__(self, period: int = 14):
+        self.__previous_close = math.nan
+        self.__average = StreamingEMA(period, alpha=1.0 / period)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        """
+        Add a bar.
+        Args:
+            high (float): The high price.
+            low (float): The low price.
+            close (float): The close price.
+        Returns:
+            float: The average true range, or NaN until `period` bars were added.
+        """
+
+        true_range = high - low
+        if not math.isnan(self.__previous_close):
+            true_range = max(
+                true_range,
+                abs(high - self.__previous_close),
+                abs(low - self.__previous_close),
+            )
+        self.__previous_close = close
+        return self.__average.update(true_range)
+
+
+class StreamingIndicators:
+    """
+    StreamingIndicators updates every indicator with its default
+    parameters, one bar at a time.
+    It is the incremental counterpart of `compute_indicators` and
+    produces the same values.
+    """
+
+    def __init__(self):
+        self.__sma = StreamingSMA(20)
+        self.__ema = StreamingEMA(20)
+        self.__rsi = StreamingRSI()
+        self.__macd = StreamingMACD()
+        self.__bollinger_bands = StreamingBollingerBands()
+        self.__atr = StreamingATR()
+
+    def update(self, high: float, low: float, close: float) -> dict[str, float]:
+        """
+        Add a bar.
+        Args:
+            high (float): The high price.
+            low (float): The low price.
+            close (float): The close price.
+        Returns:
+            dict[str, float]: The indicator values, NaN while warming up.
+        """
+
+        line, signal, histogram = self.__macd.update(close)
+        middle, upper, lower = self.__bollinger_bands.update(close)
+        return {
+            "sma": self.__sma.update(close),
+            "ema": self.__ema.update(close),
+            "rsi": self.__rsi.update(close),
+            "macd": line,
+            "macd_signal": signal,
+            "macd_histogram": histogram,
+            "bollinger_middle": middle,
+            "bollinger_upper": upper,
+            "bollinger_lower": lower,
+            "atr": self.__atr.update(high, low, close),
+        }
@@ -1,8 +1,11 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+import time
 
 from jose import jwt
 
 from app.config import AppSettings
+from app.core.service_metrics import JWT_CACHE_HITS, JWT_VERIFY_SECONDS
 
 
 class JwtService:
@@ -10,10 +13,16 @@ class JwtService:
     JwtService class for creating and verifying JWT tokens.
     This class uses the Jose library to handle JWT encoding and decoding.
     It requires the access token secret, algorithm, and expiration time to be set in the application settings.
+    Verified token payloads are kept in a bounded LRU cache until their `exp` claim,
+    so repeated calls with the same token skip the signature check.
     """
 
     def __init__(self, app_config: AppSettings):
         self.app_config = app_config
+        self.__verified_tokens: OrderedDict[str, dict] = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.total_verify_seconds = 0.0
 
     def create_access_token(self, data: dict):
         """
@@ -45,13 +54,25 @@ class JwtService:
             ValueError: If the token is invalid or expired.
         """
 
+        payload = self.__get_cached_payload(token)
+        if payload is not None:
+            self.cache_hits += 1
+            JWT_CACHE_HITS.inc()
+            return dict(payload)
+        self.cache_misses += 1
+
+        started_at = time.perf_counter()
         try:
             payload = jwt.decode(
                 token,
                 self.app_config.access_token_secret,
                 algorithms=[self.app_config.access_token_algorithm],
             )
-            return payload
+            verify_seconds = time.perf_counter() - started_at
+            self.total_verify_seconds += verify_seconds
+            JWT_VERIFY_SECONDS.observe(verify_seconds)
+            self.__cache_payload(token, payload)
+            return dict(payload)
         except jwt.ExpiredSignatureError as e:
             raise ValueError("Token has expired") from e
         except jwt.JWTClaimsError as e:
@@ -59,6 +80,60 @@ class JwtService:
         except jwt.JWTError as e:
             raise ValueError("Invalid token") from e
 
+    def get_stats(self) -> dict:
+        """
+        Get the verification counters.
+        Returns:
+            dict: The token cache hits and misses, and the time spent verifying misses.
+        """
+
+        return {
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "total_verify_seconds": self.total_verify_seconds,
+        }
+
+    def __get_cached_payload(self, token: str) -> dict | None:
+        """
+        Get the cached payload of a previously verified token.
+        Entries past their `exp` claim are evicted and reported as a miss,
+        so expiry is still enforced by the regular decode path.
+        Args:
+            token (str): The JWT access token.
+        Returns:
+            dict | None: The cached payload, or None if not cached or expired.
+        """
+
+        payload = self.__verified_tokens.get(token)
+        if payload is None:
+            return None
+
+        if payload["exp"] <= time.time():
+            del self.__verified_tokens[token]
+            return None
+
+        self.__verified_tokens.move_to_end(token)
+        return payload
+
+    def __cache_payload(self, token: str, payload: dict):
+        """
+        Cache the payload of a verified token, evicting the least
+        recently used entry when full.
+        Tokens without an `exp` claim are never cached.
+        Args:
+            token (str): The JWT access token.
+            payload (dict): The verified payload of the token.
+        """
+
+        cache_size = self.app_config.access_token_cache_size
+        if cache_size <= 0 or not isinstance(payload.get("exp"), (int, float)):
+            return
+
+        self.__verified_tokens[token] = payload
+        self.__verified_tokens.move_to_end(token)
+        while len(self.__verified_tokens) > cache_size:
+            self.__verified_tokens.popitem(last=False)
+
     def __calculate_expire(self):
         """
         Calculate the expiration time for the JWT token.
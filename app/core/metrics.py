@@ -0,0 +1,231 @@
+import asyncio
+import os
+import time
+
+from prometheus_client import Counter, Gauge, Histogram, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from pymongo import monitoring
+
+from app.core.broadcast_hub import BroadcastHub
+
+UNMATCHED_ROUTE = "unmatched"
+EVENT_LOOP_LAG_INTERVAL_SECONDS = 0.5
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# Set in the environment of every worker process, before the application is imported,
+# to aggregate the metrics of all workers
+MULTIPROCESS_DIR_VARIABLE = "PROMETHEUS_MULTIPROC_DIR"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests, by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Number of HTTP requests being served",
+    multiprocess_mode="livesum",
+)
+MONGODB_COMMAND_DURATION = Histogram(
+    "mongodb_command_duration_seconds",
+    "Duration of MongoDB commands, by collection and command",
+    ["collection", "command"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGODB_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total",
+    "Number of failed MongoDB commands, by collection and command",
+    ["collection", "command"],
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "websocket_connections",
+    "Number of open WebSocket stream connections",
+    multiprocess_mode="livesum",
+)
+WEBSOCKET_SLOW_CONSUMER_DISCONNECTS = Counter(
+    "websocket_slow_consumer_disconnects_total",
+    "Number of WebSocket clients disconnected for falling behind",
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of a periodic event loop wake-up past its scheduled time",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+class MetricsMiddleware:
+    """
+    MetricsMiddleware is a pure ASGI middleware recording the latency of
+    every HTTP request under its route template, so path parameters do not
+    create one series per value.
+    Requests that match no route share the "unmatched" label. WebSocket and lifespan
+    events are passed through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                str(status_code),
+            ).observe(time.perf_counter() - started_at)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    MongoCommandMetrics times every MongoDB command through
+    PyMongo's command monitoring.
+    The driver reports each command's duration when it completes, so the listener only
+    needs to remember the collection of commands in flight.
+    """
+
+    def __init__(self):
+        self.__collections: dict[tuple, str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        # Most commands name their collection as their first value;
+        # getMore has it separately
+        collection = event.command.get(
+            "collection", event.command.get(event.command_name)
+        )
+        if isinstance(collection, str):
+            self.__collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        collection = self.__collections.pop(
+            (event.connection_id, event.request_id), None
+        )
+        if collection is not None:
+            MONGODB_COMMAND_DURATION.labels(collection, event.command_name).observe(
+                event.duration_micros / 1_000_000
+            )
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        collection = self.__collections.pop(
+            (event.connection_id, event.request_id), None
+        )
+        if collection is not None:
+            MONGODB_COMMAND_DURATION.labels(collection, event.command_name).observe(
+                event.duration_micros / 1_000_000
+            )
+            MONGODB_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+class ServiceMetricsCollector(Collector):
+    """
+    ServiceMetricsCollector exposes the depth of the broadcast hub's subscriber queues,
+    reading it only when metrics are scraped, as it walks every subscription.
+    The other service metrics are recorded as the services work (see
+    `app.core.service_metrics`).
+    """
+
+    def __init__(self, hub: BroadcastHub):
+        self.hub = hub
+
+    def collect(self):
+        hub = self.hub.get_stats()
+        yield GaugeMetricFamily(
+            "broadcast_queued_messages",
+            "Messages waiting in subscriber queues",
+            hub["queued"],
+        )
+        yield GaugeMetricFamily(
+            "broadcast_max_queue_depth",
+            "Messages waiting in the fullest subscriber queue",
+            hub["max_queue_depth"],
+        )
+
+
+class ProcessLabelCollector(Collector):
+    """
+    ProcessLabelCollector adds a `pid` label to the samples of a per-process collector,
+    so the series of different worker processes are told apart once aggregated.
+    """
+
+    def __init__(self, collector: Collector):
+        self.collector = collector
+
+    def collect(self):
+        pid = str(os.getpid())
+        for family in self.collector.collect():
+            family.samples = [
+                sample._replace(labels={**sample.labels, "pid": pid})
+                for sample in family.samples
+            ]
+            yield family
+
+
+def is_multiprocess() -> bool:
+    """
+    Check whether the metrics of several worker processes are aggregated.
+    Returns:
+        bool: True if PROMETHEUS_MULTIPROC_DIR is set.
+    """
+
+    return MULTIPROCESS_DIR_VARIABLE in os.environ
+
+
+def mark_process_dead():
+    """
+    Drop the live gauges of this process from the aggregated metrics on shutdown.
+    """
+
+    if is_multiprocess():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+async def monitor_event_loop_lag(
+    interval_seconds: float = EVENT_LOOP_LAG_INTERVAL_SECONDS,
+):
+    """
+    Measure how late the event loop wakes up from a periodic sleep
+    until the task is cancelled.
+    A busy loop, e.g. blocked by synchronous work, delays every wake-up
+    by the time it was blocked.
+    Args:
+        interval_seconds (float): The time between measurements.
+    """
+
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled_at = loop.time() + interval_seconds
+        await asyncio.sleep(interval_seconds)
+        EVENT_LOOP_LAG.observe(max(loop.time() - scheduled_at, 0.0))
@@ -0,0 +1,451 @@
+from collections import deque
+import heapq
+from typing import NamedTuple
+
+from app.schemas.order_schema import OrderStatus, OrderType
+from app.schemas.trade_schema import TradeAction
+
+
+class Order:
+    """
+    An order tracked by the matching engine.
+    """
+
+    __slots__ = (
+        "id",
+        "user_id",
+        "symbol",
+        "action",
+        "type",
+        "price",
+        "amount",
+        "remaining",
+        "timestamp",
+        "cancelled",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        user_id: str,
+        symbol: str,
+        action: TradeAction,
+        type: OrderType,
+        price: float | None,
+        amount: float,
+        timestamp: float,
+    ):
+        self.id = id
+        self.user_id = user_id
+        self.symbol = symbol
+        self.action = action
+        self.type = type
+        self.price = price
+        self.amount = amount
+        self.remaining = amount
+        self.timestamp = timestamp
+        self.cancelled = False
+
+    @property
+    def filled_amount(self) -> float:
+        """
+        Get the amount executed so far.
+        Returns:
+            float: The filled amount.
+        """
+
+        return self.amount - self.remaining
+
+    @property
+    def status(self) -> OrderStatus:
+        """
+        Get the status of the order.
+        Returns:
+            OrderStatus: The status.
+        """
+
+        if self.remaining <= 0:
+            return OrderStatus.FILLED
+        if self.cancelled:
+            return OrderStatus.CANCELLED
+        if self.remaining < self.amount:
+            return OrderStatus.PARTIALLY_FILLED
+        return OrderStatus.OPEN
+
+    def to_dict(self) -> dict:
+        """
+        Convert the order to a dictionary.
+        Returns:
+            dict: The order fields, its filled amount and its status.
+        """
+
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "symbol": self.symbol,
+            "action": self.action,
+            "type": self.type,
+            "price": self.price,
+            "amount": self.amount,
+            "filled_amount": self.filled_amount,
+            "status": self.status,
+            "timestamp": self.timestamp,
+        }
+
+
+class Fill(NamedTuple):
+    """
+    An execution between a resting (maker) order and an incoming (taker) order,
+    at the maker's price.
+    """
+
+    maker: Order
+    taker: Order
+    price: float
+    amount: float
+
+
+class PriceLevel:
+    """
+    The resting orders at one price, in arrival order.
+    Cancelled orders are left in the queue and skipped when they reach its front.
+    """
+
+    __slots__ = ("price", "orders", "amount", "order_count")
+
+    def __init__(self, price: float):
+        self.price = price
+        self.orders: deque[Order] = deque()
+        self.amount = 0.0
+        self.order_count = 0
+
+
+class OrderBook:
+    """
+    OrderBook is the limit order book of one symbol, matching with price-time priority.
+    Each side keeps a dict of price levels holding FIFO queues, and a heap of its prices
+    for the best level, so adding a level costs O(log n) and adding
+    to an existing level O(1).
+    Cancellation is lazy: the order is flagged and its level's totals adjusted in O(1),
+    and empty levels are dropped from the heap when they surface at the top.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.__levels: dict[TradeAction, dict[float, PriceLevel]] = {
+            TradeAction.BUY: {},
+            TradeAction.SELL: {},
+        }
+        # Bids are stored negated so both heaps pop the best price first
+        self.__heaps: dict[TradeAction, list[float]] = {
+            TradeAction.BUY: [],
+            TradeAction.SELL: [],
+        }
+        # The prices in each heap, so a level re-created before its stale entry
+        # was discarded reuses that entry instead of pushing a duplicate
+        self.__heap_prices: dict[TradeAction, set[float]] = {
+            TradeAction.BUY: set(),
+            TradeAction.SELL: set(),
+        }
+        self.__orders: dict[str, Order] = {}
+
+    def best_price(self, side: TradeAction) -> float | None:
+        """
+        Get the best resting price of a side.
+        Args:
+            side (TradeAction): BUY for the best bid, SELL for the best ask.
+        Returns:
+            float | None: The best price, or None if the side is empty.
+        """
+
+        level = self.__best_level(side)
+        return level.price if level else None
+
+    def get_order(self, order_id: str) -> Order | None:
+        """
+        Get a resting order.
+        Args:
+            order_id (str): The ID of the order.
+        Returns:
+            Order | None: The order, or None if it is not resting in the book.
+        """
+
+        return self.__orders.get(order_id)
+
+    def submit(self, order: Order) -> list[Fill]:
+        """
+        Match an incoming order against the opposite side, then
+        rest any limit remainder.
+        Market orders execute at whatever prices are available, and
+        their remainder is cancelled.
+        Args:
+            order (Order): The incoming order.
+        Returns:
+            list[Fill]: The executions, in matching order.
+        """
+
+        opposite = (
+            TradeAction.SELL if order.action == TradeAction.BUY else TradeAction.BUY
+        )
+        fills = []
+
+        while order.remaining > 0:
+            level = self.__best_level(opposite)
+            if level is None or not self.__crosses(order, level.price):
+                break
+
+            maker = level.orders[0]
+            if maker.cancelled:
+                level.orders.popleft()
+                continue
+
+            amount = min(order.remaining, maker.remaining)
+            fills.append(Fill(maker, order, level.price, amount))
+            order.remaining -= amount
+            maker.remaining -= amount
+            level.amount -= amount
+
+            if maker.remaining <= 0:
+                level.orders.popleft()
+                level.order_count -= 1
+                del self.__orders[maker.id]
+                if level.order_count == 0:
+                    self.__remove_level(opposite, level)
+
+        if order.remaining > 0:
+            if order.type == OrderType.LIMIT:
+                self.__rest(order)
+            else:
+                order.cancelled = True
+        return fills
+
+    def cancel(self, order_id: str) -> Order | None:
+        """
+        Cancel a resting order.
+        Args:
+            order_id (str): The ID of the order.
+        Returns:
+            Order | None: The cancelled order, or None if it is not resting in the book.
+        """
+
+        order = self.__orders.pop(order_id, None)
+        if order is None:
+            return None
+
+        order.cancelled = True
+        level = self.__levels[order.action][order.price]
+        level.amount -= order.remaining
+        level.order_count -= 1
+        if level.order_count == 0:
+            self.__remove_level(order.action, level)
+        return order
+
+    def revert(self, order: Order, fills: list[Fill]):
+        """
+        Undo the matching of an order whose executions could not be recorded.
+        The order is withdrawn, and the makers get the filled amounts back
+        at the front of their price levels, ahead of the orders queued behind them.
+        Makers cancelled in the meantime stay cancelled.
+        Args:
+            order (Order): The incoming order.
+            fills (list[Fill]): The executions returned by `submit`.
+        """
+
+        if self.cancel(order.id) is None:
+            order.cancelled = True
+        for fill in reversed(fills):
+            order.remaining += fill.amount
+            maker = fill.maker
+            if maker.cancelled:
+                continue
+            maker.remaining += fill.amount
+            if maker.id in self.__orders:
+                self.__levels[maker.action][maker.price].amount += fill.amount
+            else:
+                self.__rest(maker, front=True)
+
+    def depth(self, side: TradeAction, levels: int) -> list[PriceLevel]:
+        """
+        Get the top price levels of a side.
+        Args:
+            side (TradeAction): BUY for bids, SELL for asks.
+            levels (int): The maximum number of levels.
+        Returns:
+            list[PriceLevel]: The levels, best first.
+        """
+
+        book_levels = self.__levels[side]
+        select = heapq.nlargest if side == TradeAction.BUY else heapq.nsmallest
+        return [book_levels[price] for price in select(levels, book_levels)]
+
+    def __best_level(self, side: TradeAction) -> PriceLevel | None:
+        """
+        Get the best level of a side, discarding heap entries of removed levels.
+        Args:
+            side (TradeAction): The side of the book.
+        Returns:
+            PriceLevel | None: The best level, or None if the side is empty.
+        """
+
+        heap = self.__heaps[side]
+        levels = self.__levels[side]
+        sign = -1.0 if side == TradeAction.BUY else 1.0
+        while heap:
+            level = levels.get(sign * heap[0])
+            if level is not None:
+                return level
+            self.__heap_prices[side].discard(sign * heapq.heappop(heap))
+        return None
+
+    def __rest(self, order: Order, front: bool = False):
+        """
+        Add the remainder of a limit order to its side of the book.
+        Args:
+            order (Order): The order to rest.
+            front (bool): Queue it ahead of its price level, restoring priority.
+        """
+
+        levels = self.__levels[order.action]
+        level = levels.get(order.price)
+        if level is None:
+            level = levels[order.price] = PriceLevel(order.price)
+            heap_prices = self.__heap_prices[order.action]
+            if order.price not in heap_prices:
+                heap_prices.add(order.price)
+                sign = -1.0 if order.action == TradeAction.BUY else 1.0
+                heapq.heappush(self.__heaps[order.action], sign * order.price)
+
+        if front:
+            level.orders.appendleft(order)
+        else:
+            level.orders.append(order)
+        level.amount += order.remaining
+        level.order_count += 1
+        self.__orders[order.id] = order
+
+    def __remove_level(self, side: TradeAction, level: PriceLevel):
+        """
+        Remove an empty level; its heap entry is discarded once it reaches the top.
+        Args:
+            side (TradeAction): The side of the book.
+            level (PriceLevel): The empty level.
+        """
+
+        del self.__levels[side][level.price]
+
+    @staticmethod
+    def __crosses(order: Order, price: float) -> bool:
+        """
+        Check whether an incoming order can execute at a resting price.
+        Args:
+            order (Order): The incoming order.
+            price (float): The resting price.
+        Returns:
+            bool: True if the order executes at the price.
+        """
+
+        if order.type == OrderType.MARKET:
+            return True
+        if order.action == TradeAction.BUY:
+            return price <= order.price
+        return price >= order.price
+
+
+class MatchingEngine:
+    """
+    MatchingEngine routes orders to the order book of their symbol.
+    Matching is synchronous and never awaits, so on the event loop orders are matched
+    one at a time; the resting remainder of an order is visible to the next ones
+    before its trades are recorded. The books are not shared between processes.
+    """
+
+    def __init__(self):
+        self.__books: dict[str, OrderBook] = {}
+        # Resting order ID -> symbol, to find the book of an order
+        # without scanning them all
+        self.__symbols: dict[str, str] = {}
+        self.orders_matched = 0
+        self.fills = 0
+
+    def get_book(self, symbol: str) -> OrderBook:
+        """
+        Get the order book of a symbol, creating it if needed.
+        Args:
+            symbol (str): The trading symbol.
+        Returns:
+            OrderBook: The order book.
+        """
+
+        book = self.__books.get(symbol)
+        if book is None:
+            book = self.__books[symbol] = OrderBook(symbol)
+        return book
+
+    def find_book(self, symbol: str) -> OrderBook | None:
+        """
+        Get the order book of a symbol, if any order was placed for it.
+        Args:
+            symbol (str): The trading symbol.
+        Returns:
+            OrderBook | None: The order book, or None if it does not exist.
+        """
+
+        return self.__books.get(symbol)
+
+    def submit(self, order: Order) -> list[Fill]:
+        """
+        Match an order in the book of its symbol.
+        Args:
+            order (Order): The incoming order.
+        Returns:
+            list[Fill]: The executions, in matching order.
+        """
+
+        fills = self.get_book(order.symbol).submit(order)
+        for fill in fills:
+            if fill.maker.remaining <= 0:
+                del self.__symbols[fill.maker.id]
+        if order.remaining > 0 and not order.cancelled:
+            self.__symbols[order.id] = order.symbol
+        self.orders_matched += 1
+        self.fills += len(fills)
+        return fills
+
+    def revert(self, order: Order, fills: list[Fill]):
+        """
+        Undo the matching of an order whose executions could not be recorded.
+        Args:
+            order (Order): The incoming order.
+            fills (list[Fill]): The executions returned by `submit`.
+        """
+
+        self.__books[order.symbol].revert(order, fills)
+        self.__symbols.pop(order.id, None)
+        for fill in fills:
+            if not fill.maker.cancelled:
+                self.__symbols[fill.maker.id] = order.symbol
+        self.fills -= len(fills)
+
+    def get_order(self, order_id: str) -> Order | None:
+        """
+        Get a resting order of any symbol.
+        Args:
+            order_id (str): The ID of the order.
+        Returns:
+            Order | None: The order, or None if it is not resting in any book.
+        """
+
+        symbol = self.__symbols.get(order_id)
+        return self.__books[symbol].get_order(order_id) if symbol else None
+
+    def cancel(self, order_id: str) -> Order | None:
+        """
+        Cancel a resting order of any symbol.
+        Args:
+            order_id (str): The ID of the order.
+        Returns:
+            Order | None: The cancelled order, or None if it is not resting in any book.
+        """
+
+        symbol = self.__symbols.pop(order_id, None)
+        return self.__books[symbol].cancel(order_id) if symbol else None
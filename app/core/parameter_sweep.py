@@ -0,0 +1,115 @@
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.core.backtesting import STRATEGIES, expand_grid, run_strategy
+
+# Set in each worker process by `__attach_prices`
+__shared_memory: shared_memory.SharedMemory | None = None
+__shared_prices: np.ndarray | None = None
+
+
+def __attach_prices(name: str, length: int):
+    """
+    Map the shared price series into a worker process, without copying it.
+    Args:
+        name (str): The name of the shared memory block.
+        length (int): The number of prices in the block.
+    """
+
+    global __shared_memory, __shared_prices
+    __shared_memory = shared_memory.SharedMemory(name=name)
+    __shared_prices = np.ndarray(
+        (length,), dtype=np.float64, buffer=__shared_memory.buf
+    )
+    __shared_prices.flags.writeable = False
+
+
+def __run_chunk(strategy: str, params_chunk: list[dict], fee_rate: float) -> list[dict]:
+    """
+    Backtest a chunk of parameter sets against the shared price
+    series, in a worker process.
+    Args:
+        strategy (str): The name of the strategy.
+        params_chunk (list[dict]): The parameter sets to backtest.
+        fee_rate (float): The fee paid per unit of traded equity.
+    Returns:
+        list[dict]: The parameters and results of each backtest.
+    """
+
+    return [
+        {
+            "params": params,
+            **run_strategy(__shared_prices, strategy, params, fee_rate)._asdict(),
+        }
+        for params in params_chunk
+    ]
+
+
+def run_sweep(
+    prices: np.ndarray,
+    strategy: str,
+    grid: dict[str, list],
+    fee_rate: float = 0.001,
+    workers: int = 1,
+    chunk_size: int | None = None,
+) -> list[dict]:
+    """
+    Backtest a strategy over every combination of a parameter grid.
+    With several workers, the parameter sets are distributed in
+    chunks across a process pool.
+    The price series is copied once into a shared memory block that every worker maps
+    read-only, so the dataset is neither pickled per task nor duplicated per worker.
+    Args:
+        prices (np.ndarray): The price series.
+        strategy (str): The name of the strategy.
+        grid (dict[str, list]): The candidate values of each strategy parameter.
+        fee_rate (float): The fee paid per unit of traded equity.
+        workers (int): The number of worker processes; 1 runs in the calling process.
+        chunk_size (int | None): The number of parameter sets per task, or None to
+            spread them evenly with a few tasks per worker.
+    Returns:
+        list[dict]: The parameters and results of each backtest, in grid order.
+    Raises:
+        ValueError: If the strategy is unknown.
+    """
+
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'")
+
+    param_sets = expand_grid(grid)
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    if workers <= 1:
+        return [
+            {
+                "params": params,
+                **run_strategy(prices, strategy, params, fee_rate)._asdict(),
+            }
+            for params in param_sets
+        ]
+
+    if chunk_size is None:
+        chunk_size = max(1, len(param_sets) // (workers * 4))
+    chunks = [
+        param_sets[start : start + chunk_size]
+        for start in range(0, len(param_sets), chunk_size)
+    ]
+
+    block = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+    try:
+        np.ndarray(prices.shape, dtype=np.float64, buffer=block.buf)[:] = prices
+        with ProcessPoolExecutor(
+            workers, initializer=__attach_prices, initargs=(block.name, len(prices))
+        ) as executor:
+            results = executor.map(
+                __run_chunk,
+                itertools.repeat(strategy),
+                chunks,
+                itertools.repeat(fee_rate),
+            )
+            return [result for chunk_results in results for result in chunk_results]
+    finally:
+        block.close()
+        block.unlink()
@@ -0,0 +1,157 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from passlib.context import CryptContext
+
+from app.core.service_metrics import (
+    PASSWORD_HASH_QUEUE_DEPTH,
+    PASSWORD_HASH_REJECTED,
+    PASSWORD_HASH_SECONDS,
+    PASSWORD_HASH_WAIT_SECONDS,
+)
+
+
+class PasswordHasherBusyError(Exception):
+    """Exception raised when the password hashing queue is full."""
+
+    def __str__(self):
+        return "Too many concurrent password operations, try again later"
+
+
+class PasswordHasher:
+    """
+    PasswordHasher runs password hashing and verification off the event loop.
+    Work is submitted to a dedicated thread pool (bcrypt
+    releases the GIL while hashing),
+    and admission is bounded: once `max_workers + max_queue_size` operations are
+    pending, new requests are rejected immediately instead of piling up behind the pool.
+    """
+
+    def __init__(
+        self, pwd_context: CryptContext, max_workers: int, max_queue_size: int
+    ):
+        self.__pwd_context = pwd_context
+        self.__executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hasher"
+        )
+        self.__max_pending = max_workers + max_queue_size
+        self.__max_workers = max_workers
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_hash_seconds = 0.0
+        self.total_wait_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Get the number of operations waiting for a free worker.
+        Returns:
+            int: The number of queued operations.
+        """
+
+        return max(self.pending - self.__max_workers, 0)
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password.
+        Args:
+            password (str): The plain-text password.
+        Returns:
+            str: The password hash.
+        Raises:
+            PasswordHasherBusyError: If the hashing queue is full.
+        """
+
+        return await self.__run(self.__pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Verify a password against a hash.
+        Args:
+            password (str): The plain-text password.
+            hashed_password (str): The stored password hash.
+        Returns:
+            bool: True if the password matches the hash, False otherwise.
+        Raises:
+            PasswordHasherBusyError: If the hashing queue is full.
+        """
+
+        return await self.__run(self.__pwd_context.verify, password, hashed_password)
+
+    def get_stats(self) -> dict:
+        """
+        Get the hashing pool counters.
+        Returns:
+            dict: The current queue depth and cumulative counters and latencies.
+        """
+
+        return {
+            "pending": self.pending,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "total_hash_seconds": self.total_hash_seconds,
+            "total_wait_seconds": self.total_wait_seconds,
+        }
+
+    def shutdown(self):
+        """
+        Shut down the hashing pool, waiting for running operations to finish.
+        """
+
+        self.__executor.shutdown(wait=True)
+
+    async def __run(self, func, *args):
+        """
+        Run a hashing operation in the pool, enforcing the admission bound.
+        Args:
+            func (Callable): The CryptContext method to run.
+            *args: The arguments to pass to the method.
+        Returns:
+            Any: The result of the method.
+        Raises:
+            PasswordHasherBusyError: If the hashing queue is full.
+        """
+
+        if self.pending >= self.__max_pending:
+            self.rejected += 1
+            PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHasherBusyError()
+
+        self.pending += 1
+        PASSWORD_HASH_QUEUE_DEPTH.inc(int(self.pending > self.__max_workers))
+        submitted_at = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, hash_seconds = await loop.run_in_executor(
+                self.__executor, self.__timed, func, *args
+            )
+        finally:
+            PASSWORD_HASH_QUEUE_DEPTH.dec(int(self.pending > self.__max_workers))
+            self.pending -= 1
+
+        wait_seconds = time.perf_counter() - submitted_at - hash_seconds
+        self.completed += 1
+        self.total_hash_seconds += hash_seconds
+        self.total_wait_seconds += wait_seconds
+        PASSWORD_HASH_SECONDS.observe(hash_seconds)
+        PASSWORD_HASH_WAIT_SECONDS.observe(wait_seconds)
+        return result
+
+    @staticmethod
+    def __timed(func, *args):
+        """
+        Call a function and measure how long it takes, from within the worker thread.
+        Args:
+            func (Callable): The function to call.
+            *args: The arguments to pass to the function.
+        Returns:
+            tuple: The result of the function and its duration in seconds.
+        """
+
+        started_at = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - started_at
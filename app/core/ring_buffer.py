@@ -0,0 +1,113 @@
+import numpy as np
+
+
+class TickRingBuffer:
+    """
+    TickRingBuffer is a fixed-size, NumPy-backed ring buffer of market ticks.
+    Timestamps, prices and volumes live in preallocated float64 arrays and are written
+    in vectorized slices, so ingestion allocates no Python objects per tick.
+    Ticks are expected to be appended in non-decreasing timestamp order.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.prices = np.zeros(capacity, dtype=np.float64)
+        self.volumes = np.zeros(capacity, dtype=np.float64)
+        self.written = 0
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def extend(self, timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray):
+        """
+        Append a batch of ticks, overwriting the oldest ones when the buffer is full.
+        Args:
+            timestamps (np.ndarray): The tick timestamps.
+            prices (np.ndarray): The tick prices.
+            volumes (np.ndarray): The tick volumes.
+        """
+
+        count = len(timestamps)
+        if count == 0:
+            return
+        if count > self.capacity:
+            # Only the newest `capacity` ticks would survive anyway
+            skipped = count - self.capacity
+            timestamps = timestamps[skipped:]
+            prices = prices[skipped:]
+            volumes = volumes[skipped:]
+            self.written += skipped
+            count = self.capacity
+
+        start = self.written % self.capacity
+        first = min(count, self.capacity - start)
+        for target, source in (
+            (self.timestamps, timestamps),
+            (self.prices, prices),
+            (self.volumes, volumes),
+        ):
+            target[start : start + first] = source[:first]
+            target[: count - first] = source[first:]
+        self.written += count
+
+    def latest(self) -> tuple[float, float, float] | None:
+        """
+        Get the most recent tick.
+        Returns:
+            tuple[float, float, float] | None: The timestamp, price and volume, or None.
+        """
+
+        if self.written == 0:
+            return None
+        index = (self.written - 1) % self.capacity
+        return (
+            float(self.timestamps[index]),
+            float(self.prices[index]),
+            float(self.volumes[index]),
+        )
+
+    def window(
+        self, since: float, until: float | None = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the ticks within a time range, oldest first.
+        Args:
+            since (float): The start of the range, inclusive.
+            until (float | None): The end of the range, exclusive, or None for no end.
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: The copied columns.
+        """
+
+        pieces = []
+        for start, stop in self.__segments():
+            timestamps = self.timestamps[start:stop]
+            low = start + np.searchsorted(timestamps, since, side="left")
+            high = (
+                stop
+                if until is None
+                else start + np.searchsorted(timestamps, until, side="left")
+            )
+            if low < high:
+                pieces.append((low, high))
+
+        return tuple(
+            (
+                np.concatenate([array[low:high] for low, high in pieces])
+                if pieces
+                else np.empty(0, dtype=np.float64)
+            )
+            for array in (self.timestamps, self.prices, self.volumes)
+        )
+
+    def __segments(self) -> list[tuple[int, int]]:
+        """
+        Get the index ranges of the stored ticks, oldest segment first.
+        Returns:
+            list[tuple[int, int]]: The [start, stop) ranges of the stored ticks.
+        """
+
+        if self.written <= self.capacity:
+            return [(0, self.written)]
+        head = self.written % self.capacity
+        return [(head, self.capacity), (0, head)] if head else [(0, self.capacity)]
@@ -0,0 +1,73 @@
+from prometheus_client import Counter, Gauge, Summary
+
+# Recorded by the services as they work, so that with PROMETHEUS_MULTIPROC_DIR set
+# the values of every worker process are aggregated
+
+BROADCAST_MESSAGES_PUBLISHED = Counter(
+    "broadcast_messages_published", "Messages published to the hub"
+)
+BROADCAST_MESSAGES_DELIVERED = Counter(
+    "broadcast_messages_delivered", "Messages delivered to subscriber queues"
+)
+BROADCAST_MESSAGES_CONFLATED = Counter(
+    "broadcast_messages_conflated",
+    "Pending messages replaced by a newer message with the same key",
+)
+BROADCAST_MESSAGES_DROPPED = Counter(
+    "broadcast_messages_dropped",
+    "Messages dropped because a subscriber queue was full",
+)
+BROADCAST_SUBSCRIBERS = Gauge(
+    "broadcast_subscribers", "Active hub subscriptions", multiprocess_mode="livesum"
+)
+BROADCAST_TRANSPORT_MESSAGES = Counter(
+    "broadcast_transport_messages",
+    "Messages sent to or received from the other worker processes, "
+    "or dropped while disconnected",
+    ["direction"],
+)
+BROADCAST_TRANSPORT_RECONNECTS = Counter(
+    "broadcast_transport_reconnects", "Reconnections of the broadcast transport"
+)
+BROADCAST_TRANSPORT_PENDING_MESSAGES = Gauge(
+    "broadcast_transport_pending_messages",
+    "Messages waiting to be sent through the broadcast transport",
+    multiprocess_mode="livesum",
+)
+
+PASSWORD_HASH_SECONDS = Summary(
+    "password_hash_seconds", "Time spent hashing or verifying passwords in the pool"
+)
+PASSWORD_HASH_WAIT_SECONDS = Summary(
+    "password_hash_wait_seconds", "Time password operations waited for a free worker"
+)
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Password operations waiting for a free worker",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected",
+    "Password operations rejected because the queue was full",
+)
+
+JWT_VERIFY_SECONDS = Summary(
+    "jwt_verify_seconds",
+    "Time spent verifying token signatures on token cache misses",
+)
+JWT_CACHE_HITS = Counter("jwt_cache_hits", "Token verifications served from the cache")
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups", "Read-through cache lookups, by outcome", ["result"]
+)
+CACHE_BACKEND_ERRORS = Counter(
+    "cache_backend_errors", "Failed calls to the shared cache tier"
+)
+
+TRADE_WRITE_BATCH_SIZE = Summary(
+    "trade_write_batch_size", "Documents per coalesced trade insert"
+)
+TRADE_WRITE_WAIT_SECONDS = Summary(
+    "trade_write_wait_seconds",
+    "Time trade inserts waited for their batch to be flushed",
+)
@@ -0,0 +1,96 @@
+from enum import Enum
+
+import msgpack
+import orjson
+
+JSON_SUBPROTOCOL = "trade-stream.json"
+MSGPACK_SUBPROTOCOL = "trade-stream.msgpack"
+
+
+class StreamEncoding(str, Enum):
+    """
+    Enum for the wire encodings of the trade stream.
+    TEXT is the legacy mode: one JSON text frame per message.
+    JSON and MSGPACK are negotiated through the WebSocket subprotocol
+    and send each batch of messages as a single array frame.
+    """
+
+    TEXT = "text"
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+
+SUBPROTOCOL_ENCODINGS = {
+    JSON_SUBPROTOCOL: StreamEncoding.JSON,
+    MSGPACK_SUBPROTOCOL: StreamEncoding.MSGPACK,
+}
+
+
+def negotiate_encoding(subprotocols: list[str]) -> tuple[StreamEncoding, str | None]:
+    """
+    Pick the stream encoding from the subprotocols offered by the client.
+    Args:
+        subprotocols (list[str]): The subprotocols the client offered, preferred first.
+    Returns:
+        tuple[StreamEncoding, str | None]: The encoding and the subprotocol to accept,
+        or the legacy text encoding and None if no offered subprotocol is supported.
+    """
+
+    for subprotocol in subprotocols:
+        encoding = SUBPROTOCOL_ENCODINGS.get(subprotocol)
+        if encoding:
+            return encoding, subprotocol
+    return StreamEncoding.TEXT, None
+
+
+class StreamMessage:
+    """
+    StreamMessage is a message published to the trade stream.
+    The payload is encoded at most once per encoding and the result is shared by every
+    subscriber the message is fanned out to.
+    """
+
+    __slots__ = ("payload", "__encoded")
+
+    def __init__(self, payload: dict):
+        self.payload = payload
+        self.__encoded: dict[StreamEncoding, bytes] = {}
+
+    def encode(self, encoding: StreamEncoding) -> bytes:
+        """
+        Encode the message payload.
+        Args:
+            encoding (StreamEncoding): The encoding. TEXT shares the JSON encoding.
+        Returns:
+            bytes: The encoded payload.
+        """
+
+        if encoding is StreamEncoding.TEXT:
+            encoding = StreamEncoding.JSON
+
+        encoded = self.__encoded.get(encoding)
+        if encoded is None:
+            if encoding is StreamEncoding.MSGPACK:
+                encoded = msgpack.packb(self.payload)
+            else:
+                encoded = orjson.dumps(self.payload)
+            self.__encoded[encoding] = encoded
+        return encoded
+
+
+def encode_frame(messages: list[StreamMessage], encoding: StreamEncoding) -> bytes:
+    """
+    Encode a batch of messages into the payload of a single frame.
+    The frame is an array of the messages, built by
+    concatenating their cached encodings.
+    Args:
+        messages (list[StreamMessage]): The messages to encode.
+        encoding (StreamEncoding): The JSON or MSGPACK encoding.
+    Returns:
+        bytes: The frame payload.
+    """
+
+    encoded = [message.encode(encoding) for message in messages]
+    if encoding is StreamEncoding.MSGPACK:
+        return msgpack.Packer().pack_array_header(len(encoded)) + b"".join(encoded)
+    return b"[" + b",".join(encoded) + b"]"
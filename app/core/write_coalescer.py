@@ -0,0 +1,203 @@
+import asyncio
+import time
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import (
+    BulkWriteError,
+    DuplicateKeyError,
+    PyMongoError,
+    WriteConcernError,
+    WriteError,
+)
+
+from app.core.service_metrics import TRADE_WRITE_BATCH_SIZE, TRADE_WRITE_WAIT_SECONDS
+
+DUPLICATE_KEY_ERROR_CODES = (11000, 11001, 12582)
+
+
+class WriteCoalescer:
+    """
+    WriteCoalescer groups concurrent inserts into one collection into
+    batched `insert_many` calls.
+    Documents are collected until the oldest one has waited `window_seconds` or
+    `max_batch_size` are pending, then written with one unordered round trip. Each
+    caller is resumed only once its own document is acknowledged, and gets the
+    error of its own document if it was rejected, so a duplicate in a batch does
+    not fail the other inserts.
+    """
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        window_seconds: float,
+        max_batch_size: int,
+    ):
+        self.collection = collection
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.__pending: list[tuple[dict, asyncio.Future, float]] = []
+        self.__timer: asyncio.TimerHandle | None = None
+        self.__writes: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.documents = 0
+        self.failed_documents = 0
+        self.largest_batch = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def insert(self, document: dict):
+        """
+        Insert a document as part of the next batch, waiting until it is acknowledged.
+        Args:
+            document (dict): The document to insert.
+        Raises:
+            PyMongoError: If the document, or the whole batch, was rejected.
+        """
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__pending.append((document, future, time.perf_counter()))
+
+        if len(self.__pending) >= self.max_batch_size:
+            self.__flush_pending()
+        elif self.__timer is None:
+            self.__timer = loop.call_later(self.window_seconds, self.__flush_pending)
+
+        await future
+
+    async def close(self):
+        """
+        Write the pending documents and wait for every batch in flight.
+        """
+
+        self.__flush_pending()
+        if self.__writes:
+            await asyncio.gather(*self.__writes, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        """
+        Get the batching counters.
+        Returns:
+            dict: The cumulative batch and document counts, and the added latency.
+        """
+
+        return {
+            "pending": len(self.__pending),
+            "batches": self.batches,
+            "documents": self.documents,
+            "failed_documents": self.failed_documents,
+            "largest_batch": self.largest_batch,
+            "average_batch_size": (
+                self.documents / self.batches if self.batches else 0.0
+            ),
+            "total_wait_seconds": self.total_wait_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+    def __flush_pending(self):
+        """
+        Start writing the pending documents as one batch.
+        """
+
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        if not self.__pending:
+            return
+
+        batch, self.__pending = self.__pending, []
+        flushed_at = time.perf_counter()
+        for _, _, queued_at in batch:
+            wait_seconds = flushed_at - queued_at
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+            TRADE_WRITE_WAIT_SECONDS.observe(wait_seconds)
+        self.batches += 1
+        TRADE_WRITE_BATCH_SIZE.observe(len(batch))
+        self.documents += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        task = asyncio.create_task(self.__write(batch))
+        self.__writes.add(task)
+        task.add_done_callback(self.__writes.discard)
+
+    async def __write(self, batch: list[tuple[dict, asyncio.Future, float]]):
+        """
+        Write a batch and resolve the future of each of its documents.
+        Any other error than a PyMongoError fails every future of
+        the batch, then propagates.
+        Args:
+            batch (list[tuple[dict, asyncio.Future, float]]): The documents, their
+                futures and the time they were queued.
+        """
+
+        errors: dict[int, PyMongoError] = {}
+        try:
+            await self.collection.insert_many(
+                [document for document, _, _ in batch], ordered=False
+            )
+        except BulkWriteError as e:
+            errors = self.__split_errors(e, len(batch))
+        except PyMongoError as e:
+            errors = dict.fromkeys(range(len(batch)), e)
+        except BaseException as e:
+            # The write was cancelled or failed unexpectedly: no caller may keep waiting
+            self.failed_documents += len(batch)
+            for _, future, _ in batch:
+                if future.done():
+                    continue
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+            raise
+
+        self.failed_documents += len(errors)
+        for index, (_, future, _) in enumerate(batch):
+            # The caller may have been cancelled while its document was in flight
+            if future.done():
+                continue
+            error = errors.get(index)
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    @staticmethod
+    def __split_errors(error: BulkWriteError, size: int) -> dict[int, PyMongoError]:
+        """
+        Map the errors of an unordered bulk insert to the documents they belong to.
+        Args:
+            error (BulkWriteError): The error raised by `insert_many`.
+            size (int): The number of documents in the batch.
+        Returns:
+            dict[int, PyMongoError]: The error of each failed document, by batch index.
+        """
+
+        errors: dict[int, PyMongoError] = {}
+        for write_error in error.details.get("writeErrors", []):
+            error_class = (
+                DuplicateKeyError
+                if write_error.get("code") in DUPLICATE_KEY_ERROR_CODES
+                else WriteError
+            )
+            errors[write_error["index"]] = error_class(
+                write_error.get("errmsg"), write_error.get("code"), write_error
+            )
+
+        # Documents written without a write error were still not acknowledged
+        # with the requested write concern
+        write_concern_errors = error.details.get("writeConcernErrors", [])
+        if write_concern_errors:
+            write_concern_error = write_concern_errors[-1]
+            for index in range(size):
+                errors.setdefault(
+                    index,
+                    WriteConcernError(
+                        write_concern_error.get("errmsg"),
+                        write_concern_error.get("code"),
+                        write_concern_error,
+                    ),
+                )
+        return errors
@@ -1,28 +1,359 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 
-from app.core.dependencies import get_app_settings
+from motor.motor_asyncio import (
+    AsyncIOMotorClient,
+    AsyncIOMotorCollection,
+    AsyncIOMotorDatabase,
+)
+from pymongo import ASCENDING, IndexModel, WriteConcern
+from pymongo.errors import BulkWriteError, PyMongoError, WriteConcernError
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    SecondaryPreferred,
+)
 
+from app.config import AppSettings, ReadProfile, WriteProfile, get_app_settings
+from app.core.metrics import MongoCommandMetrics
 
-app_settings = get_app_settings()
+DEFAULT_PROFILE = "default"
+# Read profile -> read preference class; those that may read from a
+# secondary take a max staleness
+READ_PROFILES = {
+    "primary": Primary,
+    "primary_preferred": PrimaryPreferred,
+    "secondary_preferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+# Write profile -> write concern options
+WRITE_PROFILES = {
+    "majority": {"w": "majority"},
+    "journaled": {"w": 1, "j": True},
+    "acknowledged": {"w": 1},
+}
 
-client = AsyncIOMotorClient(app_settings.mongodb_uri)
-db = client[app_settings.mongodb_db]
+# Set by `connect` and cleared by `close`, so importing this module
+# does not touch the network
+client: AsyncIOMotorClient | None = None
+db: AsyncIOMotorDatabase | None = None
+# (collection name, read profile, write profile) -> collection with those options
+__collections: dict[tuple[str, str, str], AsyncIOMotorCollection] = {}
+
+
+def create_client(app_settings: AppSettings) -> AsyncIOMotorClient:
+    """
+    Create a MongoDB client with the connection pool configured from the settings.
+    Args:
+        app_settings (AppSettings): The application settings.
+    Returns:
+        AsyncIOMotorClient: The client.
+    """
+
+    return AsyncIOMotorClient(
+        app_settings.mongodb_uri,
+        maxPoolSize=app_settings.mongodb_max_pool_size,
+        minPoolSize=app_settings.mongodb_min_pool_size,
+        maxIdleTimeMS=app_settings.mongodb_max_idle_time_ms,
+        serverSelectionTimeoutMS=app_settings.mongodb_server_selection_timeout_ms,
+        connectTimeoutMS=app_settings.mongodb_connect_timeout_ms,
+        event_listeners=[MongoCommandMetrics()],
+    )
+
+
+async def connect() -> AsyncIOMotorDatabase:
+    """
+    Create the process-wide MongoDB client and open the minimum number of
+    pooled connections, so the first requests do not pay for server selection
+    and connection handshakes.
+    Returns:
+        AsyncIOMotorDatabase: The application database.
+    Raises:
+        ServerSelectionTimeoutError: If no server is reachable in the selection timeout.
+    """
+
+    global client, db
+
+    app_settings = get_app_settings()
+    client = create_client(app_settings)
+    db = client[app_settings.mongodb_db]
+    # Concurrent pings each hold a connection, so the pool grows to
+    # the minimum size at once
+    await asyncio.gather(
+        *(db.command("ping") for _ in range(max(app_settings.mongodb_min_pool_size, 1)))
+    )
+    return db
+
+
+def close():
+    """
+    Close the process-wide MongoDB client and its pooled connections.
+    """
+
+    global client, db
+
+    if client is not None:
+        client.close()
+    client = db = None
+    __collections.clear()
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    """
+    Get the application database.
+    Returns:
+        AsyncIOMotorDatabase: The application database.
+    Raises:
+        RuntimeError: If the client is not connected.
+    """
+
+    if db is None:
+        raise RuntimeError("The database is not connected; call connect() first")
+    return db
+
+
+def get_profiled_collection(
+    name: str,
+    read_profile: ReadProfile = DEFAULT_PROFILE,
+    write_profile: WriteProfile = DEFAULT_PROFILE,
+) -> AsyncIOMotorCollection:
+    """
+    Get a collection whose operations use a read and a write profile
+    instead of the client defaults.
+    Collections are created once per profile combination and reused
+    until the client is closed.
+    Args:
+        name (str): The name of the collection.
+        read_profile (ReadProfile): "default", or a key of READ_PROFILES. Profiles that
+        may read from a secondary are bounded by MONGODB_MAX_STALENESS_SECONDS.
+        write_profile (WriteProfile): "default", or a key of WRITE_PROFILES. Majority
+        writes wait at most MONGODB_WRITE_TIMEOUT_MS for replication.
+    Returns:
+        AsyncIOMotorCollection: The collection.
+    Raises:
+        RuntimeError: If the client is not connected.
+        ValueError: If a profile is unknown.
+    """
+
+    key = (name, read_profile, write_profile)
+    collection = __collections.get(key)
+    if collection is not None:
+        return collection
+
+    app_settings = get_app_settings()
+    options = get_profile_options(
+        read_profile,
+        write_profile,
+        app_settings.mongodb_max_staleness_seconds,
+        app_settings.mongodb_write_timeout_ms,
+    )
+    collection = get_database()[name]
+    if options:
+        collection = collection.with_options(**options)
+    __collections[key] = collection
+    return collection
+
+
+def get_profile_options(
+    read_profile: ReadProfile,
+    write_profile: WriteProfile,
+    max_staleness_seconds: int,
+    write_timeout_ms: int,
+) -> dict:
+    """
+    Get the collection options of a read and a write profile.
+    Args:
+        read_profile (ReadProfile): "default", or a key of READ_PROFILES.
+        write_profile (WriteProfile): "default", or a key of WRITE_PROFILES.
+        max_staleness_seconds (int): How far behind the primary a secondary may be to be
+        read from, at least 90, or -1 for no bound.
+        write_timeout_ms (int): How long a write waits for its write concern.
+    Returns:
+        dict: The `read_preference` and `write_concern` options, for `with_options`;
+        empty for the client defaults.
+    Raises:
+        ValueError: If a profile is unknown.
+    """
+
+    options = {}
+    if read_profile != DEFAULT_PROFILE:
+        if read_profile not in READ_PROFILES:
+            raise ValueError(f"Unknown read profile '{read_profile}'")
+        read_preference = READ_PROFILES[read_profile]
+        options["read_preference"] = (
+            read_preference()
+            if read_preference is Primary
+            else read_preference(max_staleness=max_staleness_seconds)
+        )
+    if write_profile != DEFAULT_PROFILE:
+        if write_profile not in WRITE_PROFILES:
+            raise ValueError(f"Unknown write profile '{write_profile}'")
+        options["write_concern"] = WriteConcern(
+            wtimeout=write_timeout_ms, **WRITE_PROFILES[write_profile]
+        )
+    return options
+
+
+def is_unconfirmed_write(error: PyMongoError) -> bool:
+    """
+    Check whether a write failed only to be confirmed with its write concern, e.g.
+    because it timed out waiting for a majority: the documents were still written on
+    the primary, and are kept unless it fails over before replicating them.
+    Args:
+        error (PyMongoError): The error raised by the write.
+    Returns:
+        bool: Whether every document of the write was written.
+    """
+
+    if isinstance(error, WriteConcernError):
+        return True
+    return (
+        isinstance(error, BulkWriteError)
+        and not error.details.get("writeErrors")
+        and bool(error.details.get("writeConcernErrors"))
+    )
 
 
 def get_trade_collection():
     """
-    Get the trade collection from the MongoDB database.
+    Get the trade collection from the MongoDB database, written
+    with the trade write profile.
     Returns:
         AsyncIOMotorCollection: The trade collection.
     """
 
-    return db[app_settings.mongodb_trades_collection]
+    app_settings = get_app_settings()
+    return get_profiled_collection(
+        app_settings.mongodb_trades_collection,
+        write_profile=app_settings.mongodb_trade_write_profile,
+    )
+
+
+def get_trade_listing_collection():
+    """
+    Get the trade collection from the MongoDB database, read with the
+    listing read profile, for trade listings, exports and analytics, which
+    tolerate slightly stale reads.
+    A profile that reads from secondaries also breaks reading your own writes
+    through the listing cache: a trade invalidates its user's cached first page,
+    but the reload can come from a secondary that has not replicated the trade yet,
+    and that stale page is then cached for up to CACHE_TTL_SECONDS.
+    Keep the "default" profile where users must see their trades right away.
+    Returns:
+        AsyncIOMotorCollection: The trade collection.
+    """
+
+    app_settings = get_app_settings()
+    return get_profiled_collection(
+        app_settings.mongodb_trades_collection,
+        read_profile=app_settings.mongodb_listing_read_profile,
+    )
+
 
 def get_user_collection():
     """
-    Get the user collection from the MongoDB database.
+    Get the user collection from the MongoDB database, written
+    with the user write profile.
+    Users are always read from the primary, so a user can log in
+    right after registering.
     Returns:
         AsyncIOMotorCollection: The user collection.
     """
 
-    return db[app_settings.mongodb_users_collection]
+    app_settings = get_app_settings()
+    return get_profiled_collection(
+        app_settings.mongodb_users_collection,
+        write_profile=app_settings.mongodb_user_write_profile,
+    )
+
+
+def get_candle_collection():
+    """
+    Get the candle collection from the MongoDB database, written with the derived data
+    write profile.
+    Returns:
+        AsyncIOMotorCollection: The candle collection.
+    """
+
+    app_settings = get_app_settings()
+    return get_profiled_collection(
+        app_settings.mongodb_candles_collection,
+        write_profile=app_settings.mongodb_derived_write_profile,
+    )
+
+
+def get_position_collection():
+    """
+    Get the position collection from the MongoDB database, written with the derived data
+    write profile, since positions can be rebuilt from the trades.
+    Returns:
+        AsyncIOMotorCollection: The position collection.
+    """
+
+    app_settings = get_app_settings()
+    return get_profiled_collection(
+        app_settings.mongodb_positions_collection,
+        write_profile=app_settings.mongodb_derived_write_profile,
+    )
+
+
+def get_alert_collection():
+    """
+    Get the alert collection from the MongoDB database.
+    Returns:
+        AsyncIOMotorCollection: The alert collection.
+    """
+
+    return get_database()[get_app_settings().mongodb_alerts_collection]
+
+
+async def ensure_indexes():
+    """
+    Create the indexes the services rely on, if they do not exist yet.
+    The trades index serves per-user listings in (timestamp, id) keyset order,
+    the unique users indexes let registration detect duplicates in a single write,
+    the unique candles index backs the candle share upserts and range reads,
+    the unique positions index backs position upserts and rebuild merges,
+    and the alerts index serves per-user listings and lookups.
+    """
+
+    await get_trade_collection().create_indexes(
+        [
+            IndexModel(
+                [("user_id", ASCENDING), ("timestamp", ASCENDING), ("id", ASCENDING)],
+                name="user_id_timestamp_id",
+            ),
+        ]
+    )
+    await get_user_collection().create_indexes(
+        [
+            IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+            IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        ]
+    )
+    await get_candle_collection().create_indexes(
+        [
+            IndexModel(
+                [("symbol", ASCENDING), ("interval", ASCENDING), ("start", ASCENDING)],
+                name="symbol_interval_start_unique",
+                unique=True,
+            ),
+        ]
+    )
+    await get_position_collection().create_indexes(
+        [
+            IndexModel(
+                [("user_id", ASCENDING), ("symbol", ASCENDING)],
+                name="user_id_symbol_unique",
+                unique=True,
+            ),
+        ]
+    )
+    await get_alert_collection().create_indexes(
+        [
+            IndexModel(
+                [("user_id", ASCENDING), ("created_at", ASCENDING)],
+                name="user_id_created_at",
+            ),
+        ]
+    )
@@ -1,19 +1,163 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from app.routes import auth_routes, trade_routes, websocket_routes
+from app.config import get_app_settings
+from app.core.dependencies import (
+    get_alert_service,
+    get_broadcast_hub,
+    get_cache,
+    get_candle_service,
+    get_logger,
+    get_market_data_service,
+    get_service_metrics_collector,
+    get_trade_write_coalescer,
+    reset_process_services,
+)
+from app.core.metrics import (
+    MetricsMiddleware,
+    mark_process_dead,
+    monitor_event_loop_lag,
+)
+from app.db import mongo
+from app.routes import (
+    alert_routes,
+    analytics_routes,
+    auth_routes,
+    candle_routes,
+    indicator_routes,
+    market_routes,
+    metrics_routes,
+    order_routes,
+    position_routes,
+    trade_routes,
+    websocket_routes,
+)
+from app.services.tick_sources import create_tick_source
 
 
-app = FastAPI(
-    title="Crypto Trading Bot",
-    description="A trading bot for cryptocurrency exchanges",
-    version="0.1.0",
-)
+async def __cancel(tasks: list[asyncio.Task]):
+    """
+    Cancel tasks and wait for them to finish, ignoring their results.
+    Args:
+        tasks (list[asyncio.Task]): The tasks.
+    """
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """
+    Application lifespan: connects to the database, warming its connection pool,
+    prepares it and arms the price alerts before serving requests, runs the shared
+    trade-stream producer, market data ingestion, alert rule updates, cache
+    invalidations, candle persistence and the event loop lag monitor, and closes the
+    database connections once pending writes are flushed.
+    Whether startup succeeds or not, the background tasks are cancelled, the client is
+    closed and the process-wide services are released on the way out.
+    """
+
+    app_settings = get_app_settings()
+    background_tasks = []
+    try:
+        await mongo.connect()
+        await mongo.ensure_indexes()
+        alert_count = await get_alert_service().load()
+        get_logger().info("Armed %d price alerts", alert_count)
+        get_service_metrics_collector()
+
+        hub = get_broadcast_hub()
+        background_tasks += [
+            asyncio.create_task(monitor_event_loop_lag()),
+            asyncio.create_task(get_alert_service().run_rule_updates(get_logger())),
+            asyncio.create_task(websocket_routes.heartbeat_producer(hub)),
+            asyncio.create_task(
+                get_candle_service().run_flush(
+                    app_settings.candle_flush_interval_seconds, get_logger()
+                )
+            ),
+        ]
+        if hub.transport:
+            background_tasks += [
+                asyncio.create_task(hub.run_transport(get_logger())),
+                asyncio.create_task(get_cache().run_invalidations(get_logger())),
+            ]
+        tick_source = create_tick_source(
+            app_settings.market_data_source,
+            app_settings.market_data_symbols.split(","),
+            app_settings.market_data_replay_file,
+        )
+        if tick_source:
+            background_tasks.append(
+                asyncio.create_task(
+                    get_market_data_service().run(tick_source, hub, get_logger())
+                )
+            )
+
+        yield
+
+        await __cancel(background_tasks)
+        trade_write_coalescer = get_trade_write_coalescer()
+        if trade_write_coalescer:
+            await trade_write_coalescer.close()
+            get_logger().info(
+                "Coalesced %(documents)d trade writes into %(batches)d batches",
+                trade_write_coalescer.get_stats(),
+            )
+        await get_candle_service().flush()
+        get_logger().info(
+            "Cache hit ratio %(hit_ratio).2f (%(local_hits)d local hits, "
+            "%(backend_hits)d backend hits, %(misses)d misses)",
+            get_cache().get_stats(),
+        )
+    finally:
+        # Also reached when startup fails, so nothing started so far outlives it
+        await __cancel(background_tasks)
+        mongo.close()
+        reset_process_services()
+        mark_process_dead()
+
+
+def create_app() -> FastAPI:
+    """
+    Create the application.
+    Settings are only read and the database only connected when the application starts,
+    so creating it is cheap and needs no configuration.
+    Returns:
+        FastAPI: The application.
+    """
+
+    app = FastAPI(
+        title="Crypto Trading Bot",
+        description="A trading bot for cryptocurrency exchanges",
+        version="0.1.0",
+        lifespan=lifespan,
+    )
+
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(alert_routes.router)
+    app.include_router(analytics_routes.router)
+    app.include_router(auth_routes.router)
+    app.include_router(candle_routes.router)
+    app.include_router(indicator_routes.router)
+    app.include_router(market_routes.router)
+    app.include_router(metrics_routes.router)
+    app.include_router(order_routes.router)
+    app.include_router(position_routes.router)
+    app.include_router(trade_routes.router)
+    app.include_router(websocket_routes.router)
+
+    @app.get("/")
+    async def root():
+        return {"message": "Hello Crypto World!"}
 
-app.include_router(auth_routes.router)
-app.include_router(trade_routes.router)
-app.include_router(websocket_routes.router)
+    return app
 
 
-@app.get("/")
-async def root():
-    return {"message": "Hello Crypto World!"}
+# Served with `uvicorn app.main:app`, or `uvicorn --factory app.main:create_app`
+app = create_app()
@@ -0,0 +1,132 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.security import OAuth2PasswordBearer
+
+from app.core.auth_service import AuthService
+from app.core.dependencies import get_alert_service, get_auth_service
+from app.schemas.alert_schema import AlertCreate, AlertResponse
+from app.schemas.common_response_schema import ErrorDetail
+from app.services.alert_service import AlertService
+
+router = APIRouter(prefix="/api/v1/alerts", tags=["Alerts"])
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+
+@router.get(
+    "",
+    response_model=list[AlertResponse],
+    responses={status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail}},
+)
+async def list_alerts(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    alert_service: Annotated[AlertService, Depends(get_alert_service)],
+):
+    """
+    List the price alerts of the current user, armed and triggered, oldest first.
+    """
+
+    try:
+        user = auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    return await alert_service.get_alerts(user["sub"])
+
+
+@router.post(
+    "",
+    response_model=AlertResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail}},
+)
+async def create_alert(
+    alert: AlertCreate,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    alert_service: Annotated[AlertService, Depends(get_alert_service)],
+):
+    """
+    Create a one-shot price alert.
+    When a market price crosses the threshold in the alert's direction, an
+    `alert` message is sent to the user's trade-stream connections and the alert
+    is recorded as triggered.
+    """
+
+    try:
+        user = auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    return await alert_service.create_alert(user["sub"], alert)
+
+
+@router.put(
+    "/{alert_id}",
+    response_model=AlertResponse,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail},
+        status.HTTP_404_NOT_FOUND: {"model": ErrorDetail},
+    },
+)
+async def replace_alert(
+    alert_id: str,
+    alert: AlertCreate,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    alert_service: Annotated[AlertService, Depends(get_alert_service)],
+):
+    """
+    Replace the condition of a price alert of the current user and re-arm it.
+    """
+
+    try:
+        user = auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    result = await alert_service.replace_alert(user["sub"], alert_id, alert)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"No alert '{alert_id}'"
+        )
+    return result
+
+
+@router.delete(
+    "/{alert_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail},
+        status.HTTP_404_NOT_FOUND: {"model": ErrorDetail},
+    },
+)
+async def delete_alert(
+    alert_id: str,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    alert_service: Annotated[AlertService, Depends(get_alert_service)],
+):
+    """
+    Delete a price alert of the current user.
+    """
+
+    try:
+        user = auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    if not await alert_service.delete_alert(user["sub"], alert_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"No alert '{alert_id}'"
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
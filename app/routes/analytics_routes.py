@@ -0,0 +1,57 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordBearer
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.core.auth_service import AuthService
+from app.core.dependencies import get_auth_service, get_trade_archive
+from app.db.mongo import get_trade_listing_collection
+from app.schemas.analytics_schema import AnalyticsResponse
+from app.schemas.common_response_schema import ErrorDetail
+from app.schemas.trade_schema import TradeFilter
+from app.services.analytics_service import AnalyticsService
+
+
+router = APIRouter(prefix="/api/v1/analytics", tags=["Analytics"])
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+
+def __get_analytics_service(
+    trade_collection: Annotated[
+        AsyncIOMotorCollection, Depends(get_trade_listing_collection)
+    ],
+):
+    """
+    Get the analytics service.
+    """
+
+    return AnalyticsService(trade_collection, get_trade_archive())
+
+
+@router.get(
+    "",
+    response_model=AnalyticsResponse,
+    responses={status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail}},
+)
+async def get_analytics(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    analytics_service: Annotated[AnalyticsService, Depends(__get_analytics_service)],
+    filters: Annotated[TradeFilter, Depends()],
+    pushdown: Annotated[bool, Query()] = True,
+):
+    """
+    Get VWAP, exposure, turnover and buy/sell imbalance for the current user's trades.
+    Unset `pushdown` to aggregate in the application instead of in the database;
+    windows including archived trades are always aggregated in the application.
+    """
+
+    try:
+        user = auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    return await analytics_service.get_analytics(user["sub"], filters, pushdown)
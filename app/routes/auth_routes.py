@@ -1,10 +1,11 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, Form, HTTPException, status
-from passlib.context import CryptContext
+from motor.motor_asyncio import AsyncIOMotorCollection
 
-from app.core.dependencies import get_jwt_service
+from app.core.dependencies import get_jwt_service, get_password_hasher
 from app.core.jwt_service import JwtService
+from app.core.password_hasher import PasswordHasherBusyError
 from app.db.mongo import get_user_collection
 from app.schemas.common_response_schema import ErrorDetail, Message
 from app.schemas.user_schema import (
@@ -14,25 +15,30 @@ from app.schemas.user_schema import (
 )
 from app.services.user_service import DuplicateUserError, UserService
 
+PASSWORD_HASHER_RETRY_AFTER_SECONDS = "1"
+
 router = APIRouter(prefix="/api/v1/auth", tags=["Auth"])
 
 
-def __get_user_service():
+def __get_user_service(
+    user_collection: Annotated[AsyncIOMotorCollection, Depends(get_user_collection)],
+):
     """
     Get the UserService instance.
     Returns:
         UserService: The UserService instance.
     """
 
-    return UserService(
-        get_user_collection(), CryptContext(schemes=["bcrypt"], deprecated="auto")
-    )
+    return UserService(user_collection, get_password_hasher())
 
 
 @router.post(
     "/login",
     response_model=UserLoginResponse,
-    responses={status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail}},
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": ErrorDetail},
+    },
 )
 async def login_user(
     jwt_service: Annotated[JwtService, Depends(get_jwt_service)],
@@ -50,7 +56,8 @@ async def login_user(
     Returns:
         dict: A dictionary containing the JWT token.
     Raises:
-        HTTPException: If the username or password is incorrect.
+        HTTPException: If the username or password is incorrect,
+        or if the password hashing queue is full.
     """
 
     try:
@@ -67,13 +74,22 @@ async def login_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=str(e),
         ) from e
+    except PasswordHasherBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": PASSWORD_HASHER_RETRY_AFTER_SECONDS},
+        ) from e
 
 
 @router.post(
     "/register",
     status_code=status.HTTP_201_CREATED,
     response_model=Message,
-    responses={status.HTTP_400_BAD_REQUEST: {"model": ErrorDetail}},
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": ErrorDetail},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": ErrorDetail},
+    },
 )
 async def register_user(
     user: UserCreate, user_service: Annotated[UserService, Depends(__get_user_service)]
@@ -86,7 +102,8 @@ async def register_user(
     Returns:
         dict: A message indicating successful registration.
     Raises:
-        HTTPException: If a user with the same username or email already exists.
+        HTTPException: If a user with the same username or email already exists,
+        or if the password hashing queue is full.
     """
     try:
         await user_service.create_user(user)
@@ -96,3 +113,9 @@ async def register_user(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
         ) from e
+    except PasswordHasherBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": PASSWORD_HASHER_RETRY_AFTER_SECONDS},
+        ) from e
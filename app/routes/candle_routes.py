@@ -0,0 +1,59 @@
+import time
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordBearer
+
+from app.core.auth_service import AuthService
+from app.core.dependencies import get_auth_service, get_candle_service
+from app.schemas.candle_schema import CandleInterval, CandleResponse
+from app.schemas.common_response_schema import ErrorDetail
+from app.services.candle_service import CandleService
+
+DEFAULT_CANDLE_COUNT = 100
+MAX_CANDLE_COUNT = 5000
+
+router = APIRouter(prefix="/api/v1/candles", tags=["Candles"])
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+
+@router.get(
+    "/{symbol}",
+    response_model=list[CandleResponse],
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": ErrorDetail},
+        status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail},
+    },
+)
+async def list_candles(
+    symbol: str,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    candle_service: Annotated[CandleService, Depends(get_candle_service)],
+    interval: Annotated[CandleInterval, Query()] = CandleInterval.ONE_MINUTE,
+    since: Annotated[float | None, Query()] = None,
+    until: Annotated[float | None, Query()] = None,
+):
+    """
+    List the OHLCV candles of a symbol, oldest first.
+    Defaults to the last 100 candles; a range may span at most 5000 candles.
+    The hot window is served from memory and older ranges from the database.
+    """
+
+    try:
+        auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    range_end = until if until is not None else time.time()
+    if since is None:
+        since = range_end - DEFAULT_CANDLE_COUNT * interval.seconds
+    if (range_end - since) / interval.seconds > MAX_CANDLE_COUNT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The range spans more than {MAX_CANDLE_COUNT} candles",
+        )
+
+    return await candle_service.get_candles(symbol, interval, since, until)
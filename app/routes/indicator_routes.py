@@ -0,0 +1,75 @@
+import time
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordBearer
+
+from app.core.auth_service import AuthService
+from app.core.dependencies import (
+    get_auth_service,
+    get_candle_service,
+    get_indicator_service,
+)
+from app.schemas.candle_schema import CandleInterval
+from app.schemas.common_response_schema import ErrorDetail
+from app.schemas.indicator_schema import IndicatorResponse
+from app.services.candle_service import CandleService
+from app.services.indicator_service import IndicatorService
+
+DEFAULT_CANDLE_COUNT = 100
+MAX_CANDLE_COUNT = 5000
+WARMUP_CANDLE_COUNT = 100
+
+router = APIRouter(prefix="/api/v1/indicators", tags=["Indicators"])
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+
+@router.get(
+    "/{symbol}",
+    response_model=list[IndicatorResponse],
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": ErrorDetail},
+        status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail},
+    },
+)
+async def list_indicators(
+    symbol: str,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    candle_service: Annotated[CandleService, Depends(get_candle_service)],
+    indicator_service: Annotated[IndicatorService, Depends(get_indicator_service)],
+    interval: Annotated[CandleInterval, Query()] = CandleInterval.ONE_MINUTE,
+    since: Annotated[float | None, Query()] = None,
+    until: Annotated[float | None, Query()] = None,
+):
+    """
+    List SMA, EMA, RSI, MACD, Bollinger Bands and ATR over the candles
+    of a symbol, oldest first.
+    Defaults to the last 100 candles; a range may span at most 5000 candles.
+    The 100 candles before the range are used to warm the indicators up.
+    """
+
+    try:
+        auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    range_end = until if until is not None else time.time()
+    if since is None:
+        since = range_end - DEFAULT_CANDLE_COUNT * interval.seconds
+    if (range_end - since) / interval.seconds > MAX_CANDLE_COUNT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The range spans more than {MAX_CANDLE_COUNT} candles",
+        )
+
+    candles = await candle_service.get_candles(
+        symbol, interval, since - WARMUP_CANDLE_COUNT * interval.seconds, until
+    )
+    return [
+        indicators
+        for indicators in indicator_service.compute(candles)
+        if indicators["start"] >= since
+    ]
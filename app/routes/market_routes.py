@@ -0,0 +1,87 @@
+import time
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordBearer
+
+from app.core.auth_service import AuthService
+from app.core.dependencies import get_auth_service, get_market_data_service
+from app.schemas.common_response_schema import ErrorDetail
+from app.schemas.market_schema import PriceResponse, TickWindowResponse
+from app.services.market_data_service import MarketDataService
+
+DEFAULT_WINDOW_SECONDS = 60.0
+
+router = APIRouter(prefix="/api/v1/market", tags=["Market"])
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+
+@router.get(
+    "/{symbol}/latest",
+    response_model=PriceResponse,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail},
+        status.HTTP_404_NOT_FOUND: {"model": ErrorDetail},
+    },
+)
+async def get_latest_price(
+    symbol: str,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    market_data: Annotated[MarketDataService, Depends(get_market_data_service)],
+):
+    """
+    Get the latest ingested tick of a symbol.
+    """
+
+    try:
+        auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    latest = market_data.get_latest(symbol)
+    if latest is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No market data for symbol '{symbol}'",
+        )
+    return latest
+
+
+@router.get(
+    "/{symbol}/ticks",
+    response_model=TickWindowResponse,
+    responses={status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail}},
+)
+async def get_ticks(
+    symbol: str,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    market_data: Annotated[MarketDataService, Depends(get_market_data_service)],
+    since: Annotated[float | None, Query()] = None,
+    until: Annotated[float | None, Query()] = None,
+):
+    """
+    Get the in-memory ticks of a symbol within a time range.
+    Defaults to the last minute; only ticks still held in the ring buffer are returned.
+    """
+
+    try:
+        auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    if since is None:
+        since = time.time() - DEFAULT_WINDOW_SECONDS
+
+    timestamps, prices, volumes = market_data.get_window(symbol, since, until)
+    return TickWindowResponse(
+        symbol=symbol,
+        timestamps=timestamps.tolist(),
+        prices=prices.tolist(),
+        volumes=volumes.tolist(),
+    )
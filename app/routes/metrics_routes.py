@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.core.dependencies import get_metrics_registry
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Expose the application metrics in the Prometheus text format,
+    aggregated over the worker processes when PROMETHEUS_MULTIPROC_DIR is set.
+    """
+
+    return Response(
+        generate_latest(get_metrics_registry()), media_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,139 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordBearer
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.core.auth_service import AuthService
+from app.core.dependencies import (
+    get_auth_service,
+    get_broadcast_hub,
+    get_cache,
+    get_candle_service,
+    get_matching_engine,
+    get_trade_write_coalescer,
+)
+from app.db.mongo import get_position_collection, get_trade_collection
+from app.schemas.common_response_schema import ErrorDetail
+from app.schemas.order_schema import OrderBookResponse, OrderCreate, OrderResponse
+from app.services.order_service import DEFAULT_BOOK_DEPTH, OrderService
+from app.services.position_service import PositionService
+from app.services.trade_service import TradeService
+
+MAX_BOOK_DEPTH = 500
+
+router = APIRouter(prefix="/api/v1/orders", tags=["Orders"])
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+
+def __get_order_service(
+    trade_collection: Annotated[AsyncIOMotorCollection, Depends(get_trade_collection)],
+    position_collection: Annotated[
+        AsyncIOMotorCollection, Depends(get_position_collection)
+    ],
+):
+    """
+    Get the order service.
+    """
+
+    return OrderService(
+        get_matching_engine(),
+        TradeService(
+            trade_collection,
+            get_candle_service(),
+            PositionService(position_collection, get_cache()),
+            get_trade_write_coalescer(),
+            get_cache(),
+        ),
+        get_broadcast_hub(),
+    )
+
+
+@router.post(
+    "",
+    response_model=OrderResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail}},
+)
+async def place_order(
+    order: OrderCreate,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    order_service: Annotated[OrderService, Depends(__get_order_service)],
+):
+    """
+    Place a market or limit order on the paper-trading order book.
+    The order is matched with price-time priority; every fill executes a trade for both
+    the buyer and the seller at the resting order's price. The unfilled remainder of a
+    limit order rests in the book, and that of a market order is cancelled.
+    The order books are held by the worker process; paper trading needs a single worker.
+    """
+
+    try:
+        user = auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    return await order_service.place_order(user["sub"], order)
+
+
+@router.delete(
+    "/{order_id}",
+    response_model=OrderResponse,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail},
+        status.HTTP_404_NOT_FOUND: {"model": ErrorDetail},
+    },
+)
+async def cancel_order(
+    order_id: str,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    order_service: Annotated[OrderService, Depends(__get_order_service)],
+):
+    """
+    Cancel a resting order of the current user.
+    """
+
+    try:
+        user = auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    order = order_service.cancel_order(user["sub"], order_id)
+    if order is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No resting order '{order_id}'",
+        )
+    return order
+
+
+@router.get(
+    "/book/{symbol}",
+    response_model=OrderBookResponse,
+    responses={status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail}},
+)
+async def get_order_book(
+    symbol: str,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    order_service: Annotated[OrderService, Depends(__get_order_service)],
+    depth: Annotated[int, Query(ge=1, le=MAX_BOOK_DEPTH)] = DEFAULT_BOOK_DEPTH,
+):
+    """
+    Get the top price levels of a symbol's order book.
+    """
+
+    try:
+        auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    return order_service.get_order_book(symbol, depth)
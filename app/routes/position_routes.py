@@ -0,0 +1,53 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.core.auth_service import AuthService
+from app.core.dependencies import get_auth_service, get_cache
+from app.db.mongo import get_position_collection
+from app.schemas.common_response_schema import ErrorDetail
+from app.schemas.trade_schema import PositionResponse
+from app.services.position_service import PositionService
+
+
+router = APIRouter(prefix="/api/v1/positions", tags=["Positions"])
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+
+def __get_position_service(
+    position_collection: Annotated[
+        AsyncIOMotorCollection, Depends(get_position_collection)
+    ],
+):
+    """
+    Get the position service.
+    """
+
+    return PositionService(position_collection, get_cache())
+
+
+@router.get(
+    "",
+    response_model=list[PositionResponse],
+    responses={status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail}},
+)
+async def list_positions(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    position_service: Annotated[PositionService, Depends(__get_position_service)],
+):
+    """
+    List the positions of the current user, one per symbol traded.
+    """
+
+    try:
+        user = auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    positions = await position_service.get_positions(user["sub"])
+    return positions
@@ -1,40 +1,107 @@
+import tempfile
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
+from motor.motor_asyncio import AsyncIOMotorCollection
+import orjson
+from pymongo.errors import PyMongoError
 
+from app.config import AppSettings, get_app_settings
 from app.core.auth_service import AuthService
-from app.core.dependencies import get_auth_service
-from app.db.mongo import get_trade_collection
+from app.core.broadcast_hub import BroadcastHub
+from app.core.dependencies import (
+    get_auth_service,
+    get_broadcast_hub,
+    get_cache,
+    get_candle_service,
+    get_trade_archive,
+    get_trade_write_coalescer,
+)
+from app.db.mongo import (
+    get_position_collection,
+    get_trade_collection,
+    get_trade_listing_collection,
+)
 from app.schemas.common_response_schema import ErrorDetail
-from app.schemas.trade_schema import TradeCreate, TradeResponse
-from app.services.trade_service import TradeService
+from app.schemas.trade_schema import (
+    TradeCreate,
+    TradeFilter,
+    TradeImportFormat,
+    TradeImportSummary,
+    TradeResponse,
+)
+from app.services.position_service import PositionService
+from app.services.trade_files import iter_csv_rows, iter_parquet_rows, spool_chunks
+from app.services.trade_service import (
+    TradeService,
+    dump_trades_json,
+    publish_trade,
+    to_trade_payload,
+)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+UNCONFIRMED_WRITE_WARNING = (
+    '199 - "Trade written but not confirmed by its write concern"'
+)
+JSON_MEDIA_TYPE = "application/json"
 
 router = APIRouter(prefix="/api/v1/trades", tags=["Trades"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-def __get_trade_service():
+def __get_trade_service(
+    trade_collection: Annotated[AsyncIOMotorCollection, Depends(get_trade_collection)],
+    position_collection: Annotated[
+        AsyncIOMotorCollection, Depends(get_position_collection)
+    ],
+    listing_collection: Annotated[
+        AsyncIOMotorCollection, Depends(get_trade_listing_collection)
+    ],
+):
     """
     Get the trade service.
     """
 
-    return TradeService(get_trade_collection())
+    return TradeService(
+        trade_collection,
+        get_candle_service(),
+        PositionService(position_collection, get_cache()),
+        get_trade_write_coalescer(),
+        get_cache(),
+        get_trade_archive(),
+        listing_collection,
+    )
 
 
 @router.get(
     "",
     response_model=list[TradeResponse],
-    responses={status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail}},
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": ErrorDetail},
+        status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail},
+    },
 )
 async def list_trades(
+    response: Response,
     token: Annotated[str, Depends(oauth2_scheme)],
     auth_service: Annotated[AuthService, Depends(get_auth_service)],
     trade_service: Annotated[TradeService, Depends(__get_trade_service)],
+    filters: Annotated[TradeFilter, Depends()],
+    app_settings: Annotated[AppSettings, Depends(get_app_settings)],
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    after: Annotated[str | None, Query()] = None,
 ):
     """
-    List all trades for the current user.
+    List a page of trades for the current user, oldest first.
+    The cursor of the next page is returned in the `X-Next-Cursor` header
+    and is absent on the last page.
+    In fast response mode, the trades are serialized straight from the database
+    documents instead of being validated again against the response model.
     """
 
     try:
@@ -44,23 +111,97 @@ async def list_trades(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
         ) from e
 
-    trades = await trade_service.get_trades_by_user(user["sub"])
+    try:
+        trades, next_cursor = await trade_service.get_trades_by_user(
+            user["sub"], filters, limit, after
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    if app_settings.trade_fast_responses:
+        return Response(
+            dump_trades_json(trades), media_type=JSON_MEDIA_TYPE, headers=headers
+        )
+    response.headers.update(headers or {})
     return trades
 
 
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}},
+        status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail},
+    },
+)
+async def export_trades(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    trade_service: Annotated[TradeService, Depends(__get_trade_service)],
+    filters: Annotated[TradeFilter, Depends()],
+    app_settings: Annotated[AppSettings, Depends(get_app_settings)],
+):
+    """
+    Export all trades for the current user as newline-delimited JSON.
+    Trades are streamed from the database in batches, so the export runs in
+    constant memory regardless of the size of the history.
+    """
+
+    try:
+        user = auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    async def ndjson_lines():
+        batch = []
+        async for trade in trade_service.iter_trades_by_user(
+            user["sub"], filters, EXPORT_BATCH_SIZE
+        ):
+            if app_settings.trade_fast_responses:
+                line = orjson.dumps(
+                    to_trade_payload(trade), option=orjson.OPT_APPEND_NEWLINE
+                )
+            else:
+                line = (
+                    TradeResponse.model_validate(trade)
+                    .model_dump_json(by_alias=True)
+                    .encode()
+                    + b"\n"
+                )
+            batch.append(line)
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield b"".join(batch)
+                batch.clear()
+        if batch:
+            yield b"".join(batch)
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @router.post(
     "",
     response_model=TradeResponse,
     responses={status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail}},
 )
 async def place_trade(
+    response: Response,
     trade: TradeCreate,
     token: Annotated[str, Depends(oauth2_scheme)],
     auth_service: Annotated[AuthService, Depends(get_auth_service)],
     trade_service: Annotated[TradeService, Depends(__get_trade_service)],
+    hub: Annotated[BroadcastHub, Depends(get_broadcast_hub)],
+    app_settings: Annotated[AppSettings, Depends(get_app_settings)],
 ):
     """
     Place a trade.
+    The trade is published to the stream subscribers of its user and symbol.
+    A trade whose write was not confirmed with the write concern in time is returned
+    with a `Warning` header: it is recorded, and must not be placed again.
     """
 
     trade_data = trade.model_dump()
@@ -73,5 +214,80 @@ async def place_trade(
 
     trade_data["user_id"] = user["sub"]
 
-    result = await trade_service.create_trade(trade_data)
+    result, confirmed = await trade_service.create_trade(trade_data)
+    publish_trade(hub, result)
+    headers = None if confirmed else {"Warning": UNCONFIRMED_WRITE_WARNING}
+    if app_settings.trade_fast_responses:
+        return Response(
+            orjson.dumps(to_trade_payload(result)),
+            media_type=JSON_MEDIA_TYPE,
+            headers=headers,
+        )
+    response.headers.update(headers or {})
     return result
+
+
+@router.post(
+    "/import",
+    response_model=TradeImportSummary,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": ErrorDetail},
+        status.HTTP_401_UNAUTHORIZED: {"model": ErrorDetail},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": ErrorDetail},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string"}},
+                "application/vnd.apache.parquet": {
+                    "schema": {"type": "string", "format": "binary"}
+                },
+            },
+        }
+    },
+)
+async def import_trades(
+    request: Request,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    trade_service: Annotated[TradeService, Depends(__get_trade_service)],
+    format: Annotated[TradeImportFormat, Query()] = TradeImportFormat.CSV,
+):
+    """
+    Import a trade history file for the current user, sent as the raw request body.
+    The file needs `action`, `amount`, `price` and `symbol` columns, and may
+    have a `timestamp` column.
+    CSV files are parsed as they are received; Parquet files are spooled to a
+    temporary file first, since their metadata comes last. Invalid rows are skipped
+    and reported in the summary.
+    If the file turns out to be malformed part-way, or the database fails part-way, the
+    trades imported until then are kept, and the error tells how many.
+    """
+
+    try:
+        user = auth_service.get_current_user(token)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        ) from e
+
+    try:
+        if format == TradeImportFormat.CSV:
+            return await trade_service.import_trades(
+                user["sub"], iter_csv_rows(request.stream())
+            )
+        with tempfile.TemporaryFile() as spool:
+            await spool_chunks(request.stream(), spool)
+            return await trade_service.import_trades(
+                user["sub"], iter_parquet_rows(spool)
+            )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=(
+                status.HTTP_503_SERVICE_UNAVAILABLE
+                if isinstance(e.__cause__, PyMongoError)
+                else status.HTTP_400_BAD_REQUEST
+            ),
+            detail=str(e),
+        ) from e
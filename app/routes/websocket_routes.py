@@ -5,68 +5,175 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 
-from app.core.dependencies import get_jwt_service, get_logger
+from app.config import AppSettings, get_app_settings
+from app.core.broadcast_hub import (
+    BroadcastHub,
+    SlowConsumerError,
+    Subscription,
+    symbol_topic,
+    user_topic,
+)
+from app.core.dependencies import get_broadcast_hub, get_jwt_service, get_logger
 from app.core.jwt_service import JwtService
+from app.core.metrics import WEBSOCKET_CONNECTIONS, WEBSOCKET_SLOW_CONSUMER_DISCONNECTS
+from app.core.stream_codec import (
+    StreamEncoding,
+    StreamMessage,
+    encode_frame,
+    negotiate_encoding,
+)
 
 AUTHORIZATION_HEADER = "Authorization"
 AUTHORIZATION_PREFIX = "Bearer "
 MAX_QUEUE_SIZE = 10
+HEARTBEAT_TOPIC = "heartbeat"
+HEARTBEAT_INTERVAL_SECONDS = 0.5
+SYMBOLS_QUERY_PARAM = "symbols"
+SLOW_CONSUMER_CLOSE_CODE = 1013
 
 router = APIRouter(prefix="/websocket/v1")
 
 
+async def __send_messages(
+    websocket: WebSocket, messages: list[StreamMessage], encoding: StreamEncoding
+) -> tuple[int, int]:
+    """
+    Send a batch of messages to the client in the negotiated encoding.
+    Legacy text clients get one text frame per message; negotiated clients get
+    the whole batch as a single array frame (text for JSON, binary for MessagePack).
+    Args:
+        websocket (WebSocket): The WebSocket connection.
+        messages (list[StreamMessage]): The messages to send.
+        encoding (StreamEncoding): The negotiated encoding.
+    Returns:
+        tuple[int, int]: The number of frames and payload bytes sent.
+    """
+
+    if encoding is StreamEncoding.TEXT:
+        sent_bytes = 0
+        for message in messages:
+            payload = message.encode(encoding)
+            await websocket.send_text(payload.decode())
+            sent_bytes += len(payload)
+        return len(messages), sent_bytes
+
+    frame = encode_frame(messages, encoding)
+    if encoding is StreamEncoding.MSGPACK:
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame.decode())
+    return 1, len(frame)
+
+
 async def __consumer(
     websocket: WebSocket,
     logger: logging.Logger,
-    message_queue: asyncio.Queue,
+    subscription: Subscription,
     user: dict,
+    encoding: StreamEncoding,
+    batch_window_seconds: float,
 ):
     """
-    Consumer function to process messages from the queue.
+    Consumer function to forward messages from the subscription to the client.
+    Negotiated clients receive everything queued within the batch window as one frame.
+    Clients that fall behind by more than the subscription's lag threshold,
+    either while messages wait in the queue or while a send is stuck, are disconnected.
     Args:
         websocket (WebSocket): The WebSocket connection.
         logger (logging.Logger): The logger instance.
-        message_queue (asyncio.Queue): The message queue.
+        subscription (Subscription): The client's hub subscription.
         user (dict): The user information.
+        encoding (StreamEncoding): The negotiated encoding.
+        batch_window_seconds (float): How long to collect messages into one frame.
     """
 
+    connected_at = time.monotonic()
+    sent_messages = sent_frames = sent_bytes = 0
     try:
         while True:
-            message = await message_queue.get()
-            await websocket.send_text(message)
+            if encoding is StreamEncoding.TEXT:
+                messages = [await subscription.get()]
+            else:
+                messages = await subscription.get_batch(batch_window_seconds)
+
+            frames, payload_bytes = await asyncio.wait_for(
+                __send_messages(websocket, messages, encoding),
+                timeout=subscription.max_lag_seconds,
+            )
+            sent_messages += len(messages)
+            sent_frames += frames
+            sent_bytes += payload_bytes
     except WebSocketDisconnect:
         logger.info("Client [%s] disconnected (consumer)", user["sub"])
+    except (SlowConsumerError, asyncio.TimeoutError) as e:
+        WEBSOCKET_SLOW_CONSUMER_DISCONNECTS.inc()
+        logger.warning(
+            "Client [%s] is too slow, disconnecting (conflated: %d, dropped: %d): %s",
+            user["sub"],
+            subscription.conflated,
+            subscription.dropped,
+            str(e) or "send timed out",
+        )
+        await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
     except asyncio.CancelledError:
         pass
+    finally:
+        elapsed = max(time.monotonic() - connected_at, 1e-9)
+        logger.info(
+            "Client [%s] stream stats (%s): %d messages in %d frames, %d bytes, "
+            "%.1f messages/sec",
+            user["sub"],
+            encoding.value,
+            sent_messages,
+            sent_frames,
+            sent_bytes,
+            sent_messages / elapsed,
+        )
 
 
-async def __producer(
-    logger: logging.Logger,
-    message_queue: asyncio.Queue,
-    user: dict,
-):
+async def heartbeat_producer(hub: BroadcastHub):
     """
-    Producer function to send messages to the queue.
+    Process-wide producer publishing a heartbeat message to every stream client.
+    A single instance runs for the whole application, regardless of the number of
+    clients; every worker process runs its own, so heartbeats stay local to the process.
     Args:
-        logger (logging.Logger): The logger instance.
-        message_queue (asyncio.Queue): The message queue.
-        user (dict): The user information.
+        hub (BroadcastHub): The hub to publish to.
     """
 
     try:
         while True:
-            await asyncio.sleep(0.5)
-            data = f"Message from producer to client [{user['sub']}] at {time.time()}"
-
-            if message_queue.full():
-                logger.warning("Queue is full, dropping message")
-                # Drop the oldest message
-                _ = await message_queue.get_nowait()
-            await message_queue.put(data)
+            await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+            hub.publish(
+                StreamMessage({"type": "heartbeat", "timestamp": time.time()}),
+                HEARTBEAT_TOPIC,
+                key=HEARTBEAT_TOPIC,
+                local=True,
+            )
     except asyncio.CancelledError:
         pass
 
 
+def __get_topics(websocket: WebSocket, user: dict) -> list[str]:
+    """
+    Get the hub topics a client subscribes to.
+    Every client receives heartbeats and its own user's messages, plus the messages of
+    the symbols listed in the comma-separated `symbols` query parameter
+    (their trades, prices and streaming indicators).
+    Args:
+        websocket (WebSocket): The WebSocket connection.
+        user (dict): The user information.
+    Returns:
+        list[str]: The topics to subscribe to.
+    """
+
+    topics = [HEARTBEAT_TOPIC, user_topic(user["sub"])]
+    symbols = websocket.query_params.get(SYMBOLS_QUERY_PARAM, "")
+    topics.extend(
+        symbol_topic(symbol.strip()) for symbol in symbols.split(",") if symbol.strip()
+    )
+    return topics
+
+
 def __try_authenticate(
     jwt_service: JwtService,
     logger: logging.Logger,
@@ -104,14 +211,27 @@ async def websocket_endpoint(
     websocket: WebSocket,
     logger: Annotated[logging.Logger, Depends(get_logger)],
     jwt_service: Annotated[JwtService, Depends(get_jwt_service)],
+    hub: Annotated[BroadcastHub, Depends(get_broadcast_hub)],
+    app_settings: Annotated[AppSettings, Depends(get_app_settings)],
 ):
     """
     WebSocket endpoint for trading stream.
+    The client is subscribed to the broadcast hub for as long as it stays connected.
+    Clients may offer the `trade-stream.json` or `trade-stream.msgpack`
+    subprotocol to receive batched array frames; otherwise every message is sent
+    as its own JSON text frame.
+    Compression is negotiated by the server (uvicorn's
+    `--ws-per-message-deflate`, on by default).
+    With a broadcast transport, trade messages carry a `seq` object mapping each
+    of their topics to its sequence number, shared by all worker processes: a gap
+    in the numbers of a topic means messages were missed, e.g. after the client
+    lagged and was disconnected.
     Args:
         websocket (WebSocket): The WebSocket connection.
     """
 
-    await websocket.accept()
+    encoding, subprotocol = negotiate_encoding(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=subprotocol)
 
     token = websocket.headers.get(AUTHORIZATION_HEADER)
     user = __try_authenticate(jwt_service, logger, token)
@@ -120,14 +240,21 @@ async def websocket_endpoint(
         await websocket.close(code=1008)
         return
 
-    message_queue = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
-    consumer_task = asyncio.create_task(
-        __consumer(websocket, logger, message_queue, user)
+    subscription = hub.subscribe(
+        __get_topics(websocket, user),
+        MAX_QUEUE_SIZE,
+        app_settings.websocket_max_lag_seconds,
     )
-    producer_task = asyncio.create_task(__producer(logger, message_queue, user))
-
+    WEBSOCKET_CONNECTIONS.inc()
     try:
-        await asyncio.gather(consumer_task, producer_task)
+        await __consumer(
+            websocket,
+            logger,
+            subscription,
+            user,
+            encoding,
+            app_settings.websocket_batch_window_ms / 1000,
+        )
     finally:
-        consumer_task.cancel()
-        producer_task.cancel()
+        WEBSOCKET_CONNECTIONS.dec()
+        hub.unsubscribe(subscription)
@@ -0,0 +1,48 @@
+from enum import Enum
+
+from pydantic import AliasGenerator, BaseModel, Field
+from pydantic.alias_generators import to_camel
+
+
+class AlertDirection(str, Enum):
+    """
+    Enum for the direction of the price move that fires an alert.
+    """
+
+    ABOVE = "above"
+    BELOW = "below"
+
+
+class AlertCreate(BaseModel):
+    """
+    Schema for creating or replacing a price alert.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    symbol: str = Field(..., examples=["BTC", "ETH"])
+    direction: AlertDirection = Field(
+        ..., description="Fire when the price crosses above or below the threshold"
+    )
+    threshold: float = Field(..., gt=0, description="Price threshold of the alert")
+
+
+class AlertResponse(AlertCreate):
+    """
+    Schema for a price alert.
+    """
+
+    id: str = Field(..., description="ID of the alert")
+    user_id: str = Field(..., description="ID of the user who owns the alert")
+    created_at: float = Field(..., description="Timestamp of the alert creation")
+    triggered_at: float | None = Field(
+        None, description="Timestamp the alert fired at, or null while it is armed"
+    )
+    triggered_price: float | None = Field(
+        None,
+        description="Price that crossed the threshold, or null while it is armed",
+    )
@@ -0,0 +1,46 @@
+from pydantic import AliasGenerator, BaseModel, Field
+from pydantic.alias_generators import to_camel
+
+
+class SymbolAnalytics(BaseModel):
+    """
+    Schema for the analytics of a user's trades in one symbol.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    symbol: str = Field(..., examples=["BTC", "ETH"])
+    trade_count: int = Field(..., description="Number of trades")
+    volume: float = Field(..., description="Total amount traded")
+    vwap: float = Field(..., description="Volume-weighted average price")
+    turnover: float = Field(..., description="Total notional traded")
+    buy_notional: float = Field(..., description="Notional bought")
+    sell_notional: float = Field(..., description="Notional sold")
+    imbalance: float = Field(
+        ..., description="Buy/sell imbalance, from -1 (all sells) to 1 (all buys)"
+    )
+    net_quantity: float = Field(..., description="Net amount bought in the window")
+    last_price: float = Field(..., description="Latest traded price")
+    exposure: float = Field(..., description="Net quantity marked at the latest price")
+
+
+class AnalyticsResponse(BaseModel):
+    """
+    Schema for a user's portfolio analytics over a window of trades.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    trade_count: int = Field(..., description="Number of trades")
+    turnover: float = Field(..., description="Total notional traded")
+    gross_exposure: float = Field(..., description="Sum of absolute symbol exposures")
+    net_exposure: float = Field(..., description="Sum of symbol exposures")
+    symbols: list[SymbolAnalytics] = Field(..., description="Per-symbol analytics")
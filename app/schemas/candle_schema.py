@@ -0,0 +1,53 @@
+from enum import Enum
+
+from pydantic import AliasGenerator, BaseModel, Field
+from pydantic.alias_generators import to_camel
+
+
+class CandleInterval(str, Enum):
+    """
+    Enum for candle intervals.
+    """
+
+    ONE_SECOND = "1s"
+    ONE_MINUTE = "1m"
+    FIVE_MINUTES = "5m"
+    ONE_HOUR = "1h"
+
+    @property
+    def seconds(self) -> int:
+        """
+        Get the length of the interval.
+        Returns:
+            int: The interval length in seconds.
+        """
+
+        return CANDLE_INTERVAL_SECONDS[self]
+
+
+CANDLE_INTERVAL_SECONDS = {
+    CandleInterval.ONE_SECOND: 1,
+    CandleInterval.ONE_MINUTE: 60,
+    CandleInterval.FIVE_MINUTES: 300,
+    CandleInterval.ONE_HOUR: 3600,
+}
+
+
+class CandleResponse(BaseModel):
+    """
+    Schema for an OHLCV candle.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    start: float = Field(..., description="Start timestamp of the candle")
+    open: float = Field(..., description="First price in the candle")
+    high: float = Field(..., description="Highest price in the candle")
+    low: float = Field(..., description="Lowest price in the candle")
+    close: float = Field(..., description="Last price in the candle")
+    volume: float = Field(..., description="Total volume in the candle")
+    trades: int = Field(..., description="Number of trades or ticks in the candle")
@@ -0,0 +1,34 @@
+from pydantic import AliasGenerator, BaseModel, Field
+from pydantic.alias_generators import to_camel
+
+
+class IndicatorResponse(BaseModel):
+    """
+    Schema for the technical indicators of a symbol at one candle.
+    Indicators still warming up at the candle are null.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    start: float = Field(..., description="Start timestamp of the candle")
+    close: float = Field(..., description="Close price of the candle")
+    sma: float | None = Field(None, description="20-period simple moving average")
+    ema: float | None = Field(None, description="20-period exponential moving average")
+    rsi: float | None = Field(None, description="14-period relative strength index")
+    macd: float | None = Field(None, description="MACD line (12/26-period EMAs)")
+    macd_signal: float | None = Field(None, description="9-period EMA of the MACD line")
+    macd_histogram: float | None = Field(
+        None, description="MACD line minus signal line"
+    )
+    bollinger_middle: float | None = Field(None, description="Middle Bollinger Band")
+    bollinger_upper: float | None = Field(
+        None, description="Upper Bollinger Band, 2 standard deviations above the middle"
+    )
+    bollinger_lower: float | None = Field(
+        None, description="Lower Bollinger Band, 2 standard deviations below the middle"
+    )
+    atr: float | None = Field(None, description="14-period average true range")
@@ -0,0 +1,36 @@
+from pydantic import AliasGenerator, BaseModel, Field
+from pydantic.alias_generators import to_camel
+
+
+class PriceResponse(BaseModel):
+    """
+    Schema for the latest tick of a symbol.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    symbol: str = Field(..., examples=["BTC", "ETH"])
+    timestamp: float = Field(..., description="Timestamp of the tick")
+    price: float = Field(..., description="Price of the tick")
+    volume: float = Field(..., description="Volume of the tick")
+
+
+class TickWindowResponse(BaseModel):
+    """
+    Schema for the ticks of a symbol within a time range, as parallel columns.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    symbol: str = Field(..., examples=["BTC", "ETH"])
+    timestamps: list[float] = Field(..., description="Tick timestamps, oldest first")
+    prices: list[float] = Field(..., description="Tick prices")
+    volumes: list[float] = Field(..., description="Tick volumes")
@@ -0,0 +1,123 @@
+from enum import Enum
+
+from pydantic import AliasGenerator, BaseModel, Field, model_validator
+from pydantic.alias_generators import to_camel
+
+from app.schemas.trade_schema import TradeAction, TradeResponse
+
+
+class OrderType(str, Enum):
+    """
+    Enum for order types.
+    """
+
+    MARKET = "market"
+    LIMIT = "limit"
+
+
+class OrderStatus(str, Enum):
+    """
+    Enum for order statuses.
+    """
+
+    OPEN = "open"
+    PARTIALLY_FILLED = "partially_filled"
+    FILLED = "filled"
+    CANCELLED = "cancelled"
+
+
+class OrderCreate(BaseModel):
+    """
+    Schema for placing an order.
+    Limit orders require a price; market orders execute against the best prices
+    available and any unfilled remainder is cancelled.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    action: TradeAction
+    type: OrderType = Field(default=OrderType.LIMIT, description="Type of the order")
+    amount: float = Field(..., gt=0, description="Amount to trade")
+    price: float | None = Field(
+        default=None, gt=0, description="Limit price, required for limit orders"
+    )
+    symbol: str = Field(..., examples=["BTC", "ETH"])
+
+    @model_validator(mode="after")
+    def check_price(self) -> "OrderCreate":
+        """
+        Check that limit orders have a price and market orders do not.
+        Returns:
+            OrderCreate: The validated order.
+        Raises:
+            ValueError: If the price does not match the order type.
+        """
+
+        if self.type == OrderType.LIMIT and self.price is None:
+            raise ValueError("Limit orders require a price")
+        if self.type == OrderType.MARKET and self.price is not None:
+            raise ValueError("Market orders cannot have a price")
+        return self
+
+
+class OrderResponse(BaseModel):
+    """
+    Schema for an order and the trades it executed when placed.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    id: str = Field(..., description="ID of the order")
+    user_id: str = Field(..., description="ID of the user who placed the order")
+    symbol: str = Field(..., examples=["BTC", "ETH"])
+    action: TradeAction
+    type: OrderType
+    price: float | None = Field(None, description="Limit price")
+    amount: float = Field(..., description="Amount ordered")
+    filled_amount: float = Field(..., description="Amount executed so far")
+    status: OrderStatus
+    timestamp: float = Field(..., description="Timestamp of the order")
+    trades: list[TradeResponse] = Field(
+        default_factory=list,
+        description="Trades executed for this order when it was placed",
+    )
+
+
+class PriceLevelResponse(BaseModel):
+    """
+    Schema for the resting orders at one price of an order book.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    price: float = Field(..., description="Price of the level")
+    amount: float = Field(..., description="Total amount resting at the price")
+    order_count: int = Field(..., description="Number of orders resting at the price")
+
+
+class OrderBookResponse(BaseModel):
+    """
+    Schema for the top price levels of an order book.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    symbol: str = Field(..., examples=["BTC", "ETH"])
+    bids: list[PriceLevelResponse] = Field(..., description="Buy levels, best first")
+    asks: list[PriceLevelResponse] = Field(..., description="Sell levels, best first")
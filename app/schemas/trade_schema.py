@@ -38,3 +38,94 @@ class TradeResponse(TradeCreate):
     id: str = Field(..., description="ID of the trade")
     user_id: str = Field(..., description="ID of the user who made the trade")
     timestamp: float = Field(..., description="Timestamp of the trade")
+
+
+class TradeImportFormat(str, Enum):
+    """
+    Enum for trade history file formats.
+    """
+
+    CSV = "csv"
+    PARQUET = "parquet"
+
+
+class TradeImportRow(TradeCreate):
+    """
+    Schema for a row of an imported trade history file.
+    """
+
+    timestamp: float | None = Field(
+        default=None,
+        gt=0,
+        description="Timestamp of the trade, defaults to the import time",
+    )
+
+
+class TradeImportError(BaseModel):
+    """
+    Schema for a rejected row of an imported trade history file.
+    """
+
+    row: int = Field(
+        ..., description="Number of the data row in the file, starting at 1"
+    )
+    message: str = Field(..., description="Reason the row was rejected")
+
+
+class TradeImportSummary(BaseModel):
+    """
+    Schema for the result of a trade history import.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    accepted: int = Field(..., description="Number of trades imported")
+    rejected: int = Field(..., description="Number of rows rejected")
+    errors: list[TradeImportError] = Field(
+        ..., description="The first rejected rows and their reasons"
+    )
+    elapsed_seconds: float = Field(..., description="Duration of the import")
+    rows_per_second: float = Field(..., description="Rows processed per second")
+
+
+class TradeFilter(BaseModel):
+    """
+    Schema for filtering trade listings.
+    All fields are optional; the time range is half-open, [since, until).
+    """
+
+    symbol: str | None = Field(default=None, description="Only trades for this symbol")
+    action: TradeAction | None = Field(
+        default=None, description="Only trades with this action"
+    )
+    since: float | None = Field(
+        default=None, description="Only trades at or after this timestamp"
+    )
+    until: float | None = Field(
+        default=None, description="Only trades before this timestamp"
+    )
+
+
+class PositionResponse(BaseModel):
+    """
+    Schema for a user's position in a symbol.
+    """
+
+    model_config = {
+        "alias_generator": AliasGenerator(
+            serialization_alias=to_camel,
+        )
+    }
+
+    symbol: str = Field(..., examples=["AAPL", "GOOGL"])
+    net_quantity: float = Field(
+        ..., description="Net quantity held, negative for short positions"
+    )
+    average_cost: float = Field(..., description="Average cost of the open quantity")
+    realized_pnl: float = Field(..., description="Realized profit and loss")
+    trade_count: int = Field(..., description="Number of trades in the symbol")
+    updated_at: float = Field(..., description="Timestamp of the latest trade")
@@ -0,0 +1,384 @@
+import asyncio
+from collections.abc import Sequence
+from datetime import datetime, timezone
+import logging
+import sys
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
+
+from app.core.alert_index import SymbolAlertIndex, ThresholdIndex
+from app.core.broadcast_hub import BroadcastHub, user_topic
+from app.core.broadcast_transport import CONNECTED_TOPIC
+from app.core.stream_codec import StreamMessage
+from app.schemas.alert_schema import AlertCreate, AlertDirection, AlertResponse
+
+ALERT_PROJECTION = {"_id": 0}
+ALERT_RULES_TOPIC = "alert-rules"
+ALERT_RELOAD_RETRY_SECONDS = 5.0
+
+
+class AlertService:
+    """
+    AlertService manages one-shot price alert rules and fires them as prices move.
+    Rules are stored in MongoDB; armed rules are also loaded into per-symbol
+    threshold indexes, so checking a price update only touches the rules it crosses,
+    whatever the number of rules.
+    Fired alerts are published to their user's stream subscribers
+    and recorded as triggered.
+    With a hub, rule changes are published to ALERT_RULES_TOPIC and applied by
+    `run_rule_updates`, so every worker process sharing the hub's transport arms
+    the same rules. The transport is best-effort, so the rules are reloaded from
+    the database whenever it connects or the rule changes show a sequence gap.
+    Each worker checks them against its own market data and only notifies its own
+    subscribers; the first worker to record a firing wins.
+    """
+
+    def __init__(
+        self, collection: AsyncIOMotorCollection, hub: BroadcastHub | None = None
+    ):
+        self.collection = collection
+        self.hub = hub
+        self.fired = 0
+        self.__indexes: dict[str, SymbolAlertIndex] = {}
+        self.__rules: dict[str, dict] = {}
+        # Subscribed before the rules are loaded, so no change made meanwhile is missed,
+        # and unbounded, as a dropped change would leave this worker out of sync
+        self.__rule_updates = (
+            hub.subscribe([ALERT_RULES_TOPIC, CONNECTED_TOPIC], sys.maxsize)
+            if hub
+            else None
+        )
+
+    @property
+    def armed_count(self) -> int:
+        """
+        Get the number of armed rules.
+        Returns:
+            int: The number of rules in the indexes.
+        """
+
+        return len(self.__rules)
+
+    async def load(self) -> int:
+        """
+        Load every armed rule from the database into the indexes,
+        replacing the rules indexed so far.
+        Returns:
+            int: The number of rules loaded.
+        Raises:
+            PyMongoError: If the rules could not be read.
+        """
+
+        rules = await self.collection.find(
+            {"triggered_at": None}, ALERT_PROJECTION
+        ).to_list(length=None)
+        self.__rules.clear()
+        for index in self.__indexes.values():
+            index.above, index.below = ThresholdIndex(), ThresholdIndex()
+        self.arm_many(rules)
+        return len(rules)
+
+    def arm_many(self, rules: list[dict]):
+        """
+        Add many rules to the indexes, sorting each threshold index once.
+        Args:
+            rules (list[dict]): The rule documents.
+        """
+
+        grouped: dict[tuple[str, str], list[tuple[float, str]]] = {}
+        for rule in rules:
+            self.__rules[rule["id"]] = rule
+            grouped.setdefault((rule["symbol"], rule["direction"]), []).append(
+                (rule["threshold"], rule["id"])
+            )
+        for (symbol, direction), thresholds in grouped.items():
+            self.__get_threshold_index(symbol, direction).extend(thresholds)
+
+    async def run_rule_updates(self, logger: logging.Logger):
+        """
+        Apply the rule changes published by every worker until the task is cancelled.
+        The rules are reloaded when the transport connects, as changes published while
+        it was disconnected are lost, when a sequence gap shows a lost change, and when
+        another worker dropped changes it published while disconnected.
+        Args:
+            logger (logging.Logger): The logger instance.
+        """
+
+        last_sequence = None
+        dropped = 0
+        while True:
+            message = await self.__rule_updates.get()
+            if message.payload["type"] == "connected":
+                last_sequence = None
+                await self.__reload(logger)
+                if self.hub.transport.dropped > dropped:
+                    # Changes this worker published while disconnected were dropped
+                    # before being numbered, so the other workers cannot see a gap
+                    dropped = self.hub.transport.dropped
+                    self.hub.publish(
+                        StreamMessage({"type": "alert_rules_reload"}), ALERT_RULES_TOPIC
+                    )
+                continue
+
+            if message.payload["type"] == "alert_rule":
+                self.__disarm(message.payload["id"])
+                if message.payload["rule"] is not None:
+                    self.__arm(message.payload["rule"])
+            # Only numbered when the hub has a transport
+            sequence = message.payload.get("seq", {}).get(ALERT_RULES_TOPIC)
+            missed = message.payload["type"] == "alert_rules_reload" or (
+                sequence is not None
+                and last_sequence is not None
+                and sequence != last_sequence + 1
+            )
+            if sequence is not None:
+                last_sequence = sequence
+            if missed:
+                logger.warning("Price alert rule changes were missed, reloading")
+                await self.__reload(logger)
+
+    async def create_alert(self, user_id: str, alert_data: AlertCreate) -> dict:
+        """
+        Create and arm an alert rule.
+        Args:
+            user_id (str): The ID of the user.
+            alert_data (AlertCreate): The rule to create.
+        Returns:
+            dict: The created rule.
+        """
+
+        rule = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            **alert_data.model_dump(mode="json"),
+            "created_at": datetime.now(tz=timezone.utc).timestamp(),
+            "triggered_at": None,
+            "triggered_price": None,
+        }
+        await self.collection.insert_one(dict(rule))
+        self.__publish_rule(rule["id"], rule)
+        return rule
+
+    async def get_alerts(self, user_id: str) -> list:
+        """
+        Get all alert rules of a user, armed and triggered.
+        Args:
+            user_id (str): The ID of the user.
+        Returns:
+            list: The rules, oldest first.
+        """
+
+        return await (
+            self.collection.find({"user_id": user_id}, ALERT_PROJECTION)
+            .sort("created_at", ASCENDING)
+            .to_list(length=None)
+        )
+
+    async def replace_alert(
+        self, user_id: str, alert_id: str, alert_data: AlertCreate
+    ) -> dict | None:
+        """
+        Replace the condition of an alert rule and re-arm it.
+        Args:
+            user_id (str): The ID of the user.
+            alert_id (str): The ID of the rule.
+            alert_data (AlertCreate): The new condition.
+        Returns:
+            dict | None: The updated rule, or None if the user has no such rule.
+        """
+
+        rule = await self.collection.find_one_and_update(
+            {"id": alert_id, "user_id": user_id},
+            {
+                "$set": {
+                    **alert_data.model_dump(mode="json"),
+                    "triggered_at": None,
+                    "triggered_price": None,
+                }
+            },
+            projection=ALERT_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        if rule is None:
+            return None
+
+        self.__publish_rule(alert_id, rule)
+        return rule
+
+    async def delete_alert(self, user_id: str, alert_id: str) -> bool:
+        """
+        Delete an alert rule.
+        Args:
+            user_id (str): The ID of the user.
+            alert_id (str): The ID of the rule.
+        Returns:
+            bool: True if the rule existed.
+        """
+
+        result = await self.collection.delete_one({"id": alert_id, "user_id": user_id})
+        if result.deleted_count == 0:
+            return False
+
+        self.__publish_rule(alert_id, None)
+        return True
+
+    def check(self, symbol: str, prices: Sequence[float]) -> list[dict]:
+        """
+        Fire the rules of a symbol crossed by new prices, and
+        publish them to their users.
+        Args:
+            symbol (str): The trading symbol.
+            prices (Sequence[float]): The new prices, in time order.
+        Returns:
+            list[dict]: The fired rules, to be recorded with `mark_triggered`.
+        """
+
+        index = self.__get_index(symbol)
+        triggered_at = datetime.now(tz=timezone.utc).timestamp()
+        fired = []
+        # The index tracks the last price even without rules, so new rules start from it
+        for rule_id, price in index.check(prices):
+            rule = self.__rules.pop(rule_id)
+            rule["triggered_at"] = triggered_at
+            rule["triggered_price"] = price
+            fired.append(rule)
+            if self.hub:
+                self.hub.publish(
+                    StreamMessage(
+                        {
+                            "type": "alert",
+                            "data": AlertResponse.model_validate(rule).model_dump(
+                                mode="json", by_alias=True
+                            ),
+                        }
+                    ),
+                    user_topic(rule["user_id"]),
+                    # Every worker process checks the rules against its own market data
+                    local=True,
+                )
+        self.fired += len(fired)
+        return fired
+
+    async def mark_triggered(self, rules: list[dict]):
+        """
+        Record fired rules as triggered, in one bulk write.
+        Args:
+            rules (list[dict]): The fired rules.
+        Raises:
+            PyMongoError: If the write fails.
+        """
+
+        if not rules:
+            return
+        await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"id": rule["id"], "triggered_at": None},
+                    {
+                        "$set": {
+                            "triggered_at": rule["triggered_at"],
+                            "triggered_price": rule["triggered_price"],
+                        }
+                    },
+                )
+                for rule in rules
+            ],
+            ordered=False,
+        )
+
+    def __publish_rule(self, rule_id: str, rule: dict | None):
+        """
+        Arm, re-arm or disarm a rule in every worker, or in this one only without a hub.
+        Args:
+            rule_id (str): The ID of the rule.
+            rule (dict | None): The rule to arm in place of any previous version,
+            or None to disarm it.
+        """
+
+        if self.hub is None:
+            self.__disarm(rule_id)
+            if rule is not None:
+                self.__arm(rule)
+            return
+
+        # Not keyed: conflating changes would leave gaps in the sequence
+        self.hub.publish(
+            StreamMessage({"type": "alert_rule", "id": rule_id, "rule": rule}),
+            ALERT_RULES_TOPIC,
+        )
+
+    async def __reload(self, logger: logging.Logger):
+        """
+        Reload the armed rules from the database, retrying until it succeeds.
+        Args:
+            logger (logging.Logger): The logger instance.
+        """
+
+        while True:
+            try:
+                count = await self.load()
+            except PyMongoError as e:
+                logger.error(
+                    "Failed to reload price alerts, retrying in %.1fs: %s",
+                    ALERT_RELOAD_RETRY_SECONDS,
+                    str(e),
+                )
+                await asyncio.sleep(ALERT_RELOAD_RETRY_SECONDS)
+                continue
+            logger.info("Reloaded %d price alerts", count)
+            return
+
+    def __arm(self, rule: dict):
+        """
+        Add a rule to the index of its symbol.
+        Args:
+            rule (dict): The rule document.
+        """
+
+        self.__rules[rule["id"]] = rule
+        self.__get_threshold_index(rule["symbol"], rule["direction"]).add(
+            rule["threshold"], rule["id"]
+        )
+
+    def __disarm(self, rule_id: str):
+        """
+        Remove a rule from the index of its symbol, if it is still armed.
+        Args:
+            rule_id (str): The ID of the rule.
+        """
+
+        rule = self.__rules.pop(rule_id, None)
+        if rule is not None:
+            self.__get_threshold_index(rule["symbol"], rule["direction"]).remove(
+                rule["threshold"], rule_id
+            )
+
+    def __get_index(self, symbol: str) -> SymbolAlertIndex:
+        """
+        Get the alert index of a symbol, creating it if needed.
+        Args:
+            symbol (str): The trading symbol.
+        Returns:
+            SymbolAlertIndex: The alert index.
+        """
+
+        index = self.__indexes.get(symbol)
+        if index is None:
+            index = self.__indexes[symbol] = SymbolAlertIndex()
+        return index
+
+    def __get_threshold_index(self, symbol: str, direction: str) -> ThresholdIndex:
+        """
+        Get the threshold index of a symbol and direction.
+        Args:
+            symbol (str): The trading symbol.
+            direction (str): The alert direction.
+        Returns:
+            ThresholdIndex: The threshold index.
+        """
+
+        index = self.__get_index(symbol)
+        return index.above if direction == AlertDirection.ABOVE else index.below
@@ -0,0 +1,340 @@
+from typing import NamedTuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+import numpy as np
+
+from app.schemas.trade_schema import TradeAction, TradeFilter
+from app.services.trade_archive import TradeArchive
+from app.services.trade_service import TRADE_SORT, build_trade_query
+
+ANALYTICS_PROJECTION = {
+    "_id": 0,
+    "symbol": 1,
+    "action": 1,
+    "amount": 1,
+    "price": 1,
+    "timestamp": 1,
+    "id": 1,
+}
+ANALYTICS_BATCH_SIZE = 10_000
+
+
+class TradeColumns(NamedTuple):
+    """
+    A user's trades as parallel arrays, ordered by timestamp.
+    Symbols are dictionary-encoded: `symbol_codes` index into `symbol_names`.
+    """
+
+    symbol_names: np.ndarray
+    symbol_codes: np.ndarray
+    is_buy: np.ndarray
+    amounts: np.ndarray
+    prices: np.ndarray
+    timestamps: np.ndarray
+
+
+class SymbolAggregates(NamedTuple):
+    """
+    Per-symbol sums over a set of trades, as parallel arrays ordered by symbol.
+    Both the NumPy and the MongoDB aggregation paths produce these.
+    """
+
+    symbols: np.ndarray
+    trade_counts: np.ndarray
+    volumes: np.ndarray
+    notionals: np.ndarray
+    buy_notionals: np.ndarray
+    net_quantities: np.ndarray
+    last_prices: np.ndarray
+
+
+def to_columns(trades: list[dict]) -> TradeColumns:
+    """
+    Convert trade documents to columnar arrays.
+    Args:
+        trades (list[dict]): The trades, ordered by timestamp.
+    Returns:
+        TradeColumns: The trades as columns.
+    """
+
+    symbol_index: dict[str, int] = {}
+    symbol_codes = np.fromiter(
+        (
+            symbol_index.setdefault(trade["symbol"], len(symbol_index))
+            for trade in trades
+        ),
+        dtype=np.intp,
+        count=len(trades),
+    )
+    buy = TradeAction.BUY.value
+
+    return TradeColumns(
+        symbol_names=np.array(list(symbol_index), dtype=np.str_),
+        symbol_codes=symbol_codes,
+        is_buy=np.fromiter(
+            (trade["action"] == buy for trade in trades),
+            dtype=np.bool_,
+            count=len(trades),
+        ),
+        amounts=np.fromiter(
+            (trade["amount"] for trade in trades), dtype=np.float64, count=len(trades)
+        ),
+        prices=np.fromiter(
+            (trade["price"] for trade in trades), dtype=np.float64, count=len(trades)
+        ),
+        timestamps=np.fromiter(
+            (trade["timestamp"] for trade in trades),
+            dtype=np.float64,
+            count=len(trades),
+        ),
+    )
+
+
+def concatenate_columns(chunks: list[TradeColumns]) -> TradeColumns:
+    """
+    Concatenate columnar trades converted separately, merging their symbol dictionaries.
+    Args:
+        chunks (list[TradeColumns]): The trades of each chunk, in timestamp order.
+    Returns:
+        TradeColumns: The trades of all chunks as columns.
+    """
+
+    if len(chunks) == 1:
+        return chunks[0]
+
+    symbol_index: dict[str, int] = {}
+    symbol_codes = []
+    for chunk in chunks:
+        recoded = np.fromiter(
+            (
+                symbol_index.setdefault(name, len(symbol_index))
+                for name in chunk.symbol_names
+            ),
+            dtype=np.intp,
+            count=len(chunk.symbol_names),
+        )
+        symbol_codes.append(recoded[chunk.symbol_codes])
+
+    return TradeColumns(
+        symbol_names=np.array(list(symbol_index), dtype=np.str_),
+        symbol_codes=np.concatenate(symbol_codes),
+        is_buy=np.concatenate([chunk.is_buy for chunk in chunks]),
+        amounts=np.concatenate([chunk.amounts for chunk in chunks]),
+        prices=np.concatenate([chunk.prices for chunk in chunks]),
+        timestamps=np.concatenate([chunk.timestamps for chunk in chunks]),
+    )
+
+
+def aggregate_columns(columns: TradeColumns) -> SymbolAggregates:
+    """
+    Compute per-symbol sums over columnar trades with vectorized group-by operations.
+    Args:
+        columns (TradeColumns): The trades, ordered by timestamp.
+    Returns:
+        SymbolAggregates: The per-symbol sums.
+    """
+
+    # Renumber the symbol codes in symbol order so the groups come out sorted
+    order_by_name = np.argsort(columns.symbol_names)
+    symbols = columns.symbol_names[order_by_name]
+    group_count = len(symbols)
+    ranks = np.empty(group_count, dtype=np.intp)
+    ranks[order_by_name] = np.arange(group_count)
+    codes = ranks[columns.symbol_codes]
+    notionals = columns.amounts * columns.prices
+    signed_amounts = np.where(columns.is_buy, columns.amounts, -columns.amounts)
+
+    # A stable sort by symbol keeps timestamp order within each symbol,
+    # so the last row of each group holds the symbol's latest price
+    order = np.argsort(codes, kind="stable")
+    last_rows = order[np.flatnonzero(np.diff(codes[order], append=group_count))]
+
+    return SymbolAggregates(
+        symbols=symbols,
+        trade_counts=np.bincount(codes, minlength=group_count),
+        volumes=np.bincount(codes, weights=columns.amounts, minlength=group_count),
+        notionals=np.bincount(codes, weights=notionals, minlength=group_count),
+        buy_notionals=np.bincount(
+            codes,
+            weights=np.where(columns.is_buy, notionals, 0.0),
+            minlength=group_count,
+        ),
+        net_quantities=np.bincount(
+            codes, weights=signed_amounts, minlength=group_count
+        ),
+        last_prices=columns.prices[last_rows],
+    )
+
+
+def summarize(aggregates: SymbolAggregates) -> dict:
+    """
+    Derive the portfolio analytics from per-symbol sums.
+    Exposures mark the net quantity of each symbol at its latest traded price.
+    Args:
+        aggregates (SymbolAggregates): The per-symbol sums.
+    Returns:
+        dict: Portfolio totals and per-symbol VWAP, exposure, turnover and imbalance.
+    """
+
+    sell_notionals = aggregates.notionals - aggregates.buy_notionals
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vwaps = np.where(
+            aggregates.volumes > 0, aggregates.notionals / aggregates.volumes, 0.0
+        )
+        imbalances = np.where(
+            aggregates.notionals > 0,
+            (aggregates.buy_notionals - sell_notionals) / aggregates.notionals,
+            0.0,
+        )
+    exposures = aggregates.net_quantities * aggregates.last_prices
+
+    return {
+        "trade_count": int(aggregates.trade_counts.sum()),
+        "turnover": float(aggregates.notionals.sum()),
+        "gross_exposure": float(np.abs(exposures).sum()),
+        "net_exposure": float(exposures.sum()),
+        "symbols": [
+            {
+                "symbol": str(aggregates.symbols[i]),
+                "trade_count": int(aggregates.trade_counts[i]),
+                "volume": float(aggregates.volumes[i]),
+                "vwap": float(vwaps[i]),
+                "turnover": float(aggregates.notionals[i]),
+                "buy_notional": float(aggregates.buy_notionals[i]),
+                "sell_notional": float(sell_notionals[i]),
+                "imbalance": float(imbalances[i]),
+                "net_quantity": float(aggregates.net_quantities[i]),
+                "last_price": float(aggregates.last_prices[i]),
+                "exposure": float(exposures[i]),
+            }
+            for i in range(len(aggregates.symbols))
+        ],
+    }
+
+
+class AnalyticsService:
+    """
+    AnalyticsService computes per-user portfolio analytics over a window of trades.
+    By default the per-symbol aggregation is pushed down into a MongoDB
+    `$group` pipeline; alternatively the trades are loaded as columnar NumPy
+    arrays and aggregated in-process.
+    With an archive, the archived trades are merged in; MongoDB cannot aggregate them,
+    so windows overlapping archived partitions are always aggregated in-process.
+    """
+
+    def __init__(
+        self, collection: AsyncIOMotorCollection, archive: TradeArchive | None = None
+    ):
+        self.collection = collection
+        self.archive = archive
+
+    async def get_analytics(
+        self, user_id: str, filters: TradeFilter | None = None, pushdown: bool = True
+    ) -> dict:
+        """
+        Compute the analytics of a user's trades.
+        Args:
+            user_id (str): The ID of the user.
+            filters (TradeFilter | None): Optional symbol, action and time filters.
+            pushdown (bool): Aggregate in MongoDB instead of in-process.
+        Returns:
+            dict: Portfolio totals and per-symbol analytics.
+        Raises:
+            OSError: If the archive could not be read.
+        """
+
+        if pushdown and self.archive:
+            pushdown = not await self.archive.has_trades(user_id, filters)
+        if pushdown:
+            aggregates = await self.__aggregate_in_database(user_id, filters)
+        else:
+            aggregates = aggregate_columns(await self.load_columns(user_id, filters))
+        return summarize(aggregates)
+
+    async def load_columns(
+        self, user_id: str, filters: TradeFilter | None = None
+    ) -> TradeColumns:
+        """
+        Load a user's trades as columnar arrays, fetching only the analyzed fields.
+        Each batch of ANALYTICS_BATCH_SIZE trades is converted as it arrives,
+        so only one batch of trade documents is held at a time.
+        Args:
+            user_id (str): The ID of the user.
+            filters (TradeFilter | None): Optional symbol, action and time filters.
+        Returns:
+            TradeColumns: The trades, ordered by timestamp.
+        Raises:
+            OSError: If the archive could not be read.
+        """
+
+        cursor = (
+            self.collection.find(
+                build_trade_query(user_id, filters), ANALYTICS_PROJECTION
+            )
+            .sort(TRADE_SORT)
+            .batch_size(ANALYTICS_BATCH_SIZE)
+        )
+        if self.archive:
+            cursor = self.archive.merge_hot_trades(user_id, aiter(cursor), filters)
+        chunks = []
+        trades = []
+        async for trade in cursor:
+            trades.append(trade)
+            if len(trades) == ANALYTICS_BATCH_SIZE:
+                chunks.append(to_columns(trades))
+                trades = []
+        if trades or not chunks:
+            chunks.append(to_columns(trades))
+        return concatenate_columns(chunks)
+
+    async def __aggregate_in_database(
+        self, user_id: str, filters: TradeFilter | None
+    ) -> SymbolAggregates:
+        """
+        Compute per-symbol sums with a MongoDB aggregation pipeline.
+        Args:
+            user_id (str): The ID of the user.
+            filters (TradeFilter | None): Optional symbol, action and time filters.
+        Returns:
+            SymbolAggregates: The per-symbol sums.
+        """
+
+        is_buy = {"$eq": ["$action", TradeAction.BUY.value]}
+        notional = {"$multiply": ["$amount", "$price"]}
+        pipeline = [
+            {"$match": build_trade_query(user_id, filters)},
+            # Same order as the in-process path, so both agree on the last price of
+            # trades with the same timestamp
+            {"$sort": {"timestamp": 1, "id": 1}},
+            {
+                "$group": {
+                    "_id": "$symbol",
+                    "trade_count": {"$sum": 1},
+                    "volume": {"$sum": "$amount"},
+                    "notional": {"$sum": notional},
+                    "buy_notional": {"$sum": {"$cond": [is_buy, notional, 0]}},
+                    "net_quantity": {
+                        "$sum": {
+                            "$cond": [is_buy, "$amount", {"$multiply": [-1, "$amount"]}]
+                        }
+                    },
+                    "last_price": {"$last": "$price"},
+                }
+            },
+            {"$sort": {"_id": 1}},
+        ]
+        rows = await self.collection.aggregate(pipeline).to_list(length=None)
+
+        return SymbolAggregates(
+            symbols=np.array([row["_id"] for row in rows], dtype=np.str_),
+            trade_counts=np.array([row["trade_count"] for row in rows], dtype=np.int64),
+            volumes=np.array([row["volume"] for row in rows], dtype=np.float64),
+            notionals=np.array([row["notional"] for row in rows], dtype=np.float64),
+            buy_notionals=np.array(
+                [row["buy_notional"] for row in rows], dtype=np.float64
+            ),
+            net_quantities=np.array(
+                [row["net_quantity"] for row in rows], dtype=np.float64
+            ),
+            last_prices=np.array([row["last_price"] for row in rows], dtype=np.float64),
+        )
@@ -0,0 +1,121 @@
+from motor.motor_asyncio import AsyncIOMotorCollection
+import numpy as np
+from pymongo import ASCENDING
+
+from app.schemas.candle_schema import CandleInterval
+from app.services.candle_service import CandleService
+from app.services.tick_sources import ReplayTickSource
+from app.services.trade_archive import TradeArchive, trade_sort_key
+
+PRICE_PROJECTION = {"_id": 0, "timestamp": 1, "price": 1, "id": 1}
+PRICE_BATCH_SIZE = 10_000
+
+
+class BacktestService:
+    """
+    BacktestService loads the price history of a symbol as arrays for backtesting:
+    candle closes, the prices of the recorded trades, or a tick replay file.
+    With an archive, the prices of the archived trades are merged in.
+    """
+
+    def __init__(
+        self,
+        trade_collection: AsyncIOMotorCollection,
+        candle_service: CandleService,
+        archive: TradeArchive | None = None,
+    ):
+        self.trade_collection = trade_collection
+        self.candle_service = candle_service
+        self.archive = archive
+
+    async def load_candle_prices(
+        self,
+        symbol: str,
+        interval: CandleInterval,
+        since: float,
+        until: float | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Load the close prices of a symbol's candles.
+        Args:
+            symbol (str): The trading symbol.
+            interval (CandleInterval): The candle interval.
+            since (float): The start of the range, inclusive.
+            until (float | None): The end of the range, exclusive, or None for no end.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The candle starts and closes, oldest first.
+        """
+
+        candles = await self.candle_service.get_candles(symbol, interval, since, until)
+        return (
+            np.fromiter((c["start"] for c in candles), np.float64, len(candles)),
+            np.fromiter((c["close"] for c in candles), np.float64, len(candles)),
+        )
+
+    async def load_trade_prices(
+        self, symbol: str, since: float | None = None, until: float | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Load the prices of the recorded trades of a symbol, across all users.
+        Args:
+            symbol (str): The trading symbol.
+            since (float | None): The start of the range, inclusive, or None.
+            until (float | None): The end of the range, exclusive, or None for no end.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The trade timestamps and prices.
+        Raises:
+            OSError: If the archive could not be read.
+        """
+
+        query: dict = {"symbol": symbol}
+        time_range = {}
+        if since is not None:
+            time_range["$gte"] = since
+        if until is not None:
+            time_range["$lt"] = until
+        if time_range:
+            query["timestamp"] = time_range
+
+        trades = await (
+            self.trade_collection.find(query, PRICE_PROJECTION)
+            .sort([("timestamp", ASCENDING), ("id", ASCENDING)])
+            .batch_size(PRICE_BATCH_SIZE)
+            .to_list(length=None)
+        )
+        if self.archive:
+            archived = await self.archive.load_symbol_trades(symbol, since, until)
+            # A trade in both tiers, while it is being archived, is only kept once
+            trades = list(
+                {
+                    trade["id"]: trade
+                    for trade in sorted(archived + trades, key=trade_sort_key)
+                }.values()
+            )
+        return (
+            np.fromiter((t["timestamp"] for t in trades), np.float64, len(trades)),
+            np.fromiter((t["price"] for t in trades), np.float64, len(trades)),
+        )
+
+    @staticmethod
+    async def load_replay_prices(
+        path: str, symbol: str
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Load the tick prices of a symbol from a replay file.
+        Args:
+            path (str): The CSV file, in the `ReplayTickSource` format.
+            symbol (str): The trading symbol.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The tick timestamps and prices in file order.
+        """
+
+        timestamps, prices = [], []
+        async for batch in ReplayTickSource(path, speed=0).batches():
+            if batch.symbol == symbol:
+                timestamps.append(batch.timestamps)
+                prices.append(batch.prices)
+
+        if not prices:
+            empty = np.empty(0, dtype=np.float64)
+            return empty, empty
+        return np.concatenate(timestamps), np.concatenate(prices)
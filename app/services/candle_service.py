@@ -0,0 +1,477 @@
+import asyncio
+from collections.abc import Callable
+import logging
+from operator import itemgetter
+import time
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+import numpy as np
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import PyMongoError
+
+from app.schemas.candle_schema import CandleInterval
+
+CANDLE_DTYPE = np.dtype(
+    [
+        ("start", np.float64),
+        ("open", np.float64),
+        ("high", np.float64),
+        ("low", np.float64),
+        ("close", np.float64),
+        ("volume", np.float64),
+        ("trades", np.int64),
+        # Timestamps of the first and last prices, which order the shares of a candle
+        ("first_at", np.float64),
+        ("last_at", np.float64),
+    ]
+)
+CANDLE_FIELDS = ("start", "open", "high", "low", "close", "volume", "trades")
+CANDLE_PROJECTION = {"_id": 0, "symbol": 0, "interval": 0}
+
+
+class CandleSeries:
+    """
+    CandleSeries incrementally aggregates prices of one symbol into
+    OHLCV candles of one interval.
+    Closed candles are kept in a fixed-size structured NumPy ring buffer; the open
+    candle is updated in place. Batches are aggregated per candle with vectorized
+    reductions, so the cost of a batch is proportional to the number of candles it
+    touches, not to the number of prices.
+    Prices older than the open candle are ignored and counted as late.
+    """
+
+    def __init__(self, interval_seconds: int, capacity: int):
+        self.interval_seconds = interval_seconds
+        self.capacity = capacity
+        self.closed = np.zeros(capacity, dtype=CANDLE_DTYPE)
+        self.written = 0
+        self.current: np.ndarray | None = None
+        self.late = 0
+
+    @property
+    def oldest_start(self) -> float | None:
+        """
+        Get the start of the oldest candle held in memory.
+        Returns:
+            float | None: The start timestamp, or None if no candle is held.
+        """
+
+        if self.written:
+            oldest = self.written % self.capacity if self.written > self.capacity else 0
+            return float(self.closed[oldest]["start"])
+        if self.current is not None:
+            return float(self.current["start"])
+        return None
+
+    def add(
+        self, timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray
+    ) -> list[np.void]:
+        """
+        Aggregate a batch of prices, ordered by timestamp, into the series.
+        Args:
+            timestamps (np.ndarray): The timestamps of the prices.
+            prices (np.ndarray): The prices.
+            volumes (np.ndarray): The traded volumes.
+        Returns:
+            list[np.void]: The candles closed by the batch.
+        """
+
+        starts = np.floor(timestamps / self.interval_seconds) * self.interval_seconds
+        if self.current is not None:
+            on_time = starts >= self.current["start"]
+            if not on_time.all():
+                self.late += int(np.count_nonzero(~on_time))
+                starts, timestamps = starts[on_time], timestamps[on_time]
+                prices, volumes = prices[on_time], volumes[on_time]
+        if len(starts) == 0:
+            return []
+
+        first_indexes = np.concatenate(([0], np.flatnonzero(np.diff(starts)) + 1))
+        last_indexes = np.concatenate((first_indexes[1:] - 1, [len(starts) - 1]))
+        highs = np.maximum.reduceat(prices, first_indexes)
+        lows = np.minimum.reduceat(prices, first_indexes)
+        bucket_volumes = np.add.reduceat(volumes, first_indexes)
+        counts = last_indexes - first_indexes + 1
+
+        closed = []
+        for i, first in enumerate(first_indexes):
+            if self.current is not None and starts[first] == self.current["start"]:
+                self.current["high"] = max(self.current["high"], highs[i])
+                self.current["low"] = min(self.current["low"], lows[i])
+                self.current["close"] = prices[last_indexes[i]]
+                self.current["volume"] += bucket_volumes[i]
+                self.current["trades"] += counts[i]
+                self.current["last_at"] = timestamps[last_indexes[i]]
+                continue
+
+            if self.current is not None:
+                closed.append(self.__close())
+            self.current = np.array(
+                (
+                    starts[first],
+                    prices[first],
+                    highs[i],
+                    lows[i],
+                    prices[last_indexes[i]],
+                    bucket_volumes[i],
+                    counts[i],
+                    timestamps[first],
+                    timestamps[last_indexes[i]],
+                ),
+                dtype=CANDLE_DTYPE,
+            )
+        return closed
+
+    def close_expired(self, now: float) -> np.void | None:
+        """
+        Close the open candle if its interval has ended.
+        Args:
+            now (float): The current timestamp.
+        Returns:
+            np.void | None: The closed candle, or None if the open one is still running.
+        """
+
+        if self.current is None or self.current["start"] + self.interval_seconds > now:
+            return None
+        return self.__close()
+
+    def window(self, since: float, until: float | None = None) -> np.ndarray:
+        """
+        Get the in-memory candles starting within a time range, oldest first,
+        including the open candle.
+        Args:
+            since (float): The start of the range, inclusive.
+            until (float | None): The end of the range, exclusive, or None for no end.
+        Returns:
+            np.ndarray: A structured array of candles.
+        """
+
+        if self.written > self.capacity:
+            head = self.written % self.capacity
+            candles = np.concatenate((self.closed[head:], self.closed[:head]))
+        else:
+            candles = self.closed[: self.written]
+        if self.current is not None:
+            candles = np.concatenate((candles, self.current.reshape(1)))
+
+        mask = candles["start"] >= since
+        if until is not None:
+            mask &= candles["start"] < until
+        return candles[mask]
+
+    def __close(self) -> np.void:
+        """
+        Move the open candle into the closed ring buffer.
+        Returns:
+            np.void: A copy of the closed candle.
+        """
+
+        candle = self.current.copy()
+        self.closed[self.written % self.capacity] = candle
+        self.written += 1
+        self.current = None
+        return candle[()]
+
+
+class CandleService:
+    """
+    CandleService maintains OHLCV candles for every symbol and
+    interval from trades and ticks.
+    The hot window lives in memory; closed candles are persisted to MongoDB in bulk,
+    and older ranges are read back from there. An optional `on_close` callback receives
+    every candle document as soon as the candle closes.
+    Stored candles are made of shares: each worker process aggregates the trades it
+    serves into its own share, while ticks go to a share named after their source, so
+    a feed every worker ingests is stored once instead of once per worker. A share is
+    set rather than added to the stored candle, and the shares are combined on reads.
+    The in-memory window, and so the recent candles served and the streamed
+    indicators, only hold this worker's trades and the ticks.
+    """
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        memory_size: int,
+        on_close: Callable[[dict], None] | None = None,
+    ):
+        self.collection = collection
+        self.memory_size = memory_size
+        self.on_close = on_close
+        # Keys this process's share of the stored candles; a restarted worker starts a
+        # new share rather than overwriting the one it flushed before
+        self.worker_id = uuid.uuid4().hex
+        self.__series: dict[tuple[str, CandleInterval], CandleSeries] = {}
+        # The open candle of each share, until it closes and is queued for persistence
+        self.__shares: dict[tuple[str, CandleInterval, str], CandleSeries] = {}
+        self.__pending: list[dict] = []
+
+    def add_trade(self, symbol: str, timestamp: float, price: float, amount: float):
+        """
+        Aggregate a single trade into the candles of its symbol.
+        Args:
+            symbol (str): The trading symbol.
+            timestamp (float): The timestamp of the trade.
+            price (float): The price of the trade.
+            amount (float): The amount traded.
+        """
+
+        self.add_prices(
+            symbol,
+            np.array([timestamp], dtype=np.float64),
+            np.array([price], dtype=np.float64),
+            np.array([amount], dtype=np.float64),
+        )
+
+    def add_prices(
+        self,
+        symbol: str,
+        timestamps: np.ndarray,
+        prices: np.ndarray,
+        volumes: np.ndarray,
+        source: str | None = None,
+    ):
+        """
+        Aggregate a batch of prices, ordered by timestamp, into the candles of a symbol.
+        Args:
+            symbol (str): The trading symbol.
+            timestamps (np.ndarray): The timestamps of the prices.
+            prices (np.ndarray): The prices.
+            volumes (np.ndarray): The traded volumes.
+            source (str | None): The name of the tick source the prices come from, or
+            None for the trades this worker serves.
+        """
+
+        share = f"ticks:{source}" if source else f"worker:{self.worker_id}"
+        for interval in CandleInterval:
+            for candle in self.__get_series(symbol, interval).add(
+                timestamps, prices, volumes
+            ):
+                self.__close(symbol, interval, candle)
+            for candle in self.__get_share(symbol, interval, share).add(
+                timestamps, prices, volumes
+            ):
+                self.__queue(symbol, interval, share, candle)
+
+    async def get_candles(
+        self,
+        symbol: str,
+        interval: CandleInterval,
+        since: float,
+        until: float | None = None,
+    ) -> list[dict]:
+        """
+        Get the candles of a symbol starting within a time range, oldest first.
+        Candles still held in memory are served from there; only the part of the range
+        older than the in-memory window is read from the database.
+        Args:
+            symbol (str): The trading symbol.
+            interval (CandleInterval): The candle interval.
+            since (float): The start of the range, inclusive.
+            until (float | None): The end of the range, exclusive, or None for no end.
+        Returns:
+            list[dict]: The candles.
+        """
+
+        series = self.__series.get((symbol, interval))
+        oldest_start = series.oldest_start if series else None
+
+        candles = []
+        if oldest_start is None or since < oldest_start:
+            stored_until = oldest_start if oldest_start is not None else until
+            if until is not None and stored_until is not None:
+                stored_until = min(stored_until, until)
+
+            time_range = {"$gte": since}
+            if stored_until is not None:
+                time_range["$lt"] = stored_until
+            documents = await (
+                self.collection.find(
+                    {"symbol": symbol, "interval": interval.value, "start": time_range},
+                    CANDLE_PROJECTION,
+                )
+                .sort("start", ASCENDING)
+                .to_list(length=None)
+            )
+            candles = [self.__combine(document) for document in documents]
+
+        if series:
+            window = series.window(max(since, oldest_start), until)
+            candles.extend(
+                {name: candle[name].item() for name in CANDLE_FIELDS}
+                for candle in window
+            )
+        return candles
+
+    async def flush(self) -> int:
+        """
+        Close candles whose interval has ended and persist all closed
+        candle shares in one bulk write.
+        Each share is set in its stored candle, so writing it again after a failure,
+        even one the server had applied, does not count it twice.
+        Returns:
+            int: The number of candle shares persisted.
+        Raises:
+            PyMongoError: If the write fails; the batch is kept for the next flush.
+        """
+
+        now = time.time()
+        for (symbol, interval), series in self.__series.items():
+            candle = series.close_expired(now)
+            if candle is not None:
+                self.__close(symbol, interval, candle)
+        for (symbol, interval, share), series in self.__shares.items():
+            candle = series.close_expired(now)
+            if candle is not None:
+                self.__queue(symbol, interval, share, candle)
+
+        if not self.__pending:
+            return 0
+
+        pending, self.__pending = self.__pending, []
+        try:
+            await self.collection.bulk_write(
+                [self.__set_share(document) for document in pending], ordered=False
+            )
+        except PyMongoError:
+            self.__pending = pending + self.__pending
+            raise
+        return len(pending)
+
+    async def run_flush(self, interval_seconds: float, logger: logging.Logger):
+        """
+        Flush closed candles periodically until the task is cancelled.
+        Args:
+            interval_seconds (float): The time between flushes.
+            logger (logging.Logger): The logger instance.
+        """
+
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.flush()
+            except PyMongoError as e:
+                logger.error("Failed to persist candles: %s", str(e))
+
+    def __get_series(self, symbol: str, interval: CandleInterval) -> CandleSeries:
+        """
+        Get the candle series of a symbol and interval, creating it if needed.
+        Args:
+            symbol (str): The trading symbol.
+            interval (CandleInterval): The candle interval.
+        Returns:
+            CandleSeries: The candle series.
+        """
+
+        series = self.__series.get((symbol, interval))
+        if series is None:
+            series = self.__series[(symbol, interval)] = CandleSeries(
+                interval.seconds, self.memory_size
+            )
+        return series
+
+    def __get_share(
+        self, symbol: str, interval: CandleInterval, share: str
+    ) -> CandleSeries:
+        """
+        Get the open candle series of a share, creating it if needed.
+        Args:
+            symbol (str): The trading symbol.
+            interval (CandleInterval): The candle interval.
+            share (str): The key of the share.
+        Returns:
+            CandleSeries: The candle series, which only keeps the last closed candle.
+        """
+
+        series = self.__shares.get((symbol, interval, share))
+        if series is None:
+            series = self.__shares[(symbol, interval, share)] = CandleSeries(
+                interval.seconds, 1
+            )
+        return series
+
+    def __close(self, symbol: str, interval: CandleInterval, candle: np.void):
+        """
+        Pass a candle closed in memory to the `on_close` callback.
+        Args:
+            symbol (str): The trading symbol.
+            interval (CandleInterval): The candle interval.
+            candle (np.void): The closed candle.
+        """
+
+        if self.on_close:
+            document = {"symbol": symbol, "interval": interval.value}
+            document.update((name, candle[name].item()) for name in CANDLE_DTYPE.names)
+            self.on_close(document)
+
+    def __queue(
+        self, symbol: str, interval: CandleInterval, share: str, candle: np.void
+    ):
+        """
+        Queue a closed candle share for persistence.
+        Args:
+            symbol (str): The trading symbol.
+            interval (CandleInterval): The candle interval.
+            share (str): The key of the share.
+            candle (np.void): The closed candle share.
+        """
+
+        document = {"symbol": symbol, "interval": interval.value, "share": share}
+        document.update((name, candle[name].item()) for name in CANDLE_DTYPE.names)
+        self.__pending.append(document)
+
+    @staticmethod
+    def __set_share(document: dict) -> UpdateOne:
+        """
+        Build the upsert setting a closed candle share in the stored candle of its
+        interval.
+        Args:
+            document (dict): The candle share document.
+        Returns:
+            UpdateOne: The upsert.
+        """
+
+        return UpdateOne(
+            {
+                "symbol": document["symbol"],
+                "interval": document["interval"],
+                "start": document["start"],
+            },
+            {
+                "$set": {
+                    f"shares.{document['share']}": {
+                        name: document[name]
+                        for name in CANDLE_DTYPE.names
+                        if name != "start"
+                    }
+                }
+            },
+            upsert=True,
+        )
+
+    @staticmethod
+    def __combine(document: dict) -> dict:
+        """
+        Combine the shares of a stored candle.
+        The open and the close come from the shares with the earliest first price and
+        the latest last price; the volumes and trade counts add up.
+        Args:
+            document (dict): The stored candle.
+        Returns:
+            dict: The candle.
+        """
+
+        if "shares" not in document:
+            # Stored before candles were split into shares
+            return {name: document[name] for name in CANDLE_FIELDS}
+
+        shares = list(document["shares"].values())
+        return {
+            "start": document["start"],
+            "open": min(shares, key=itemgetter("first_at"))["open"],
+            "high": max(share["high"] for share in shares),
+            "low": min(share["low"] for share in shares),
+            "close": max(shares, key=itemgetter("last_at"))["close"],
+            "volume": sum(share["volume"] for share in shares),
+            "trades": sum(share["trades"] for share in shares),
+        }
@@ -0,0 +1,113 @@
+import math
+
+import numpy as np
+
+from app.core.broadcast_hub import BroadcastHub, symbol_topic
+from app.core.indicators import StreamingIndicators, compute_indicators
+from app.core.stream_codec import StreamMessage
+from app.schemas.candle_schema import CandleInterval
+from app.schemas.indicator_schema import IndicatorResponse
+
+
+def indicator_key(symbol: str) -> str:
+    """
+    Get the stream conflation key of indicator updates for a symbol.
+    Args:
+        symbol (str): The trading symbol.
+    Returns:
+        str: The conflation key.
+    """
+
+    return f"indicators:{symbol}"
+
+
+class IndicatorService:
+    """
+    IndicatorService computes technical indicators over candle close prices.
+    Ranges are computed in batch over the candle arrays; additionally, when a
+    stream interval is configured, every closed candle of that interval updates
+    per-symbol streaming indicators in O(1), and the new values are published to
+    the symbol's stream subscribers.
+    """
+
+    def __init__(
+        self,
+        hub: BroadcastHub | None = None,
+        stream_interval: CandleInterval | None = None,
+    ):
+        self.hub = hub
+        self.stream_interval = stream_interval
+        self.__streams: dict[str, StreamingIndicators] = {}
+
+    def compute(self, candles: list[dict]) -> list[dict]:
+        """
+        Compute the indicators of a series of candles.
+        Args:
+            candles (list[dict]): The candles, oldest first.
+        Returns:
+            list[dict]: The start, close and indicator values of every candle;
+            values of indicators still warming up are None.
+        """
+
+        if not candles:
+            return []
+
+        highs = np.fromiter((c["high"] for c in candles), np.float64, len(candles))
+        lows = np.fromiter((c["low"] for c in candles), np.float64, len(candles))
+        closes = np.fromiter((c["close"] for c in candles), np.float64, len(candles))
+        columns = {
+            name: [None if math.isnan(v) else v for v in values.tolist()]
+            for name, values in compute_indicators(highs, lows, closes).items()
+        }
+
+        return [
+            {
+                "start": candle["start"],
+                "close": candle["close"],
+                **{name: values[i] for name, values in columns.items()},
+            }
+            for i, candle in enumerate(candles)
+        ]
+
+    def on_candle_closed(self, candle: dict):
+        """
+        Update the streaming indicators of the candle's symbol and publish them.
+        Candles of other intervals than the stream interval are ignored.
+        Args:
+            candle (dict): The closed candle document.
+        """
+
+        if (
+            self.stream_interval is None
+            or candle["interval"] != self.stream_interval.value
+        ):
+            return
+
+        symbol = candle["symbol"]
+        stream = self.__streams.get(symbol)
+        if stream is None:
+            stream = self.__streams[symbol] = StreamingIndicators()
+        values = stream.update(candle["high"], candle["low"], candle["close"])
+
+        if self.hub:
+            self.hub.publish(
+                StreamMessage(
+                    {
+                        "type": "indicators",
+                        "symbol": symbol,
+                        "interval": candle["interval"],
+                        "data": IndicatorResponse(
+                            start=candle["start"],
+                            close=candle["close"],
+                            **{
+                                name: None if math.isnan(value) else value
+                                for name, value in values.items()
+                            },
+                        ).model_dump(mode="json", by_alias=True),
+                    }
+                ),
+                symbol_topic(symbol),
+                key=indicator_key(symbol),
+                # Every worker process computes the indicators from its own candles
+                local=True,
+            )
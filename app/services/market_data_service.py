@@ -0,0 +1,154 @@
+import logging
+
+import numpy as np
+from pymongo.errors import PyMongoError
+
+from app.core.broadcast_hub import BroadcastHub, symbol_topic
+from app.core.ring_buffer import TickRingBuffer
+from app.core.stream_codec import StreamMessage
+from app.services.alert_service import AlertService
+from app.services.candle_service import CandleService
+from app.services.tick_sources import TickBatch, TickSource
+
+
+def price_key(symbol: str) -> str:
+    """
+    Get the stream conflation key of price updates for a symbol.
+    Args:
+        symbol (str): The trading symbol.
+    Returns:
+        str: The conflation key.
+    """
+
+    return f"price:{symbol}"
+
+
+class MarketDataService:
+    """
+    MarketDataService keeps recent market ticks in memory, one ring buffer per symbol.
+    It serves latest-price and time-window lookups, feeds ingested ticks to the candle
+    service, publishes the latest price of every ingested batch to the symbol's stream
+    subscribers, and fires the price alerts the ticks cross.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int,
+        candle_service: CandleService | None = None,
+        alert_service: AlertService | None = None,
+    ):
+        self.buffer_size = buffer_size
+        self.candle_service = candle_service
+        self.alert_service = alert_service
+        self.__buffers: dict[str, TickRingBuffer] = {}
+
+    @property
+    def symbols(self) -> list[str]:
+        """
+        Get the symbols with ingested ticks.
+        Returns:
+            list[str]: The symbols.
+        """
+
+        return list(self.__buffers)
+
+    def ingest(self, batch: TickBatch, source: str | None = None):
+        """
+        Store a batch of ticks in the symbol's ring buffer and
+        aggregate them into candles.
+        Args:
+            batch (TickBatch): The ticks to store.
+            source (str | None): The name of the tick source, which keys the ticks'
+            share of the stored candles, or None to count them as this worker's own.
+        """
+
+        buffer = self.__buffers.get(batch.symbol)
+        if buffer is None:
+            buffer = self.__buffers[batch.symbol] = TickRingBuffer(self.buffer_size)
+        buffer.extend(batch.timestamps, batch.prices, batch.volumes)
+
+        if self.candle_service:
+            self.candle_service.add_prices(
+                batch.symbol, batch.timestamps, batch.prices, batch.volumes, source
+            )
+
+    def get_latest(self, symbol: str) -> dict | None:
+        """
+        Get the most recent tick of a symbol.
+        Args:
+            symbol (str): The trading symbol.
+        Returns:
+            dict | None: The symbol, timestamp, price and volume, or None.
+        """
+
+        buffer = self.__buffers.get(symbol)
+        latest = buffer.latest() if buffer else None
+        if latest is None:
+            return None
+
+        timestamp, price, volume = latest
+        return {
+            "symbol": symbol,
+            "timestamp": timestamp,
+            "price": price,
+            "volume": volume,
+        }
+
+    def get_window(
+        self, symbol: str, since: float, until: float | None = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the ticks of a symbol within a time range, oldest first.
+        Args:
+            symbol (str): The trading symbol.
+            since (float): The start of the range, inclusive.
+            until (float | None): The end of the range, exclusive, or None for no end.
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: The timestamps, prices, volumes.
+        """
+
+        buffer = self.__buffers.get(symbol)
+        if buffer is None:
+            empty = np.empty(0, dtype=np.float64)
+            return empty, empty, empty
+        return buffer.window(since, until)
+
+    async def run(self, source: TickSource, hub: BroadcastHub, logger: logging.Logger):
+        """
+        Consume a tick source until it is exhausted or the task is cancelled.
+        Args:
+            source (TickSource): The tick source.
+            hub (BroadcastHub): The hub to publish price updates to.
+            logger (logging.Logger): The logger instance.
+        """
+
+        logger.info("Starting market data ingestion from %s", type(source).__name__)
+        async for batch in source.batches():
+            if len(batch.timestamps) == 0:
+                continue
+
+            self.ingest(batch, source.name)
+            hub.publish(
+                StreamMessage(
+                    {
+                        "type": "price",
+                        "symbol": batch.symbol,
+                        "timestamp": float(batch.timestamps[-1]),
+                        "price": float(batch.prices[-1]),
+                        "volume": float(batch.volumes[-1]),
+                    }
+                ),
+                symbol_topic(batch.symbol),
+                key=price_key(batch.symbol),
+                # Every worker process ingests the market data
+                # and serves its own clients
+                local=True,
+            )
+
+            if self.alert_service:
+                fired = self.alert_service.check(batch.symbol, batch.prices.tolist())
+                try:
+                    await self.alert_service.mark_triggered(fired)
+                except PyMongoError as e:
+                    logger.error("Failed to record triggered alerts: %s", str(e))
+        logger.info("Market data source %s is exhausted", type(source).__name__)
@@ -0,0 +1,154 @@
+import asyncio
+from datetime import datetime, timezone
+import uuid
+
+from pymongo.errors import PyMongoError
+
+from app.core.broadcast_hub import BroadcastHub
+from app.core.order_book import Fill, MatchingEngine, Order
+from app.schemas.order_schema import OrderCreate
+from app.schemas.trade_schema import TradeAction
+from app.services.trade_service import TradeService, publish_trade
+
+DEFAULT_BOOK_DEPTH = 20
+
+
+class OrderService:
+    """
+    OrderService places orders on the in-memory matching engine for paper trading.
+    Every fill executes two trades, one for the buyer and one for the seller, which are
+    created through the TradeService (so positions and candles follow) and streamed like
+    directly placed trades. Resting orders live in memory only and
+    do not survive a restart.
+    The books are per process: run the service in a single worker, as orders placed on
+    different workers never match and can only be cancelled on the worker holding them.
+    """
+
+    def __init__(
+        self, engine: MatchingEngine, trade_service: TradeService, hub: BroadcastHub
+    ):
+        self.engine = engine
+        self.trade_service = trade_service
+        self.hub = hub
+
+    async def place_order(self, user_id: str, order_data: OrderCreate) -> dict:
+        """
+        Match an order and record the trades it executes with a single write.
+        Matching and writing are not atomic: while the trades are written, the resting
+        remainder of the order can already be matched by other orders.
+        If the trades cannot be written, the order's own fills are reverted and the
+        order withdrawn. Recording is shielded from cancellation, so trades that reach
+        the database always reach positions, candles and streams too.
+        Args:
+            user_id (str): The ID of the user placing the order.
+            order_data (OrderCreate): The order to place.
+        Returns:
+            dict: The order after matching, with the trades executed for its user.
+        Raises:
+            PyMongoError: If the trades could not be written.
+        """
+
+        order = Order(
+            str(uuid.uuid4()),
+            user_id,
+            order_data.symbol,
+            order_data.action,
+            order_data.type,
+            order_data.price,
+            order_data.amount,
+            datetime.now(tz=timezone.utc).timestamp(),
+        )
+        fills = self.engine.submit(order)
+        # A client disconnect or a shutdown cancels the request, not the recording
+        trades = await asyncio.shield(self.__record(order, fills))
+
+        # The trades alternate between the taker and the maker of each fill
+        return {**order.to_dict(), "trades": trades[::2]}
+
+    def cancel_order(self, user_id: str, order_id: str) -> dict | None:
+        """
+        Cancel a resting order of a user.
+        Args:
+            user_id (str): The ID of the user.
+            order_id (str): The ID of the order.
+        Returns:
+            dict | None: The cancelled order, or None if the user has no such order.
+        """
+
+        order = self.engine.get_order(order_id)
+        if order is None or order.user_id != user_id:
+            return None
+        return self.engine.cancel(order_id).to_dict()
+
+    def get_order_book(self, symbol: str, depth: int = DEFAULT_BOOK_DEPTH) -> dict:
+        """
+        Get the top price levels of a symbol's order book.
+        Args:
+            symbol (str): The trading symbol.
+            depth (int): The maximum number of levels per side.
+        Returns:
+            dict: The symbol and its bid and ask levels, best first.
+        """
+
+        book = self.engine.find_book(symbol)
+        order_book = {"symbol": symbol, "bids": [], "asks": []}
+        if book is None:
+            return order_book
+
+        for side_name, side in (("bids", TradeAction.BUY), ("asks", TradeAction.SELL)):
+            order_book[side_name] = [
+                {
+                    "price": level.price,
+                    "amount": level.amount,
+                    "order_count": level.order_count,
+                }
+                for level in book.depth(side, depth)
+            ]
+        return order_book
+
+    async def __record(self, order: Order, fills: list[Fill]) -> list[dict]:
+        """
+        Write the trades of an order's fills, then apply and publish them.
+        Args:
+            order (Order): The matched order.
+            fills (list[Fill]): The executions returned by the matching engine.
+        Returns:
+            list[dict]: The created trades, taker and maker of each fill in turn.
+        Raises:
+            PyMongoError: If the trades could not be written; the fills are reverted.
+        """
+
+        try:
+            trades = await self.trade_service.insert_trades(
+                [trade for fill in fills for trade in self.__to_trades(fill)]
+            )
+        except PyMongoError:
+            # None of the fills was recorded, so the makers get their liquidity back
+            self.engine.revert(order, fills)
+            raise
+        await self.trade_service.apply_trades(trades)
+        for trade in trades:
+            publish_trade(self.hub, trade)
+        return trades
+
+    @staticmethod
+    def __to_trades(fill: Fill) -> tuple[dict, dict]:
+        """
+        Build the trades of both sides of a fill.
+        Args:
+            fill (Fill): The fill.
+        Returns:
+            tuple[dict, dict]: The taker's and the maker's trade data.
+        """
+
+        return tuple(
+            {
+                "user_id": order.user_id,
+                "order_id": order.id,
+                "symbol": order.symbol,
+                "action": order.action.value,
+                "amount": fill.amount,
+                "price": fill.price,
+            }
+            for order in (fill.taker, fill.maker)
+        )
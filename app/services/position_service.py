@@ -0,0 +1,492 @@
+from collections.abc import AsyncIterator
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, UpdateOne
+
+from app.core.cache import ReadThroughCache
+from app.schemas.trade_schema import TradeAction
+from app.services.trade_archive import TradeArchive
+
+# The folded state of a position; the rebuild stages its own copy of each field
+POSITION_FIELDS = ("net_quantity", "average_cost", "realized_pnl", "trade_count")
+STAGED_FIELDS = [
+    "rebuild_id",
+    "rebuild_sequence",
+    "rebuilt_updated_at",
+    *(f"rebuilt_{field}" for field in POSITION_FIELDS),
+]
+POSITION_PROJECTION = {"_id": 0, "sequence": 0, **dict.fromkeys(STAGED_FIELDS, 0)}
+REBUILD_PROJECTION = {
+    "_id": 0,
+    "user_id": 1,
+    "symbol": 1,
+    "action": 1,
+    "amount": 1,
+    "price": 1,
+    "timestamp": 1,
+    "id": 1,
+}
+# Served by the user_id_timestamp_id index
+REBUILD_SORT = [("user_id", ASCENDING), ("timestamp", ASCENDING), ("id", ASCENDING)]
+REBUILD_CHUNK_SIZE = 1000
+REBUILD_BATCH_SIZE = 100
+REBUILD_ATTEMPTS = 5
+
+
+def positions_namespace(user_id: str) -> str:
+    """
+    Get the cache namespace of a user's positions.
+    Args:
+        user_id (str): The ID of the user.
+    Returns:
+        str: The cache namespace.
+    """
+
+    return f"positions:{user_id}"
+
+
+class PositionRebuildConflictError(Exception):
+    """Exception raised when positions keep being traded while they are rebuilt."""
+
+
+class PositionService:
+    """
+    PositionService maintains a materialized position per user and symbol:
+    net quantity, average cost, realized P&L and trade count.
+    Positions are updated on every trade, so reading them costs O(symbols
+    held) rather than O(trades).
+    With a cache, reads are served from it until the user's next trade.
+    """
+
+    def __init__(
+        self, collection: AsyncIOMotorCollection, cache: ReadThroughCache | None = None
+    ):
+        self.collection = collection
+        self.cache = cache
+
+    async def apply_trade(self, trade: dict):
+        """
+        Apply a trade to its user's position in the trade's symbol.
+        The position is read and updated by a single pipeline update, so concurrent
+        trades on the same position cannot lose updates. Its sequence is bumped, so a
+        rebuild in progress knows not to overwrite it.
+        Args:
+            trade (dict): The created trade.
+        """
+
+        signed_amount = (
+            trade["amount"] if trade["action"] == TradeAction.BUY else -trade["amount"]
+        )
+        new_state = self.__fold(
+            {"$ifNull": ["$net_quantity", 0]},
+            {"$ifNull": ["$average_cost", 0]},
+            {"$ifNull": ["$realized_pnl", 0]},
+            {"$ifNull": ["$trade_count", 0]},
+            {"$literal": signed_amount},
+            {"$literal": trade["price"]},
+        )
+        await self.collection.update_one(
+            {"user_id": trade["user_id"], "symbol": trade["symbol"]},
+            [
+                {
+                    "$set": {
+                        **new_state,
+                        "updated_at": {"$literal": trade["timestamp"]},
+                        "sequence": {"$add": [{"$ifNull": ["$sequence", 0]}, 1]},
+                    }
+                }
+            ],
+            upsert=True,
+        )
+        if self.cache:
+            await self.cache.invalidate(positions_namespace(trade["user_id"]))
+
+    async def get_positions(self, user_id: str) -> list:
+        """
+        Get all positions of a user.
+        Args:
+            user_id (str): The ID of the user.
+        Returns:
+            list: The positions of the user, ordered by symbol.
+        """
+
+        async def load_positions():
+            # Positions a rebuild has only staged so far are not live yet
+            return await (
+                self.collection.find(
+                    {"user_id": user_id, "net_quantity": {"$ne": None}},
+                    POSITION_PROJECTION,
+                )
+                .sort("symbol", ASCENDING)
+                .to_list(length=None)
+            )
+
+        if self.cache:
+            return await self.cache.get_or_load(
+                positions_namespace(user_id), "all", load_positions
+            )
+        return await load_positions()
+
+    async def rebuild(
+        self,
+        trade_collection: AsyncIOMotorCollection,
+        user_id: str | None = None,
+        archive: TradeArchive | None = None,
+    ) -> int:
+        """
+        Recompute positions from the trades collection and the archived trades.
+        Each user's trades are streamed in timestamp order, and each position's trades
+        are folded on the server in chunks of REBUILD_CHUNK_SIZE trades, each resuming
+        from the state left by the previous one, so no document holds more than a chunk.
+        The trades are folded into a staging copy of each position, swapped in only if
+        no trade was applied to the position since the rebuild started; the users
+        whose positions were traded meanwhile are rebuilt again. Positions left
+        without trades are deleted.
+        Only the cached positions of a single rebuilt user are invalidated.
+        Args:
+            trade_collection (AsyncIOMotorCollection): The trades collection.
+            user_id (str | None): Only rebuild the positions of this user,
+            or None for all users.
+            archive (TradeArchive | None): The archive of trades to merge in, if any.
+        Returns:
+            int: The number of positions rebuilt, once per rebuild of their user.
+        Raises:
+            OSError: If the archive could not be read.
+            PositionRebuildConflictError: If positions were still traded during the
+            last of REBUILD_ATTEMPTS rebuilds; the others are rebuilt.
+        """
+
+        positions, conflicting = await self.__rebuild_once(
+            trade_collection, user_id, archive
+        )
+        for _ in range(REBUILD_ATTEMPTS - 1):
+            if not conflicting:
+                break
+            retried = []
+            for conflicting_user_id in conflicting:
+                rebuilt, still_conflicting = await self.__rebuild_once(
+                    trade_collection, conflicting_user_id, archive
+                )
+                positions += rebuilt
+                retried += still_conflicting
+            conflicting = retried
+
+        if self.cache and user_id:
+            await self.cache.invalidate(positions_namespace(user_id))
+        if conflicting:
+            raise PositionRebuildConflictError(
+                f"The positions of {len(conflicting)} users were traded during "
+                f"each of {REBUILD_ATTEMPTS} rebuilds"
+            )
+        return positions
+
+    async def __rebuild_once(
+        self,
+        trade_collection: AsyncIOMotorCollection,
+        user_id: str | None,
+        archive: TradeArchive | None,
+    ) -> tuple[int, list[str]]:
+        """
+        Fold the trades of one or all users into staged positions, and swap in those
+        of the positions no trade was applied to meanwhile.
+        Args:
+            trade_collection (AsyncIOMotorCollection): The trades collection.
+            user_id (str | None): Only rebuild the positions of this user,
+            or None for all users.
+            archive (TradeArchive | None): The archive of trades to merge in, if any.
+        Returns:
+            tuple[int, list[str]]: The number of positions swapped in, and the users
+            with positions traded during the rebuild.
+        """
+
+        rebuild_id = uuid.uuid4().hex
+        query = {"user_id": user_id} if user_id else {}
+        # Stamped before any trade is read, so any trade applied from now on
+        # shows as a change of sequence
+        await self.collection.update_many(
+            query,
+            [
+                {
+                    "$set": {
+                        "rebuild_id": {"$literal": rebuild_id},
+                        "rebuild_sequence": {"$ifNull": ["$sequence", 0]},
+                    }
+                },
+                {"$unset": STAGED_FIELDS[2:]},
+            ],
+        )
+
+        state = self.__fold(
+            "$$value.net_quantity",
+            "$$value.average_cost",
+            "$$value.realized_pnl",
+            "$$value.trade_count",
+            "$$this.signed_amount",
+            "$$this.price",
+        )
+
+        updates = []
+        # The trades of each symbol of the current user not folded yet,
+        # and the symbols whose staged position already holds folded chunks
+        chunks: dict[str, list[dict]] = {}
+        resumed: set[str] = set()
+        current_user_id = None
+        async for trade in self.__iter_trades(trade_collection, user_id, archive):
+            if trade["user_id"] != current_user_id:
+                updates.extend(
+                    self.__fold_chunk(
+                        current_user_id, symbol, chunk, state, resumed, rebuild_id
+                    )
+                    for symbol, chunk in chunks.items()
+                    if chunk
+                )
+                chunks, resumed = {}, set()
+                current_user_id = trade["user_id"]
+
+            chunk = chunks.setdefault(trade["symbol"], [])
+            chunk.append(trade)
+            if len(chunk) >= REBUILD_CHUNK_SIZE:
+                updates.append(
+                    self.__fold_chunk(
+                        current_user_id,
+                        trade["symbol"],
+                        chunk,
+                        state,
+                        resumed,
+                        rebuild_id,
+                    )
+                )
+                chunks[trade["symbol"]] = []
+            if len(updates) >= REBUILD_BATCH_SIZE:
+                # Ordered, so the chunks of a position are folded in turn
+                await self.collection.bulk_write(updates)
+                updates = []
+        updates.extend(
+            self.__fold_chunk(
+                current_user_id, symbol, chunk, state, resumed, rebuild_id
+            )
+            for symbol, chunk in chunks.items()
+            if chunk
+        )
+        if updates:
+            await self.collection.bulk_write(updates)
+
+        unchanged = {
+            "rebuild_id": rebuild_id,
+            "$expr": {"$eq": [{"$ifNull": ["$sequence", 0]}, "$rebuild_sequence"]},
+        }
+        result = await self.collection.update_many(
+            {**query, **unchanged, "rebuilt_trade_count": {"$gt": 0}},
+            [
+                {
+                    "$set": {
+                        field: f"$rebuilt_{field}"
+                        for field in (*POSITION_FIELDS, "updated_at")
+                    }
+                },
+                {"$unset": STAGED_FIELDS},
+            ],
+        )
+        await self.collection.delete_many(
+            {**query, **unchanged, "rebuilt_trade_count": None}
+        )
+        conflicting = await self.collection.distinct(
+            "user_id", {**query, "rebuild_id": rebuild_id}
+        )
+        return result.modified_count, conflicting
+
+    @staticmethod
+    async def __iter_trades(
+        trade_collection: AsyncIOMotorCollection,
+        user_id: str | None,
+        archive: TradeArchive | None,
+    ) -> AsyncIterator[dict]:
+        """
+        Iterate over the trades of one or all users, grouped by user, in time order.
+        Args:
+            trade_collection (AsyncIOMotorCollection): The trades collection.
+            user_id (str | None): Only iterate over the trades of this user,
+            or None for all users.
+            archive (TradeArchive | None): The archive of trades to merge in, if any.
+        Yields:
+            dict: The trades.
+        """
+
+        def find(query: dict):
+            return (
+                trade_collection.find(query, REBUILD_PROJECTION)
+                .sort(REBUILD_SORT)
+                .batch_size(REBUILD_CHUNK_SIZE)
+            )
+
+        if archive is None:
+            async for trade in find({"user_id": user_id} if user_id else {}):
+                yield trade
+            return
+
+        if user_id:
+            user_ids = [user_id]
+        else:
+            user_ids = sorted(
+                set(await trade_collection.distinct("user_id"))
+                | set(await archive.list_user_ids())
+            )
+        for merged_user_id in user_ids:
+            cursor = find({"user_id": merged_user_id})
+            async for trade in archive.merge_hot_trades(merged_user_id, aiter(cursor)):
+                yield trade
+
+    @staticmethod
+    def __fold_chunk(
+        user_id: str,
+        symbol: str,
+        trades: list[dict],
+        state: dict,
+        resumed: set[str],
+        rebuild_id: str,
+    ) -> UpdateOne:
+        """
+        Build the update folding a chunk of trades into a staged position.
+        Args:
+            user_id (str): The ID of the user.
+            symbol (str): The symbol of the position.
+            trades (list[dict]): The trades, in timestamp order.
+            state (dict): The expressions applying the `$$this` trade to `$$value`.
+            resumed (set[str]): The symbols whose chunks resume from the staged position
+            rather than from scratch; the symbol is added to it.
+            rebuild_id (str): The ID of the rebuild.
+        Returns:
+            UpdateOne: The update.
+        """
+
+        stages = []
+        if symbol not in resumed:
+            # A position the rebuild did not stamp is new, or was created by a trade
+            # applied since it started, and then cannot be swapped
+            stages.append(
+                {
+                    "$set": {
+                        "rebuild_id": {"$literal": rebuild_id},
+                        "rebuild_sequence": {
+                            "$cond": [
+                                {"$eq": ["$rebuild_id", rebuild_id]},
+                                "$rebuild_sequence",
+                                {"$cond": [{"$ifNull": ["$sequence", False]}, -1, 0]},
+                            ]
+                        },
+                    }
+                }
+            )
+        initial = {
+            field: f"$rebuilt_{field}" if symbol in resumed else 0
+            for field in POSITION_FIELDS
+        }
+        resumed.add(symbol)
+        folded = {
+            "$reduce": {
+                "input": {
+                    "$literal": [
+                        {
+                            "signed_amount": (
+                                trade["amount"]
+                                if trade["action"] == TradeAction.BUY
+                                else -trade["amount"]
+                            ),
+                            "price": trade["price"],
+                        }
+                        for trade in trades
+                    ]
+                },
+                "initialValue": initial,
+                "in": state,
+            }
+        }
+        return UpdateOne(
+            {"user_id": user_id, "symbol": symbol},
+            [
+                *stages,
+                {"$set": {"state": folded}},
+                {
+                    "$set": {
+                        **{f"rebuilt_{field}": f"$state.{field}" for field in initial},
+                        "rebuilt_updated_at": {"$literal": trades[-1]["timestamp"]},
+                    }
+                },
+                {"$unset": "state"},
+            ],
+            upsert=True,
+        )
+
+    @staticmethod
+    def __fold(
+        quantity, average_cost, realized_pnl, trade_count, signed_amount, price
+    ) -> dict:
+        """
+        Build the MongoDB expressions applying one trade to a position,
+        using the average cost method.
+        Trades on the side of the position grow it at a blended cost; opposite trades
+        realize P&L on the closed quantity, and a trade that flips the position opens
+        the remainder at its price.
+        The same expressions drive both the on-write update and the rebuild.
+        Args:
+            quantity: Expression of the current net quantity (negative when short).
+            average_cost: Expression of the current average cost.
+            realized_pnl: Expression of the current realized P&L.
+            trade_count: Expression of the current trade count.
+            signed_amount: Expression of the trade amount, negative for sells.
+            price: Expression of the trade price.
+        Returns:
+            dict: The new net quantity, average cost, realized P&L and trade count.
+        """
+
+        same_side = {
+            "$or": [
+                {"$eq": [quantity, 0]},
+                {"$gt": [{"$multiply": [quantity, signed_amount]}, 0]},
+            ]
+        }
+        new_quantity = {"$add": [quantity, signed_amount]}
+        closed_quantity = {"$min": [{"$abs": quantity}, {"$abs": signed_amount}]}
+        position_side = {"$cond": [{"$gt": [quantity, 0]}, 1, -1]}
+
+        blended_cost = {
+            "$divide": [
+                {
+                    "$add": [
+                        {"$multiply": [{"$abs": quantity}, average_cost]},
+                        {"$multiply": [{"$abs": signed_amount}, price]},
+                    ]
+                },
+                {"$add": [{"$abs": quantity}, {"$abs": signed_amount}]},
+            ]
+        }
+        reduced_cost = {
+            "$cond": [
+                {"$eq": [new_quantity, 0]},
+                0,
+                {
+                    "$cond": [
+                        {"$gt": [{"$multiply": [new_quantity, quantity]}, 0]},
+                        average_cost,
+                        price,
+                    ]
+                },
+            ]
+        }
+        realized = {
+            "$multiply": [
+                closed_quantity,
+                {"$subtract": [price, average_cost]},
+                position_side,
+            ]
+        }
+
+        return {
+            "net_quantity": new_quantity,
+            "average_cost": {"$cond": [same_side, blended_cost, reduced_cost]},
+            "realized_pnl": {
+                "$add": [realized_pnl, {"$cond": [same_side, 0, realized]}]
+            },
+            "trade_count": {"$add": [trade_count, 1]},
+        }
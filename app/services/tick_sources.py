@@ -0,0 +1,185 @@
+from abc import ABC, abstractmethod
+import asyncio
+from collections.abc import AsyncIterator
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+
+class TickBatch(NamedTuple):
+    """
+    A batch of ticks for a single symbol, as parallel float64 arrays.
+    """
+
+    symbol: str
+    timestamps: np.ndarray
+    prices: np.ndarray
+    volumes: np.ndarray
+
+
+class TickSource(ABC):
+    """
+    TickSource is the interface of market tick providers consumed
+    by the MarketDataService.
+    Sources yield ticks in per-symbol batches of arrays rather than one object per tick.
+    Every worker process ingests the same source, so its `name` keys the ticks' share of
+    the stored candles.
+    """
+
+    name: str
+
+    @abstractmethod
+    def batches(self) -> AsyncIterator[TickBatch]:
+        """
+        Produce batches of ticks until the source is exhausted or cancelled.
+        Returns:
+            AsyncIterator[TickBatch]: The batches of ticks.
+        """
+
+
+class SyntheticTickSource(TickSource):
+    """
+    SyntheticTickSource generates a random-walk price series per symbol.
+    Useful for local development and load testing without an exchange connection.
+    Each worker process walks independently, so with several workers a stored candle
+    holds the ticks of whichever worker persisted it last.
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        symbols: list[str],
+        interval_seconds: float = 0.1,
+        ticks_per_batch: int = 10,
+        seed: int | None = None,
+    ):
+        self.symbols = symbols
+        self.interval_seconds = interval_seconds
+        self.ticks_per_batch = ticks_per_batch
+        self.__rng = np.random.default_rng(seed)
+        self.__last_prices = {symbol: 100.0 for symbol in symbols}
+
+    async def batches(self) -> AsyncIterator[TickBatch]:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            now = time.time()
+            timestamps = now - self.interval_seconds * (
+                1 - np.arange(1, self.ticks_per_batch + 1) / self.ticks_per_batch
+            )
+
+            for symbol in self.symbols:
+                returns = self.__rng.normal(0.0, 0.0005, self.ticks_per_batch)
+                prices = self.__last_prices[symbol] * np.exp(np.cumsum(returns))
+                volumes = self.__rng.exponential(1.0, self.ticks_per_batch)
+                self.__last_prices[symbol] = float(prices[-1])
+                yield TickBatch(symbol, timestamps, prices, volumes)
+
+
+class ReplayTickSource(TickSource):
+    """
+    ReplayTickSource replays ticks from a CSV file with
+    `timestamp,symbol,price,volume` columns.
+    The file is parsed into columns by pyarrow, a block at a time in a worker thread
+    so the event loop stays responsive, and replayed in chunks of up to `chunk_size`
+    ticks paced by their timestamps divided by `speed`; a speed of 0 replays as fast
+    as possible.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, speed: float = 1.0, chunk_size: int = 1000):
+        self.path = path
+        self.speed = speed
+        self.chunk_size = chunk_size
+
+    async def batches(self) -> AsyncIterator[TickBatch]:
+        replay_started_at = time.monotonic()
+        first_timestamp = None
+
+        async for chunk in self.__read_chunks():
+            timestamps = chunk["timestamp"]
+            if first_timestamp is None:
+                first_timestamp = float(timestamps[0])
+
+            if self.speed > 0:
+                due_in = (float(timestamps[-1]) - first_timestamp) / self.speed - (
+                    time.monotonic() - replay_started_at
+                )
+                await asyncio.sleep(max(due_in, 0))
+            else:
+                await asyncio.sleep(0)
+
+            for symbol in np.unique(chunk["symbol"]):
+                mask = chunk["symbol"] == symbol
+                yield TickBatch(
+                    str(symbol),
+                    timestamps[mask],
+                    chunk["price"][mask],
+                    chunk["volume"][mask],
+                )
+
+    async def __read_chunks(self) -> AsyncIterator[dict[str, np.ndarray]]:
+        """
+        Read the replay file in chunks of columnar arrays.
+        Yields:
+            dict[str, np.ndarray]: The columns of the next chunk.
+        """
+
+        # pyarrow takes a while to import and is only needed here
+        import pyarrow as pa
+        import pyarrow.csv as pv
+
+        column_types = {
+            "timestamp": pa.float64(),
+            "symbol": pa.string(),
+            "price": pa.float64(),
+            "volume": pa.float64(),
+        }
+        reader = await asyncio.to_thread(
+            pv.open_csv,
+            self.path,
+            convert_options=pv.ConvertOptions(
+                column_types=column_types, include_columns=list(column_types)
+            ),
+        )
+        try:
+            while True:
+                record_batch = await asyncio.to_thread(next, reader, None)
+                if record_batch is None:
+                    return
+                for start in range(0, record_batch.num_rows, self.chunk_size):
+                    chunk = record_batch.slice(start, self.chunk_size)
+                    yield {
+                        name: chunk.column(name).to_numpy(zero_copy_only=False)
+                        for name in column_types
+                    }
+        finally:
+            reader.close()
+
+
+def create_tick_source(
+    source: str, symbols: list[str], replay_file: str | None
+) -> TickSource | None:
+    """
+    Create the tick source selected in the application settings.
+    Args:
+        source (str): "synthetic", "replay" or "none".
+        symbols (list[str]): The symbols to generate, for the synthetic source.
+        replay_file (str | None): The CSV file to replay, for the replay source.
+    Returns:
+        TickSource | None: The tick source, or None if ingestion is disabled.
+    Raises:
+        ValueError: If the source is unknown or the replay file is missing.
+    """
+
+    if source == "none":
+        return None
+    if source == "synthetic":
+        return SyntheticTickSource(symbols)
+    if source == "replay":
+        if not replay_file:
+            raise ValueError("A replay file is required for the replay tick source")
+        return ReplayTickSource(replay_file)
+    raise ValueError(f"Unknown tick source '{source}'")
@@ -0,0 +1,554 @@
+import asyncio
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+import os
+from urllib.parse import quote, unquote
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+import numpy as np
+from pymongo import ASCENDING
+
+from app.schemas.trade_schema import TradeFilter
+
+ARCHIVE_FILE_MAX_ROWS = 100_000
+ARCHIVE_ROW_GROUP_SIZE = 10_000
+ARCHIVE_COMPRESSION = "zstd"
+ARCHIVE_FILE_SUFFIX = ".parquet"
+ARCHIVE_DELETE_BATCH_SIZE = 1000
+ARCHIVE_COLUMNS = ("action", "amount", "price", "symbol", "id", "user_id", "timestamp")
+MONTH_FORMAT = "%Y-%m"
+
+
+class TradeArchive:
+    """
+    TradeArchive is the cold tier of the trades: trades older than a cutoff are moved
+    from the trades collection into compressed Parquet files, partitioned by
+    user and month (`user_id=<user>/month=<YYYY-MM>/`), in a local directory
+    or an S3-compatible bucket.
+    Reads only open the partitions of the requested user overlapping the requested time
+    range, and skip the row groups outside of it from their statistics.
+    Trade listings, position rebuilds, analytics and backtests merge the archived trades
+    with those of the trades collection.
+    """
+
+    def __init__(self, filesystem, root: str):
+        self.filesystem = filesystem
+        self.root = root.rstrip("/")
+
+    async def archive(
+        self,
+        collection: AsyncIOMotorCollection,
+        cutoff: float,
+        user_id: str | None = None,
+        max_rows_per_file: int = ARCHIVE_FILE_MAX_ROWS,
+    ) -> dict:
+        """
+        Move the trades older than a cutoff from the trades collection to the archive.
+        Trades are written to their partition before being deleted from the collection,
+        so they are never missing from listings. An archival interrupted between the
+        two can write some trades to a second file when it is run again; reads drop
+        those duplicates.
+        Args:
+            collection (AsyncIOMotorCollection): The trades collection.
+            cutoff (float): The timestamp before which trades are archived.
+            user_id (str | None): Only archive this user's trades, or None for all.
+            max_rows_per_file (int): The maximum number of trades per file.
+        Returns:
+            dict: The numbers of users, files and trades archived.
+        Raises:
+            PyMongoError: If the trades could not be read or deleted.
+            OSError: If a file could not be written.
+        """
+
+        user_ids = (
+            [user_id]
+            if user_id
+            else await collection.distinct("user_id", {"timestamp": {"$lt": cutoff}})
+        )
+        summary = {"users": 0, "files": 0, "trades": 0}
+        for archived_user_id in user_ids:
+            cursor = (
+                collection.find(
+                    {"user_id": archived_user_id, "timestamp": {"$lt": cutoff}},
+                    dict.fromkeys(("_id", *ARCHIVE_COLUMNS), 1),
+                )
+                .sort([("timestamp", ASCENDING), ("id", ASCENDING)])
+                .batch_size(ARCHIVE_DELETE_BATCH_SIZE)
+            )
+            rows = []
+            month = None
+            async for trade in cursor:
+                trade_month = month_of(trade["timestamp"])
+                if rows and (trade_month != month or len(rows) >= max_rows_per_file):
+                    await self.__move(collection, archived_user_id, month, rows)
+                    summary["files"] += 1
+                    summary["trades"] += len(rows)
+                    rows = []
+                month = trade_month
+                rows.append(trade)
+            if rows:
+                await self.__move(collection, archived_user_id, month, rows)
+                summary["files"] += 1
+                summary["trades"] += len(rows)
+                summary["users"] += 1
+        return summary
+
+    async def load_trades(
+        self,
+        user_id: str,
+        filters: TradeFilter | None = None,
+        after: tuple[float, str] | None = None,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """
+        Read a user's archived trades, ordered by timestamp and ID.
+        Partitions are read in time order until `limit` trades are found.
+        Args:
+            user_id (str): The ID of the user.
+            filters (TradeFilter | None): Optional symbol, action and time filters.
+            after (tuple[float, str] | None): The timestamp and ID to resume after.
+            limit (int | None): The maximum number of trades to read, or None for all.
+        Returns:
+            list[dict]: The trades.
+        Raises:
+            OSError: If the archive could not be read.
+        """
+
+        trades = []
+        async for month_trades in self.iter_trades(user_id, filters, after):
+            trades.extend(month_trades)
+            if limit is not None and len(trades) >= limit:
+                return trades[:limit]
+        return trades
+
+    async def iter_trades(
+        self,
+        user_id: str,
+        filters: TradeFilter | None = None,
+        after: tuple[float, str] | None = None,
+    ) -> AsyncIterator[list[dict]]:
+        """
+        Iterate over a user's archived trades one monthly partition
+        at a time, in time order.
+        Files are read in a worker thread to keep the event loop responsive.
+        Args:
+            user_id (str): The ID of the user.
+            filters (TradeFilter | None): Optional symbol, action and time filters.
+            after (tuple[float, str] | None): The timestamp and ID to resume after.
+        Yields:
+            list[dict]: The trades of each partition, ordered by timestamp and ID.
+        Raises:
+            OSError: If the archive could not be read.
+        """
+
+        since = filters.since if filters else None
+        until = filters.until if filters else None
+        if after is not None:
+            since = after[0] if since is None else max(since, after[0])
+
+        for month, directory in await asyncio.to_thread(self.__list_months, user_id):
+            if not self.__overlaps(month, since, until):
+                continue
+            trades = await asyncio.to_thread(
+                self.__read_partition, directory, filters, after
+            )
+            if trades:
+                yield trades
+
+    async def list_user_ids(self) -> list[str]:
+        """
+        List the users with archived trades.
+        Returns:
+            list[str]: The IDs of the users, in order.
+        Raises:
+            OSError: If the archive could not be read.
+        """
+
+        return await asyncio.to_thread(self.__list_user_ids)
+
+    async def has_trades(
+        self, user_id: str, filters: TradeFilter | None = None
+    ) -> bool:
+        """
+        Check whether a user has archived partitions overlapping a filtered time range.
+        Args:
+            user_id (str): The ID of the user.
+            filters (TradeFilter | None): Optional filters, of which only the time range
+            is checked.
+        Returns:
+            bool: False if no archived trade can match the filters.
+        Raises:
+            OSError: If the archive could not be read.
+        """
+
+        since = filters.since if filters else None
+        until = filters.until if filters else None
+        months = await asyncio.to_thread(self.__list_months, user_id)
+        return any(self.__overlaps(month, since, until) for month, _ in months)
+
+    async def merge_hot_trades(
+        self,
+        user_id: str,
+        hot_trades: AsyncIterator[dict],
+        filters: TradeFilter | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Merge a user's archived trades with those of the trades collection, in
+        (timestamp, id) order. Imported trades can be older than archived ones, so the
+        tiers overlap in time; a trade in both, while being archived, is kept once.
+        Args:
+            user_id (str): The ID of the user.
+            hot_trades (AsyncIterator[dict]): The user's trades from the trades
+            collection, matching the filters, in (timestamp, id) order.
+            filters (TradeFilter | None): Optional symbol, action and time filters.
+        Yields:
+            dict: The trades.
+        Raises:
+            OSError: If the archive could not be read.
+        """
+
+        hot_trade = await anext(hot_trades, None)
+        async for archived_trades in self.iter_trades(user_id, filters):
+            for trade in archived_trades:
+                key = trade_sort_key(trade)
+                while hot_trade is not None and trade_sort_key(hot_trade) < key:
+                    yield hot_trade
+                    hot_trade = await anext(hot_trades, None)
+                if hot_trade is not None and hot_trade["id"] == trade["id"]:
+                    continue
+                yield trade
+        while hot_trade is not None:
+            yield hot_trade
+            hot_trade = await anext(hot_trades, None)
+
+    async def load_symbol_trades(
+        self, symbol: str, since: float | None = None, until: float | None = None
+    ) -> list[dict]:
+        """
+        Read the archived trades of a symbol across all users, by timestamp and ID.
+        Every user's partitions overlapping the time range are opened.
+        Args:
+            symbol (str): The trading symbol.
+            since (float | None): The start of the range, inclusive, or None.
+            until (float | None): The end of the range, exclusive, or None for no end.
+        Returns:
+            list[dict]: The trades.
+        Raises:
+            OSError: If the archive could not be read.
+        """
+
+        filters = TradeFilter(symbol=symbol, since=since, until=until)
+        directories = await asyncio.to_thread(self.__list_partitions, since, until)
+        return await asyncio.to_thread(
+            self.__read_partitions, directories, filters, None
+        )
+
+    async def __move(
+        self,
+        collection: AsyncIOMotorCollection,
+        user_id: str,
+        month: str,
+        trades: list[dict],
+    ):
+        """
+        Write trades to a file of their partition, then delete them
+        from the trades collection.
+        Args:
+            collection (AsyncIOMotorCollection): The trades collection.
+            user_id (str): The ID of the user.
+            month (str): The month of the trades, as YYYY-MM.
+            trades (list[dict]): The trades, ordered by timestamp and ID.
+        """
+
+        await asyncio.to_thread(self.__write_partition, user_id, month, trades)
+        for i in range(0, len(trades), ARCHIVE_DELETE_BATCH_SIZE):
+            batch = trades[i : i + ARCHIVE_DELETE_BATCH_SIZE]
+            await collection.delete_many(
+                {"_id": {"$in": [trade["_id"] for trade in batch]}}
+            )
+
+    def __write_partition(self, user_id: str, month: str, trades: list[dict]):
+        """
+        Write trades to a new file of their partition, atomically on local directories.
+        Args:
+            user_id (str): The ID of the user.
+            month (str): The month of the trades, as YYYY-MM.
+            trades (list[dict]): The trades, ordered by timestamp and ID.
+        """
+
+        # pyarrow takes a while to import and is only needed by the archive
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pylist(
+            [{column: trade[column] for column in ARCHIVE_COLUMNS} for trade in trades],
+            schema=archive_schema(),
+        )
+        directory = f"{self.__user_directory(user_id)}/month={month}"
+        self.filesystem.create_dir(directory, recursive=True)
+        first = trades[0]
+        path = f"{directory}/{first['timestamp']!r}_{first['id']}{ARCHIVE_FILE_SUFFIX}"
+        # Readers only open *.parquet files, so they never see a partially written one
+        pq.write_table(
+            table,
+            path + ".tmp",
+            filesystem=self.filesystem,
+            compression=ARCHIVE_COMPRESSION,
+            row_group_size=ARCHIVE_ROW_GROUP_SIZE,
+        )
+        self.filesystem.move(path + ".tmp", path)
+
+    def __list_months(self, user_id: str) -> list[tuple[str, str]]:
+        """
+        List the monthly partitions of a user.
+        Args:
+            user_id (str): The ID of the user.
+        Returns:
+            list[tuple[str, str]]: The month, as YYYY-MM, and the directory of each
+            partition, in time order.
+        """
+
+        import pyarrow.fs
+
+        infos = self.filesystem.get_file_info(
+            pyarrow.fs.FileSelector(
+                self.__user_directory(user_id), allow_not_found=True
+            )
+        )
+        return sorted(
+            (info.base_name.removeprefix("month="), info.path)
+            for info in infos
+            if info.type == pyarrow.fs.FileType.Directory
+            and info.base_name.startswith("month=")
+        )
+
+    def __list_user_ids(self) -> list[str]:
+        """
+        List the users with a directory in the archive.
+        Returns:
+            list[str]: The IDs of the users, in order.
+        """
+
+        import pyarrow.fs
+
+        infos = self.filesystem.get_file_info(
+            pyarrow.fs.FileSelector(self.root, allow_not_found=True)
+        )
+        return sorted(
+            unquote(info.base_name.removeprefix("user_id="))
+            for info in infos
+            if info.type == pyarrow.fs.FileType.Directory
+            and info.base_name.startswith("user_id=")
+        )
+
+    def __list_partitions(self, since: float | None, until: float | None) -> list[str]:
+        """
+        List the partitions of every user overlapping a time range.
+        Args:
+            since (float | None): The start of the range, inclusive, or None.
+            until (float | None): The end of the range, exclusive, or None for no end.
+        Returns:
+            list[str]: The directories of the partitions.
+        """
+
+        return [
+            directory
+            for user_id in self.__list_user_ids()
+            for month, directory in self.__list_months(user_id)
+            if self.__overlaps(month, since, until)
+        ]
+
+    def __read_partition(
+        self,
+        directory: str,
+        filters: TradeFilter | None,
+        after: tuple[float, str] | None,
+    ) -> list[dict]:
+        """
+        Read the trades of a partition matching the filters.
+        Args:
+            directory (str): The directory of the partition.
+            filters (TradeFilter | None): Optional symbol, action and time filters.
+            after (tuple[float, str] | None): The timestamp and ID to resume after.
+        Returns:
+            list[dict]: The trades, ordered by timestamp and ID.
+        """
+
+        return self.__read_partitions([directory], filters, after)
+
+    def __read_partitions(
+        self,
+        directories: list[str],
+        filters: TradeFilter | None,
+        after: tuple[float, str] | None,
+    ) -> list[dict]:
+        """
+        Read the trades of partitions matching the filters.
+        A trade written to two files by an interrupted archival is only returned once.
+        Args:
+            directories (list[str]): The directories of the partitions.
+            filters (TradeFilter | None): Optional symbol, action and time filters.
+            after (tuple[float, str] | None): The timestamp and ID of the trade
+            to resume after.
+        Returns:
+            list[dict]: The trades, ordered by timestamp and ID.
+        """
+
+        import pyarrow.dataset as ds
+        import pyarrow.fs
+
+        paths = [
+            info.path
+            for directory in directories
+            for info in self.filesystem.get_file_info(
+                pyarrow.fs.FileSelector(directory)
+            )
+            if info.path.endswith(ARCHIVE_FILE_SUFFIX)
+        ]
+        if not paths:
+            return []
+
+        conditions = []
+        if filters:
+            if filters.symbol:
+                conditions.append(ds.field("symbol") == filters.symbol)
+            if filters.action:
+                conditions.append(ds.field("action") == filters.action.value)
+            if filters.since is not None:
+                conditions.append(ds.field("timestamp") >= filters.since)
+            if filters.until is not None:
+                conditions.append(ds.field("timestamp") < filters.until)
+        if after is not None:
+            timestamp, trade_id = after
+            conditions.append(
+                (ds.field("timestamp") > timestamp)
+                | ((ds.field("timestamp") == timestamp) & (ds.field("id") > trade_id))
+            )
+        condition = None
+        for clause in conditions:
+            condition = clause if condition is None else condition & clause
+
+        table = (
+            ds.dataset(paths, schema=archive_schema(), filesystem=self.filesystem)
+            .to_table(filter=condition)
+            .sort_by([("timestamp", "ascending"), ("id", "ascending")])
+        )
+        # Copies of a trade share its timestamp and ID, so they end up side by side
+        ids = table.column("id").to_numpy(zero_copy_only=False)
+        if len(ids) > 1:
+            table = table.filter(np.concatenate(([True], ids[1:] != ids[:-1])))
+        return table.to_pylist()
+
+    @staticmethod
+    def __overlaps(month: str, since: float | None, until: float | None) -> bool:
+        """
+        Check whether a month overlaps a time range.
+        Args:
+            month (str): The month, as YYYY-MM.
+            since (float | None): The start of the range, inclusive, or None.
+            until (float | None): The end of the range, exclusive, or None for no end.
+        Returns:
+            bool: True if some of the month is within the range.
+        """
+
+        start, end = month_range(month)
+        return (since is None or end > since) and (until is None or start < until)
+
+    def __user_directory(self, user_id: str) -> str:
+        """
+        Get the directory of a user's partitions.
+        Args:
+            user_id (str): The ID of the user.
+        Returns:
+            str: The directory.
+        """
+
+        return f"{self.root}/user_id={quote(user_id, safe='')}"
+
+
+def archive_schema():
+    """
+    Get the Arrow schema of the archived trades.
+    Returns:
+        pyarrow.Schema: The schema.
+    """
+
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("action", pa.string()),
+            ("amount", pa.float64()),
+            ("price", pa.float64()),
+            ("symbol", pa.string()),
+            ("id", pa.string()),
+            ("user_id", pa.string()),
+            ("timestamp", pa.float64()),
+        ]
+    )
+
+
+def trade_sort_key(trade: dict) -> tuple[float, str]:
+    """
+    Get the (timestamp, id) position of a trade in listing order.
+    Args:
+        trade (dict): The trade.
+    Returns:
+        tuple[float, str]: The sort key.
+    """
+
+    return trade["timestamp"], trade["id"]
+
+
+def month_of(timestamp: float) -> str:
+    """
+    Get the UTC month of a timestamp.
+    Args:
+        timestamp (float): The Unix timestamp.
+    Returns:
+        str: The month, as YYYY-MM.
+    """
+
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime(MONTH_FORMAT)
+
+
+def month_range(month: str) -> tuple[float, float]:
+    """
+    Get the time range of a UTC month.
+    Args:
+        month (str): The month, as YYYY-MM.
+    Returns:
+        tuple[float, float]: The start timestamps of the month and of the next one.
+    """
+
+    start = datetime.strptime(month, MONTH_FORMAT).replace(tzinfo=timezone.utc)
+    end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start.timestamp(), end.timestamp()
+
+
+def create_trade_archive(url: str | None) -> TradeArchive | None:
+    """
+    Create the trade archive from its URL.
+    Args:
+        url (str | None): A local directory, as a path or a file:// URL, an S3 URL such
+        as "s3://key:secret@bucket/prefix?endpoint_override=localhost:9000&scheme=http"
+        for MinIO, or None to disable archiving.
+    Returns:
+        TradeArchive | None: The trade archive, or None if disabled.
+    Raises:
+        ValueError: If the URL is not supported.
+    """
+
+    if not url:
+        return None
+
+    # pyarrow takes a while to import and is only needed when an archive is configured
+    import pyarrow.fs
+
+    if "://" not in url:
+        url = os.path.abspath(url)
+    try:
+        filesystem, root = pyarrow.fs.FileSystem.from_uri(url)
+    except pyarrow.ArrowInvalid as e:
+        raise ValueError(f"Unsupported trade archive URL: {url}") from e
+    return TradeArchive(filesystem, root)
@@ -0,0 +1,161 @@
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator
+import codecs
+import csv
+from datetime import datetime, timezone
+from typing import BinaryIO
+
+REQUIRED_COLUMNS = ("action", "amount", "price", "symbol")
+OPTIONAL_COLUMNS = ("timestamp",)
+PARQUET_BATCH_SIZE = 10_000
+
+
+async def iter_csv_rows(chunks: AsyncIterable[bytes]) -> AsyncIterator[list[dict]]:
+    """
+    Parse a UTF-8 CSV trade history file as it arrives, one chunk of bytes at a time.
+    Only the current chunk and the incomplete line at its end are held in memory,
+    so quoted values cannot span lines. Empty values are dropped, so optional
+    columns can be left blank.
+    Args:
+        chunks (AsyncIterable[bytes]): The content of the file.
+    Yields:
+        list[dict]: The rows parsed from each chunk, keyed by lower-case column name.
+    Raises:
+        ValueError: If the file is not UTF-8 CSV or its header lacks a required column.
+    """
+
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    columns = None
+    remainder = ""
+    async for chunk in chunks:
+        lines = (remainder + decoder.decode(chunk)).split("\n")
+        remainder = lines.pop()
+        columns, rows = __parse_lines(lines, columns)
+        if rows:
+            yield rows
+
+    columns, rows = __parse_lines(
+        [remainder + decoder.decode(b"", final=True)], columns
+    )
+    if rows:
+        yield rows
+
+
+async def iter_parquet_rows(
+    source: str | BinaryIO, batch_size: int = PARQUET_BATCH_SIZE
+) -> AsyncIterator[list[dict]]:
+    """
+    Read a Parquet trade history file one record batch at a time.
+    Parquet keeps its metadata at the end of the file, so it is read from a path or a
+    seekable file rather than a stream. Batches are decoded in a worker thread to keep
+    the event loop responsive.
+    Args:
+        source (str | BinaryIO): The path of the file, or the file opened as binary.
+        batch_size (int): The maximum number of rows per batch.
+    Yields:
+        list[dict]: The rows of each batch, keyed by column name.
+    Raises:
+        ValueError: If the file is not valid Parquet or lacks a required column.
+    """
+
+    # pyarrow takes a while to import and is only needed here
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(source)
+    columns = [name.lower() for name in parquet_file.schema_arrow.names]
+    __check_columns(columns)
+    batches = parquet_file.iter_batches(
+        batch_size,
+        columns=[
+            name
+            for name in parquet_file.schema_arrow.names
+            if name.lower() in REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+        ],
+    )
+
+    while True:
+        batch = await asyncio.to_thread(next, batches, None)
+        if batch is None:
+            return
+        yield [
+            {
+                name.lower(): (
+                    __to_timestamp(value) if isinstance(value, datetime) else value
+                )
+                for name, value in row.items()
+                if value is not None
+            }
+            for row in batch.to_pylist()
+        ]
+
+
+async def spool_chunks(chunks: AsyncIterable[bytes], file: BinaryIO):
+    """
+    Write a stream to a file and rewind it, so it can be read with random access.
+    Args:
+        chunks (AsyncIterable[bytes]): The content of the stream.
+        file (BinaryIO): The file to write to, opened in binary mode.
+    """
+
+    async for chunk in chunks:
+        file.write(chunk)
+    file.seek(0)
+
+
+def __parse_lines(
+    lines: list[str], columns: list[str] | None
+) -> tuple[list[str], list[dict]]:
+    """
+    Parse complete CSV lines, reading the header first if it has not been read yet.
+    Args:
+        lines (list[str]): The lines to parse.
+        columns (list[str] | None): The column names, or None before the header.
+    Returns:
+        tuple[list[str], list[dict]]: The column names and the parsed rows.
+    Raises:
+        ValueError: If a line is malformed or the header lacks a required column.
+    """
+
+    rows = []
+    try:
+        for values in csv.reader(lines):
+            if not values:
+                continue
+            if columns is None:
+                columns = [value.strip().lower() for value in values]
+                __check_columns(columns)
+                continue
+            rows.append(
+                {column: value for column, value in zip(columns, values) if value}
+            )
+    except csv.Error as e:
+        raise ValueError(f"Malformed CSV: {e}") from e
+    return columns, rows
+
+
+def __check_columns(columns: list[str]):
+    """
+    Check that a trade history file has every required column.
+    Args:
+        columns (list[str]): The lower-case column names of the file.
+    Raises:
+        ValueError: If a required column is missing.
+    """
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+
+def __to_timestamp(value: datetime) -> float:
+    """
+    Convert a Parquet timestamp to a Unix timestamp, reading naive values as UTC.
+    Args:
+        value (datetime): The timestamp.
+    Returns:
+        float: The Unix timestamp.
+    """
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
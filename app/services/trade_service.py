@@ -1,39 +1,602 @@
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator
 from datetime import datetime, timezone
+import heapq
+import time
 import uuid
 
 from motor.motor_asyncio import AsyncIOMotorCollection
+import orjson
+from pydantic import TypeAdapter, ValidationError
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.core.broadcast_hub import BroadcastHub, symbol_topic, user_topic
+from app.core.cache import ReadThroughCache
+from app.core.stream_codec import StreamMessage
+from app.core.write_coalescer import WriteCoalescer
+from app.db.mongo import is_unconfirmed_write
+from app.schemas.trade_schema import TradeFilter, TradeImportRow, TradeResponse
+from app.services.candle_service import CandleService
+from app.services.position_service import PositionService
+from app.services.trade_archive import TradeArchive, trade_sort_key
+
+CURSOR_SEPARATOR = "_"
+# Response field name -> serialized name, e.g. user_id -> userId
+TRADE_RESPONSE_ALIASES = {
+    name: field.serialization_alias or name
+    for name, field in TradeResponse.model_fields.items()
+}
+# Only the response fields are read, so documents can be serialized as
+# they come from the database
+TRADE_PROJECTION = {"_id": 0, **dict.fromkeys(TRADE_RESPONSE_ALIASES, 1)}
+TRADE_SORT = [("timestamp", ASCENDING), ("id", ASCENDING)]
+IMPORT_CHUNK_SIZE = 5000
+MAX_IMPORT_ERRORS = 100
+IMPORT_ROWS_ADAPTER = TypeAdapter(list[TradeImportRow])
+
+
+def encode_cursor(trade: dict) -> str:
+    """
+    Encode the keyset position of a trade into an opaque pagination cursor.
+    Args:
+        trade (dict): The last trade of a page.
+    Returns:
+        str: The cursor pointing right after the trade.
+    """
+
+    return f"{trade['timestamp']!r}{CURSOR_SEPARATOR}{trade['id']}"
+
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    """
+    Decode a pagination cursor produced by `encode_cursor`.
+    Args:
+        cursor (str): The cursor to decode.
+    Returns:
+        tuple[float, str]: The timestamp and ID of the trade the cursor points after.
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+
+    timestamp, separator, trade_id = cursor.partition(CURSOR_SEPARATOR)
+    if not separator or not trade_id:
+        raise ValueError("Invalid cursor")
+    try:
+        return float(timestamp), trade_id
+    except ValueError as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def build_trade_query(
+    user_id: str, filters: TradeFilter | None = None, after: str | None = None
+) -> dict:
+    """
+    Build the MongoDB query for a user's trades.
+    Args:
+        user_id (str): The ID of the user.
+        filters (TradeFilter | None): Optional symbol, action and time range filters.
+        after (str | None): Optional cursor to resume after.
+    Returns:
+        dict: The MongoDB query.
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+
+    query: dict = {"user_id": user_id}
+
+    if filters:
+        if filters.symbol:
+            query["symbol"] = filters.symbol
+        if filters.action:
+            query["action"] = filters.action.value
+
+        time_range = {}
+        if filters.since is not None:
+            time_range["$gte"] = filters.since
+        if filters.until is not None:
+            time_range["$lt"] = filters.until
+        if time_range:
+            query["timestamp"] = time_range
+
+    if after:
+        timestamp, trade_id = decode_cursor(after)
+        query["$or"] = [
+            {"timestamp": {"$gt": timestamp}},
+            {"timestamp": timestamp, "id": {"$gt": trade_id}},
+        ]
+
+    return query
+
+
+def trades_namespace(user_id: str) -> str:
+    """
+    Get the cache namespace of a user's trade pages.
+    Args:
+        user_id (str): The ID of the user.
+    Returns:
+        str: The cache namespace.
+    """
+
+    return f"trades:{user_id}"
+
+
+def merge_trades(archived: list[dict], hot: list[dict]) -> list[dict]:
+    """
+    Merge archived and hot trades, both in listing order, into a
+    single list in listing order.
+    A trade in both tiers, while it is being archived, is only kept once.
+    Args:
+        archived (list[dict]): The archived trades.
+        hot (list[dict]): The trades of the trades collection.
+    Returns:
+        list[dict]: The merged trades.
+    """
+
+    merged = []
+    for trade in heapq.merge(archived, hot, key=trade_sort_key):
+        if not merged or merged[-1]["id"] != trade["id"]:
+            merged.append(trade)
+    return merged
+
+
+def to_trade_payload(trade: dict) -> dict:
+    """
+    Convert a trade document to its serialized response form without validating it.
+    Only for documents this service wrote or validated itself, which always match
+    `TradeResponse`; it is several times faster than validating them again.
+    Args:
+        trade (dict): The trade document.
+    Returns:
+        dict: The trade with the response field names.
+    """
+
+    return {alias: trade[name] for name, alias in TRADE_RESPONSE_ALIASES.items()}
+
+
+def dump_trades_json(trades: list[dict]) -> bytes:
+    """
+    Serialize trade documents to a JSON array of trade responses
+    without validating them.
+    Args:
+        trades (list[dict]): The trade documents, written by this service.
+    Returns:
+        bytes: The JSON array.
+    """
+
+    return orjson.dumps([to_trade_payload(trade) for trade in trades])
+
+
+def publish_trade(hub: BroadcastHub, trade: dict):
+    """
+    Publish a created trade to the stream subscribers of its user and symbol.
+    Trades are executions, not quotes, so they are never conflated: a slow subscriber
+    keeps every pending trade until its queue is full.
+    Args:
+        hub (BroadcastHub): The broadcast hub.
+        trade (dict): The created trade.
+    """
+
+    hub.publish(
+        StreamMessage({"type": "trade", "data": to_trade_payload(trade)}),
+        user_topic(trade["user_id"]),
+        symbol_topic(trade["symbol"]),
+    )
+
+
+class TradeImportAbortedError(ValueError):
+    """Exception raised when a trade history file cannot be imported to its end."""
+
+    def __init__(self, message: str, summary: dict):
+        super().__init__(message)
+        self.summary = summary
+
+    def __str__(self):
+        if not self.summary["accepted"] and not self.summary["rejected"]:
+            return self.args[0]
+        return (
+            f"{self.args[0]} (imported {self.summary['accepted']} trades "
+            f"and rejected {self.summary['rejected']} rows before)"
+        )
 
 
 class TradeService:
     """
     TradeService class to handle trade-related operations.
+    With a cache, the first page of each trade listing is served from it
+    until the user's next trade.
+    With an archive, listings merge the archived trades with those
+    of the trades collection.
+    Listings can read from a differently configured handle of the trades collection than
+    writes, e.g. one preferring secondaries.
     """
 
-    def __init__(self, collection: AsyncIOMotorCollection):
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        candle_service: CandleService | None = None,
+        position_service: PositionService | None = None,
+        write_coalescer: WriteCoalescer | None = None,
+        cache: ReadThroughCache | None = None,
+        archive: TradeArchive | None = None,
+        listing_collection: AsyncIOMotorCollection | None = None,
+    ):
         self.collection = collection
+        self.listing_collection = (
+            listing_collection if listing_collection is not None else collection
+        )
+        self.candle_service = candle_service
+        self.position_service = position_service
+        self.write_coalescer = write_coalescer
+        self.cache = cache
+        self.archive = archive
 
-    async def create_trade(self, trade_data: dict) -> dict:
+    async def create_trade(self, trade_data: dict) -> tuple[dict, bool]:
         """
-        Create a new trade in the database.
+        Create a new trade in the database, apply it to the user's position
+        and aggregate it into the symbol's candles.
+        With a write coalescer, the insert is batched with concurrent ones
+        and still returns only once the trade is acknowledged.
+        A trade written but not confirmed with the write concern in time is on the
+        primary, so it is still applied and returned, rather than retried as a
+        duplicate by a client told it failed.
         Args:
             trade_data (dict): The trade data to create.
         Returns:
-            dict: The created trade data.
+            tuple[dict, bool]: The created trade data, and whether its write was
+            confirmed with the write concern.
+        Raises:
+            PyMongoError: If the trade could not be written.
         """
 
         trade_data["id"] = str(uuid.uuid4())
         trade_data["timestamp"] = datetime.now(tz=timezone.utc).timestamp()
-        await self.collection.insert_one(trade_data)
-        return trade_data
+        confirmed = True
+        try:
+            if self.write_coalescer:
+                await self.write_coalescer.insert(trade_data)
+            else:
+                await self.collection.insert_one(trade_data)
+        except PyMongoError as e:
+            if not is_unconfirmed_write(e):
+                raise
+            confirmed = False
+        await self.apply_trades([trade_data])
+        return trade_data, confirmed
+
+    async def insert_trades(self, trades_data: list[dict]) -> list[dict]:
+        """
+        Write several new trades with a single `insert_many`, all or none of them:
+        if the write fails, the trades it wrote before failing are deleted again.
+        Trades written but not confirmed with the write concern in time are kept.
+        The trades still have to be passed to `apply_trades`.
+        Args:
+            trades_data (list[dict]): The trade data to create.
+        Returns:
+            list[dict]: The created trade data, in order.
+        Raises:
+            PyMongoError: If the trades could not be written.
+        """
+
+        if not trades_data:
+            return []
+        for trade_data in trades_data:
+            trade_data["id"] = str(uuid.uuid4())
+            trade_data["timestamp"] = datetime.now(tz=timezone.utc).timestamp()
+        try:
+            await self.collection.insert_many(trades_data)
+        except PyMongoError as e:
+            if is_unconfirmed_write(e):
+                return trades_data
+            # The insert is ordered, so the trades before the failing one were written
+            await self.collection.delete_many(
+                {
+                    "_id": {
+                        "$in": [trade["_id"] for trade in trades_data if "_id" in trade]
+                    }
+                }
+            )
+            raise
+        return trades_data
+
+    async def apply_trades(self, trades: list[dict]):
+        """
+        Apply written trades to their users' positions and cached listings,
+        and aggregate them into their symbols' candles.
+        Args:
+            trades (list[dict]): The created trades.
+        """
+
+        for trade_data in trades:
+            if self.cache:
+                await self.cache.invalidate(trades_namespace(trade_data["user_id"]))
+            if self.position_service:
+                await self.position_service.apply_trade(trade_data)
+            if self.candle_service:
+                self.candle_service.add_trade(
+                    trade_data["symbol"],
+                    trade_data["timestamp"],
+                    trade_data["price"],
+                    trade_data["amount"],
+                )
+
+    async def import_trades(
+        self,
+        user_id: str,
+        batches: AsyncIterable[list[dict]],
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> dict:
+        """
+        Import a user's trade history from parsed file rows.
+        Rows are validated and written `chunk_size` at a time with unordered
+        `insert_many` calls, and the next chunk is validated while the
+        previous one is being written, so memory stays bounded by two chunks
+        regardless of the size of the file.
+        Invalid rows are skipped and reported. Imported trades are not streamed
+        nor aggregated into the live candles; the user's positions are rebuilt
+        once the import completes, or once it fails after writing some chunks,
+        which then stay imported, even in part.
+        Args:
+            user_id (str): The ID of the user.
+            batches (AsyncIterable[list[dict]]): The rows of the file, in batches.
+            chunk_size (int): The number of rows validated and written at a time.
+        Returns:
+            dict: The accepted and rejected rows, first errors and throughput.
+        Raises:
+            TradeImportAbortedError: If the file cannot be parsed to its end, or a
+            chunk could not be written, with the numbers of rows imported and
+            rejected before.
+        """
+
+        started_at = time.perf_counter()
+        imported_at = datetime.now(tz=timezone.utc).timestamp()
+        summary = {"accepted": 0, "rejected": 0, "errors": []}
+        pending_write = None
+        written = False
+        rows = []
+        first_row = 1
+
+        async def write_chunk(chunk: list[dict]):
+            nonlocal pending_write, written, first_row
+
+            documents, row_numbers = self.__validate_rows(
+                chunk, first_row, user_id, imported_at, summary
+            )
+            first_row += len(chunk)
+            if pending_write:
+                await pending_write
+            # A failed unordered write may still have written part of its chunk
+            written = written or bool(documents)
+            pending_write = asyncio.create_task(
+                self.__insert_documents(documents, row_numbers, summary)
+            )
+
+        try:
+            try:
+                async for batch in batches:
+                    rows.extend(batch)
+                    if len(rows) >= chunk_size:
+                        await write_chunk(rows)
+                        rows = []
+                if rows:
+                    await write_chunk(rows)
+            finally:
+                if pending_write:
+                    await pending_write
+        except ValueError as e:
+            raise TradeImportAbortedError(str(e), summary) from e
+        except PyMongoError as e:
+            raise TradeImportAbortedError(
+                "Failed to write the imported trades", summary
+            ) from e
+        finally:
+            # Chunks written before a failure stay imported
+            if written:
+                if self.cache:
+                    await self.cache.invalidate(trades_namespace(user_id))
+                if self.position_service:
+                    await self.position_service.rebuild(
+                        self.collection, user_id, self.archive
+                    )
+
+        elapsed = time.perf_counter() - started_at
+        summary["elapsed_seconds"] = elapsed
+        summary["rows_per_second"] = (
+            (summary["accepted"] + summary["rejected"]) / elapsed if elapsed else 0.0
+        )
+        return summary
+
+    async def get_trades_by_user(
+        self,
+        user_id: str,
+        filters: TradeFilter | None = None,
+        limit: int = 100,
+        after: str | None = None,
+    ) -> tuple[list, str | None]:
+        """
+        Get a page of trades for a specific user, ordered by timestamp.
+        Pages are keyset-paginated on (timestamp, id), so fetching a page costs
+        the same regardless of how deep into the history it is.
+        Archived trades are merged in, reading only the
+        partitions the page may come from.
+        Args:
+            user_id (str): The ID of the user.
+            filters (TradeFilter | None): Optional symbol, action and time filters.
+            limit (int): The maximum number of trades to return.
+            after (str | None): The cursor returned with the previous page.
+        Returns:
+            tuple[list, str | None]: The trades and the cursor of the next page,
+            or None if this is the last page.
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
 
-    async def get_trades_by_user(self, user_id: str) -> list:
+        if self.cache and after is None:
+            trades, next_cursor = await self.cache.get_or_load(
+                trades_namespace(user_id),
+                f"{limit}:{filters.model_dump_json() if filters else ''}",
+                lambda: self.__load_trades_page(user_id, filters, limit, after),
+            )
+            return trades, next_cursor
+        return await self.__load_trades_page(user_id, filters, limit, after)
+
+    async def iter_trades_by_user(
+        self,
+        user_id: str,
+        filters: TradeFilter | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """
+        Iterate over all trades for a specific user, ordered by timestamp.
+        Documents are pulled from the server `batch_size` at a time, so memory
+        stays constant regardless of the size of the history;
+        archived trades are read one monthly partition at a time.
+        Args:
+            user_id (str): The ID of the user.
+            filters (TradeFilter | None): Optional symbol, action and time filters.
+            batch_size (int): The number of documents fetched per round trip.
+        Yields:
+            dict: The trades of the user.
+        """
+
+        query = build_trade_query(user_id, filters)
+        cursor = (
+            self.listing_collection.find(query, TRADE_PROJECTION)
+            .sort(TRADE_SORT)
+            .batch_size(batch_size)
+        )
+        trades = cursor
+        if self.archive:
+            trades = self.archive.merge_hot_trades(user_id, aiter(cursor), filters)
+        async for trade in trades:
+            yield trade
+
+    async def __load_trades_page(
+        self,
+        user_id: str,
+        filters: TradeFilter | None,
+        limit: int,
+        after: str | None,
+    ) -> tuple[list, str | None]:
+        """
+        Query a page of trades for a specific user.
+        Args:
+            user_id (str): The ID of the user.
+            filters (TradeFilter | None): Optional symbol, action and time filters.
+            limit (int): The maximum number of trades to return.
+            after (str | None): The cursor returned with the previous page.
+        Returns:
+            tuple[list, str | None]: The trades and the next page's cursor, or None.
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+
+        query = build_trade_query(user_id, filters, after)
+        cursor = (
+            self.listing_collection.find(query, TRADE_PROJECTION)
+            .sort(TRADE_SORT)
+            .limit(limit + 1)
+        )
+        trades = await cursor.to_list(length=limit + 1)
+        if self.archive:
+            archived = await self.archive.load_trades(
+                user_id, filters, decode_cursor(after) if after else None, limit + 1
+            )
+            trades = merge_trades(archived, trades)[: limit + 1]
+
+        if len(trades) <= limit:
+            return trades, None
+        trades = trades[:limit]
+        return trades, encode_cursor(trades[-1])
+
+    async def __insert_documents(
+        self, documents: list[dict], row_numbers: list[int], summary: dict
+    ):
+        """
+        Write a chunk of imported trades, counting the rows rejected by the database.
+        Args:
+            documents (list[dict]): The trades to write.
+            row_numbers (list[int]): The file row of each trade.
+            summary (dict): The import summary to update.
+        Raises:
+            PyMongoError: If the chunk could not be written at all.
+        """
+
+        if not documents:
+            return
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+            summary["accepted"] += len(documents)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            summary["accepted"] += len(documents) - len(write_errors)
+            summary["rejected"] += len(write_errors)
+            for write_error in write_errors:
+                TradeService.__add_import_error(
+                    summary,
+                    row_numbers[write_error["index"]],
+                    write_error.get("errmsg", ""),
+                )
+
+    @staticmethod
+    def __validate_rows(
+        rows: list[dict],
+        first_row: int,
+        user_id: str,
+        imported_at: float,
+        summary: dict,
+    ) -> tuple[list[dict], list[int]]:
         """
-        Get all trades for a specific user.
+        Validate a chunk of imported rows with the trade creation rules.
+        The whole chunk is validated at once, and only re-validated
+        row by row if it has errors.
         Args:
+            rows (list[dict]): The rows to validate.
+            first_row (int): The file row of the first row of the chunk.
             user_id (str): The ID of the user.
+            imported_at (float): The timestamp of rows without one.
+            summary (dict): The import summary to update with the rejected rows.
         Returns:
-            list: A list of trades for the user.
+            tuple[list[dict], list[int]]: The trades to write and their file rows.
+        """
+
+        try:
+            trades = list(enumerate(IMPORT_ROWS_ADAPTER.validate_python(rows)))
+        except ValidationError:
+            trades = []
+            for index, row in enumerate(rows):
+                try:
+                    trades.append((index, TradeImportRow.model_validate(row)))
+                except ValidationError as e:
+                    summary["rejected"] += 1
+                    TradeService.__add_import_error(
+                        summary,
+                        first_row + index,
+                        "; ".join(
+                            f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                            for error in e.errors()
+                        ),
+                    )
+
+        documents = []
+        for _, trade in trades:
+            document = trade.model_dump()
+            document["id"] = str(uuid.uuid4())
+            document["user_id"] = user_id
+            if document["timestamp"] is None:
+                document["timestamp"] = imported_at
+            documents.append(document)
+        return documents, [first_row + index for index, _ in trades]
+
+    @staticmethod
+    def __add_import_error(summary: dict, row: int, message: str):
+        """
+        Record a rejected row, keeping only the first MAX_IMPORT_ERRORS.
+        Args:
+            summary (dict): The import summary to update.
+            row (int): The file row.
+            message (str): The reason the row was rejected.
         """
 
-        trades = await self.collection.find({"user_id": user_id}).to_list(length=None)
-        return trades
+        if len(summary["errors"]) < MAX_IMPORT_ERRORS:
+            summary["errors"].append({"row": row, "message": message})
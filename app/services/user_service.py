@@ -1,6 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorCollection
-from passlib.context import CryptContext
+from pymongo.errors import DuplicateKeyError
 
+from app.core.password_hasher import PasswordHasher
 from app.schemas.user_schema import UserCreate, UserLogin
 
 
@@ -18,9 +19,11 @@ class DuplicateUserError(Exception):
 class UserService:
     """Service for user-related operations."""
 
-    def __init__(self, collection: AsyncIOMotorCollection, pwd_context: CryptContext):
+    def __init__(
+        self, collection: AsyncIOMotorCollection, password_hasher: PasswordHasher
+    ):
         self.collection = collection
-        self.__pwd_context = pwd_context
+        self.__password_hasher = password_hasher
 
     async def authenticate_user(self, user: UserLogin):
         """
@@ -29,6 +32,7 @@ class UserService:
             user (UserLogin): The user data to authenticate.
         Raises:
             ValueError: If the username or password is incorrect.
+            PasswordHasherBusyError: If the password hashing queue is full.
         """
 
         db_user = await self.collection.find_one({"username": user.username})
@@ -36,45 +40,33 @@ class UserService:
         if not db_user:
             raise ValueError("Incorrect username or password")
 
-        if not self.__pwd_context.verify(user.password, db_user["password"]):
+        if not await self.__password_hasher.verify(user.password, db_user["password"]):
             raise ValueError("Incorrect username or password")
 
     async def create_user(self, user: UserCreate):
         """
         Create a new user in the database.
+        Duplicates are detected by the unique username and email indexes,
+        so the check and the insert happen in a single write.
         Args:
             user (UserCreate): The user data to create.
         Returns:
             Any: The ID of the created user.
         Raises:
             DuplicateUserError: If a user with the same username or email already exists.
+            PasswordHasherBusyError: If the password hashing queue is full.
         """
 
-        if await self.__check_user_exists(user.username, user.email):
-            raise DuplicateUserError(user.username, user.email)
-
-        hashed_password = self.__pwd_context.hash(user.password)
+        hashed_password = await self.__password_hasher.hash(user.password)
         user_doc = {
             "username": user.username,
             "email": user.email,
             "password": hashed_password,
             "full_name": user.full_name,
         }
-        result = await self.collection.insert_one(user_doc)
+        try:
+            result = await self.collection.insert_one(user_doc)
+        except DuplicateKeyError as e:
+            raise DuplicateUserError(user.username, user.email) from e
 
         return result.inserted_id
-
-    async def __check_user_exists(self, username, email):
-        """
-        Check if a user with the given username or email already exists in the database.
-        Args:
-            username (str): The username to check.
-            email (str): The email to check.
-        Returns:
-            bool: True if the user exists, False otherwise.
-        """
-
-        user = await self.collection.find_one(
-            {"$or": [{"username": username}, {"email": email}]}
-        )
-        return user is not None
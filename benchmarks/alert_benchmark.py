@@ -0,0 +1,122 @@
+"""
+Benchmark of the price alert indexes.
+Arms N alert rules spread around the prices of a few symbols, replays random-walk ticks,
+and compares the indexed check with scanning every rule of the symbol on each tick.
+
+Usage:
+    python -m benchmarks.alert_benchmark [--rules N] [--ticks N] [--batch-size N]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.services.alert_service import AlertService
+
+SYMBOLS = ["BTC", "ETH", "SOL", "ADA", "DOT"]
+START_PRICE = 100.0
+
+
+def __build_rules(count: int) -> list[dict]:
+    """
+    Build alert rules with thresholds spread within 20% of the start price.
+    Args:
+        count (int): The number of rules to build.
+    Returns:
+        list[dict]: The rule documents.
+    """
+
+    rng = np.random.default_rng(42)
+    symbols = rng.integers(0, len(SYMBOLS), count)
+    thresholds = START_PRICE * rng.uniform(0.8, 1.2, count)
+    directions = np.where(thresholds > START_PRICE, "above", "below")
+    return [
+        {
+            "id": str(i),
+            "user_id": f"user-{i % 10_000}",
+            "symbol": SYMBOLS[symbols[i]],
+            "direction": str(directions[i]),
+            "threshold": float(thresholds[i]),
+            "created_at": 0.0,
+            "triggered_at": None,
+            "triggered_price": None,
+        }
+        for i in range(count)
+    ]
+
+
+def __scan(rules: list[dict], previous: float, price: float) -> int:
+    """
+    Find the rules crossed by a price move by scanning all of them.
+    Args:
+        rules (list[dict]): The rules of the symbol.
+        previous (float): The previous price.
+        price (float): The new price.
+    Returns:
+        int: The number of rules crossed.
+    """
+
+    return sum(
+        1
+        for rule in rules
+        if (rule["direction"] == "above" and previous < rule["threshold"] <= price)
+        or (rule["direction"] == "below" and price <= rule["threshold"] < previous)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rules", type=int, default=1_000_000)
+    parser.add_argument("--ticks", type=int, default=1_000_000)
+    parser.add_argument(
+        "--batch-size", type=int, default=10, help="Ticks per symbol batch"
+    )
+    args = parser.parse_args()
+
+    rules = __build_rules(args.rules)
+    alert_service = AlertService(collection=None)
+    started_at = time.perf_counter()
+    alert_service.arm_many(rules)
+    print(f"armed {args.rules:,} rules in {time.perf_counter() - started_at:.2f} s")
+
+    rng = np.random.default_rng(7)
+    batch_count = args.ticks // args.batch_size
+    steps = rng.normal(0, 0.0005, (batch_count, args.batch_size))
+    prices = {symbol: START_PRICE for symbol in SYMBOLS}
+
+    latencies = []
+    started_at = time.perf_counter()
+    for i in range(batch_count):
+        symbol = SYMBOLS[i % len(SYMBOLS)]
+        batch = (prices[symbol] * np.exp(np.cumsum(steps[i]))).tolist()
+        prices[symbol] = batch[-1]
+
+        checked_at = time.perf_counter_ns()
+        alert_service.check(symbol, batch)
+        latencies.append(time.perf_counter_ns() - checked_at)
+    elapsed = time.perf_counter() - started_at
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"indexed check: {batch_count * args.batch_size / elapsed:,.0f} ticks/s, "
+        f"{alert_service.fired:,} alerts fired, "
+        f"{alert_service.armed_count:,} still armed"
+    )
+    print(
+        f"per batch of {args.batch_size} ticks: p50 {quantiles[49] / 1000:.1f} us, "
+        f"p99 {quantiles[98] / 1000:.1f} us"
+    )
+
+    symbol_rules = [rule for rule in rules if rule["symbol"] == SYMBOLS[0]]
+    started_at = time.perf_counter()
+    __scan(symbol_rules, START_PRICE, START_PRICE * 1.001)
+    print(
+        f"full scan of the {len(symbol_rules):,} {SYMBOLS[0]} rules: "
+        f"{(time.perf_counter() - started_at) * 1000:.1f} ms per tick"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Benchmark of the portfolio analytics paths.
+Compares a plain Python loop over trade dicts with the columnar NumPy aggregation,
+and, when a MongoDB URI is given, the end-to-end NumPy path
+against the `$group` pushdown.
+
+Usage:
+    python -m benchmarks.analytics_benchmark [--trades N] [--mongodb-uri URI]
+"""
+
+import argparse
+import asyncio
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+import numpy as np
+
+from app.services.analytics_service import (
+    ANALYTICS_BATCH_SIZE,
+    AnalyticsService,
+    aggregate_columns,
+    concatenate_columns,
+    summarize,
+    to_columns,
+)
+
+SYMBOLS = ["BTC", "ETH", "SOL", "ADA", "DOT", "XRP", "LTC", "DOGE"]
+USER_ID = "benchmark_user"
+
+
+def __build_trades(count: int) -> list[dict]:
+    """
+    Build synthetic trade documents, ordered by timestamp.
+    Args:
+        count (int): The number of trades to build.
+    Returns:
+        list[dict]: The trades.
+    """
+
+    rng = np.random.default_rng(42)
+    symbols = rng.choice(SYMBOLS, count)
+    actions = rng.choice(["buy", "sell"], count)
+    amounts = rng.uniform(0.01, 10, count)
+    prices = rng.uniform(10, 1000, count)
+    return [
+        {
+            "id": str(i),
+            "user_id": USER_ID,
+            "symbol": str(symbols[i]),
+            "action": str(actions[i]),
+            "amount": float(amounts[i]),
+            "price": float(prices[i]),
+            "timestamp": 1_700_000_000.0 + i,
+        }
+        for i in range(count)
+    ]
+
+
+def __python_loop(trades: list[dict]) -> dict:
+    """
+    Compute per-symbol VWAP, exposure and imbalance with a plain Python loop.
+    Args:
+        trades (list[dict]): The trades, ordered by timestamp.
+    Returns:
+        dict: Per-symbol VWAP, exposure and imbalance.
+    """
+
+    sums = {}
+    for trade in trades:
+        symbol_sums = sums.setdefault(trade["symbol"], [0.0, 0.0, 0.0, 0.0, 0.0])
+        notional = trade["amount"] * trade["price"]
+        symbol_sums[0] += trade["amount"]
+        symbol_sums[1] += notional
+        if trade["action"] == "buy":
+            symbol_sums[2] += notional
+            symbol_sums[3] += trade["amount"]
+        else:
+            symbol_sums[3] -= trade["amount"]
+        symbol_sums[4] = trade["price"]
+
+    return {
+        symbol: {
+            "vwap": notional / volume,
+            "exposure": net_quantity * last_price,
+            "imbalance": (2 * buy_notional - notional) / notional,
+        }
+        for symbol, (
+            volume,
+            notional,
+            buy_notional,
+            net_quantity,
+            last_price,
+        ) in sums.items()
+    }
+
+
+def __vectorized(trades: list[dict]) -> dict:
+    """
+    Convert trade dicts to columns and compute the analytics with NumPy.
+    Args:
+        trades (list[dict]): The trades, ordered by timestamp.
+    Returns:
+        dict: Portfolio totals and per-symbol analytics.
+    """
+
+    return summarize(aggregate_columns(to_columns(trades)))
+
+
+def __vectorized_in_batches(trades: list[dict]) -> dict:
+    """
+    Convert trade dicts to columns one batch at a time, as `load_columns` does,
+    and compute the analytics with NumPy.
+    Args:
+        trades (list[dict]): The trades, ordered by timestamp.
+    Returns:
+        dict: Portfolio totals and per-symbol analytics.
+    """
+
+    chunks = [
+        to_columns(trades[i : i + ANALYTICS_BATCH_SIZE])
+        for i in range(0, len(trades), ANALYTICS_BATCH_SIZE)
+    ]
+    return summarize(aggregate_columns(concatenate_columns(chunks)))
+
+
+def __time(func, *args) -> float:
+    """
+    Time a single call of a function.
+    Args:
+        func (Callable): The function to call.
+        *args: The arguments to pass to the function.
+    Returns:
+        float: The elapsed time in milliseconds.
+    """
+
+    started_at = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - started_at) * 1000
+
+
+async def __measure_database(uri: str, trades: list[dict]) -> tuple[float, float]:
+    """
+    Time both AnalyticsService paths against a scratch MongoDB collection.
+    Args:
+        uri (str): The MongoDB connection URI.
+        trades (list[dict]): The trades to load into the scratch collection.
+    Returns:
+        tuple[float, float]: The NumPy and pushdown timings, in milliseconds.
+    """
+
+    client = AsyncIOMotorClient(uri)
+    collection = client["benchmark"]["analytics_trades"]
+    await collection.drop()
+    await collection.insert_many([dict(trade) for trade in trades])
+    await collection.create_index([("user_id", 1), ("timestamp", 1), ("id", 1)])
+
+    analytics_service = AnalyticsService(collection)
+    timings = []
+    for pushdown in (False, True):
+        started_at = time.perf_counter()
+        await analytics_service.get_analytics(USER_ID, pushdown=pushdown)
+        timings.append((time.perf_counter() - started_at) * 1000)
+
+    await collection.drop()
+    client.close()
+    return timings[0], timings[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trades", type=int, default=500_000)
+    parser.add_argument(
+        "--mongodb-uri", help="Also benchmark against this MongoDB server"
+    )
+    args = parser.parse_args()
+
+    trades = __build_trades(args.trades)
+    columns = to_columns(trades)
+
+    print(f"{args.trades:,} trades")
+    print(f"python loop over dicts:      {__time(__python_loop, trades):9.1f} ms")
+    print(f"dicts to columns + numpy:    {__time(__vectorized, trades):9.1f} ms")
+    print(
+        f"batched columns + numpy:     "
+        f"{__time(__vectorized_in_batches, trades):9.1f} ms"
+    )
+    print(
+        f"numpy on loaded columns:     "
+        f"{__time(lambda: summarize(aggregate_columns(columns))):9.1f} ms"
+    )
+
+    if args.mongodb_uri:
+        numpy_ms, pushdown_ms = asyncio.run(
+            __measure_database(args.mongodb_uri, trades)
+        )
+        print(f"mongo load + numpy:          {numpy_ms:9.1f} ms")
+        print(f"mongo $group pushdown:       {pushdown_ms:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Benchmark of the trade archive.
+Fills the in-memory trades collection of `benchmarks.memory_mongo` with two years
+of trades per user, archives those older than a cutoff to Parquet files in a
+temporary local directory, and checks that paginated listings, time-range filtered
+listings, exports, analytics and backtest trade prices return exactly the same
+results as before archiving.
+Reports the archival throughput, the compressed size of the archive, and the latency
+of listing pages served from the hot tier and the cold tier.
+
+Usage:
+    python -m benchmarks.archive_benchmark [--users N] [--trades N]
+        [--archive-months N] [--limit N]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from pymongo import ASCENDING, IndexModel
+
+from app.schemas.trade_schema import TradeFilter
+from app.services.analytics_service import AnalyticsService
+from app.services.backtest_service import BacktestService
+from app.services.trade_archive import create_trade_archive, month_range
+from app.services.trade_service import TradeService
+from benchmarks.memory_mongo import MemoryCollection
+
+START_MONTH = "2024-01"
+MONTHS = 24
+SYMBOLS = ["BTC", "ETH", "SOL", "ADA"]
+
+
+async def __fill(collection: MemoryCollection, users: int, trades: int):
+    """
+    Insert trades spread evenly over MONTHS months from START_MONTH.
+    Args:
+        collection (MemoryCollection): The trades collection.
+        users (int): The number of users.
+        trades (int): The number of trades per user.
+    """
+
+    await collection.create_indexes(
+        [
+            IndexModel(
+                [("user_id", ASCENDING), ("timestamp", ASCENDING), ("id", ASCENDING)],
+                name="t",
+            )
+        ]
+    )
+    rng = random.Random(42)
+    start = month_range(START_MONTH)[0]
+    step = MONTHS * 30 * 86400 / trades
+    for user in range(users):
+        await collection.insert_many(
+            [
+                {
+                    "action": rng.choice(["buy", "sell"]),
+                    "amount": round(rng.uniform(0.1, 5), 4),
+                    "price": round(rng.uniform(10, 60_000), 2),
+                    "symbol": rng.choice(SYMBOLS),
+                    "id": f"{user:04d}-{i:08d}",
+                    "user_id": f"user_{user}",
+                    "timestamp": start + i * step + rng.random(),
+                }
+                for i in range(trades)
+            ]
+        )
+
+
+async def __list_all(
+    trade_service: TradeService, user_id: str, filters: TradeFilter | None, limit: int
+) -> tuple[list[dict], list[float]]:
+    """
+    Walk every page of a user's trade listing.
+    Args:
+        trade_service (TradeService): The trade service.
+        user_id (str): The ID of the user.
+        filters (TradeFilter | None): The listing filters.
+        limit (int): The page size.
+    Returns:
+        tuple[list[dict], list[float]]: The trades, and each page's latency in seconds.
+    """
+
+    trades, latencies, cursor = [], [], None
+    while True:
+        started_at = time.perf_counter()
+        page, cursor = await trade_service.get_trades_by_user(
+            user_id, filters, limit, cursor
+        )
+        latencies.append(time.perf_counter() - started_at)
+        trades.extend(page)
+        if cursor is None:
+            return trades, latencies
+
+
+def __percentiles(latencies: list[float]) -> str:
+    """
+    Format the p50 and p95 of latencies.
+    Args:
+        latencies (list[float]): The latencies, in seconds.
+    Returns:
+        str: The percentiles in milliseconds.
+    """
+
+    quantiles = (
+        statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    )
+    return f"p50 {quantiles[49] * 1000:6.2f} ms, p95 {quantiles[94] * 1000:6.2f} ms"
+
+
+async def __run(args: argparse.Namespace):
+    collection = MemoryCollection("trades")
+    await __fill(collection, args.users, args.trades)
+    user_ids = [f"user_{user}" for user in range(args.users)]
+    cutoff_month = (
+        f"{2024 + args.archive_months // 12}-{args.archive_months % 12 + 1:02d}"
+    )
+    cutoff = month_range(cutoff_month)[0]
+    filter_ranges = [
+        TradeFilter(since=cutoff - 45 * 86400, until=cutoff + 45 * 86400),
+        TradeFilter(symbol="BTC", until=cutoff - 200 * 86400),
+    ]
+
+    hot_service = TradeService(collection)
+    expected = {}
+    expected_analytics = {}
+    for user_id in user_ids:
+        expected[user_id] = [
+            (await __list_all(hot_service, user_id, None, args.limit))[0]
+        ]
+        for filters in filter_ranges:
+            expected[user_id].append(
+                (await __list_all(hot_service, user_id, filters, args.limit))[0]
+            )
+        # The in-memory database has no aggregation pipelines
+        expected_analytics[user_id] = await AnalyticsService(collection).get_analytics(
+            user_id, pushdown=False
+        )
+    expected_prices = await BacktestService(collection, None).load_trade_prices("BTC")
+
+    with tempfile.TemporaryDirectory() as directory:
+        archive = create_trade_archive(directory)
+        started_at = time.perf_counter()
+        summary = await archive.archive(collection, cutoff)
+        elapsed = time.perf_counter() - started_at
+        size = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(directory)
+            for name in names
+        )
+        print(
+            f"Archived {summary['trades']:,} trades before {cutoff_month} "
+            f"of {summary['users']} users into {summary['files']} files "
+            f"in {elapsed:.2f}s "
+            f"({summary['trades'] / elapsed:,.0f} trades/s), {size / 1e6:.2f} MB "
+            f"({size / summary['trades']:.1f} bytes/trade)"
+        )
+
+        trade_service = TradeService(collection, archive=archive)
+        cold_latencies, hot_latencies = [], []
+        for user_id in user_ids:
+            trades, latencies = await __list_all(
+                trade_service, user_id, None, args.limit
+            )
+            assert trades == expected[user_id][0], f"listing of {user_id} differs"
+            for page, latency in zip(range(0, len(trades), args.limit), latencies):
+                (
+                    cold_latencies
+                    if trades[page]["timestamp"] < cutoff
+                    else hot_latencies
+                ).append(latency)
+            for filters, filtered in zip(filter_ranges, expected[user_id][1:]):
+                trades, _ = await __list_all(
+                    trade_service, user_id, filters, args.limit
+                )
+                assert trades == filtered, f"filtered listing of {user_id} differs"
+            exported = [
+                trade async for trade in trade_service.iter_trades_by_user(user_id)
+            ]
+            assert exported == expected[user_id][0], f"export of {user_id} differs"
+            analytics_service = AnalyticsService(collection, archive)
+            analytics = await analytics_service.get_analytics(user_id)
+            assert analytics == expected_analytics[user_id], "analytics differ"
+        backtest_service = BacktestService(collection, None, archive)
+        prices = await backtest_service.load_trade_prices("BTC")
+        for array, expected_array in zip(prices, expected_prices):
+            assert np.array_equal(array, expected_array), "backtest trade prices differ"
+
+        print(f"Listing pages from the hot tier:  {__percentiles(hot_latencies)}")
+        print(f"Listing pages from the cold tier: {__percentiles(cold_latencies)}")
+        print(
+            "Listings, filtered listings, exports, analytics and backtest trade prices "
+            "match the pre-archive results"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--trades", type=int, default=20_000)
+    parser.add_argument("--archive-months", type=int, default=18)
+    parser.add_argument("--limit", type=int, default=500)
+    args = parser.parse_args()
+
+    asyncio.run(__run(args))
+
+
+if __name__ == "__main__":
+    main()
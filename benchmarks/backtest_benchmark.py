@@ -0,0 +1,92 @@
+"""
+Benchmark of the backtesting engine.
+Compares a per-bar Python loop with the vectorized engine on a single backtest,
+then measures parameter sweep throughput with one and several worker processes.
+
+Usage:
+    python -m benchmarks.backtest_benchmark [--prices N] [--workers N]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from app.core.backtesting import run_backtest, sma_crossover
+from app.core.parameter_sweep import run_sweep
+
+FEE_RATE = 0.001
+SWEEP_GRID = {"fast": [5, 10, 15, 20, 30, 40], "slow": [50, 100, 150, 200, 300, 400]}
+
+
+def __python_loop(prices: list[float], fast: int, slow: int) -> float:
+    """
+    Backtest an SMA crossover with a plain Python loop over the bars.
+    Args:
+        prices (list[float]): The price series.
+        fast (int): The period of the fast average.
+        slow (int): The period of the slow average.
+    Returns:
+        float: The total return.
+    """
+
+    equity, position = 1.0, 0.0
+    fast_sum = slow_sum = 0.0
+    for i, price in enumerate(prices[:-1]):
+        fast_sum += price - (prices[i - fast] if i >= fast else 0.0)
+        slow_sum += price - (prices[i - slow] if i >= slow else 0.0)
+        target = 1.0 if i >= slow - 1 and fast_sum / fast > slow_sum / slow else 0.0
+        equity *= 1.0 - FEE_RATE * abs(target - position)
+        position = target
+        equity *= 1.0 + position * (prices[i + 1] / price - 1.0)
+    return equity - 1.0
+
+
+def __time(func, *args, **kwargs) -> float:
+    """
+    Time a single call of a function.
+    Args:
+        func (Callable): The function to call.
+        *args: The arguments to pass to the function.
+        **kwargs: The keyword arguments to pass to the function.
+    Returns:
+        float: The elapsed time in seconds.
+    """
+
+    started_at = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prices", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, args.prices)))
+    print(f"{args.prices:,} prices, {os.cpu_count()} CPUs")
+
+    loop_seconds = __time(__python_loop, prices.tolist(), 10, 100)
+    vectorized_seconds = __time(
+        lambda: run_backtest(prices, sma_crossover(prices, 10, 100), FEE_RATE)
+    )
+    print(f"single backtest, python loop:  {loop_seconds * 1000:9.1f} ms")
+    print(f"single backtest, vectorized:   {vectorized_seconds * 1000:9.1f} ms")
+
+    combinations = len(SWEEP_GRID["fast"]) * len(SWEEP_GRID["slow"])
+    for workers in sorted({1, args.workers}):
+        seconds = __time(
+            run_sweep, prices, "sma_crossover", SWEEP_GRID, FEE_RATE, workers=workers
+        )
+        print(
+            f"sweep of {combinations} backtests, {workers} workers: {seconds:6.2f} s "
+            f"({combinations / seconds:.1f} backtests/s, "
+            f"{combinations * args.prices / seconds / 1e6:.1f}M bars/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
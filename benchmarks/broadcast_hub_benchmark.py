@@ -0,0 +1,92 @@
+"""
+Benchmark of the BroadcastHub fan-out latency.
+Subscribes N consumers to one topic, publishes timestamped messages, and measures
+the time from publish until each consumer has received the message.
+
+Usage:
+    python -m benchmarks.broadcast_hub_benchmark [--connections
+        1000 10000] [--messages N]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.broadcast_hub import BroadcastHub, Subscription
+
+TOPIC = "benchmark"
+MAX_QUEUE_SIZE = 10
+
+
+async def __consume(subscription: Subscription, messages: int, latencies: list):
+    """
+    Receive a number of messages and record their publish-to-receive latency.
+    Args:
+        subscription (Subscription): The subscription to read from.
+        messages (int): The number of messages to receive.
+        latencies (list): The list to append latencies (in seconds) to.
+    """
+
+    for _ in range(messages):
+        published_at = await subscription.get()
+        latencies.append(time.perf_counter() - published_at)
+
+
+async def __measure(connections: int, messages: int) -> dict:
+    """
+    Measure fan-out latency for a number of concurrent subscribers.
+    Args:
+        connections (int): The number of subscribers.
+        messages (int): The number of messages to publish.
+    Returns:
+        dict: Publish cost and delivery latency percentiles, in microseconds.
+    """
+
+    hub = BroadcastHub()
+    latencies = []
+    publish_seconds = []
+    subscriptions = [hub.subscribe([TOPIC], MAX_QUEUE_SIZE) for _ in range(connections)]
+    consumers = [
+        asyncio.create_task(__consume(subscription, messages, latencies))
+        for subscription in subscriptions
+    ]
+    await asyncio.sleep(0)
+
+    for _ in range(messages):
+        started_at = time.perf_counter()
+        hub.publish(started_at, TOPIC)
+        publish_seconds.append(time.perf_counter() - started_at)
+        # Let every consumer drain the message before publishing the next one
+        await asyncio.sleep(0)
+
+    await asyncio.gather(*consumers)
+    for subscription in subscriptions:
+        hub.unsubscribe(subscription)
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "publish_us": statistics.mean(publish_seconds) * 1_000_000,
+        "p50_us": quantiles[49] * 1_000_000,
+        "p99_us": quantiles[98] * 1_000_000,
+        "max_us": max(latencies) * 1_000_000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--messages", type=int, default=50)
+    args = parser.parse_args()
+
+    for connections in args.connections:
+        result = asyncio.run(__measure(connections, args.messages))
+        print(
+            f"{connections:>6} connections: publish {result['publish_us']:9.1f} us, "
+            f"delivery p50 {result['p50_us']:9.1f} us, p99 {result['p99_us']:9.1f} us, "
+            f"max {result['max_us']:9.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
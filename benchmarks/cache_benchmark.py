@@ -0,0 +1,119 @@
+"""
+Benchmark of the read-through cache in front of dashboard polling.
+Simulates dashboards polling the first trade page of a set of users while bots keep
+trading, against a simulated database query latency, and compares no cache with the
+local tier alone and with the local tier over the in-memory Redis stand-in. After every
+write, the next read of the same user is checked to include it.
+
+Usage:
+    python -m benchmarks.cache_benchmark [--users N] [--polls N]
+        [--write-ratio R] [--query-ms N]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.core.cache import MemoryCacheBackend, ReadThroughCache
+
+CONCURRENCY = 200
+
+
+async def __run(args: argparse.Namespace, cache: ReadThroughCache | None) -> dict:
+    """
+    Run the polling workload.
+    Args:
+        args (argparse.Namespace): The workload parameters.
+        cache (ReadThroughCache | None): The cache, or None to query on every poll.
+    Returns:
+        dict: Throughput, database queries and latency percentiles.
+    """
+
+    rng = random.Random(42)
+    trade_counts = [0] * args.users
+    queries = 0
+    latencies = []
+
+    async def load_page(user: int) -> int:
+        nonlocal queries
+        queries += 1
+        count = trade_counts[user]
+        await asyncio.sleep(args.query_ms / 1000)
+        return count
+
+    async def worker(operations: list[tuple[int, bool]]):
+        for user, is_write in operations:
+            started_at = time.perf_counter()
+            if is_write:
+                trade_counts[user] += 1
+                if cache:
+                    await cache.invalidate(f"trades:{user}")
+                continue
+            expected = trade_counts[user]
+            if cache:
+                count = await cache.get_or_load(
+                    f"trades:{user}", "first-page", lambda: load_page(user)
+                )
+            else:
+                count = await load_page(user)
+            assert count >= expected, "read missed a completed write"
+            latencies.append(time.perf_counter() - started_at)
+
+    # Zipf-like popularity: a few users are watched by many dashboards
+    weights = [1 / (rank + 1) for rank in range(args.users)]
+    operations = [
+        (rng.choices(range(args.users), weights)[0], rng.random() < args.write_ratio)
+        for _ in range(args.polls)
+    ]
+    started_at = time.perf_counter()
+    await asyncio.gather(
+        *(worker(operations[i::CONCURRENCY]) for i in range(CONCURRENCY))
+    )
+    elapsed = time.perf_counter() - started_at
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "polls_per_second": len(latencies) / elapsed,
+        "queries": queries,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "stats": cache.get_stats() if cache else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--polls", type=int, default=100_000)
+    parser.add_argument("--write-ratio", type=float, default=0.02)
+    parser.add_argument("--query-ms", type=float, default=2.0)
+    parser.add_argument("--ttl-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    configurations = {
+        "no cache": None,
+        "local": ReadThroughCache(10_000, args.ttl_seconds),
+        "local + memory": ReadThroughCache(
+            10_000, args.ttl_seconds, MemoryCacheBackend()
+        ),
+    }
+    for name, cache in configurations.items():
+        result = asyncio.run(__run(args, cache))
+        line = (
+            f"{name:>15}: {result['polls_per_second']:>9,.0f} polls/s, "
+            f"{result['queries']:>7,} queries, "
+            f"p50 {result['p50_ms']:6.2f} ms, p99 {result['p99_ms']:6.2f} ms"
+        )
+        if result["stats"]:
+            stats = result["stats"]
+            line += (
+                f", hit ratio {stats['hit_ratio']:.3f} "
+                f"({stats['coalesced']:,} coalesced loads)"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
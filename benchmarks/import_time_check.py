@@ -0,0 +1,107 @@
+"""
+Import-time budget check of the application.
+Imports `app.main` in fresh interpreters with `-X importtime`, without any configuration
+and outside the repository (so `app/.env` is not read), and fails if the import
+takes longer than the budget, reads the settings, creates a database client, or
+loads a module that is only needed by optional features. Prints the slowest imports
+to help find regressions.
+
+Usage:
+    python -m benchmarks.import_time_check [--budget-ms N] [--repeat N] [--top N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+DEFAULT_BUDGET_MS = 1500
+# Heavy modules only imported by the features that need them
+LAZY_MODULES = ("pyarrow", "redis")
+IMPORT_SCRIPT = """
+import app.main
+import app.config
+import app.db.mongo
+
+assert app.db.mongo.client is None, "a database client was created at import time"
+assert (
+    app.config.get_app_settings.cache_info().currsize == 0
+), "settings were read at import time"
+"""
+
+
+def __measure(repository: str) -> dict[str, tuple[int, int]]:
+    """
+    Import the application in a fresh interpreter, with an empty environment.
+    Args:
+        repository (str): The root of the repository.
+    Returns:
+        dict[str, tuple[int, int]]: The self and cumulative µs of each module.
+    Raises:
+        RuntimeError: If the import fails.
+    """
+
+    env = {"PATH": os.environ.get("PATH", ""), "PYTHONPATH": repository}
+    with tempfile.TemporaryDirectory() as directory:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT],
+            cwd=directory,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    repository = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        # The fastest run is the least disturbed by the rest of the machine
+        modules = min(
+            (__measure(repository) for _ in range(args.repeat)),
+            key=lambda modules: modules["app.main"][1],
+        )
+    except RuntimeError as e:
+        sys.exit(f"FAIL: importing the application failed: {e}")
+
+    total_ms = modules["app.main"][1] / 1000
+    print(f"import app.main: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print("Slowest imports (cumulative):")
+    top_level = [
+        (cumulative, name)
+        for name, (_, cumulative) in modules.items()
+        if name != "app.main" and (name.startswith("app.") or "." not in name)
+    ]
+    for cumulative, name in sorted(top_level, reverse=True)[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = [
+        f"{module} is imported eagerly" for module in LAZY_MODULES if module in modules
+    ]
+    if total_ms > args.budget_ms:
+        failures.append(
+            f"import took {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget"
+        )
+    if failures:
+        sys.exit("FAIL: " + "; ".join(failures))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark of the technical indicators.
+Times every batch indicator over a long random-walk price series, then the streaming
+indicators fed one bar at a time, and checks that both modes agree.
+
+Usage:
+    python -m benchmarks.indicator_benchmark [--points N]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.core import indicators
+from app.core.indicators import StreamingIndicators, compute_indicators
+
+# Relative to the price level, since oscillators like the MACD hover around zero
+RELATIVE_TOLERANCE = 1e-9
+
+
+def __build_bars(count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build a synthetic random-walk series of bars.
+    Args:
+        count (int): The number of bars to build.
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: The highs, lows and closes.
+    """
+
+    rng = np.random.default_rng(42)
+    closes = 30_000 + np.cumsum(rng.normal(0, 25, count))
+    highs = closes + rng.uniform(0, 20, count)
+    lows = closes - rng.uniform(0, 20, count)
+    return highs, lows, closes
+
+
+def __time(func, *args) -> float:
+    """
+    Time a single call of a function.
+    Args:
+        func (Callable): The function to call.
+        *args: The arguments to pass to the function.
+    Returns:
+        float: The elapsed time in milliseconds.
+    """
+
+    started_at = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - started_at) * 1000
+
+
+def __check_agreement(
+    batch: dict[str, np.ndarray], streamed: list[dict[str, float]], price_level: float
+):
+    """
+    Check that the streaming indicators match the batch ones.
+    Args:
+        batch (dict[str, np.ndarray]): The batch indicator series.
+        streamed (list[dict[str, float]]): The streaming indicator values, one per bar.
+        price_level (float): The magnitude of the prices, which scales the tolerance.
+    Raises:
+        AssertionError: If an indicator differs between the modes.
+    """
+
+    for name, expected in batch.items():
+        actual = np.array([values[name] for values in streamed])
+        assert np.array_equal(np.isnan(expected), np.isnan(actual)), name
+        assert np.allclose(
+            actual,
+            expected,
+            rtol=0,
+            atol=RELATIVE_TOLERANCE * price_level,
+            equal_nan=True,
+        ), name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--points", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    highs, lows, closes = __build_bars(args.points)
+    print(f"{args.points:,} points")
+    for name, func, func_args in (
+        ("sma(20)", indicators.sma, (closes, 20)),
+        ("ema(20)", indicators.ema, (closes, 20)),
+        ("rsi(14)", indicators.rsi, (closes,)),
+        ("macd(12, 26, 9)", indicators.macd, (closes,)),
+        ("bollinger_bands(20, 2)", indicators.bollinger_bands, (closes,)),
+        ("atr(14)", indicators.atr, (highs, lows, closes)),
+    ):
+        print(f"batch {name + ':':<24}{__time(func, *func_args):9.1f} ms")
+
+    started_at = time.perf_counter()
+    batch = compute_indicators(highs, lows, closes)
+    batch_ms = (time.perf_counter() - started_at) * 1000
+
+    stream = StreamingIndicators()
+    started_at = time.perf_counter()
+    streamed = [
+        stream.update(high, low, close)
+        for high, low, close in zip(highs.tolist(), lows.tolist(), closes.tolist())
+    ]
+    stream_seconds = time.perf_counter() - started_at
+
+    print(f"batch, all indicators:        {batch_ms:9.1f} ms")
+    print(
+        f"streaming, all indicators:    {stream_seconds * 1000:9.1f} ms "
+        f"({stream_seconds / args.points * 1e6:.2f} us per update)"
+    )
+
+    __check_agreement(batch, streamed, float(np.abs(closes).max()))
+    print(f"streaming and batch agree within {RELATIVE_TOLERANCE:g} of the price level")
+
+
+if __name__ == "__main__":
+    main()
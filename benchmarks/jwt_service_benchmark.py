@@ -0,0 +1,73 @@
+"""
+Micro-benchmark of the per-request authentication overhead.
+Compares `AuthService.get_current_user` with the verified-token
+cache disabled and enabled.
+
+Usage:
+    python -m benchmarks.jwt_service_benchmark [--iterations N]
+"""
+
+import argparse
+import timeit
+
+from app.config import AppSettings
+from app.core.auth_service import AuthService
+from app.core.jwt_service import JwtService
+
+
+def __build_settings(cache_size: int) -> AppSettings:
+    """
+    Build application settings for the benchmark, independent of any .env file.
+    Args:
+        cache_size (int): The size of the verified-token cache.
+    Returns:
+        AppSettings: The benchmark settings.
+    """
+
+    return AppSettings(
+        _env_file=None,
+        access_token_secret="benchmark-secret",
+        access_token_algorithm="HS256",
+        access_token_expires_in_minutes=30,
+        access_token_cache_size=cache_size,
+        mongodb_uri="mongodb://localhost:27017",
+        mongodb_db="benchmark",
+        mongodb_trades_collection="trades",
+        mongodb_users_collection="users",
+    )
+
+
+def __measure(cache_size: int, iterations: int) -> float:
+    """
+    Measure the average time of authenticating the same token repeatedly.
+    Args:
+        cache_size (int): The size of the verified-token cache.
+        iterations (int): The number of authentications to time.
+    Returns:
+        float: The average time per authentication, in microseconds.
+    """
+
+    auth_service = AuthService(JwtService(__build_settings(cache_size)))
+    token = auth_service.jwt_service.create_access_token({"sub": "benchmark_user"})
+
+    seconds = timeit.timeit(
+        lambda: auth_service.get_current_user(token), number=iterations
+    )
+    return seconds / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    uncached = __measure(0, args.iterations)
+    cached = __measure(10_000, args.iterations)
+
+    print(f"uncached: {uncached:8.2f} us/request")
+    print(f"cached:   {cached:8.2f} us/request")
+    print(f"speedup:  {uncached / cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
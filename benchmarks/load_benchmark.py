@@ -0,0 +1,470 @@
+"""
+End-to-end load benchmark of the HTTP and WebSocket API.
+Starts the application in a uvicorn subprocess, against the MongoDB of `--mongodb-uri`
+or, by default, against the in-memory database of `benchmarks.memory_mongo`, and drives
+registration, login, trade placement, trade listing and the trade stream fan-out to many
+concurrent WebSocket clients. Reports the throughput and p50/p95/p99 latency
+of each scenario, and can write them as JSON and compare them with the
+results of another commit.
+The fan-out latency is measured from the trade's server-side timestamp, so the client
+and the server must share a clock, as they do on one machine.
+
+Usage:
+    python -m benchmarks.load_benchmark [--users N] [--logins N]
+        [--trades N] [--lists N]
+        [--stream-clients N] [--stream-trades N] [--concurrency N] [--mongodb-uri URI]
+        [--base-url URL] [--json PATH] [--compare BASELINE_PATH]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+
+import httpx
+from websockets.asyncio.client import connect
+
+STREAM_SYMBOL = "LOADBENCH"
+SYMBOLS = ["BTC", "ETH", "SOL", "ADA"]
+PASSWORD = "load-benchmark-password"
+SERVER_START_TIMEOUT_SECONDS = 30.0
+STREAM_TIMEOUT_SECONDS = 10.0
+
+
+def __summarize(latencies: list[float], elapsed: float, errors: int) -> dict:
+    """
+    Summarize the latencies of a scenario.
+    Args:
+        latencies (list[float]): The latencies of the successful operations, in seconds.
+        elapsed (float): The wall-clock duration of the scenario, in seconds.
+        errors (int): The number of failed operations.
+    Returns:
+        dict: The operation count, throughput and latency percentiles in milliseconds.
+    """
+
+    quantiles = (
+        statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    )
+    return {
+        "operations": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": quantiles[49] * 1000 if quantiles else 0.0,
+        "p95_ms": quantiles[94] * 1000 if quantiles else 0.0,
+        "p99_ms": quantiles[98] * 1000 if quantiles else 0.0,
+    }
+
+
+async def __drive(
+    operations: list[Callable[[], Awaitable[httpx.Response]]], concurrency: int
+) -> dict:
+    """
+    Run HTTP operations with a fixed number of concurrent workers.
+    Args:
+        operations (list[Callable[[], Awaitable[httpx.Response]]]): The operations.
+        concurrency (int): The number of operations in flight at a time.
+    Returns:
+        dict: The scenario summary.
+    """
+
+    pending = iter(operations)
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for operation in pending:
+            started_at = time.perf_counter()
+            try:
+                response = await operation()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if response.is_success:
+                latencies.append(time.perf_counter() - started_at)
+            else:
+                errors += 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return __summarize(latencies, time.perf_counter() - started_at, errors)
+
+
+async def __stream_client(
+    url: str, token: str, expected: int, ready: asyncio.Event, latencies: list[float]
+) -> int:
+    """
+    Receive the benchmark symbol's trades on the trade stream.
+    Args:
+        url (str): The WebSocket URL of the trade stream.
+        token (str): The access token.
+        expected (int): The number of trades published.
+        ready (asyncio.Event): Set once the client is subscribed.
+        latencies (list[float]): The list to append delivery latencies (in seconds) to.
+    Returns:
+        int: The number of trades received; fewer than published when some were dropped.
+    """
+
+    received = 0
+    async with connect(
+        f"{url}?symbols={STREAM_SYMBOL}",
+        additional_headers={"Authorization": f"Bearer {token}"},
+        max_queue=None,
+    ) as websocket:
+        ready.set()
+        try:
+            while received < expected:
+                message = json.loads(
+                    await asyncio.wait_for(websocket.recv(), STREAM_TIMEOUT_SECONDS)
+                )
+                if message.get("type") != "trade":
+                    continue
+                latencies.append(time.time() - message["data"]["timestamp"])
+                received += 1
+                if message["data"]["amount"] == expected:
+                    break
+        except TimeoutError:
+            pass
+    return received
+
+
+async def __run_stream(
+    client: httpx.AsyncClient, base_url: str, token: str, args: argparse.Namespace
+) -> dict:
+    """
+    Measure the trade stream fan-out: connect the WebSocket clients, then place trades
+    of the benchmark symbol one at a time and record when each client receives them.
+    Args:
+        client (httpx.AsyncClient): The HTTP client.
+        base_url (str): The base URL of the server.
+        token (str): The access token of the trading user.
+        args (argparse.Namespace): The benchmark parameters.
+    Returns:
+        dict: The scenario summary, with delivery latencies and the delivered ratio.
+    """
+
+    url = base_url.replace("http", "ws", 1) + "/websocket/v1/trade-stream"
+    latencies: list[float] = []
+    ready_events = [asyncio.Event() for _ in range(args.stream_clients)]
+    clients = []
+    # Connect in waves, so the handshakes do not all time out at once
+    for i, ready in enumerate(ready_events):
+        clients.append(
+            asyncio.create_task(
+                __stream_client(url, token, args.stream_trades, ready, latencies)
+            )
+        )
+        if i % args.concurrency == args.concurrency - 1:
+            await asyncio.gather(*(event.wait() for event in ready_events[: i + 1]))
+    await asyncio.gather(*(event.wait() for event in ready_events))
+
+    started_at = time.perf_counter()
+    # The amount numbers the trades, so clients can tell when
+    # they have seen the last one
+    for amount in range(1, args.stream_trades + 1):
+        await client.post(
+            "/api/v1/trades",
+            json={
+                "action": "buy",
+                "amount": amount,
+                "price": 100.0,
+                "symbol": STREAM_SYMBOL,
+            },
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        await asyncio.sleep(args.stream_interval_ms / 1000)
+    received = await asyncio.gather(*clients, return_exceptions=True)
+    elapsed = time.perf_counter() - started_at
+
+    summary = __summarize(
+        latencies,
+        elapsed,
+        sum(1 for result in received if isinstance(result, BaseException)),
+    )
+    summary["delivered_ratio"] = len(latencies) / (
+        args.stream_clients * args.stream_trades
+    )
+    return summary
+
+
+async def __run(base_url: str, args: argparse.Namespace) -> dict:
+    """
+    Run every scenario against a server.
+    Args:
+        base_url (str): The base URL of the server.
+        args (argparse.Namespace): The benchmark parameters.
+    Returns:
+        dict: The summary of each scenario.
+    """
+
+    rng = random.Random(42)
+    run_id = uuid.uuid4().hex[:6]
+    usernames = [f"lb{run_id}{i}" for i in range(args.users)]
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    results = {}
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60.0
+    ) as client:
+        results["register_user"] = await __drive(
+            [
+                lambda username=username: client.post(
+                    "/api/v1/auth/register",
+                    json={
+                        "username": username,
+                        "email": f"{username}@example.com",
+                        "password": PASSWORD,
+                        "fullName": "Load Benchmark",
+                    },
+                )
+                for username in usernames
+            ],
+            args.concurrency,
+        )
+
+        tokens = {}
+
+        async def login(username: str) -> httpx.Response:
+            response = await client.post(
+                "/api/v1/auth/login", data={"username": username, "password": PASSWORD}
+            )
+            if response.is_success:
+                tokens[username] = response.json()["access_token"]
+            return response
+
+        results["login_user"] = await __drive(
+            [
+                lambda username=usernames[i % len(usernames)]: login(username)
+                for i in range(max(args.logins, len(usernames)))
+            ],
+            args.concurrency,
+        )
+        if not tokens:
+            raise RuntimeError(
+                "No user could log in; is the server configured correctly?"
+            )
+        headers = [{"Authorization": f"Bearer {token}"} for token in tokens.values()]
+
+        results["place_trade"] = await __drive(
+            [
+                lambda: client.post(
+                    "/api/v1/trades",
+                    json={
+                        "action": rng.choice(["buy", "sell"]),
+                        "amount": round(rng.uniform(0.1, 10.0), 4),
+                        "price": round(rng.uniform(10.0, 1000.0), 2),
+                        "symbol": rng.choice(SYMBOLS),
+                    },
+                    headers=rng.choice(headers),
+                )
+                for _ in range(args.trades)
+            ],
+            args.concurrency,
+        )
+
+        results["list_trades"] = await __drive(
+            [
+                lambda: client.get("/api/v1/trades", headers=rng.choice(headers))
+                for _ in range(args.lists)
+            ],
+            args.concurrency,
+        )
+
+        if args.stream_clients:
+            results["trade_stream"] = await __run_stream(
+                client, base_url, next(iter(tokens.values())), args
+            )
+    return results
+
+
+def __free_port() -> int:
+    """
+    Get a free local TCP port.
+    Returns:
+        int: The port.
+    """
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def __start_server(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    """
+    Start the application in a subprocess and wait until it serves requests.
+    Args:
+        args (argparse.Namespace): The benchmark parameters.
+    Returns:
+        tuple[subprocess.Popen, str]: The server process and its base URL.
+    """
+
+    port = __free_port()
+    env = dict(os.environ)
+    if args.mongodb_uri:
+        env["MONGODB_URI"] = args.mongodb_uri
+    command = [sys.executable, "-m", "benchmarks.load_benchmark", "--serve", str(port)]
+    if not args.mongodb_uri:
+        command.append("--memory-db")
+    process = subprocess.Popen(command, env=env)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with code {process.returncode}")
+        try:
+            if httpx.get(base_url + "/").is_success:
+                return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("The server did not start in time")
+
+
+def __serve(port: int, memory_db: bool):
+    """
+    Serve the application, in the benchmark's server subprocess.
+    Args:
+        port (int): The port to listen on.
+        memory_db (bool): Whether to use the in-memory database instead of MongoDB.
+    """
+
+    import uvicorn
+
+    if memory_db:
+        from benchmarks.memory_mongo import install
+
+        install()
+
+    from app.main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def __git_commit() -> str | None:
+    """
+    Get the commit of the working tree, marked dirty if it has uncommitted changes.
+    Returns:
+        str | None: The commit, or None outside a git repository.
+    """
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def __print_results(results: dict, baseline: dict | None):
+    """
+    Print the summary of each scenario, with the change from a baseline if given.
+    Args:
+        results (dict): The summary of each scenario.
+        baseline (dict | None): The summary of each scenario in the baseline run.
+    """
+
+    for name, result in results.items():
+        line = (
+            f"{name:>14}: {result['operations']:>7,} ops, "
+            f"{result['errors']:>4} errors, "
+            f"{result['throughput']:>9,.1f} ops/s, p50 {result['p50_ms']:8.2f} ms, "
+            f"p95 {result['p95_ms']:8.2f} ms, p99 {result['p99_ms']:8.2f} ms"
+        )
+        if "delivered_ratio" in result:
+            line += f", delivered {result['delivered_ratio']:.1%}"
+        previous = (baseline or {}).get(name)
+        if previous:
+            line += " | vs baseline: " + ", ".join(
+                f"{metric} {(result[metric] / previous[metric] - 1) * 100:+.1f}%"
+                for metric in ("throughput", "p50_ms", "p99_ms")
+                if previous[metric]
+            )
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--trades", type=int, default=2000)
+    parser.add_argument("--lists", type=int, default=2000)
+    parser.add_argument("--stream-clients", type=int, default=200)
+    parser.add_argument("--stream-trades", type=int, default=50)
+    parser.add_argument("--stream-interval-ms", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--mongodb-uri", help="Benchmark against this MongoDB instead of in memory"
+    )
+    parser.add_argument("--base-url", help="Benchmark an already running server")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Compare with the results of this file")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--memory-db", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        __serve(args.serve, args.memory_db)
+        return
+
+    process = None
+    base_url = args.base_url
+    if not base_url:
+        process, base_url = __start_server(args)
+    try:
+        results = asyncio.run(__run(base_url, args))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["scenarios"]
+    __print_results(results, baseline)
+
+    if args.json:
+        parameters = {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("json", "compare", "serve", "memory_db")
+        }
+        with open(args.json, "w") as file:
+            json.dump(
+                {
+                    "commit": __git_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "database": "mongodb" if args.mongodb_uri else "memory",
+                    "parameters": parameters,
+                    "scenarios": results,
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,504 @@
+"""
+An in-memory substitute for the Motor database, for running the
+application without a mongod.
+It implements the subset of the collection API the services use: equality, range,
+`$or` and `$expr` queries, sorts and projections, unique indexes, bulk writes, and the
+aggregation expressions of the position update and rebuild pipelines. Indexes also
+serve equality lookups on their first field, and `_id` queries are served by key, so
+per-user queries and batched deletes stay cheap as collections grow. It is not meant
+to be a general MongoDB emulation.
+
+Usage:
+    from benchmarks.memory_mongo import install
+    install()  # before the application starts
+"""
+
+from collections.abc import Iterator
+import itertools
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+MISSING = object()
+
+
+def install():
+    """
+    Make the application connect to an in-memory database instead of MongoDB.
+    Must be called before `app.db.mongo.connect`, i.e. before the application starts.
+    """
+
+    import app.db.mongo
+
+    app.db.mongo.create_client = lambda _: MemoryClient()
+
+
+class MemoryClient:
+    """
+    A client creating in-memory databases on first access.
+    """
+
+    def __init__(self):
+        self.__databases: dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> "MemoryDatabase":
+        database = self.__databases.get(name)
+        if database is None:
+            database = self.__databases[name] = MemoryDatabase()
+        return database
+
+    def close(self):
+        self.__databases.clear()
+
+
+class MemoryDatabase:
+    """
+    A database creating in-memory collections on first access.
+    """
+
+    def __init__(self):
+        self.__collections: dict[str, MemoryCollection] = {}
+
+    async def command(self, command: str) -> dict:
+        if command != "ping":
+            raise NotImplementedError(command)
+        return {"ok": 1.0}
+
+    def __getitem__(self, name: str) -> "MemoryCollection":
+        collection = self.__collections.get(name)
+        if collection is None:
+            collection = self.__collections[name] = MemoryCollection(name)
+        return collection
+
+
+class MemoryCursor:
+    """
+    A cursor over the matched documents of a query, sorted and limited when read.
+    """
+
+    def __init__(self, documents: list[dict], projection: dict | None):
+        self.__documents = documents
+        self.__projection = projection
+        self.__sort: list[tuple[str, int]] = []
+        self.__limit = 0
+
+    def sort(self, key, direction: int | None = None) -> "MemoryCursor":
+        self.__sort = [(key, direction or 1)] if isinstance(key, str) else list(key)
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self.__limit = limit
+        return self
+
+    def batch_size(self, _: int) -> "MemoryCursor":
+        return self
+
+    async def to_list(self, length: int | None = None) -> list[dict]:
+        return list(itertools.islice(self.__results(), length or None))
+
+    def __aiter__(self):
+        return self.__iterate()
+
+    async def __iterate(self):
+        for document in self.__results():
+            yield document
+
+    def __results(self) -> Iterator[dict]:
+        documents = self.__documents
+        # Stable sorts applied from the last key to the first give a multi-key sort
+        for field, direction in reversed(self.__sort):
+            documents = sorted(
+                documents,
+                key=lambda document: document.get(field),
+                reverse=direction < 0,
+            )
+        if self.__limit:
+            documents = documents[: self.__limit]
+        for document in documents:
+            yield project(document, self.__projection)
+
+
+class MemoryCollection:
+    """
+    An in-memory collection of documents.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.__documents: dict[ObjectId, dict] = {}
+        # First field of each index -> value -> IDs of the documents with that value
+        self.__lookups: dict[str, dict] = {}
+        self.__unique_keys: list[tuple[str, ...]] = []
+
+    def with_options(self, **_) -> "MemoryCollection":
+        # Read preferences and write concerns make no difference to
+        # a single in-memory copy
+        return self
+
+    async def create_indexes(self, indexes: list) -> list[str]:
+        names = []
+        for index in indexes:
+            document = index.document
+            fields = tuple(document["key"])
+            if document.get("unique"):
+                self.__unique_keys.append(fields)
+            if fields[0] not in self.__lookups:
+                lookup = self.__lookups[fields[0]] = {}
+                for document_id, stored in self.__documents.items():
+                    lookup.setdefault(stored.get(fields[0]), set()).add(document_id)
+            names.append(document["name"])
+        return names
+
+    async def insert_one(self, document: dict) -> SimpleNamespace:
+        return SimpleNamespace(inserted_id=self.__insert(document))
+
+    async def insert_many(
+        self, documents: list[dict], ordered: bool = True
+    ) -> SimpleNamespace:
+        inserted_ids = []
+        write_errors = []
+        for index, document in enumerate(documents):
+            try:
+                inserted_ids.append(self.__insert(document))
+            except DuplicateKeyError as e:
+                write_errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if write_errors:
+            raise BulkWriteError(
+                {
+                    "writeErrors": write_errors,
+                    "writeConcernErrors": [],
+                    "nInserted": len(inserted_ids),
+                }
+            )
+        return SimpleNamespace(inserted_ids=inserted_ids)
+
+    async def find_one(
+        self, query: dict, projection: dict | None = None
+    ) -> dict | None:
+        for document in self.__match(query):
+            return project(document, projection)
+        return None
+
+    def find(
+        self, query: dict | None = None, projection: dict | None = None
+    ) -> MemoryCursor:
+        return MemoryCursor(list(self.__match(query or {})), projection)
+
+    async def count_documents(self, query: dict) -> int:
+        return sum(1 for _ in self.__match(query))
+
+    async def update_one(
+        self, query: dict, update, upsert: bool = False
+    ) -> SimpleNamespace:
+        return SimpleNamespace(modified_count=self.__update(query, update, upsert))
+
+    async def update_many(self, query: dict, update) -> SimpleNamespace:
+        matched = [document["_id"] for document in self.__match(query)]
+        for document_id in matched:
+            self.__update({"_id": document_id}, update, upsert=False)
+        return SimpleNamespace(modified_count=len(matched))
+
+    async def find_one_and_update(
+        self,
+        query: dict,
+        update,
+        projection: dict | None = None,
+        return_document=False,
+        **_,
+    ) -> dict | None:
+        if not self.__update(query, update, upsert=False):
+            return None
+        return await self.find_one(query, projection)
+
+    async def delete_one(self, query: dict) -> SimpleNamespace:
+        for document in self.__match(query):
+            self.__remove(document["_id"])
+            return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, query: dict) -> SimpleNamespace:
+        matched = [document["_id"] for document in self.__match(query)]
+        for document_id in matched:
+            self.__remove(document_id)
+        return SimpleNamespace(deleted_count=len(matched))
+
+    async def distinct(self, field: str, query: dict | None = None) -> list:
+        return list(
+            dict.fromkeys(document.get(field) for document in self.__match(query or {}))
+        )
+
+    async def bulk_write(
+        self, operations: list, ordered: bool = True
+    ) -> SimpleNamespace:
+        for operation in operations:
+            if isinstance(operation, InsertOne):
+                self.__insert(operation._doc)
+            elif isinstance(operation, ReplaceOne):
+                matched = next(self.__match(operation._filter), None)
+                if matched is not None:
+                    self.__remove(matched["_id"])
+                    self.__insert({**operation._doc, "_id": matched["_id"]})
+                elif operation._upsert:
+                    self.__insert(dict(operation._doc))
+            elif isinstance(operation, UpdateOne):
+                self.__update(operation._filter, operation._doc, operation._upsert)
+            else:
+                raise NotImplementedError(type(operation).__name__)
+        return SimpleNamespace(acknowledged=True)
+
+    def __insert(self, document: dict) -> ObjectId:
+        document.setdefault("_id", ObjectId())
+        for fields in self.__unique_keys:
+            values = tuple(document.get(field) for field in fields)
+            if any(
+                tuple(other.get(field) for field in fields) == values
+                for other in self.__match(dict(zip(fields, values)))
+            ):
+                raise DuplicateKeyError(f"E11000 duplicate key on {fields}", 11000)
+
+        stored = dict(document)
+        self.__documents[stored["_id"]] = stored
+        for field, lookup in self.__lookups.items():
+            lookup.setdefault(stored.get(field), set()).add(stored["_id"])
+        return stored["_id"]
+
+    def __remove(self, document_id: ObjectId):
+        stored = self.__documents.pop(document_id)
+        for field, lookup in self.__lookups.items():
+            lookup.get(stored.get(field), set()).discard(document_id)
+
+    def __update(self, query: dict, update, upsert: bool) -> int:
+        document = next(self.__match(query), None)
+        if document is None:
+            if not upsert:
+                return 0
+            document = {
+                field: value
+                for field, value in query.items()
+                if not field.startswith("$")
+            }
+        else:
+            self.__remove(document["_id"])
+
+        stages = update if isinstance(update, list) else [update]
+        for stage in stages:
+            for operator, fields in stage.items():
+                if operator == "$set" and isinstance(update, list):
+                    # Pipeline stages take expressions, all evaluated against the
+                    # document before the stage
+                    document.update(
+                        {
+                            field: evaluate(value, document)
+                            for field, value in fields.items()
+                        }
+                    )
+                elif operator == "$set":
+                    # Classic updates take plain values, with dotted embedded paths
+                    for field, value in fields.items():
+                        *parents, name = field.split(".")
+                        embedded = document
+                        for parent in parents:
+                            embedded = embedded.setdefault(parent, {})
+                        embedded[name] = value
+                elif operator == "$unset":
+                    for field in [fields] if isinstance(fields, str) else fields:
+                        document.pop(field, None)
+                else:
+                    raise NotImplementedError(operator)
+        self.__insert(document)
+        return 1
+
+    def __match(self, query: dict) -> Iterator[dict]:
+        candidates = self.__documents.values()
+        ids = query.get("_id")
+        if isinstance(ids, dict) and "$in" in ids:
+            candidates = [
+                self.__documents[i] for i in ids["$in"] if i in self.__documents
+            ]
+        elif ids is not None and not isinstance(ids, dict):
+            candidates = [self.__documents[ids]] if ids in self.__documents else []
+        for field, lookup in self.__lookups.items():
+            value = query.get(field, MISSING)
+            if value is not MISSING and not isinstance(value, dict):
+                candidates = [self.__documents[i] for i in lookup.get(value, ())]
+                break
+        return (document for document in candidates if matches(document, query))
+
+
+def matches(document: dict, query: dict) -> bool:
+    """
+    Check whether a document matches a query.
+    Args:
+        document (dict): The document.
+        query (dict): The query.
+    Returns:
+        bool: True if the document matches.
+    """
+
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+            continue
+        if field == "$expr":
+            if not evaluate(condition, document):
+                return False
+            continue
+
+        value = get_path(document, field)
+        if isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if value is None or not COMPARISONS[operator](value, operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def project(document: dict, projection: dict | None) -> dict:
+    """
+    Apply an exclusion or inclusion projection to a document.
+    Args:
+        document (dict): The document.
+        projection (dict | None): The projection.
+    Returns:
+        dict: A copy of the projected document.
+    """
+
+    if not projection:
+        return dict(document)
+    included = [field for field, flag in projection.items() if flag]
+    if included:
+        projected = {field: document[field] for field in included if field in document}
+        if projection.get("_id", 1):
+            projected["_id"] = document["_id"]
+        return projected
+    return {
+        field: value for field, value in document.items() if projection.get(field, 1)
+    }
+
+
+def get_path(document: dict, path: str):
+    """
+    Get the value of a dotted field path.
+    Args:
+        document (dict): The document.
+        path (str): The path, e.g. "state.net_quantity".
+    Returns:
+        Any: The value, or None if the path does not exist.
+    """
+
+    value = document
+    for name in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+def evaluate(expression, document: dict, variables: dict | None = None):
+    """
+    Evaluate an aggregation expression against a document.
+    Args:
+        expression: A literal, a "$field" or "$$variable" reference, an operator
+            document or an object of expressions.
+        document (dict): The document.
+        variables (dict | None): The values of the variables in scope, e.g. in the
+            `in` expression of a `$reduce`.
+    Returns:
+        Any: The value of the expression.
+    """
+
+    variables = variables or {}
+    if isinstance(expression, str) and expression.startswith("$$"):
+        name, _, path = expression[2:].partition(".")
+        return get_path(variables[name], path) if path else variables[name]
+    if isinstance(expression, str) and expression.startswith("$"):
+        return get_path(document, expression[1:])
+    if not isinstance(expression, dict):
+        return expression
+    if not next(iter(expression), "").startswith("$"):
+        return {
+            field: evaluate(value, document, variables)
+            for field, value in expression.items()
+        }
+
+    ((operator, operand),) = expression.items()
+    if operator == "$literal":
+        return operand
+    if operator == "$cond":
+        condition, if_true, if_false = operand
+        return evaluate(
+            if_true if evaluate(condition, document, variables) else if_false,
+            document,
+            variables,
+        )
+    if operator == "$ifNull":
+        value, default = (
+            evaluate(argument, document, variables) for argument in operand
+        )
+        return default if value is None else value
+    if operator == "$reduce":
+        value = evaluate(operand["initialValue"], document, variables)
+        for item in evaluate(operand["input"], document, variables):
+            value = evaluate(
+                operand["in"], document, {**variables, "value": value, "this": item}
+            )
+        return value
+
+    arguments = (
+        [evaluate(argument, document, variables) for argument in operand]
+        if isinstance(operand, list)
+        else [evaluate(operand, document, variables)]
+    )
+    return EXPRESSIONS[operator](arguments)
+
+
+COMPARISONS = {
+    "$gt": lambda value, operand: value > operand,
+    "$gte": lambda value, operand: value >= operand,
+    "$lt": lambda value, operand: value < operand,
+    "$lte": lambda value, operand: value <= operand,
+    "$ne": lambda value, operand: value != operand,
+    "$in": lambda value, operand: value in operand,
+}
+
+EXPRESSIONS = {
+    "$abs": lambda arguments: abs(arguments[0]),
+    "$add": sum,
+    "$subtract": lambda arguments: arguments[0] - arguments[1],
+    "$multiply": lambda arguments: __product(arguments),
+    "$divide": lambda arguments: arguments[0] / arguments[1],
+    # Like MongoDB, $min and $max ignore missing and null values
+    "$min": lambda arguments: min(
+        (argument for argument in arguments if argument is not None), default=None
+    ),
+    "$max": lambda arguments: max(
+        (argument for argument in arguments if argument is not None), default=None
+    ),
+    "$eq": lambda arguments: arguments[0] == arguments[1],
+    "$gt": lambda arguments: arguments[0] > arguments[1],
+    "$gte": lambda arguments: arguments[0] >= arguments[1],
+    "$lt": lambda arguments: arguments[0] < arguments[1],
+    "$or": any,
+    "$and": all,
+}
+
+
+def __product(arguments: list) -> float:
+    """
+    Multiply the arguments of a `$multiply` expression.
+    Args:
+        arguments (list): The evaluated arguments.
+    Returns:
+        float: The product.
+    """
+
+    product = 1
+    for argument in arguments:
+        product *= argument
+    return product
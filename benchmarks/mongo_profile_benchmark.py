@@ -0,0 +1,197 @@
+"""
+Benchmark of the MongoDB read and write profiles.
+Runs trade inserts with every write profile and trade listing queries with every read
+profile against a real MongoDB, in a scratch database dropped afterwards, and reports
+their throughput and p50/p95/p99 latency. Listing reads run while inserts keep the
+primary busy, the way `list_trades` competes with `place_trade`.
+Meant for a replica set; a local single-host one is enough to compare write concerns:
+
+    mongod --replSet rs0 --port 27017 --dbpath /tmp/rs0 &
+    mongosh --eval 'rs.initiate()'
+
+On a single host, reads preferring secondaries are served by the primary.
+
+Usage:
+    python -m benchmarks.mongo_profile_benchmark [--mongodb-uri URI] [--operations N]
+        [--concurrency N] [--max-staleness-seconds N]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel
+
+from app.db.mongo import (
+    DEFAULT_PROFILE,
+    READ_PROFILES,
+    WRITE_PROFILES,
+    get_profile_options,
+)
+from app.services.trade_service import TRADE_PROJECTION, TRADE_SORT
+
+DATABASE = "profile-benchmark"
+USERS = 100
+SEED_TRADES = 20_000
+PAGE_SIZE = 100
+WRITE_TIMEOUT_MS = 5000
+
+
+def __build_trade(rng: random.Random) -> dict:
+    """
+    Build a trade document like those written by the trade service.
+    Args:
+        rng (random.Random): The random generator.
+    Returns:
+        dict: The trade document.
+    """
+
+    return {
+        "action": rng.choice(["buy", "sell"]),
+        "amount": round(rng.uniform(0.1, 5), 4),
+        "price": round(rng.uniform(10, 60_000), 2),
+        "symbol": rng.choice(["BTC", "ETH", "SOL"]),
+        "id": str(uuid.uuid4()),
+        "user_id": f"user_{rng.randrange(USERS)}",
+        "timestamp": time.time(),
+    }
+
+
+async def __drive(operation, operations: int, concurrency: int) -> dict:
+    """
+    Run an operation a number of times with a fixed number of concurrent workers.
+    Args:
+        operation (Callable[[], Awaitable]): The operation.
+        operations (int): The number of operations.
+        concurrency (int): The number of operations in flight at a time.
+    Returns:
+        dict: The throughput and latency percentiles in milliseconds.
+    """
+
+    remaining = iter(range(operations))
+    latencies = []
+
+    async def worker():
+        for _ in remaining:
+            started_at = time.perf_counter()
+            await operation()
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+def __print(name: str, result: dict):
+    print(
+        f"{name:>22}: {result['throughput']:9,.0f} ops/s, "
+        f"p50 {result['p50_ms']:7.2f} ms, p95 {result['p95_ms']:7.2f} ms, "
+        f"p99 {result['p99_ms']:7.2f} ms"
+    )
+
+
+async def __run(args: argparse.Namespace):
+    """
+    Seed the scratch database, then benchmark every write
+    profile and every read profile.
+    Args:
+        args (argparse.Namespace): The benchmark parameters.
+    """
+
+    client = AsyncIOMotorClient(args.mongodb_uri, serverSelectionTimeoutMS=5000)
+    collection: AsyncIOMotorCollection = client[DATABASE]["trades"]
+    rng = random.Random(42)
+    hello = await client.admin.command("hello")
+    print(
+        f"Replica set: {hello.get('setName', 'none (standalone)')}, "
+        f"hosts: {hello.get('hosts')}"
+    )
+    try:
+        await collection.drop()
+        await collection.create_indexes(
+            [
+                IndexModel(
+                    [
+                        ("user_id", ASCENDING),
+                        ("timestamp", ASCENDING),
+                        ("id", ASCENDING),
+                    ]
+                )
+            ]
+        )
+        await collection.insert_many([__build_trade(rng) for _ in range(SEED_TRADES)])
+
+        print("Trade inserts:")
+        for profile in (DEFAULT_PROFILE, *WRITE_PROFILES):
+            profiled = collection.with_options(
+                **get_profile_options(DEFAULT_PROFILE, profile, -1, WRITE_TIMEOUT_MS)
+            )
+            __print(
+                profile,
+                await __drive(
+                    lambda: profiled.insert_one(__build_trade(rng)),
+                    args.operations,
+                    args.concurrency,
+                ),
+            )
+
+        print("Trade listing pages, during inserts:")
+        for profile in (DEFAULT_PROFILE, *READ_PROFILES):
+            profiled = collection.with_options(
+                **get_profile_options(
+                    profile,
+                    DEFAULT_PROFILE,
+                    args.max_staleness_seconds,
+                    WRITE_TIMEOUT_MS,
+                )
+            )
+            writes = asyncio.create_task(
+                __drive(
+                    lambda: collection.insert_one(__build_trade(rng)),
+                    args.operations,
+                    args.concurrency,
+                )
+            )
+            result = await __drive(
+                lambda: profiled.find(
+                    {"user_id": f"user_{rng.randrange(USERS)}"}, TRADE_PROJECTION
+                )
+                .sort(TRADE_SORT)
+                .limit(PAGE_SIZE)
+                .to_list(length=PAGE_SIZE),
+                args.operations,
+                args.concurrency,
+            )
+            await writes
+            __print(profile, result)
+    finally:
+        await client.drop_database(DATABASE)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--mongodb-uri", default="mongodb://localhost:27017/?replicaSet=rs0"
+    )
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-staleness-seconds", type=int, default=90)
+    args = parser.parse_args()
+
+    asyncio.run(__run(args))
+
+
+if __name__ == "__main__":
+    main()
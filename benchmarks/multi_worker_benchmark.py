@@ -0,0 +1,308 @@
+"""
+Benchmark of the trade stream fan-out across uvicorn worker processes.
+Starts a broadcast relay and the application with 1, 4 and 8 workers sharing it
+(each worker with its own in-memory database), connects WebSocket clients, which
+the kernel spreads over the workers, then places trades of the benchmark symbol
+on fresh connections, so they are handled by any worker, and checks that every
+client receives every trade.
+Reports the delivered ratio, the p50/p95/p99 delivery latency (from the
+trade's server-side timestamp) and the gaps in the per-topic sequence
+numbers seen by the clients.
+With `--no-transport`, the workers do not share their messages,
+showing what clients miss.
+
+Usage:
+    python -m benchmarks.multi_worker_benchmark [--workers 1 4 8]
+        [--clients N] [--trades N]
+        [--interval-ms N] [--no-transport]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import orjson
+from websockets.asyncio.client import connect
+
+from app.core.broadcast_hub import symbol_topic
+
+STREAM_SYMBOL = "WORKERBENCH"
+STREAM_TOPIC = symbol_topic(STREAM_SYMBOL)
+WARMUP_PRICE = 1.0
+TRADE_PRICE = 100.0
+SERVER_START_TIMEOUT_SECONDS = 30.0
+WARMUP_TIMEOUT_SECONDS = 10.0
+STREAM_TIMEOUT_SECONDS = 5.0
+
+
+def create_memory_app():
+    """
+    Create the application against an in-memory database, in each uvicorn worker.
+    Returns:
+        FastAPI: The application.
+    """
+
+    from benchmarks.memory_mongo import install
+
+    install()
+
+    from app.main import create_app
+
+    return create_app()
+
+
+class StreamClient:
+    """
+    A trade stream client recording the delivery latency and sequence
+    gaps of the benchmark symbol.
+    """
+
+    def __init__(self, url: str, token: str):
+        self.url = url
+        self.token = token
+        self.ready = asyncio.Event()
+        self.warm = asyncio.Event()
+        self.latencies: list[float] = []
+        self.gaps = 0
+        self.unnumbered = 0
+        self.__last_sequence: int | None = None
+
+    async def run(self, last_amount: int):
+        """
+        Receive trades until the last one, or until no trade was received for a while.
+        Args:
+            last_amount (int): The amount of the last measured trade.
+        """
+
+        async with connect(
+            f"{self.url}?symbols={STREAM_SYMBOL}",
+            additional_headers={"Authorization": f"Bearer {self.token}"},
+            max_queue=None,
+        ) as websocket:
+            self.ready.set()
+            last_trade_at = time.monotonic()
+            try:
+                while True:
+                    message = orjson.loads(
+                        await asyncio.wait_for(websocket.recv(), STREAM_TIMEOUT_SECONDS)
+                    )
+                    if message.get("type") != "trade":
+                        # Heartbeats keep coming when the trades do not
+                        if time.monotonic() - last_trade_at > STREAM_TIMEOUT_SECONDS:
+                            break
+                        continue
+                    last_trade_at = time.monotonic()
+                    self.__check_sequence(message.get("seq", {}).get(STREAM_TOPIC))
+                    trade = message["data"]
+                    if trade["price"] == WARMUP_PRICE:
+                        self.warm.set()
+                        continue
+                    self.latencies.append(time.time() - trade["timestamp"])
+                    if trade["amount"] == last_amount:
+                        break
+            except TimeoutError:
+                pass
+
+    def __check_sequence(self, sequence: int | None):
+        """
+        Count the messages skipped since the previous one.
+        Args:
+            sequence (int | None): The message's sequence number in the benchmark topic.
+        """
+
+        if sequence is None:
+            self.unnumbered += 1
+            return
+        if self.__last_sequence is not None:
+            self.gaps += max(sequence - self.__last_sequence - 1, 0)
+        self.__last_sequence = sequence
+
+
+def __free_port() -> int:
+    """
+    Get a free local TCP port.
+    Returns:
+        int: The port.
+    """
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def __start_server(workers: int, env: dict) -> tuple[subprocess.Popen, str]:
+    """
+    Start the application with several workers and wait until it serves requests.
+    Args:
+        workers (int): The number of worker processes.
+        env (dict): The environment of the server.
+    Returns:
+        tuple[subprocess.Popen, str]: The server process and its base URL.
+    """
+
+    port = __free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "--factory",
+            "benchmarks.multi_worker_benchmark:create_memory_app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with code {process.returncode}")
+        try:
+            if httpx.get(base_url + "/").is_success:
+                # The port accepts connections as soon as one worker is up
+                time.sleep(workers * 0.5)
+                return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("The server did not start in time")
+
+
+async def __run(base_url: str, args: argparse.Namespace) -> dict:
+    """
+    Connect the clients, warm the stream up and measure the delivery of the trades.
+    Args:
+        base_url (str): The base URL of the server.
+        args (argparse.Namespace): The benchmark parameters.
+    Returns:
+        dict: The delivered ratio, latency percentiles in ms and sequence gaps.
+    """
+
+    from app.core.dependencies import get_jwt_service
+
+    jwt_service = get_jwt_service()
+    trader_token = jwt_service.create_access_token({"sub": "benchmark_trader"})
+    url = base_url.replace("http", "ws", 1) + "/websocket/v1/trade-stream"
+    clients = [
+        StreamClient(
+            url, jwt_service.create_access_token({"sub": f"benchmark_viewer_{i}"})
+        )
+        for i in range(args.clients)
+    ]
+    tasks = [asyncio.create_task(client.run(args.trades)) for client in clients]
+    await asyncio.gather(*(client.ready.wait() for client in clients))
+
+    # Without keep-alive, every trade is placed on a new
+    # connection, handled by any worker
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {trader_token}"},
+        limits=httpx.Limits(max_keepalive_connections=0),
+    ) as client:
+
+        async def place(amount: int, price: float):
+            response = await client.post(
+                "/api/v1/trades",
+                json={
+                    "action": "buy",
+                    "amount": amount,
+                    "price": price,
+                    "symbol": STREAM_SYMBOL,
+                },
+            )
+            response.raise_for_status()
+
+        # Until every client has seen a trade, some workers may not be subscribed yet
+        deadline = time.monotonic() + WARMUP_TIMEOUT_SECONDS
+        while not all(c.warm.is_set() for c in clients) and time.monotonic() < deadline:
+            await place(1, WARMUP_PRICE)
+            await asyncio.sleep(0.05)
+        warm = sum(c.warm.is_set() for c in clients)
+
+        started_at = time.perf_counter()
+        # The amount numbers the trades, so clients can tell when
+        # they have seen the last one
+        for amount in range(1, args.trades + 1):
+            await place(amount, TRADE_PRICE)
+            await asyncio.sleep(args.interval_ms / 1000)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - started_at
+
+    latencies = [latency for c in clients for latency in c.latencies]
+    quantiles = (
+        statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    )
+    return {
+        "warm_clients": warm,
+        "delivered_ratio": len(latencies) / (args.clients * args.trades),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": quantiles[49] * 1000 if quantiles else 0.0,
+        "p95_ms": quantiles[94] * 1000 if quantiles else 0.0,
+        "p99_ms": quantiles[98] * 1000 if quantiles else 0.0,
+        "sequence_gaps": sum(c.gaps for c in clients),
+        "unnumbered": sum(c.unnumbered for c in clients),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--trades", type=int, default=50)
+    parser.add_argument("--interval-ms", type=float, default=20.0)
+    parser.add_argument("--no-transport", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, MARKET_DATA_SOURCE="none", BROADCAST_TRANSPORT_URL="")
+        relay = None
+        if not args.no_transport:
+            path = os.path.join(directory, "relay.sock")
+            relay = subprocess.Popen(
+                [sys.executable, "-m", "app.cli.broadcast_relay", path],
+                stdout=subprocess.DEVNULL,
+            )
+            while not os.path.exists(path):
+                time.sleep(0.05)
+            env["BROADCAST_TRANSPORT_URL"] = f"unix://{path}"
+
+        try:
+            for workers in args.workers:
+                server, base_url = __start_server(workers, env)
+                try:
+                    result = asyncio.run(__run(base_url, args))
+                finally:
+                    server.terminate()
+                    server.wait()
+                print(
+                    f"{workers} workers: delivered {result['delivered_ratio']:7.2%} "
+                    f"({result['warm_clients']}/{args.clients} clients warm), "
+                    f"{result['throughput']:>9,.0f} msg/s, "
+                    f"p50 {result['p50_ms']:7.2f} ms, p95 {result['p95_ms']:7.2f} ms, "
+                    f"p99 {result['p99_ms']:7.2f} ms, "
+                    f"{result['sequence_gaps']} sequence gaps, "
+                    f"{result['unnumbered']} unnumbered"
+                )
+        finally:
+            if relay:
+                relay.terminate()
+                relay.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark of the matching engine on a single core.
+Replays a synthetic flow of limit orders around a drifting mid price, market orders
+and cancellations, and reports throughput and per-operation latency percentiles.
+
+Usage:
+    python -m benchmarks.order_book_benchmark [--orders N] [--resting N]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.core.order_book import MatchingEngine, Order
+from app.schemas.order_schema import OrderType
+from app.schemas.trade_schema import TradeAction
+
+SYMBOL = "BTC"
+TICK_SIZE = 0.5
+MARKET_ORDER_RATIO = 0.05
+CANCEL_RATIO = 0.3
+
+
+def __build_orders(count: int, seed: int) -> list[Order]:
+    """
+    Build a synthetic order flow, mostly limit orders within a few ticks
+    of a random-walk mid price.
+    Args:
+        count (int): The number of orders to build.
+        seed (int): The random seed.
+    Returns:
+        list[Order]: The orders.
+    """
+
+    rng = np.random.default_rng(seed)
+    mids = 30_000 + TICK_SIZE * np.cumsum(rng.integers(-1, 2, count))
+    offsets = TICK_SIZE * rng.integers(-20, 21, count)
+    is_buy = rng.random(count) < 0.5
+    is_market = rng.random(count) < MARKET_ORDER_RATIO
+    amounts = rng.integers(1, 100, count) / 10
+
+    return [
+        Order(
+            str(i),
+            f"user-{i % 100}",
+            SYMBOL,
+            TradeAction.BUY if is_buy[i] else TradeAction.SELL,
+            OrderType.MARKET if is_market[i] else OrderType.LIMIT,
+            None if is_market[i] else float(mids[i] + offsets[i]),
+            float(amounts[i]),
+            float(i),
+        )
+        for i in range(count)
+    ]
+
+
+def __percentiles(latencies: list[int]) -> str:
+    """
+    Format the latency percentiles of a set of operations.
+    Args:
+        latencies (list[int]): The latencies, in nanoseconds.
+    Returns:
+        str: The p50, p99 and p99.9 latencies in microseconds.
+    """
+
+    quantiles = statistics.quantiles(latencies, n=1000)
+    return (
+        f"p50 {quantiles[499] / 1000:.2f} us, p99 {quantiles[989] / 1000:.2f} us, "
+        f"p99.9 {quantiles[998] / 1000:.2f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument(
+        "--resting", type=int, default=10_000, help="Orders to pre-fill the book with"
+    )
+    args = parser.parse_args()
+
+    engine = MatchingEngine()
+    for order in __build_orders(args.resting, seed=1):
+        order.id = f"warmup-{order.id}"
+        engine.submit(order)
+
+    orders = __build_orders(args.orders, seed=2)
+    cancel_rng = np.random.default_rng(3)
+    cancels = cancel_rng.random(args.orders) < CANCEL_RATIO
+    cancel_targets = cancel_rng.integers(0, args.orders, args.orders)
+    book = engine.get_book(SYMBOL)
+
+    submit_latencies, cancel_latencies = [], []
+    fills = 0
+    started_at = time.perf_counter()
+    for i, order in enumerate(orders):
+        submitted_at = time.perf_counter_ns()
+        fills += len(book.submit(order))
+        submit_latencies.append(time.perf_counter_ns() - submitted_at)
+
+        if cancels[i] and cancel_targets[i] <= i:
+            cancelled_at = time.perf_counter_ns()
+            book.cancel(str(cancel_targets[i]))
+            cancel_latencies.append(time.perf_counter_ns() - cancelled_at)
+    elapsed = time.perf_counter() - started_at
+
+    print(f"{args.orders:,} orders on a book pre-filled with {args.resting:,} orders")
+    print(f"throughput: {args.orders / elapsed:,.0f} orders/s ({fills:,} fills)")
+    print(f"submit latency: {__percentiles(submit_latencies)}")
+    print(f"cancel latency: {__percentiles(cancel_latencies)}")
+    print(
+        f"resting levels: {len(book.depth(TradeAction.BUY, 1_000_000))} bids, "
+        f"{len(book.depth(TradeAction.SELL, 1_000_000))} asks"
+    )
+
+
+if __name__ == "__main__":
+    main()
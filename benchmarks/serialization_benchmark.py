@@ -0,0 +1,114 @@
+"""
+Benchmark of trade listing serialization.
+Serializes pages of trade documents as they come from the database, the way FastAPI does
+with `response_model=list[TradeResponse]` (validation, then the standard JSON encoder,
+or pydantic's JSON serializer), and with the fast response mode (trusted documents
+encoded by orjson), and checks that every path produces the same JSON.
+
+Usage:
+    python -m benchmarks.serialization_benchmark [--sizes 10000 100000] [--repeat N]
+"""
+
+import argparse
+import json
+import time
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.schemas.trade_schema import TradeResponse
+from app.services.trade_service import dump_trades_json
+
+TRADES_ADAPTER = TypeAdapter(list[TradeResponse])
+
+
+def __build_trades(count: int) -> list[dict]:
+    """
+    Build trade documents resembling those returned by the trade listing query.
+    Args:
+        count (int): The number of trades to build.
+    Returns:
+        list[dict]: The trade documents.
+    """
+
+    return [
+        {
+            "action": "buy" if i % 2 else "sell",
+            "amount": 0.5 + i % 7,
+            "price": 60_000.0 + i,
+            "symbol": ("BTC", "ETH", "SOL")[i % 3],
+            "id": f"{i:032x}",
+            "user_id": "benchmark_user",
+            "timestamp": 1_700_000_000.0 + i / 1000,
+        }
+        for i in range(count)
+    ]
+
+
+def __validate_and_dump_stdlib(trades: list[dict]) -> bytes:
+    """
+    Validate trades against the response model and encode them with
+    the standard JSON encoder.
+    Args:
+        trades (list[dict]): The trade documents.
+    Returns:
+        bytes: The JSON array.
+    """
+
+    validated = TRADES_ADAPTER.validate_python(trades)
+    return json.dumps(
+        TRADES_ADAPTER.dump_python(validated, mode="json", by_alias=True),
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+
+
+def __validate_and_dump_json(trades: list[dict]) -> bytes:
+    """
+    Validate trades against the response model and encode them with
+    pydantic's JSON serializer.
+    Args:
+        trades (list[dict]): The trade documents.
+    Returns:
+        bytes: The JSON array.
+    """
+
+    return TRADES_ADAPTER.dump_json(
+        TRADES_ADAPTER.validate_python(trades), by_alias=True
+    )
+
+
+SERIALIZERS = {
+    "validate + json": __validate_and_dump_stdlib,
+    "validate + dump_json": __validate_and_dump_json,
+    "trusted + orjson": dump_trades_json,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        trades = __build_trades(size)
+        expected = orjson.loads(__validate_and_dump_json(trades))
+        print(f"{size:,} trades:")
+        baseline = None
+        for name, serialize in SERIALIZERS.items():
+            assert orjson.loads(serialize(trades)) == expected, f"{name} output differs"
+            started_at = time.perf_counter()
+            for _ in range(args.repeat):
+                payload = serialize(trades)
+            elapsed = (time.perf_counter() - started_at) / args.repeat
+            baseline = baseline or elapsed
+            print(
+                f"{name:>22}: {elapsed * 1000:8.2f} ms, "
+                f"{size / elapsed:>12,.0f} trades/s, "
+                f"{len(payload) / 1e6:6.2f} MB, {baseline / elapsed:5.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
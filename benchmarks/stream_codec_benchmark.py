@@ -0,0 +1,99 @@
+"""
+Benchmark of the trade-stream wire encodings.
+Compares payload bytes and encoding throughput of legacy per-message text frames
+against batched JSON and MessagePack frames, before and after permessage-deflate.
+
+Usage:
+    python -m benchmarks.stream_codec_benchmark [--messages N] [--batch-size N]
+"""
+
+import argparse
+import time
+import zlib
+
+from app.core.stream_codec import StreamEncoding, StreamMessage, encode_frame
+
+
+def __build_messages(count: int) -> list[StreamMessage]:
+    """
+    Build a list of trade messages resembling those published by `place_trade`.
+    Args:
+        count (int): The number of messages to build.
+    Returns:
+        list[StreamMessage]: The messages.
+    """
+
+    return [
+        StreamMessage(
+            {
+                "type": "trade",
+                "data": {
+                    "action": "buy" if i % 2 else "sell",
+                    "amount": 0.5 + i % 7,
+                    "price": 60_000.0 + i,
+                    "symbol": ("BTC", "ETH", "SOL")[i % 3],
+                    "id": f"{i:032x}",
+                    "userId": "benchmark_user",
+                    "timestamp": 1_700_000_000.0 + i / 1000,
+                },
+            }
+        )
+        for i in range(count)
+    ]
+
+
+def __measure(
+    messages: list[StreamMessage], encoding: StreamEncoding, batch_size: int
+) -> dict:
+    """
+    Encode all messages into frames and measure size and throughput.
+    Args:
+        messages (list[StreamMessage]): The messages, fresh with no cached encodings.
+        encoding (StreamEncoding): The encoding to use.
+        batch_size (int): The messages per frame; ignored for the text encoding.
+    Returns:
+        dict: The frames, raw and deflated bytes, and messages encoded per second.
+    """
+
+    started_at = time.perf_counter()
+    if encoding is StreamEncoding.TEXT:
+        frames = [message.encode(encoding) for message in messages]
+    else:
+        frames = [
+            encode_frame(messages[i : i + batch_size], encoding)
+            for i in range(0, len(messages), batch_size)
+        ]
+    elapsed = time.perf_counter() - started_at
+
+    # permessage-deflate compresses each frame on a context shared across the connection
+    compressor = zlib.compressobj(wbits=-15)
+    deflated_bytes = sum(
+        len(compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH))
+        for frame in frames
+    )
+    return {
+        "frames": len(frames),
+        "bytes": sum(len(frame) for frame in frames),
+        "deflated_bytes": deflated_bytes,
+        "messages_per_second": len(messages) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    for encoding in StreamEncoding:
+        result = __measure(__build_messages(args.messages), encoding, args.batch_size)
+        print(
+            f"{encoding.value:>8}: {result['frames']:>7} frames, "
+            f"{result['bytes'] / args.messages:6.1f} bytes/message, "
+            f"{result['deflated_bytes'] / args.messages:6.1f} deflated bytes/message, "
+            f"{result['messages_per_second']:12,.0f} messages/sec"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark of the trade write coalescer.
+Runs bursts of concurrent trade inserts against a simulated collection that charges a
+fixed round-trip time per call over a bounded connection pool, and compares one
+`insert_one` per trade with coalesced `insert_many` batches. Every burst contains a few
+duplicate IDs, to check that only the callers of the rejected documents see an error.
+
+Usage:
+    python -m benchmarks.write_coalescer_benchmark [--writers 1000 10000] [--rtt-ms N]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.core.write_coalescer import WriteCoalescer
+
+DUPLICATE_EVERY = 100
+
+
+class SimulatedCollection:
+    """
+    A collection with a unique `id` field, whose calls each cost one round trip
+    plus a small per-document cost, over a bounded connection pool.
+    """
+
+    def __init__(self, rtt_seconds: float, document_seconds: float, pool_size: int):
+        self.rtt_seconds = rtt_seconds
+        self.document_seconds = document_seconds
+        self.round_trips = 0
+        self.ids: set[str] = set()
+        self.__pool = asyncio.Semaphore(pool_size)
+
+    async def insert_one(self, document: dict):
+        async with self.__pool:
+            self.round_trips += 1
+            await asyncio.sleep(self.rtt_seconds + self.document_seconds)
+            if document["id"] in self.ids:
+                raise DuplicateKeyError("duplicate key", 11000)
+            self.ids.add(document["id"])
+
+    async def insert_many(self, documents: list[dict], ordered: bool = True):
+        async with self.__pool:
+            self.round_trips += 1
+            await asyncio.sleep(
+                self.rtt_seconds + self.document_seconds * len(documents)
+            )
+            write_errors = []
+            for index, document in enumerate(documents):
+                if document["id"] in self.ids:
+                    write_errors.append(
+                        {"index": index, "code": 11000, "errmsg": "duplicate key"}
+                    )
+                else:
+                    self.ids.add(document["id"])
+            if write_errors:
+                raise BulkWriteError(
+                    {
+                        "writeErrors": write_errors,
+                        "writeConcernErrors": [],
+                        "nInserted": 0,
+                    }
+                )
+
+
+async def __write(insert, document: dict, latencies: list) -> bool:
+    """
+    Insert a document and record how long the caller waited for it.
+    Args:
+        insert (Callable): The insert coroutine function.
+        document (dict): The document to insert.
+        latencies (list): The list to append latencies (in seconds) to.
+    Returns:
+        bool: True if the document was rejected as a duplicate.
+    """
+
+    started_at = time.perf_counter()
+    try:
+        await insert(document)
+    except DuplicateKeyError:
+        return True
+    finally:
+        latencies.append(time.perf_counter() - started_at)
+    return False
+
+
+async def __measure(writers: int, args: argparse.Namespace, coalesce: bool) -> dict:
+    """
+    Run one burst of concurrent inserts.
+    Args:
+        writers (int): The number of concurrent inserts.
+        args (argparse.Namespace): The simulation parameters.
+        coalesce (bool): Whether to batch the inserts with a WriteCoalescer.
+    Returns:
+        dict: Throughput, round trips, rejected inserts and latency percentiles.
+    """
+
+    collection = SimulatedCollection(
+        args.rtt_ms / 1000, args.document_us / 1_000_000, args.pool_size
+    )
+    coalescer = WriteCoalescer(collection, args.window_ms / 1000, args.max_batch_size)
+    insert = coalescer.insert if coalesce else collection.insert_one
+    documents = [
+        # Every DUPLICATE_EVERY-th document reuses the ID of the previous one
+        {"id": str(i - 1 if i % DUPLICATE_EVERY == 0 and i else i)}
+        for i in range(writers)
+    ]
+
+    latencies = []
+    started_at = time.perf_counter()
+    rejected = await asyncio.gather(
+        *(__write(insert, document, latencies) for document in documents)
+    )
+    elapsed = time.perf_counter() - started_at
+    await coalescer.close()
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "writes_per_second": writers / elapsed,
+        "round_trips": collection.round_trips,
+        "rejected": sum(rejected),
+        "stored": len(collection.ids),
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "stats": coalescer.get_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--rtt-ms", type=float, default=1.0)
+    parser.add_argument("--document-us", type=float, default=5.0)
+    parser.add_argument("--pool-size", type=int, default=100)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    for writers in args.writers:
+        expected_rejected = (writers - 1) // DUPLICATE_EVERY
+        for coalesce in (False, True):
+            result = asyncio.run(__measure(writers, args, coalesce))
+            assert result["rejected"] == expected_rejected, result
+            assert result["stored"] == writers - expected_rejected, result
+            print(
+                f"{writers:>6} writers, "
+                f"{'coalesced' if coalesce else 'insert_one':>10}: "
+                f"{result['writes_per_second']:>9,.0f} writes/s, "
+                f"{result['round_trips']:>6} round trips, "
+                f"p50 {result['p50_ms']:7.2f} ms, p99 {result['p99_ms']:7.2f} ms"
+            )
+            if coalesce:
+                stats = result["stats"]
+                print(
+                    f"{'':>25}average batch {stats['average_batch_size']:.1f}, "
+                    f"largest {stats['largest_batch']}, added wait "
+                    f"{stats['total_wait_seconds'] / stats['documents'] * 1000:.2f} "
+                    f"ms mean, "
+                    f"{stats['max_wait_seconds'] * 1000:.2f} ms max"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Tests of the read-through cache over the in-process backend: hits in both tiers,
+coalesced loads, invalidation, and values loaded before an invalidation, which must
+never be written back.
+
+Usage:
+    python -m pytest tests/test_cache.py
+"""
+
+import asyncio
+import logging
+
+import pytest
+
+from app.core.broadcast_hub import BroadcastHub
+from app.core.broadcast_transport import MemoryBroadcastTransport
+from app.core.cache import MemoryCacheBackend, ReadThroughCache
+
+NAMESPACE = "positions:user"
+LOCAL_SIZE = 100
+TTL_SECONDS = 60
+
+
+class Loader:
+    """
+    A loader counting its calls, which can be held until released.
+    """
+
+    def __init__(self, value, held: bool = False):
+        self.value = value
+        self.calls = 0
+        self.released = asyncio.Event()
+        if not held:
+            self.released.set()
+
+    async def __call__(self):
+        """
+        Load the value, once released.
+        Returns:
+            Any: The value.
+        """
+
+        self.calls += 1
+        await self.released.wait()
+        return self.value
+
+
+class FailingBackend(MemoryCacheBackend):
+    """
+    A backend whose every call fails, like an unreachable Redis server.
+    """
+
+    async def get(self, namespace: str, key: str):
+        raise ConnectionError("backend down")
+
+    async def set(self, namespace, key, value, ttl_seconds, generation):
+        raise ConnectionError("backend down")
+
+    async def delete(self, namespace: str):
+        raise ConnectionError("backend down")
+
+
+def build_cache(
+    backend: MemoryCacheBackend | None = None, **kwargs
+) -> ReadThroughCache:
+    """
+    Build a cache with the test defaults.
+    Args:
+        backend (MemoryCacheBackend | None): The shared tier.
+        **kwargs: Overrides of the other parameters.
+    Returns:
+        ReadThroughCache: The cache.
+    """
+
+    return ReadThroughCache(
+        kwargs.pop("local_size", LOCAL_SIZE),
+        kwargs.pop("ttl_seconds", TTL_SECONDS),
+        backend,
+        **kwargs,
+    )
+
+
+async def settle():
+    """
+    Let the tasks woken so far run until they block again.
+    """
+
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.parametrize("with_backend", [False, True])
+def test_local_hit(with_backend: bool):
+    async def run():
+        cache = build_cache(MemoryCacheBackend() if with_backend else None)
+        loader = Loader([1, 2])
+
+        assert await cache.get_or_load(NAMESPACE, "page", loader) == [1, 2]
+        assert await cache.get_or_load(NAMESPACE, "page", loader) == [1, 2]
+
+        assert loader.calls == 1
+        stats = cache.get_stats()
+        assert (stats["local_hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+    asyncio.run(run())
+
+
+def test_backend_hit_from_another_worker():
+    async def run():
+        backend = MemoryCacheBackend()
+        loader = Loader({"net_quantity": 2.0})
+        await build_cache(backend).get_or_load(NAMESPACE, "positions", loader)
+
+        other = build_cache(backend)
+        assert await other.get_or_load(NAMESPACE, "positions", loader) == {
+            "net_quantity": 2.0
+        }
+        assert loader.calls == 1
+        assert other.get_stats()["backend_hits"] == 1
+
+    asyncio.run(run())
+
+
+def test_local_tier_evicts_the_least_recently_used_entry():
+    async def run():
+        cache = build_cache(local_size=2)
+        loaders = {key: Loader(key) for key in "abc"}
+        for key in "aba":
+            await cache.get_or_load(NAMESPACE, key, loaders[key])
+        await cache.get_or_load(NAMESPACE, "c", loaders["c"])
+
+        await cache.get_or_load(NAMESPACE, "a", loaders["a"])
+        await cache.get_or_load(NAMESPACE, "b", loaders["b"])
+        assert (loaders["a"].calls, loaders["b"].calls) == (1, 2)
+
+    asyncio.run(run())
+
+
+def test_concurrent_misses_share_a_load():
+    async def run():
+        cache = build_cache(MemoryCacheBackend())
+        loader = Loader("value", held=True)
+
+        lookups = [
+            asyncio.create_task(cache.get_or_load(NAMESPACE, "page", loader))
+            for _ in range(5)
+        ]
+        await settle()
+        loader.released.set()
+
+        assert await asyncio.gather(*lookups) == ["value"] * 5
+        assert loader.calls == 1
+        assert cache.get_stats()["coalesced"] == 4
+
+    asyncio.run(run())
+
+
+def test_cancelled_caller_does_not_fail_the_shared_load():
+    async def run():
+        cache = build_cache()
+        loader = Loader("value", held=True)
+
+        cancelled = asyncio.create_task(cache.get_or_load(NAMESPACE, "page", loader))
+        joined = asyncio.create_task(cache.get_or_load(NAMESPACE, "page", loader))
+        await settle()
+        cancelled.cancel()
+        loader.released.set()
+
+        assert await joined == "value"
+        assert cancelled.cancelled()
+
+    asyncio.run(run())
+
+
+def test_invalidate_drops_both_tiers():
+    async def run():
+        backend = MemoryCacheBackend()
+        cache = build_cache(backend)
+        await cache.get_or_load(NAMESPACE, "page", Loader("old"))
+
+        await cache.invalidate(NAMESPACE)
+
+        assert await cache.get_or_load(NAMESPACE, "page", Loader("new")) == "new"
+        assert (await backend.get(NAMESPACE, "page"))[1] == 1
+        assert cache.get_stats()["misses"] == 2
+
+    asyncio.run(run())
+
+
+def test_load_started_before_an_invalidation_is_not_joined_or_cached():
+    async def run():
+        backend = MemoryCacheBackend()
+        cache = build_cache(backend)
+        stale = Loader("old", held=True)
+
+        before = asyncio.create_task(cache.get_or_load(NAMESPACE, "page", stale))
+        await settle()
+        await cache.invalidate(NAMESPACE)
+        # Callers after the invalidation see their own writes
+        assert await cache.get_or_load(NAMESPACE, "page", Loader("new")) == "new"
+        stale.released.set()
+
+        assert await before == "old"
+        assert await cache.get_or_load(NAMESPACE, "page", Loader("other")) == "new"
+        assert (
+            await build_cache(backend).get_or_load(NAMESPACE, "page", Loader("other"))
+            == "new"
+        )
+
+    asyncio.run(run())
+
+
+def test_stale_write_back_is_rejected_by_generation():
+    async def run():
+        backend = MemoryCacheBackend()
+        loading = build_cache(backend)
+        stale = Loader("old", held=True)
+
+        # The load reads the generation of the namespace, then another worker
+        # invalidates it before the value is loaded
+        load = asyncio.create_task(loading.get_or_load(NAMESPACE, "page", stale))
+        await settle()
+        await build_cache(backend).invalidate(NAMESPACE)
+        stale.released.set()
+
+        assert await load == "old"
+        assert await backend.get(NAMESPACE, "page") == (None, 1)
+        # The rejected value is not kept in the local tier either
+        assert await loading.get_or_load(NAMESPACE, "page", Loader("new")) == "new"
+
+    asyncio.run(run())
+
+
+def test_backend_errors_fall_back_to_the_loader():
+    async def run():
+        cache = build_cache(FailingBackend())
+        loader = Loader("value")
+
+        assert await cache.get_or_load(NAMESPACE, "page", loader) == "value"
+        await cache.invalidate(NAMESPACE)
+        assert await cache.get_or_load(NAMESPACE, "page", loader) == "value"
+
+        assert loader.calls == 2
+        # Without a generation from the failed gets, no set is attempted
+        assert cache.get_stats()["backend_errors"] == 3
+
+    asyncio.run(run())
+
+
+def test_invalidations_reach_the_other_workers():
+    async def run():
+        # Two caches on one hub stand for two workers, the loopback
+        # transport for the channel between them
+        hub = BroadcastHub(MemoryBroadcastTransport())
+        writer, reader = build_cache(hub=hub), build_cache(hub=hub)
+        logger = logging.getLogger(__name__)
+        tasks = [
+            asyncio.create_task(hub.run_transport(logger)),
+            asyncio.create_task(writer.run_invalidations(logger)),
+            asyncio.create_task(reader.run_invalidations(logger)),
+        ]
+        await settle()
+        try:
+            await reader.get_or_load(NAMESPACE, "page", Loader("old"))
+
+            await writer.invalidate(NAMESPACE)
+            await settle()
+
+            assert await reader.get_or_load(NAMESPACE, "page", Loader("new")) == "new"
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(run())
@@ -0,0 +1,160 @@
+"""
+Tests of the technical indicators: the streaming indicators, fed one bar at a time,
+must match the batch ones, including the NaN values while they warm up.
+
+Usage:
+    python -m pytest tests/test_indicators.py
+"""
+
+import numpy as np
+import pytest
+
+from app.core import indicators
+
+# Relative to the price level, since oscillators like the MACD hover around zero
+RELATIVE_TOLERANCE = 1e-9
+# Lengths around the warm-up of every default period, and long enough series
+# to cross several renormalizations of the rolling windows and EWM blocks
+LENGTHS = [0, 1, 2, 13, 14, 15, 19, 20, 21, 25, 26, 33, 34, 35, 500, 5000]
+
+
+def build_bars(count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build a random-walk series of bars.
+    Args:
+        count (int): The number of bars to build.
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: The highs, lows and closes.
+    """
+
+    rng = np.random.default_rng(count)
+    closes = 30_000 + np.cumsum(rng.normal(0, 25, count))
+    highs = closes + rng.uniform(0, 20, count)
+    lows = closes - rng.uniform(0, 20, count)
+    return highs, lows, closes
+
+
+def assert_agree(expected: np.ndarray, actual: np.ndarray, price_level: float):
+    """
+    Assert that two indicator series are NaN at the same bars and close elsewhere.
+    Args:
+        expected (np.ndarray): The batch series.
+        actual (np.ndarray): The streaming series.
+        price_level (float): The magnitude of the prices, which scales the tolerance.
+    """
+
+    assert expected.shape == actual.shape
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(
+        actual, expected, rtol=0, atol=RELATIVE_TOLERANCE * price_level, equal_nan=True
+    )
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+@pytest.mark.parametrize("period", [1, 5, 20])
+def test_sma(length: int, period: int):
+    _, _, closes = build_bars(length)
+    stream = indicators.StreamingSMA(period)
+    streamed = np.array([stream.update(close) for close in closes.tolist()])
+
+    expected = indicators.sma(closes, period)
+    assert np.isnan(expected[: period - 1]).all()
+    assert not np.isnan(expected[period - 1 :]).any()
+    assert_agree(expected, streamed, 30_000)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+@pytest.mark.parametrize("period", [1, 5, 20])
+def test_ema(length: int, period: int):
+    _, _, closes = build_bars(length)
+    stream = indicators.StreamingEMA(period)
+    streamed = np.array([stream.update(close) for close in closes.tolist()])
+
+    expected = indicators.ema(closes, period)
+    assert np.isnan(expected[: period - 1]).all()
+    assert not np.isnan(expected[period - 1 :]).any()
+    assert_agree(expected, streamed, 30_000)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+@pytest.mark.parametrize("period", [2, 14])
+def test_rsi(length: int, period: int):
+    _, _, closes = build_bars(length)
+    stream = indicators.StreamingRSI(period)
+    streamed = np.array([stream.update(close) for close in closes.tolist()])
+
+    expected = indicators.rsi(closes, period)
+    assert np.isnan(expected[:period]).all()
+    assert not np.isnan(expected[period:]).any()
+    assert_agree(expected, streamed, 100)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+@pytest.mark.parametrize("periods", [(12, 26, 9), (3, 6, 4)])
+def test_macd(length: int, periods: tuple[int, int, int]):
+    _, _, closes = build_bars(length)
+    stream = indicators.StreamingMACD(*periods)
+    streamed = [stream.update(close) for close in closes.tolist()]
+
+    expected = indicators.macd(closes, *periods)
+    for i, series in enumerate(expected):
+        assert_agree(series, np.array([values[i] for values in streamed]), 30_000)
+    _, slow_period, signal_period = periods
+    assert np.isnan(expected.signal[: slow_period + signal_period - 2]).all()
+    assert not np.isnan(expected.signal[slow_period + signal_period - 2 :]).any()
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+@pytest.mark.parametrize("period", [2, 20])
+def test_bollinger_bands(length: int, period: int):
+    _, _, closes = build_bars(length)
+    stream = indicators.StreamingBollingerBands(period, 2.5)
+    streamed = [stream.update(close) for close in closes.tolist()]
+
+    expected = indicators.bollinger_bands(closes, period, 2.5)
+    for i, series in enumerate(expected):
+        assert_agree(series, np.array([values[i] for values in streamed]), 30_000)
+    assert np.isnan(expected.upper[: period - 1]).all()
+    assert not np.isnan(expected.upper[period - 1 :]).any()
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+@pytest.mark.parametrize("period", [1, 14])
+def test_atr(length: int, period: int):
+    highs, lows, closes = build_bars(length)
+    stream = indicators.StreamingATR(period)
+    streamed = np.array(
+        [
+            stream.update(high, low, close)
+            for high, low, close in zip(highs.tolist(), lows.tolist(), closes.tolist())
+        ]
+    )
+
+    expected = indicators.atr(highs, lows, closes, period)
+    assert np.isnan(expected[: period - 1]).all()
+    assert not np.isnan(expected[period - 1 :]).any()
+    assert_agree(expected, streamed, 30_000)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_all_indicators(length: int):
+    highs, lows, closes = build_bars(length)
+    stream = indicators.StreamingIndicators()
+    streamed = [
+        stream.update(high, low, close)
+        for high, low, close in zip(highs.tolist(), lows.tolist(), closes.tolist())
+    ]
+
+    expected = indicators.compute_indicators(highs, lows, closes)
+    assert set(expected) == set(stream.update(1.0, 1.0, 1.0))
+    for name, series in expected.items():
+        assert_agree(series, np.array([values[name] for values in streamed]), 30_000)
+
+
+def test_flat_series():
+    closes = np.full(50, 100.0)
+    assert (indicators.rsi(closes)[14:] == 50.0).all()
+    assert (indicators.bollinger_bands(closes).upper[19:] == 100.0).all()
+
+    stream = indicators.StreamingRSI()
+    assert [stream.update(100.0) for _ in range(50)][14:] == [50.0] * 36
@@ -0,0 +1,349 @@
+"""
+Tests of the order book and the matching engine: fills at the makers' prices with
+price-time priority, partial fills, cancellation, and the revert of an order whose
+trades could not be written.
+
+Usage:
+    python -m pytest tests/test_order_book.py
+"""
+
+import asyncio
+import itertools
+
+from pymongo.errors import PyMongoError
+import pytest
+
+from app.core.broadcast_hub import BroadcastHub
+from app.core.order_book import MatchingEngine, Order, OrderBook
+from app.schemas.order_schema import OrderCreate, OrderStatus, OrderType
+from app.schemas.trade_schema import TradeAction
+from app.services.order_service import OrderService
+
+SYMBOL = "BTC"
+
+order_ids = itertools.count()
+
+
+def build_order(
+    action: TradeAction,
+    amount: float,
+    price: float | None = None,
+    user_id: str = "user",
+) -> Order:
+    """
+    Build an order, a limit order if it has a price and a market order otherwise.
+    Args:
+        action (TradeAction): The side of the order.
+        amount (float): The amount to trade.
+        price (float | None): The limit price.
+        user_id (str): The ID of the user placing the order.
+    Returns:
+        Order: The order, timestamped after every order built before it.
+    """
+
+    order_id = next(order_ids)
+    return Order(
+        f"order-{order_id}",
+        user_id,
+        SYMBOL,
+        action,
+        OrderType.MARKET if price is None else OrderType.LIMIT,
+        price,
+        amount,
+        float(order_id),
+    )
+
+
+def levels(book: OrderBook, side: TradeAction) -> list[tuple[float, float, int]]:
+    """
+    Get the levels of a side of a book.
+    Args:
+        book (OrderBook): The order book.
+        side (TradeAction): The side of the book.
+    Returns:
+        list[tuple[float, float, int]]: The price, amount and order count of each level,
+        best first.
+    """
+
+    return [
+        (level.price, level.amount, level.order_count) for level in book.depth(side, 10)
+    ]
+
+
+class FakeTradeService:
+    """
+    A trade service recording the trades written, or failing every write.
+    """
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.trades: list[dict] = []
+
+    async def insert_trades(self, trades_data: list[dict]) -> list[dict]:
+        """
+        Record new trades, like `TradeService.insert_trades`.
+        Args:
+            trades_data (list[dict]): The trades to write.
+        Returns:
+            list[dict]: The written trades.
+        Raises:
+            PyMongoError: If the service fails every write.
+        """
+
+        if self.fail:
+            raise PyMongoError("write failed")
+        trades = [
+            {**trade_data, "id": f"trade-{len(self.trades) + index}", "timestamp": 0.0}
+            for index, trade_data in enumerate(trades_data)
+        ]
+        self.trades.extend(trades)
+        return trades
+
+    async def apply_trades(self, trades: list[dict]):
+        """
+        Do nothing, as there are no positions or candles to update.
+        Args:
+            trades (list[dict]): The written trades.
+        """
+
+
+def test_limit_order_rests_without_a_cross():
+    book = OrderBook(SYMBOL)
+    assert book.submit(build_order(TradeAction.BUY, 1, 100)) == []
+    assert book.submit(build_order(TradeAction.SELL, 2, 101)) == []
+
+    assert book.best_price(TradeAction.BUY) == 100
+    assert book.best_price(TradeAction.SELL) == 101
+    assert levels(book, TradeAction.BUY) == [(100, 1, 1)]
+    assert levels(book, TradeAction.SELL) == [(101, 2, 1)]
+
+
+def test_fills_at_maker_prices_with_price_time_priority():
+    book = OrderBook(SYMBOL)
+    late = build_order(TradeAction.SELL, 1, 100)
+    early = build_order(TradeAction.SELL, 1, 100)
+    cheapest = build_order(TradeAction.SELL, 1, 99)
+    for maker in (early, late, cheapest):
+        book.submit(maker)
+
+    taker = build_order(TradeAction.BUY, 3, 105)
+    fills = book.submit(taker)
+
+    assert [(fill.maker, fill.price, fill.amount) for fill in fills] == [
+        (cheapest, 99, 1),
+        (early, 100, 1),
+        (late, 100, 1),
+    ]
+    assert all(fill.taker is taker for fill in fills)
+    assert taker.status == OrderStatus.FILLED
+    assert book.best_price(TradeAction.SELL) is None
+    assert book.get_order(taker.id) is None
+
+
+def test_partial_fill_of_the_maker():
+    book = OrderBook(SYMBOL)
+    maker = build_order(TradeAction.SELL, 5, 100)
+    book.submit(maker)
+
+    fills = book.submit(build_order(TradeAction.BUY, 2, 100))
+
+    assert [fill.amount for fill in fills] == [2]
+    assert maker.status == OrderStatus.PARTIALLY_FILLED
+    assert maker.filled_amount == 2
+    assert levels(book, TradeAction.SELL) == [(100, 3, 1)]
+
+
+def test_partial_fill_of_a_limit_taker_rests_its_remainder():
+    book = OrderBook(SYMBOL)
+    book.submit(build_order(TradeAction.SELL, 1, 100))
+    book.submit(build_order(TradeAction.SELL, 1, 102))
+
+    taker = build_order(TradeAction.BUY, 3, 101)
+    fills = book.submit(taker)
+
+    assert [(fill.price, fill.amount) for fill in fills] == [(100, 1)]
+    assert taker.status == OrderStatus.PARTIALLY_FILLED
+    assert book.get_order(taker.id) is taker
+    assert levels(book, TradeAction.BUY) == [(101, 2, 1)]
+    assert levels(book, TradeAction.SELL) == [(102, 1, 1)]
+
+
+def test_market_order_remainder_is_cancelled():
+    book = OrderBook(SYMBOL)
+    book.submit(build_order(TradeAction.BUY, 1, 100))
+    book.submit(build_order(TradeAction.BUY, 1, 90))
+
+    taker = build_order(TradeAction.SELL, 5)
+    fills = book.submit(taker)
+
+    assert [(fill.price, fill.amount) for fill in fills] == [(100, 1), (90, 1)]
+    assert taker.status == OrderStatus.CANCELLED
+    assert taker.filled_amount == 2
+    assert book.get_order(taker.id) is None
+    assert book.best_price(TradeAction.BUY) is None
+
+
+def test_cancel_removes_the_order_from_matching():
+    book = OrderBook(SYMBOL)
+    cancelled = build_order(TradeAction.SELL, 1, 100)
+    resting = build_order(TradeAction.SELL, 1, 100)
+    book.submit(cancelled)
+    book.submit(resting)
+
+    assert book.cancel(cancelled.id) is cancelled
+    assert cancelled.status == OrderStatus.CANCELLED
+    assert book.cancel(cancelled.id) is None
+    assert levels(book, TradeAction.SELL) == [(100, 1, 1)]
+
+    fills = book.submit(build_order(TradeAction.BUY, 2, 100))
+    assert [(fill.maker, fill.amount) for fill in fills] == [(resting, 1)]
+
+
+def test_cancelling_the_last_order_of_a_level_removes_it():
+    book = OrderBook(SYMBOL)
+    best = build_order(TradeAction.BUY, 1, 101)
+    book.submit(best)
+    book.submit(build_order(TradeAction.BUY, 1, 100))
+
+    book.cancel(best.id)
+
+    assert book.best_price(TradeAction.BUY) == 100
+    assert levels(book, TradeAction.BUY) == [(100, 1, 1)]
+
+    # The level can be re-created while its stale heap entry is still there
+    book.submit(build_order(TradeAction.BUY, 2, 101))
+    assert levels(book, TradeAction.BUY) == [(101, 2, 1), (100, 1, 1)]
+
+
+def test_revert_restores_makers_ahead_of_their_levels():
+    book = OrderBook(SYMBOL)
+    filled = build_order(TradeAction.SELL, 1, 100)
+    partially_filled = build_order(TradeAction.SELL, 2, 101)
+    queued = build_order(TradeAction.SELL, 1, 101)
+    for maker in (filled, partially_filled, queued):
+        book.submit(maker)
+
+    taker = build_order(TradeAction.BUY, 3, 101)
+    fills = book.submit(taker)
+    # An order queued behind a maker while the trades were being written
+    arrived = build_order(TradeAction.SELL, 1, 100)
+    book.submit(arrived)
+
+    book.revert(taker, fills)
+
+    assert taker.status == OrderStatus.CANCELLED
+    assert taker.remaining == taker.amount
+    assert filled.remaining == 1 and partially_filled.remaining == 2
+    assert levels(book, TradeAction.SELL) == [(100, 2, 2), (101, 3, 2)]
+    fills = book.submit(build_order(TradeAction.BUY, 5, 101))
+    assert [fill.maker for fill in fills] == [
+        filled,
+        arrived,
+        partially_filled,
+        queued,
+    ]
+
+
+def test_revert_keeps_makers_cancelled_meanwhile_cancelled():
+    book = OrderBook(SYMBOL)
+    maker = build_order(TradeAction.SELL, 2, 100)
+    book.submit(maker)
+
+    taker = build_order(TradeAction.BUY, 1, 100)
+    fills = book.submit(taker)
+    book.cancel(maker.id)
+    book.revert(taker, fills)
+
+    assert maker.status == OrderStatus.CANCELLED
+    assert book.best_price(TradeAction.SELL) is None
+
+
+def test_engine_routes_orders_by_symbol():
+    engine = MatchingEngine()
+    maker = build_order(TradeAction.SELL, 1, 100)
+    engine.submit(maker)
+    other = Order("other", "user", "ETH", TradeAction.BUY, OrderType.LIMIT, 100, 1, 0)
+
+    assert engine.submit(other) == []
+    assert engine.get_order(maker.id) is maker
+    assert engine.cancel(maker.id) is maker
+    assert engine.get_order(maker.id) is None
+    assert engine.cancel(maker.id) is None
+    assert engine.find_book("SOL") is None
+
+
+def test_engine_forgets_filled_makers():
+    engine = MatchingEngine()
+    maker = build_order(TradeAction.SELL, 1, 100)
+    engine.submit(maker)
+
+    fills = engine.submit(build_order(TradeAction.BUY, 1, 100))
+
+    assert len(fills) == 1
+    assert engine.get_order(maker.id) is None
+    assert (engine.orders_matched, engine.fills) == (2, 1)
+
+
+def test_place_order_records_both_sides_of_each_fill():
+    engine = MatchingEngine()
+    trade_service = FakeTradeService()
+    service = OrderService(engine, trade_service, BroadcastHub())
+    maker = build_order(TradeAction.SELL, 1, 100, user_id="maker")
+    engine.submit(maker)
+
+    order = asyncio.run(
+        service.place_order(
+            "taker",
+            OrderCreate(action=TradeAction.BUY, amount=3, price=100, symbol=SYMBOL),
+        )
+    )
+
+    assert order["status"] == OrderStatus.PARTIALLY_FILLED
+    assert [trade["user_id"] for trade in order["trades"]] == ["taker"]
+    assert [
+        (trade["user_id"], trade["action"], trade["amount"], trade["price"])
+        for trade in trade_service.trades
+    ] == [
+        ("taker", TradeAction.BUY.value, 1, 100),
+        ("maker", TradeAction.SELL.value, 1, 100),
+    ]
+    assert service.get_order_book(SYMBOL) == {
+        "symbol": SYMBOL,
+        "bids": [{"price": 100, "amount": 2, "order_count": 1}],
+        "asks": [],
+    }
+
+
+def test_place_order_reverts_the_fills_after_a_failed_write():
+    engine = MatchingEngine()
+    service = OrderService(engine, FakeTradeService(fail=True), BroadcastHub())
+    maker = build_order(TradeAction.SELL, 1, 100, user_id="maker")
+    engine.submit(maker)
+
+    with pytest.raises(PyMongoError):
+        asyncio.run(
+            service.place_order(
+                "taker",
+                OrderCreate(action=TradeAction.BUY, amount=3, price=100, symbol=SYMBOL),
+            )
+        )
+
+    assert engine.get_order(maker.id) is maker
+    assert maker.status == OrderStatus.OPEN
+    assert engine.fills == 0
+    assert service.get_order_book(SYMBOL) == {
+        "symbol": SYMBOL,
+        "bids": [],
+        "asks": [{"price": 100, "amount": 1, "order_count": 1}],
+    }
+
+
+def test_cancel_order_only_cancels_the_users_own_orders():
+    engine = MatchingEngine()
+    service = OrderService(engine, FakeTradeService(), BroadcastHub())
+    maker = build_order(TradeAction.SELL, 1, 100, user_id="maker")
+    engine.submit(maker)
+
+    assert service.cancel_order("someone-else", maker.id) is None
+    assert service.cancel_order("maker", maker.id)["status"] == OrderStatus.CANCELLED
+    assert service.cancel_order("maker", maker.id) is None
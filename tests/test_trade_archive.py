@@ -0,0 +1,209 @@
+"""
+Tests of the trade archive on a local directory: archived trades leave the trades
+collection and are read back in order, and trades written twice by an interrupted
+archival are only read once.
+
+Usage:
+    python -m pytest tests/test_trade_archive.py
+"""
+
+import asyncio
+from pathlib import Path
+
+import pyarrow.fs
+import pytest
+
+from app.schemas.trade_schema import TradeFilter
+from app.services.trade_archive import ARCHIVE_DELETE_BATCH_SIZE, TradeArchive
+from benchmarks.memory_mongo import MemoryCollection
+
+USER_ID = "user"
+# 2024-01-01 and 2024-02-01, UTC
+JANUARY = 1704067200.0
+FEBRUARY = 1706745600.0
+SYMBOLS = ("BTC", "ETH")
+
+
+class InterruptedCollection(MemoryCollection):
+    """
+    A trades collection whose deletes fail after a number of them, like an
+    archival stopped between writing a file and deleting all of its trades.
+    """
+
+    def __init__(self, name: str, deletes_left: int):
+        super().__init__(name)
+        self.deletes_left = deletes_left
+
+    async def delete_many(self, query: dict):
+        """
+        Delete the matching documents, unless the deletes left are used up.
+        Args:
+            query (dict): The query.
+        Raises:
+            ConnectionError: Once the deletes left are used up.
+        """
+
+        if self.deletes_left <= 0:
+            raise ConnectionError("archival interrupted")
+        self.deletes_left -= 1
+        return await super().delete_many(query)
+
+
+def build_trades(start: float, count: int) -> list[dict]:
+    """
+    Build a user's trades, one per second.
+    Args:
+        start (float): The timestamp of the first trade.
+        count (int): The number of trades.
+    Returns:
+        list[dict]: The trades, ordered by timestamp and ID.
+    """
+
+    return [
+        {
+            "id": f"{start:.0f}-{i:05d}",
+            "user_id": USER_ID,
+            "symbol": SYMBOLS[i % len(SYMBOLS)],
+            "action": "buy" if i % 3 else "sell",
+            "amount": 1.0 + i,
+            "price": 100.0 + i % 7,
+            "timestamp": start + i,
+        }
+        for i in range(count)
+    ]
+
+
+def build_archive(root: Path) -> TradeArchive:
+    """
+    Build an archive in a local directory.
+    Args:
+        root (Path): The directory.
+    Returns:
+        TradeArchive: The archive.
+    """
+
+    return TradeArchive(pyarrow.fs.LocalFileSystem(), str(root))
+
+
+def archived_files(root: Path) -> list[Path]:
+    """
+    List the Parquet files of an archive.
+    Args:
+        root (Path): The directory of the archive.
+    Returns:
+        list[Path]: The files, in order.
+    """
+
+    return sorted(root.rglob("*.parquet"))
+
+
+async def hot_trades(collection: MemoryCollection):
+    """
+    Iterate over the user's trades left in the collection, in listing order.
+    Args:
+        collection (MemoryCollection): The trades collection.
+    Yields:
+        dict: The trades.
+    """
+
+    cursor = collection.find({"user_id": USER_ID}, {"_id": 0}).sort(
+        [("timestamp", 1), ("id", 1)]
+    )
+    async for trade in cursor:
+        yield trade
+
+
+def without_ids(trades: list[dict]) -> list[dict]:
+    """
+    Drop the database IDs of trades, to compare them with archived ones.
+    Args:
+        trades (list[dict]): The trades.
+    Returns:
+        list[dict]: The trades without their `_id` field.
+    """
+
+    return [{k: v for k, v in trade.items() if k != "_id"} for trade in trades]
+
+
+def test_archive_moves_old_trades_by_month(tmp_path: Path):
+    async def run():
+        collection = MemoryCollection("trades")
+        old = build_trades(JANUARY, 30) + build_trades(FEBRUARY, 20)
+        recent = build_trades(FEBRUARY + 86400, 5)
+        await collection.insert_many([dict(trade) for trade in old + recent])
+        archive = build_archive(tmp_path)
+
+        summary = await archive.archive(
+            collection, FEBRUARY + 86400, max_rows_per_file=25
+        )
+
+        assert summary == {"users": 1, "files": 3, "trades": 50}
+        assert [path.parent.name for path in archived_files(tmp_path)] == [
+            "month=2024-01",
+            "month=2024-01",
+            "month=2024-02",
+        ]
+        assert without_ids(await collection.find({}).to_list()) == recent
+        assert await archive.load_trades(USER_ID) == old
+        assert await archive.list_user_ids() == [USER_ID]
+
+    asyncio.run(run())
+
+
+def test_archived_trades_are_filtered_and_paged(tmp_path: Path):
+    async def run():
+        collection = MemoryCollection("trades")
+        old = build_trades(JANUARY, 30) + build_trades(FEBRUARY, 20)
+        await collection.insert_many([dict(trade) for trade in old])
+        archive = build_archive(tmp_path)
+        await archive.archive(collection, FEBRUARY + 86400)
+
+        filters = TradeFilter(symbol="ETH", since=JANUARY + 10)
+        expected = [
+            trade
+            for trade in old
+            if trade["symbol"] == "ETH" and trade["timestamp"] >= JANUARY + 10
+        ]
+        assert await archive.load_trades(USER_ID, filters) == expected
+
+        after = (old[24]["timestamp"], old[24]["id"])
+        assert await archive.load_trades(USER_ID, after=after, limit=10) == old[25:35]
+        assert not await archive.has_trades(USER_ID, TradeFilter(since=FEBRUARY * 2))
+        assert await archive.load_symbol_trades("BTC", until=FEBRUARY) == [
+            trade for trade in old[:30] if trade["symbol"] == "BTC"
+        ]
+
+    asyncio.run(run())
+
+
+def test_interrupted_archival_reads_each_trade_once(tmp_path: Path):
+    async def run():
+        trades = build_trades(JANUARY, 2 * ARCHIVE_DELETE_BATCH_SIZE + 500)
+        collection = InterruptedCollection("trades", deletes_left=1)
+        await collection.insert_many([dict(trade) for trade in trades])
+        archive = build_archive(tmp_path)
+
+        with pytest.raises(ConnectionError):
+            await archive.archive(collection, FEBRUARY)
+        # The trades not deleted yet are in both tiers, and listed once
+        merged = [
+            trade
+            async for trade in archive.merge_hot_trades(USER_ID, hot_trades(collection))
+        ]
+        assert merged == trades
+
+        collection.deletes_left = len(trades)
+        await archive.archive(collection, FEBRUARY)
+
+        assert len(archived_files(tmp_path)) == 2
+        assert await collection.count_documents({}) == 0
+        assert await archive.load_trades(USER_ID) == trades
+        assert await archive.load_symbol_trades("ETH") == [
+            trade for trade in trades if trade["symbol"] == "ETH"
+        ]
+        after = (trades[1500]["timestamp"], trades[1500]["id"])
+        assert await archive.load_trades(USER_ID, after=after, limit=3) == (
+            trades[1501:1504]
+        )
+
+    asyncio.run(run())
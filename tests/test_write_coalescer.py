@@ -0,0 +1,222 @@
+"""
+Tests of the write coalescer: concurrent inserts are written in batches, and each
+caller gets the error of its own document when a batch is partly rejected.
+
+Usage:
+    python -m pytest tests/test_write_coalescer.py
+"""
+
+import asyncio
+
+from pymongo.errors import (
+    AutoReconnect,
+    BulkWriteError,
+    DuplicateKeyError,
+    WriteConcernError,
+    WriteError,
+)
+import pytest
+
+from app.core.write_coalescer import WriteCoalescer
+
+WINDOW_SECONDS = 0.01
+MAX_BATCH_SIZE = 4
+
+
+class FakeCollection:
+    """
+    A collection recording its `insert_many` batches, and raising
+    a given error for every batch if any.
+    """
+
+    def __init__(self, error: BaseException | None = None):
+        self.error = error
+        self.batches: list[list[dict]] = []
+
+    async def insert_many(self, documents: list[dict], ordered: bool = True):
+        """
+        Record a batch of documents, then raise the error if any.
+        Args:
+            documents (list[dict]): The documents.
+            ordered (bool): Whether the insert stops at the first error.
+        Raises:
+            BaseException: The error of the collection.
+        """
+
+        assert not ordered
+        self.batches.append(documents)
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+
+
+def bulk_write_error(
+    write_errors: list[dict], write_concern_errors: list[dict] | None = None
+) -> BulkWriteError:
+    """
+    Build the error of a partly rejected unordered insert.
+    Args:
+        write_errors (list[dict]): The errors of the rejected documents.
+        write_concern_errors (list[dict] | None): The write concern errors, if any.
+    Returns:
+        BulkWriteError: The error.
+    """
+
+    return BulkWriteError(
+        {
+            "writeErrors": write_errors,
+            "writeConcernErrors": write_concern_errors or [],
+            "nInserted": MAX_BATCH_SIZE - len(write_errors),
+        }
+    )
+
+
+async def insert_batch(
+    collection: FakeCollection, count: int = MAX_BATCH_SIZE
+) -> list[BaseException | None]:
+    """
+    Insert documents concurrently through a coalescer.
+    Args:
+        collection (FakeCollection): The collection.
+        count (int): The number of documents.
+    Returns:
+        list[BaseException | None]: The error of each insert, or None if it succeeded.
+    """
+
+    coalescer = WriteCoalescer(collection, WINDOW_SECONDS, MAX_BATCH_SIZE)
+    results = await asyncio.gather(
+        *(coalescer.insert({"id": str(i)}) for i in range(count)),
+        return_exceptions=True,
+    )
+    await coalescer.close()
+    return results
+
+
+def test_concurrent_inserts_share_batches():
+    async def run():
+        collection = FakeCollection()
+        coalescer = WriteCoalescer(collection, WINDOW_SECONDS, MAX_BATCH_SIZE)
+
+        await asyncio.gather(*(coalescer.insert({"id": str(i)}) for i in range(6)))
+
+        batch_ids = [
+            [document["id"] for document in batch] for batch in collection.batches
+        ]
+        assert batch_ids == [["0", "1", "2", "3"], ["4", "5"]]
+        stats = coalescer.get_stats()
+        assert stats["batches"] == 2 and stats["largest_batch"] == MAX_BATCH_SIZE
+        assert stats["documents"] == 6 and stats["failed_documents"] == 0
+
+    asyncio.run(run())
+
+
+def test_duplicate_only_fails_its_own_insert():
+    async def run():
+        collection = FakeCollection(
+            bulk_write_error(
+                [{"index": 1, "code": 11000, "errmsg": "E11000 duplicate key error"}]
+            )
+        )
+
+        results = await insert_batch(collection)
+
+        assert [type(result) for result in results] == [
+            type(None),
+            DuplicateKeyError,
+            type(None),
+            type(None),
+        ]
+        assert results[1].code == 11000
+
+    asyncio.run(run())
+
+
+def test_other_write_errors_fail_their_own_inserts():
+    async def run():
+        collection = FakeCollection(
+            bulk_write_error(
+                [
+                    {"index": 0, "code": 121, "errmsg": "Document failed validation"},
+                    {"index": 3, "code": 11000, "errmsg": "E11000 duplicate key error"},
+                ]
+            )
+        )
+
+        results = await insert_batch(collection)
+
+        assert type(results[0]) is WriteError
+        assert results[1] is None and results[2] is None
+        assert isinstance(results[3], DuplicateKeyError)
+
+    asyncio.run(run())
+
+
+def test_write_concern_error_fails_the_inserts_without_their_own_error():
+    async def run():
+        collection = FakeCollection(
+            bulk_write_error(
+                [{"index": 2, "code": 11000, "errmsg": "E11000 duplicate key error"}],
+                [{"code": 64, "errmsg": "waiting for replication timed out"}],
+            )
+        )
+
+        results = await insert_batch(collection)
+
+        assert isinstance(results[2], DuplicateKeyError)
+        for index in (0, 1, 3):
+            assert isinstance(results[index], WriteConcernError)
+            assert results[index].code == 64
+
+    asyncio.run(run())
+
+
+def test_failed_batch_fails_every_insert():
+    async def run():
+        error = AutoReconnect("connection reset")
+        results = await insert_batch(FakeCollection(error))
+
+        assert all(result is error for result in results)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "error", [RuntimeError("unexpected"), asyncio.CancelledError()]
+)
+def test_unexpected_error_resumes_every_insert(error: BaseException):
+    async def run():
+        collection = FakeCollection(error)
+        coalescer = WriteCoalescer(collection, WINDOW_SECONDS, MAX_BATCH_SIZE)
+
+        results = await asyncio.gather(
+            *(coalescer.insert({"id": str(i)}) for i in range(MAX_BATCH_SIZE)),
+            return_exceptions=True,
+        )
+        await coalescer.close()
+
+        assert all(type(result) is type(error) for result in results)
+        assert coalescer.get_stats()["failed_documents"] == MAX_BATCH_SIZE
+
+    asyncio.run(run())
+
+
+def test_cancelled_caller_does_not_fail_its_batch():
+    async def run():
+        collection = FakeCollection()
+        coalescer = WriteCoalescer(collection, WINDOW_SECONDS, MAX_BATCH_SIZE)
+
+        cancelled = asyncio.create_task(coalescer.insert({"id": "cancelled"}))
+        kept = asyncio.create_task(coalescer.insert({"id": "kept"}))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await kept
+        await coalescer.close()
+
+        assert cancelled.cancelled()
+        # The document of a cancelled caller may still be written
+        assert [document["id"] for document in collection.batches[0]] == [
+            "cancelled",
+            "kept",
+        ]
+
+    asyncio.run(run())